@@ -1,19 +1,43 @@
 from langgraph.types import Send
 
 from apps.agent.state import GraphState
+from apps.config import settings
+
+
+def search_nodes() -> list[str]:
+    """知识库检索的入口节点（并行执行）"""
+    return ["multi_search"] if settings.MILVUS_MULTI_SEARCH else ["hybrid_search", "text_match"]
 
 
 def route_condition(state: GraphState) -> str:
     """路由条件"""
     route_decision = state["route_decision"]
     if route_decision == "knowledge_base_search":
-        return "query_transform_HyDE"
+        return "answer_cache_lookup" if settings.ANSWER_CACHE_ENABLED else "query_transform_HyDE"
     elif route_decision == "plan_and_execute":
         return "planner"
     else:
         return "query_transform"
 
 
+def prestage_route_condition(state: GraphState) -> list[str] | str:
+    """推测执行模式的路由条件：前置阶段已完成查询转换，直接进入检索 / 规划 / 生成"""
+    route_decision = state["route_decision"]
+    if route_decision == "knowledge_base_search":
+        return "answer_cache_lookup" if settings.ANSWER_CACHE_ENABLED else search_nodes()
+    elif route_decision == "plan_and_execute":
+        return "planner"
+    else:
+        return "generate_response"
+
+
+def answer_cache_condition(state: GraphState) -> list[str] | str:
+    """答案缓存命中直接保存记忆并结束；未命中继续查询转换 / 检索"""
+    if state.get("answer_cache_hit"):
+        return "save_memories"
+    return search_nodes() if settings.AGENT_SPECULATIVE_PRESTAGE else "query_transform_HyDE"
+
+
 def generate_response_router(state: GraphState) -> str:
     """generate_response 统一出边：工具调用 → 评估 → 保存记忆"""
     messages = state.get("messages", [])
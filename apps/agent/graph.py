@@ -5,14 +5,26 @@ from typing import TYPE_CHECKING, Any
 from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode
 
-from apps.agent.condition import assign_workers, generate_response_router, route_condition
+from apps.agent.condition import (
+    answer_cache_condition,
+    assign_workers,
+    generate_response_router,
+    prestage_route_condition,
+    route_condition,
+    search_nodes,
+)
 from apps.agent.nodes import (
+    answer_cache_lookup,
+    cache_answer,
     evaluate_node,
     generate_response,
     hybrid_search,
+    multi_search,
     plan_step,
+    prestage,
     query_transform,
     query_transform_HyDE,
+    rerank,
     retrieve_memories,
     router,
     save_memories,
@@ -22,6 +34,7 @@ from apps.agent.nodes import (
 )
 from apps.agent.state import GraphState
 from apps.agent.tools import tools
+from apps.config import settings
 
 if TYPE_CHECKING:
     from langgraph.graph.state import CompiledStateGraph
@@ -35,12 +48,20 @@ def build_workflow() -> StateGraph:
     workflow = StateGraph(GraphState)
 
     # 节点定义
-    workflow.add_node("retrieve_memories", retrieve_memories)
-    workflow.add_node("router", router)
-    workflow.add_node("query_transform", query_transform)
-    workflow.add_node("query_transform_HyDE", query_transform_HyDE)
-    workflow.add_node("hybrid_search", hybrid_search)
-    workflow.add_node("text_match", text_match)
+    if settings.AGENT_SPECULATIVE_PRESTAGE:
+        workflow.add_node("prestage", prestage)
+    else:
+        workflow.add_node("retrieve_memories", retrieve_memories)
+        workflow.add_node("router", router)
+        workflow.add_node("query_transform", query_transform)
+        workflow.add_node("query_transform_HyDE", query_transform_HyDE)
+    if settings.MILVUS_MULTI_SEARCH:
+        workflow.add_node("multi_search", multi_search)
+    else:
+        workflow.add_node("hybrid_search", hybrid_search)
+        workflow.add_node("text_match", text_match)
+    if settings.RERANK_PROVIDER != "none":
+        workflow.add_node("rerank", rerank)
     workflow.add_node("generate_response", generate_response)
     workflow.add_node("planner", plan_step)
     workflow.add_node("work_step", work_step)
@@ -48,34 +69,51 @@ def build_workflow() -> StateGraph:
     workflow.add_node("evaluate_node", evaluate_node)
     workflow.add_node("tool_node", ToolNode(tools))
     workflow.add_node("save_memories", save_memories)
+    if settings.ANSWER_CACHE_ENABLED:
+        workflow.add_node("answer_cache_lookup", answer_cache_lookup)
+        workflow.add_node("cache_answer", cache_answer)
 
     # 边定义: 记忆检索 → 路由 → ... → 记忆存储
-    workflow.add_edge(START, "retrieve_memories")
-    workflow.add_edge("retrieve_memories", "router")
-    workflow.add_conditional_edges(
-        "router",
-        route_condition,
-        {
-            "query_transform": "query_transform",
-            "query_transform_HyDE": "query_transform_HyDE",
-            "planner": "planner",
-        },
-    )
+    retrieval = search_nodes()
+    # 知识库检索的第一跳：推测执行模式已完成 HyDE，直接检索；顺序模式先做 HyDE
+    knowledge_entry = retrieval if settings.AGENT_SPECULATIVE_PRESTAGE else ["query_transform_HyDE"]
+    if settings.ANSWER_CACHE_ENABLED:
+        # 先查答案缓存，命中直接保存记忆，未命中再进入查询转换 / 检索
+        workflow.add_conditional_edges(
+            "answer_cache_lookup", answer_cache_condition, [*knowledge_entry, "save_memories"]
+        )
+        knowledge_entry = ["answer_cache_lookup"]
+    if settings.AGENT_SPECULATIVE_PRESTAGE:
+        # 前置阶段并发完成记忆检索、路由与查询转换，直接进入检索 / 规划 / 生成
+        workflow.add_edge(START, "prestage")
+        workflow.add_conditional_edges(
+            "prestage", prestage_route_condition, [*knowledge_entry, "planner", "generate_response"]
+        )
+    else:
+        workflow.add_edge(START, "retrieve_memories")
+        workflow.add_edge("retrieve_memories", "router")
+        workflow.add_conditional_edges("router", route_condition, ["query_transform", *knowledge_entry, "planner"])
+        workflow.add_edge("query_transform", "generate_response")
+        for node in retrieval:
+            workflow.add_edge("query_transform_HyDE", node)
 
     workflow.add_conditional_edges("planner", assign_workers, ["work_step"])
     workflow.add_edge("work_step", "synthesis_step_results")
-    workflow.add_edge("query_transform", "generate_response")
-    workflow.add_edge("query_transform_HyDE", "hybrid_search")
-    workflow.add_edge("query_transform_HyDE", "text_match")
-    workflow.add_edge("hybrid_search", "generate_response")
-    workflow.add_edge("text_match", "generate_response")
-
-    # generate_response 统一出边：工具调用 → 评估 → 保存记忆
+    # 检索结果（启用重排时先经过 rerank）汇入 generate_response
+    retrieved = "rerank" if settings.RERANK_PROVIDER != "none" else "generate_response"
+    workflow.add_edge(retrieval, retrieved)
+    if settings.RERANK_PROVIDER != "none":
+        workflow.add_edge("rerank", "generate_response")
+
+    # generate_response 统一出边：工具调用 → 评估 → （写答案缓存）→ 保存记忆
+    finished = "cache_answer" if settings.ANSWER_CACHE_ENABLED else "save_memories"
     workflow.add_conditional_edges(
         "generate_response",
         generate_response_router,
-        {"tool_node": "tool_node", "evaluate_node": "evaluate_node", "save_memories": "save_memories"},
+        {"tool_node": "tool_node", "evaluate_node": "evaluate_node", "save_memories": finished},
     )
+    if settings.ANSWER_CACHE_ENABLED:
+        workflow.add_edge("cache_answer", "save_memories")
     workflow.add_edge("tool_node", "generate_response")
     workflow.add_edge("evaluate_node", "generate_response")
     workflow.add_edge("synthesis_step_results", "save_memories")
@@ -0,0 +1,12 @@
+from .classifier import ROUTE_LABELS, IntentClassifier, IntentPrediction, get_intent_classifier
+from .route_log import log_route, read_route_log, shutdown_route_log
+
+__all__ = [
+    "ROUTE_LABELS",
+    "IntentClassifier",
+    "IntentPrediction",
+    "get_intent_classifier",
+    "log_route",
+    "read_route_log",
+    "shutdown_route_log",
+]
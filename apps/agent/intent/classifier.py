@@ -0,0 +1,185 @@
+"""
+本地意图分类器
+
+router 节点前的快速通道，分两层：
+- 规则层：问候、致谢、确认、纯算式等高精度模式，直接判定为 answer_directly；
+- 模型层：jieba 分词 + 字符 bigram + 关键词组特征，哈希到固定维度，softmax 回归输出三类概率。
+
+置信度低于阈值（或模型未训练）时返回的结果由调用方交给 LLM 路由兜底。
+模型由 `python -m apps.agent.intent.train` 基于 LLM 路由日志训练。
+"""
+
+import logging
+import re
+import threading
+import zlib
+from collections.abc import Sequence
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal
+
+import jieba
+import numpy as np
+from pydantic import BaseModel, Field
+
+from apps.config import settings
+
+logger = logging.getLogger(__name__)
+
+RouteLabel = Literal["answer_directly", "knowledge_base_search", "plan_and_execute"]
+ROUTE_LABELS: tuple[RouteLabel, ...] = ("answer_directly", "knowledge_base_search", "plan_and_execute")
+
+FEATURE_DIM = 1 << 15
+
+_SMALL_TALK = re.compile(
+    r"^(你好|您好|hi|hello|hey|嗨|哈喽|早上好|中午好|下午好|晚上好|早安|晚安|"
+    r"谢谢|谢谢你|多谢|感谢|谢了|thanks|thank you|thx|"
+    r"好的|好|嗯|嗯嗯|ok|okay|收到|明白了?|知道了|了解|可以|没问题|"
+    r"再见|拜拜|bye|goodbye)"
+    r"[\s!！。.~～,，?？]*$",
+    re.IGNORECASE,
+)
+_ARITHMETIC = re.compile(r"^[\d\s.()（）]+([+\-*/×÷^][\d\s.()（）]+)+[=＝]?\s*[?？]?$")
+
+KEYWORD_GROUPS: dict[str, tuple[str, ...]] = {
+    "plan": ("计划", "方案", "规划", "步骤", "流程", "安排", "制定", "设计", "拆解", "路线", "排期", "帮我", "一份"),
+    "knowledge": ("什么是", "是什么", "原理", "区别", "为什么", "如何", "怎么", "介绍", "解释", "定义", "作用", "哪些"),
+    "chat": ("你好", "谢谢", "哈哈", "天气", "心情", "聊聊", "你是谁", "无聊", "开心", "难过"),
+}
+
+
+class IntentPrediction(BaseModel):
+    route_decision: RouteLabel = Field(..., description="预测的路由类别")
+    confidence: float = Field(..., description="置信度（0~1）")
+    source: Literal["rule", "model"] = Field(..., description="规则命中或模型预测")
+
+
+def extract_features(text: str) -> list[str]:
+    """文本 → 稀疏特征名列表（去重）"""
+    text = text.strip().lower()
+    features = {"bias"}
+    words = [w for w in jieba.cut(text) if w.strip()]
+    features.update(f"w:{w}" for w in words)
+    features.update(f"c:{text[i : i + 2]}" for i in range(len(text) - 1))
+    for group, keywords in KEYWORD_GROUPS.items():
+        if any(k in text for k in keywords):
+            features.add(f"kw:{group}")
+    length = len(text)
+    features.add("len:short" if length <= 6 else "len:medium" if length <= 30 else "len:long")
+    if text.endswith(("?", "？", "吗", "呢")):
+        features.add("q:end")
+    return sorted(features)
+
+
+def hash_features(features: Sequence[str], dim: int = FEATURE_DIM) -> np.ndarray:
+    """特征名哈希到 [0, dim)；crc32 跨进程稳定，训练与推理一致"""
+    return np.unique(np.fromiter((zlib.crc32(f.encode()) % dim for f in features), dtype=np.int64))
+
+
+def match_rules(text: str) -> RouteLabel | None:
+    text = text.strip()
+    if _SMALL_TALK.match(text) or _ARITHMETIC.match(text):
+        return "answer_directly"
+    return None
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentClassifier:
+    """规则 + softmax 回归意图分类器；weights 为 None 时只有规则层"""
+
+    def __init__(self, weights: np.ndarray | None = None, dim: int = FEATURE_DIM) -> None:
+        self.dim = dim
+        self.weights = weights
+        self._lock = threading.Lock()
+        self._counts = {"rule": 0, "model": 0, "fallback": 0}
+
+    @property
+    def trained(self) -> bool:
+        return self.weights is not None
+
+    def _encode(self, text: str) -> tuple[np.ndarray, float]:
+        indices = hash_features(extract_features(text), self.dim)
+        # 按特征数归一化，长短文本的 logits 尺度一致
+        return indices, 1.0 / np.sqrt(len(indices))
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        if self.weights is None:
+            raise RuntimeError("意图模型未训练")
+        indices, scale = self._encode(text)
+        return _softmax(self.weights[indices].sum(axis=0) * scale)
+
+    def predict(self, text: str) -> IntentPrediction | None:
+        """规则命中返回置信度 1.0；否则返回模型预测；模型未训练时返回 None"""
+        label = match_rules(text)
+        if label is not None:
+            return IntentPrediction(route_decision=label, confidence=1.0, source="rule")
+        if self.weights is None:
+            return None
+        proba = self.predict_proba(text)
+        best = int(proba.argmax())
+        return IntentPrediction(route_decision=ROUTE_LABELS[best], confidence=float(proba[best]), source="model")
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        epochs: int = 20,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+        seed: int = 42,
+    ) -> "IntentClassifier":
+        """带 L2 正则的逐样本 SGD，学习率按 epoch 衰减"""
+        targets = np.array([ROUTE_LABELS.index(label) for label in labels])
+        encoded = [self._encode(text) for text in texts]
+        weights = np.zeros((self.dim, len(ROUTE_LABELS)), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            lr = learning_rate / (1 + epoch)
+            for i in rng.permutation(len(encoded)):
+                indices, scale = encoded[i]
+                grad = _softmax(weights[indices].sum(axis=0) * scale)
+                grad[targets[i]] -= 1.0
+                weights[indices] -= lr * (scale * grad + l2 * weights[indices])
+        self.weights = weights
+        return self
+
+    def save(self, path: str | Path) -> None:
+        if self.weights is None:
+            raise RuntimeError("意图模型未训练")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, labels=np.array(ROUTE_LABELS))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "IntentClassifier":
+        data = np.load(path)
+        if tuple(data["labels"]) != ROUTE_LABELS:
+            raise ValueError(f"意图模型类别不匹配: {tuple(data['labels'])}")
+        weights = data["weights"]
+        return cls(weights=weights, dim=weights.shape[0])
+
+    def record(self, source: Literal["rule", "model", "fallback"]) -> None:
+        """记录一次路由由哪一层完成（fallback 表示交给 LLM）"""
+        with self._lock:
+            self._counts[source] += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+@lru_cache(maxsize=1)
+def get_intent_classifier() -> IntentClassifier:
+    """按 INTENT_MODEL_PATH 加载模型；文件不存在或加载失败时只启用规则层"""
+    path = Path(settings.INTENT_MODEL_PATH)
+    if path.exists():
+        try:
+            classifier = IntentClassifier.load(path)
+            logger.info("已加载意图模型: %s", path)
+            return classifier
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("意图模型加载失败，仅使用规则: %s", e)
+    return IntentClassifier()
@@ -0,0 +1,119 @@
+"""
+路由决策日志
+
+每次路由追加一行 JSON（问题、类别、来源、置信度）到 ROUTE_LOG_PATH，作为本地意图模型的训练数据。
+日志包含用户问题原文，默认不记录（ROUTE_LOG_PATH 为空），需要收集训练数据时显式开启：
+- log_route 只把记录放入队列，由 QueueListener 的后台线程写文件，不在异步路由节点中阻塞事件循环；
+- 文件超过 ROUTE_LOG_MAX_BYTES 时轮转，最多保留 ROUTE_LOG_BACKUP_COUNT 个历史文件。
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any
+
+from apps.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 只写路由日志文件，不向上传播到应用日志
+_route_logger = logging.getLogger(f"{__name__}.records")
+_route_logger.propagate = False
+_route_logger.setLevel(logging.INFO)
+
+_lock = threading.Lock()
+_listener: QueueListener | None = None
+_queue_handler: QueueHandler | None = None
+_path: str = ""
+
+
+def _ensure_listener(path: str) -> bool:
+    """按当前 ROUTE_LOG_PATH 启动（或切换）后台写入线程，返回是否可写"""
+    global _listener, _queue_handler, _path
+    if _listener is not None and _path == path:
+        return True
+    with _lock:
+        if _listener is not None and _path == path:
+            return True
+        _stop_listener()
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            logger.warning("路由日志目录创建失败: %s", e)
+            return False
+        file_handler = RotatingFileHandler(
+            path,
+            maxBytes=settings.ROUTE_LOG_MAX_BYTES,
+            backupCount=settings.ROUTE_LOG_BACKUP_COUNT,
+            encoding="utf-8",
+            delay=True,
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        _queue_handler = QueueHandler(records)
+        _route_logger.addHandler(_queue_handler)
+        _listener = QueueListener(records, file_handler)
+        _listener.start()
+        _path = path
+        return True
+
+
+def _stop_listener() -> None:
+    """调用方持有锁：写完队列中的记录后关闭文件"""
+    global _listener, _queue_handler, _path
+    if _queue_handler is not None:
+        _route_logger.removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    _path = ""
+
+
+def log_route(query: str, route_decision: str, source: str, confidence: float | None = None) -> None:
+    """追加一条路由记录（只入队，不等待写入）；写入失败只告警，不影响对话"""
+    if not settings.ROUTE_LOG_PATH or not query:
+        return
+    if not _ensure_listener(settings.ROUTE_LOG_PATH):
+        return
+    record = {
+        "ts": int(time.time()),
+        "query": query,
+        "route_decision": route_decision,
+        "source": source,
+        "confidence": confidence,
+    }
+    _route_logger.info(json.dumps(record, ensure_ascii=False))
+
+
+def shutdown_route_log() -> None:
+    """写完已排队的记录并关闭日志文件"""
+    with _lock:
+        _stop_listener()
+
+
+def read_route_log(path: str | Path) -> list[dict[str, Any]]:
+    """读取路由日志（含轮转出的历史文件，从旧到新），跳过损坏的行"""
+    path = Path(path)
+    backups = sorted(
+        (p for p in path.parent.glob(f"{path.name}.*") if p.suffix[1:].isdigit()),
+        key=lambda p: int(p.suffix[1:]),
+        reverse=True,
+    )
+    records = []
+    for file in [*backups, path]:
+        if not file.exists():
+            continue
+        with file.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
@@ -0,0 +1,153 @@
+"""
+本地意图模型训练与评估
+
+从路由日志读取 LLM 路由结果作为标签（默认只用 source=llm 的记录，避免模型学习自己的输出），
+按问题去重后划分训练 / 测试集，训练 softmax 回归并输出评估报告：
+整体准确率、各类别精确率 / 召回率、不同置信度阈值下的本地覆盖率与准确率、单次预测延迟。
+
+    python -m apps.agent.intent.train [--data data/route_log.jsonl] [--threshold 0.9]
+    python -m apps.agent.intent.train --eval-only   # 评估已有模型
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from apps.agent.intent.classifier import ROUTE_LABELS, IntentClassifier
+from apps.agent.intent.route_log import read_route_log
+from apps.config import settings
+
+THRESHOLD_SWEEP = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+
+
+def load_dataset(path: str | Path, sources: Sequence[str] = ("llm",)) -> tuple[list[str], list[str]]:
+    """读取路由日志，按问题去重（保留最新一条）"""
+    latest: dict[str, str] = {}
+    for record in read_route_log(path):
+        query = (record.get("query") or "").strip()
+        label = record.get("route_decision")
+        if query and label in ROUTE_LABELS and record.get("source") in sources:
+            latest[query] = label
+    return list(latest), list(latest.values())
+
+
+def split_dataset(
+    texts: Sequence[str], labels: Sequence[str], test_ratio: float, seed: int
+) -> tuple[list[str], list[str], list[str], list[str]]:
+    order = np.random.default_rng(seed).permutation(len(texts))
+    n_test = int(len(texts) * test_ratio)
+    test, train = order[:n_test], order[n_test:]
+    return (
+        [texts[i] for i in train],
+        [labels[i] for i in train],
+        [texts[i] for i in test],
+        [labels[i] for i in test],
+    )
+
+
+def evaluate(
+    classifier: IntentClassifier,
+    texts: Sequence[str],
+    labels: Sequence[str],
+    thresholds: Sequence[float] = THRESHOLD_SWEEP,
+) -> dict[str, Any]:
+    """逐条预测并统计准确率、覆盖率与延迟；模型未训练且规则未命中的样本视为预测失败"""
+    predictions = []
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        predictions.append(classifier.predict(text))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    correct = [p is not None and p.route_decision == label for p, label in zip(predictions, labels, strict=True)]
+    per_label = {}
+    for label in ROUTE_LABELS:
+        predicted = sum(p is not None and p.route_decision == label for p in predictions)
+        actual = sum(y == label for y in labels)
+        hits = sum(ok and y == label for ok, y in zip(correct, labels, strict=True))
+        per_label[label] = {
+            "precision": hits / predicted if predicted else 0.0,
+            "recall": hits / actual if actual else 0.0,
+            "support": actual,
+        }
+
+    sweep = []
+    for threshold in thresholds:
+        covered = [ok for p, ok in zip(predictions, correct, strict=True) if p and p.confidence >= threshold]
+        sweep.append(
+            {
+                "threshold": threshold,
+                "coverage": len(covered) / len(texts) if texts else 0.0,
+                "accuracy": sum(covered) / len(covered) if covered else 0.0,
+            }
+        )
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "samples": len(texts),
+        "accuracy": sum(correct) / len(texts) if texts else 0.0,
+        "per_label": per_label,
+        "sweep": sweep,
+        "latency_ms": {"p50": quantiles[49], "p95": quantiles[94], "p99": quantiles[98]},
+    }
+
+
+def print_report(report: dict[str, Any], threshold: float) -> None:
+    latency = report["latency_ms"]
+    print(f"样本数: {report['samples']}，整体准确率: {report['accuracy']:.3f}")
+    print(f"预测延迟: p50 {latency['p50']:.3f} ms, p95 {latency['p95']:.3f} ms, p99 {latency['p99']:.3f} ms\n")
+    print("| 类别 | precision | recall | support |")
+    print("|---|---|---|---|")
+    for label, metrics in report["per_label"].items():
+        print(f"| {label} | {metrics['precision']:.3f} | {metrics['recall']:.3f} | {metrics['support']} |")
+    print("\n| 阈值 | 本地覆盖率 | 覆盖样本准确率 |")
+    print("|---|---|---|")
+    for row in report["sweep"]:
+        mark = " ←" if row["threshold"] == threshold else ""
+        print(f"| {row['threshold']:.2f}{mark} | {row['coverage']:.3f} | {row['accuracy']:.3f} |")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地意图模型训练与评估")
+    parser.add_argument("--data", default=settings.ROUTE_LOG_PATH, help="路由日志路径")
+    parser.add_argument("--sources", nargs="+", default=["llm"], help="作为标签的记录来源")
+    parser.add_argument("--output", default=settings.INTENT_MODEL_PATH)
+    parser.add_argument("--test-ratio", type=float, default=0.2)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--threshold", type=float, default=settings.INTENT_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--eval-only", action="store_true", help="用全部数据评估 --output 处的已有模型")
+    args = parser.parse_args()
+    if not args.data:
+        parser.error("未配置 ROUTE_LOG_PATH，请用 --data 指定路由日志路径")
+
+    texts, labels = load_dataset(args.data, args.sources)
+    if not texts:
+        raise SystemExit(f"{args.data} 中没有可用的路由记录")
+    thresholds = sorted({*THRESHOLD_SWEEP, args.threshold})
+
+    if args.eval_only:
+        print_report(evaluate(IntentClassifier.load(args.output), texts, labels, thresholds), args.threshold)
+        return
+
+    train_texts, train_labels, test_texts, test_labels = split_dataset(texts, labels, args.test_ratio, args.seed)
+    print(f"训练 {len(train_texts)} 条，测试 {len(test_texts)} 条")
+    start = time.perf_counter()
+    classifier = IntentClassifier().fit(
+        train_texts, train_labels, epochs=args.epochs, learning_rate=args.learning_rate, seed=args.seed
+    )
+    print(f"训练耗时 {time.perf_counter() - start:.1f}s\n")
+    if test_texts:
+        print_report(evaluate(classifier, test_texts, test_labels, thresholds), args.threshold)
+    classifier.save(args.output)
+    print(f"\n模型已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,112 @@
+"""
+LLM 实例工厂
+
+同一 provider 的所有模型共用一组 httpx 连接池（同步 + 异步各一个），
+连接数由 LLM_MAX_CONNECTIONS / LLM_MAX_KEEPALIVE_CONNECTIONS 限制，避免并发对话各自建连。
+两个连接池前都挂 provider 级调度器（并发上限、RPM / TPM 令牌桶、优先级排队与重试），见 scheduler.py。
+"""
+
 from functools import lru_cache
 
+import httpx
 from langchain_openai import ChatOpenAI
 
+from apps.agent.llm.scheduler import (
+    PRIORITY_HEADER,
+    LLMScheduler,
+    Priority,
+    SchedulingTransport,
+    SyncSchedulingTransport,
+)
 from apps.config import settings
 
 
-def get_llm(model: str | None = None) -> ChatOpenAI:
-    """获取 LLM 实例（同参数复用缓存）"""
+def get_llm(model: str | None = None, priority: Priority = "interactive") -> ChatOpenAI:
+    """获取 LLM 实例（同参数复用缓存）；priority 决定请求在调度器中的排队优先级"""
     resolved_model = model or settings.LLM_MODEL
     if settings.LLM_PROVIDER == "openai":
-        return _get_openai_llm(resolved_model)
+        return _get_openai_llm(resolved_model, priority)
     else:
-        return _get_dashscope_llm(resolved_model)
+        return _get_dashscope_llm(resolved_model, priority)
+
+
+_schedulers: dict[str, LLMScheduler] = {}
+
+
+_http_clients: dict[str, tuple[httpx.Client, httpx.AsyncClient]] = {}
+
+
+def get_http_clients(provider: str) -> tuple[httpx.Client, httpx.AsyncClient]:
+    """provider 级共享的 httpx 连接池（首次使用时创建）"""
+    if provider not in _http_clients:
+        limits = httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        )
+        timeout = httpx.Timeout(settings.LLM_TIMEOUT, connect=10.0)
+        scheduler = get_scheduler(provider)
+        _http_clients[provider] = (
+            httpx.Client(
+                transport=SyncSchedulingTransport(httpx.HTTPTransport(limits=limits), scheduler), timeout=timeout
+            ),
+            httpx.AsyncClient(
+                transport=SchedulingTransport(httpx.AsyncHTTPTransport(limits=limits), scheduler), timeout=timeout
+            ),
+        )
+    return _http_clients[provider]
+
 
+def get_scheduler(provider: str) -> LLMScheduler:
+    """provider 级请求调度器"""
+    if provider not in _schedulers:
+        _schedulers[provider] = LLMScheduler(
+            provider,
+            rpm=settings.LLM_RPM,
+            tpm=settings.LLM_TPM,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+    return _schedulers[provider]
 
-@lru_cache(maxsize=4)
-def _get_openai_llm(model: str) -> ChatOpenAI:
-    return ChatOpenAI(temperature=0, model=model)
+
+def scheduler_stats() -> dict[str, dict]:
+    return {provider: scheduler.stats() for provider, scheduler in _schedulers.items()}
+
+
+async def close_http_clients() -> None:
+    """关闭连接池并清空 LLM 实例缓存（lifespan 退出时调用）"""
+    _get_openai_llm.cache_clear()
+    _get_dashscope_llm.cache_clear()
+    while _http_clients:
+        _, (client, async_client) = _http_clients.popitem()
+        client.close()
+        await async_client.aclose()
+
+
+# 同步 / 异步请求的重试都由调度器统一处理（带抖动，429 时整个 provider 退避），关闭 SDK 自身的重试
+@lru_cache(maxsize=8)
+def _get_openai_llm(model: str, priority: Priority) -> ChatOpenAI:
+    client, async_client = get_http_clients("openai")
+    return ChatOpenAI(
+        temperature=0,
+        model=model,
+        max_retries=0,
+        default_headers={PRIORITY_HEADER: priority},
+        http_client=client,
+        http_async_client=async_client,
+    )
 
 
-@lru_cache(maxsize=4)
-def _get_dashscope_llm(model: str) -> ChatOpenAI:
+@lru_cache(maxsize=8)
+def _get_dashscope_llm(model: str, priority: Priority) -> ChatOpenAI:
+    client, async_client = get_http_clients("dashscope")
     return ChatOpenAI(
         temperature=0,
         model=model,
         openai_api_key=settings.DASHSCOPE_API_KEY,
         openai_api_base=settings.DASHSCOPE_BASE_URL,
+        max_retries=0,
+        default_headers={PRIORITY_HEADER: priority},
+        http_client=client,
+        http_async_client=async_client,
     )
@@ -0,0 +1,386 @@
+"""
+LLM 请求调度
+
+每个 provider 一个 LLMScheduler，以 httpx transport 的形式挂在 llm_factory 的共享连接池（同步 + 异步）上：
+- 并发上限：同时在途的请求数（含流式响应读取）不超过 LLM_MAX_CONCURRENCY；
+- 令牌桶：RPM（请求数）与 TPM（token 数，按请求体字节数估算）两个桶，容量为每分钟额度，按秒匀速补充；
+- 优先级：interactive（路由 / 查询转换 / 生成） > evaluation（反思评估、计划子任务） > background（消息摘要），
+  排队时只有队首（优先级最高、最早到达）的请求可以放行，低优先级请求不会插队；
+- 重试：429 / 5xx / 连接错误按指数退避 + 随机抖动重试（优先使用 Retry-After），
+  429 时整个 provider 暂停放行直到退避结束，避免排队请求继续撞限流。
+
+请求优先级通过 get_llm(priority=...) 写入的请求头传递，transport 转发前移除。
+同步调用（invoke）经 SyncSchedulingTransport 与异步请求共用同一个调度器的并发槽位、额度与排队顺序，
+等待时阻塞调用线程。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+Priority = Literal["interactive", "evaluation", "background"]
+PRIORITIES: tuple[Priority, ...] = ("interactive", "evaluation", "background")
+PRIORITY_HEADER = "x-buddy-llm-priority"
+
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+# 请求未送达或连接被复用前已断开，可安全重试；读取超时不重试（生成可能已经开始）
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+BYTES_PER_TOKEN = 3  # 请求体字节数 → token 数的粗略换算（中文 UTF-8 约 3 字节 / token）
+COMPLETION_TOKEN_ESTIMATE = 512  # 未指定 max_tokens 时为输出预留的 token 数
+
+
+class TokenBucket:
+    """容量为每分钟额度、按秒匀速补充的令牌桶；rate_per_minute <= 0 表示不限制"""
+
+    def __init__(self, rate_per_minute: int) -> None:
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self._rate = rate_per_minute / 60.0
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """取出 amount 需要等待的秒数（0 表示立即可取）"""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self._rate
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self.tokens -= min(amount, self.capacity)
+
+
+@dataclass(order=True)
+class _Waiter:
+    rank: int
+    seq: int
+    tokens: int = field(compare=False)
+    event: asyncio.Event | threading.Event = field(compare=False)
+    # 同步调用方为 None，直接在当前线程唤醒
+    loop: asyncio.AbstractEventLoop | None = field(compare=False)
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class LLMScheduler:
+    """单个 provider 的请求调度器（线程安全，可被多个事件循环使用）"""
+
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0, max_concurrency: int = 32, max_retries: int = 3) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._rpm = TokenBucket(rpm)
+        self._tpm = TokenBucket(tpm)
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+        self._wait: dict[str, list[float]] = {p: [0, 0.0] for p in PRIORITIES}  # [次数, 累计等待秒数]
+
+    async def acquire(self, priority: Priority, tokens: int) -> None:
+        """排队直到获得一个并发槽位与足够的 RPM / TPM 额度"""
+        event = asyncio.Event()
+        waiter, start = self._enqueue(priority, tokens, event, asyncio.get_running_loop())
+        admitted = False
+        try:
+            while True:
+                with self._lock:
+                    delay = self._try_admit(waiter)
+                if delay == 0:
+                    admitted = True
+                    break
+                # 唤醒经 call_soon_threadsafe 调度，在本协程挂起之后才执行，clear 不会丢失唤醒
+                event.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(event.wait(), delay)
+        finally:
+            self._leave(waiter, priority, start, admitted)
+
+    def acquire_sync(self, priority: Priority, tokens: int) -> None:
+        """acquire 的同步版本，阻塞当前线程排队"""
+        event = threading.Event()
+        waiter, start = self._enqueue(priority, tokens, event, None)
+        admitted = False
+        try:
+            while True:
+                # 唤醒在其他线程中立即执行，先 clear 再检查，检查之后的唤醒不会丢失
+                event.clear()
+                with self._lock:
+                    delay = self._try_admit(waiter)
+                if delay == 0:
+                    admitted = True
+                    break
+                event.wait(delay)
+        finally:
+            self._leave(waiter, priority, start, admitted)
+
+    def _enqueue(
+        self,
+        priority: Priority,
+        tokens: int,
+        event: asyncio.Event | threading.Event,
+        loop: asyncio.AbstractEventLoop | None,
+    ) -> tuple[_Waiter, float]:
+        waiter = _Waiter(PRIORITIES.index(priority), next(self._seq), tokens, event, loop)
+        with self._lock:
+            heapq.heappush(self._queue, waiter)
+        return waiter, time.monotonic()
+
+    def _leave(self, waiter: _Waiter, priority: Priority, start: float, admitted: bool) -> None:
+        """放行后记录等待时间；未放行（取消 / 中断）时移出队列并唤醒新的队首"""
+        with self._lock:
+            if not admitted:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                self._wake_head()
+            else:
+                stats = self._wait[priority]
+                stats[0] += 1
+                stats[1] += time.monotonic() - start
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._wake_head()
+
+    def backoff(self, delay: float) -> None:
+        """收到 429：暂停放行 delay 秒"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._counts["rate_limited"] += 1
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def _try_admit(self, waiter: _Waiter) -> float | None:
+        """调用方持有锁。放行返回 0，需按时间等待返回秒数，需等待其他请求释放返回 None"""
+        if not self._queue or self._queue[0] is not waiter or self._in_flight >= self.max_concurrency:
+            return None
+        now = time.monotonic()
+        delay = max(self._paused_until - now, self._rpm.delay(1, now), self._tpm.delay(waiter.tokens, now))
+        if delay > 0:
+            return delay
+        self._rpm.take(1)
+        self._tpm.take(waiter.tokens)
+        self._in_flight += 1
+        self._counts["requests"] += 1
+        heapq.heappop(self._queue)
+        self._wake_head()
+        return 0
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0].wake()
+
+    def retry_delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        """指数退避 + 抖动；响应带 Retry-After（秒）时优先使用"""
+        if response is not None:
+            try:
+                return float(response.headers["retry-after"]) + random.uniform(0, 0.5)
+            except (KeyError, ValueError):
+                pass
+        return min(30.0, 0.5 * 2**attempt) * random.uniform(0.5, 1.5)
+
+    def classify(self, outcome: httpx.Response | Exception, attempt: int) -> float | None:
+        """
+        第 attempt 次请求结束后的重试决策（outcome 为响应或 RETRY_ERRORS 中的异常）：返回重试前等待的秒数，
+        不重试返回 None，由调用方返回响应或抛出异常。记录失败 / 重试次数，429 时暂停放行。
+        """
+        response = outcome if isinstance(outcome, httpx.Response) else None
+        if response is not None and response.status_code not in RETRY_STATUS:
+            return None
+        if attempt >= self.max_retries:
+            self.count("failures")
+            return None
+        delay = self.retry_delay(attempt, response)
+        if response is None:
+            logger.warning("LLM 请求失败，%.1fs 后重试（%d/%d）: %s", delay, attempt + 1, self.max_retries, outcome)
+        else:
+            if response.status_code == 429:
+                self.backoff(delay)
+            logger.warning(
+                "LLM 返回 %d，%.1fs 后重试（%d/%d）", response.status_code, delay, attempt + 1, self.max_retries
+            )
+        self.count("retries")
+        return delay
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            depth = {p: 0 for p in PRIORITIES}
+            for waiter in self._queue:
+                depth[PRIORITIES[waiter.rank]] += 1
+            return {
+                "queue_depth": depth,
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "rpm_available": None if self._rpm.unlimited else round(self._rpm.tokens),
+                "tpm_available": None if self._tpm.unlimited else round(self._tpm.tokens),
+                "avg_wait_ms": {p: round(s[1] / s[0] * 1000, 1) if s[0] else 0.0 for p, s in self._wait.items()},
+                **self._counts,
+            }
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """按请求体大小估算本次请求消耗的 token 数（输入 + 预留输出）"""
+    return len(request.content) // BYTES_PER_TOKEN + COMPLETION_TOKEN_ESTIMATE
+
+
+def parse_request(request: httpx.Request) -> tuple[Priority, int]:
+    """取出（并移除）优先级请求头，返回 (优先级, 估算 token 数)；未知优先级按 interactive 处理"""
+    priority = request.headers.pop(PRIORITY_HEADER, "interactive")
+    return (priority if priority in PRIORITIES else "interactive"), estimate_tokens(request)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """响应体读取完毕（或关闭）时释放调度槽位"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, scheduler: LLMScheduler) -> None:
+        self._stream = stream
+        self._scheduler = scheduler
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._scheduler.release()
+
+
+class SchedulingTransport(httpx.AsyncBaseTransport):
+    """在底层 transport 前排队、限流并重试"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, scheduler: LLMScheduler) -> None:
+        self._transport = transport
+        self._scheduler = scheduler
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        priority, tokens = parse_request(request)
+        scheduler = self._scheduler
+        attempt = 0
+        while True:
+            await scheduler.acquire(priority, tokens)
+            try:
+                response = await self._transport.handle_async_request(request)
+            except RETRY_ERRORS as e:
+                scheduler.release()
+                if (delay := scheduler.classify(e, attempt)) is None:
+                    raise
+            except BaseException:
+                scheduler.release()
+                raise
+            else:
+                if (delay := scheduler.classify(response, attempt)) is None:
+                    return httpx.Response(
+                        status_code=response.status_code,
+                        headers=response.headers,
+                        stream=_ReleasingStream(response.stream, scheduler),
+                        extensions=response.extensions,
+                        request=request,
+                    )
+                try:
+                    await response.aclose()
+                finally:
+                    scheduler.release()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _SyncReleasingStream(httpx.SyncByteStream):
+    """_ReleasingStream 的同步版本"""
+
+    def __init__(self, stream: httpx.SyncByteStream, scheduler: LLMScheduler) -> None:
+        self._stream = stream
+        self._scheduler = scheduler
+        self._released = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._scheduler.release()
+
+
+class SyncSchedulingTransport(httpx.BaseTransport):
+    """SchedulingTransport 的同步版本（invoke / stream 等同步调用），排队与重试等待时阻塞调用线程"""
+
+    def __init__(self, transport: httpx.BaseTransport, scheduler: LLMScheduler) -> None:
+        self._transport = transport
+        self._scheduler = scheduler
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        priority, tokens = parse_request(request)
+        scheduler = self._scheduler
+        attempt = 0
+        while True:
+            scheduler.acquire_sync(priority, tokens)
+            try:
+                response = self._transport.handle_request(request)
+            except RETRY_ERRORS as e:
+                scheduler.release()
+                if (delay := scheduler.classify(e, attempt)) is None:
+                    raise
+            except BaseException:
+                scheduler.release()
+                raise
+            else:
+                if (delay := scheduler.classify(response, attempt)) is None:
+                    return httpx.Response(
+                        status_code=response.status_code,
+                        headers=response.headers,
+                        stream=_SyncReleasingStream(response.stream, scheduler),
+                        extensions=response.extensions,
+                        request=request,
+                    )
+                try:
+                    response.close()
+                finally:
+                    scheduler.release()
+            attempt += 1
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self._transport.close()
@@ -22,6 +22,7 @@ class MemoryManager:
                     "url": settings.MILVUS_URL,
                     "token": settings.MILVUS_TOKEN or None,
                     "db_name": settings.MILVUS_DB_NAME,
+                    "metric_type": settings.MILVUS_MEM0_METRIC_TYPE,
                 },
             },
             "llm": {
@@ -36,7 +37,7 @@ class MemoryManager:
             "embedder": {
                 "provider": settings.EMBEDDING_PROVIDER,
                 "config": {
-                    "model": settings.EMBEDDING_MODEL,
+                    "model": settings.embedding_model_name,
                     "embedding_dims": settings.EMBEDDING_DIMENSIONS,
                     "api_key": settings.OPENAI_API_KEY,
                 },
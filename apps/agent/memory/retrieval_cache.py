@@ -0,0 +1,230 @@
+"""
+按用户缓存的长期记忆检索
+
+retrieve_memories 每轮都会调用 mem0 search（一次 embedding + 一次 Milvus 检索），而用户的记忆集合只在
+save_memories 写入时变化，同一会话中相邻几轮的问题也往往相近。本缓存在记忆写入前复用检索结果：
+- 最近结果：按查询 embedding 匹配，与最近某次查询的余弦相似度不低于 similarity 时直接复用其结果；
+- 本地记忆集：用户的记忆不超过 local_max 条时整体载入内存（文本 + embedding），在本地做余弦打分，
+  不再请求 Milvus；记忆条数超过上限的用户退回 mem0 search。本地打分只在 mem0 Collection 的度量为 COSINE 时
+  与 mem0 search 的 score / threshold 语义一致，其他度量（mem0 默认的 L2 下 score 是距离）不做本地打分；
+- 写入失效：persist_memories 写入后调用 invalidate，整个用户的缓存作废；载入 / 检索期间发生写入时结果不回填。
+
+查询 embedding 走 milvus_vector 的查询缓存，记忆文本 embedding 走文档 embedding 缓存，与 mem0 使用同一 embedding 模型。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+from apps.config import settings
+
+logger = logging.getLogger(__name__)
+
+Memory = dict[str, Any]
+EncodeQueryFn = Callable[[str], Sequence[float]]
+EncodeDocumentsFn = Callable[[list[str]], Sequence[Sequence[float]]]
+RemoteSearchFn = Callable[[str, str, int, float], list[Memory]]  # (query, user_id, limit, threshold)
+ListMemoriesFn = Callable[[str, int], list[Memory]]  # (user_id, limit)
+
+RECENT_QUERIES = 8  # 每个用户保留的最近查询结果数
+
+
+@dataclass
+class _UserEntry:
+    expires_at: float
+    recent: deque[tuple[np.ndarray, list[Memory]]] = field(default_factory=lambda: deque(maxlen=RECENT_QUERIES))
+    memories: list[Memory] | None = None  # 本地记忆集，未载入为 None
+    vectors: np.ndarray | None = None
+    too_large: bool = False  # 记忆条数超过 local_max，不做本地打分
+
+
+class MemoryRetrievalCache:
+    """线程安全的按用户记忆检索缓存"""
+
+    def __init__(
+        self,
+        encode_query: EncodeQueryFn,
+        encode_documents: EncodeDocumentsFn,
+        remote_search: RemoteSearchFn,
+        list_memories: ListMemoriesFn,
+        similarity: float = 0.95,
+        local_max: int = 200,
+        max_users: int = 1000,
+        ttl: float = 600.0,
+        metric: str = "COSINE",
+    ) -> None:
+        self._encode_query = encode_query
+        self._encode_documents = encode_documents
+        self._remote_search = remote_search
+        self._list_memories = list_memories
+        self.similarity = similarity
+        # 本地余弦打分与 mem0 的 score 只在 COSINE 度量下可比
+        self.local_max = local_max if metric == "COSINE" else 0
+        self.max_users = max_users
+        self.ttl = ttl
+        self._users: OrderedDict[str, _UserEntry] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._counts = {"recent_hits": 0, "local_hits": 0, "misses": 0, "local_loads": 0, "invalidations": 0}
+        self._remote_ms = 0.0  # mem0 search 延迟的指数移动平均
+        self._saved_ms = 0.0
+
+    def search(self, user_id: str, query: str, limit: int = 3, threshold: float = 0.7) -> list[Memory]:
+        start = time.perf_counter()
+        generation = self._generation(user_id)
+        vector = _normalize(self._encode_query(query))
+
+        results, source = self._lookup(user_id, vector, limit, threshold)
+        if results is None and self.local_max > 0 and self._load_local(user_id, generation):
+            results, source = self._lookup(user_id, vector, limit, threshold)
+        if results is not None:
+            self._record_hit(source, start, user_id, generation, vector, results)
+            return results
+
+        remote_start = time.perf_counter()
+        results = self._remote_search(query, user_id, limit, threshold)
+        elapsed = (time.perf_counter() - remote_start) * 1000
+        with self._lock:
+            self._counts["misses"] += 1
+            self._remote_ms = elapsed if not self._remote_ms else 0.8 * self._remote_ms + 0.2 * elapsed
+        self._remember(user_id, generation, vector, results)
+        return results
+
+    def invalidate(self, user_id: str) -> None:
+        """用户记忆发生写入：作废该用户的全部缓存"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._users.pop(user_id, None)
+            self._counts["invalidations"] += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits = self._counts["recent_hits"] + self._counts["local_hits"]
+            total = hits + self._counts["misses"]
+            return {
+                **self._counts,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "users": len(self._users),
+                "avg_remote_ms": round(self._remote_ms, 1),
+                "saved_ms": round(self._saved_ms, 1),
+            }
+
+    def _generation(self, user_id: str) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def _entry(self, user_id: str, create: bool = False) -> _UserEntry | None:
+        """调用方持有锁"""
+        entry = self._users.get(user_id)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._users[user_id]
+            entry = None
+        if entry is None and create:
+            entry = self._users[user_id] = _UserEntry(expires_at=time.monotonic() + self.ttl)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        if entry is not None:
+            self._users.move_to_end(user_id)
+        return entry
+
+    def _lookup(
+        self, user_id: str, vector: np.ndarray, limit: int, threshold: float
+    ) -> tuple[list[Memory] | None, str]:
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry is None:
+                return None, ""
+            for cached_vector, results in entry.recent:
+                if float(cached_vector @ vector) >= self.similarity:
+                    return results, "recent_hits"
+            if entry.memories is None:
+                return None, ""
+            memories, vectors = entry.memories, entry.vectors
+        if not memories:
+            return [], "local_hits"
+        scores = vectors @ vector
+        order = np.argsort(-scores)[:limit]
+        results = [{**memories[i], "score": float(scores[i])} for i in order if scores[i] >= threshold]
+        return results, "local_hits"
+
+    def _load_local(self, user_id: str, generation: int) -> bool:
+        """载入用户的全部记忆用于本地打分，返回是否载入成功"""
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry is not None and entry.too_large:
+                return False
+        memories = [m for m in self._list_memories(user_id, self.local_max + 1) if m.get("memory")]
+        too_large = len(memories) > self.local_max
+        vectors = None
+        if not too_large:
+            encoded = self._encode_documents([m["memory"] for m in memories]) if memories else []
+            vectors = np.stack([_normalize(v) for v in encoded]) if memories else np.zeros((0, 0), dtype=np.float32)
+        with self._lock:
+            if self._generations.get(user_id, 0) != generation:
+                return False
+            entry = self._entry(user_id, create=True)
+            entry.too_large = too_large
+            if not too_large:
+                entry.memories = [{"id": m.get("id"), "memory": m["memory"]} for m in memories]
+                entry.vectors = vectors
+                self._counts["local_loads"] += 1
+        return not too_large
+
+    def _record_hit(
+        self, source: str, start: float, user_id: str, generation: int, vector: np.ndarray, results: list[Memory]
+    ) -> None:
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._counts[source] += 1
+            self._saved_ms += max(0.0, self._remote_ms - elapsed)
+        if source == "local_hits":
+            self._remember(user_id, generation, vector, results)
+
+    def _remember(self, user_id: str, generation: int, vector: np.ndarray, results: list[Memory]) -> None:
+        with self._lock:
+            if self._generations.get(user_id, 0) == generation:
+                self._entry(user_id, create=True).recent.append((vector, results))
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+def _results(response: Any) -> list[Memory]:
+    """mem0 返回格式: list[dict] 或 {"results": [...]}"""
+    return response if isinstance(response, list) else response.get("results", [])
+
+
+@lru_cache(maxsize=1)
+def get_memory_cache() -> MemoryRetrievalCache:
+    from apps.agent.memory.mem0 import get_memory_client
+    from apps.agent.rag import milvus_vector
+
+    def remote_search(query: str, user_id: str, limit: int, threshold: float) -> list[Memory]:
+        return _results(get_memory_client().search(query, user_id=user_id, limit=limit, threshold=threshold))
+
+    def list_memories(user_id: str, limit: int) -> list[Memory]:
+        return _results(get_memory_client().get_all(user_id=user_id, limit=limit))
+
+    return MemoryRetrievalCache(
+        encode_query=lambda query: milvus_vector.encode_query(query)[0],
+        encode_documents=milvus_vector._encode_documents,
+        remote_search=remote_search,
+        list_memories=list_memories,
+        similarity=settings.MEMORY_CACHE_SIMILARITY,
+        local_max=settings.MEMORY_CACHE_LOCAL_MAX,
+        max_users=settings.MEMORY_CACHE_MAX_USERS,
+        ttl=settings.MEMORY_CACHE_TTL,
+        metric=settings.MILVUS_MEM0_METRIC_TYPE,
+    )
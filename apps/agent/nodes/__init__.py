@@ -1,12 +1,15 @@
+from .answer_cache import answer_cache_lookup, cache_answer
 from .evaluator import evaluate_node
 from .generate_response import generate_response
 from .memory import retrieve_memories, save_memories
 from .planner import plan_step, synthesis_step_results, work_step
+from .prestage import prestage
 from .query_transformer import query_transform
-from .retriever import hybrid_search, query_transform_HyDE, text_match
+from .retriever import hybrid_search, multi_search, query_transform_HyDE, rerank, text_match
 from .router import router
 
 __all__ = [
+    "prestage",
     "router",
     "retrieve_memories",
     "save_memories",
@@ -14,6 +17,10 @@ __all__ = [
     "query_transform_HyDE",
     "hybrid_search",
     "text_match",
+    "multi_search",
+    "rerank",
+    "answer_cache_lookup",
+    "cache_answer",
     "generate_response",
     "plan_step",
     "work_step",
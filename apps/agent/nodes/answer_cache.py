@@ -0,0 +1,114 @@
+"""
+语义答案缓存节点
+
+- answer_cache_lookup：知识库检索前按问题 embedding 查缓存，命中时分段写入 custom 流并直接给出 final_answer；
+- cache_answer：评估通过、未调用工具的知识库答案写回缓存（工具结果可能随时间变化，不参与缓存）。
+
+缓存以问题原文为键，依赖上下文的追问（"它的价格呢？"）单看问题无法确定所问对象，
+存在可被指代的前文（之前的对话、对话摘要或长期记忆）时既不查也不写缓存。
+"""
+
+import asyncio
+import logging
+import re
+from typing import Any
+
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
+
+from apps.agent.rag import milvus_vector
+from apps.agent.rag.answer_cache import CachedAnswer, SemanticAnswerCache, get_answer_cache
+from apps.agent.state import GraphState
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 20  # 命中时每个流式片段的字符数
+
+# 指代与省略：代词、指示词、承接前文的开头 / 结尾
+_CONTEXT_REFERENCE = re.compile(
+    r"[它他她]们?|[这那](?:个|些|种|样|里|篇|段|份|位|款|是)|上面|上述|前面|刚才|之前"
+    r"|^(?:那|那么|还有|另外|然后|所以)|呢[？?。.！!]*$"
+    r"|\b(?:it|its|they|them|their|this|that|these|those|above|previous)\b|^(?:and|what about|how about)\b",
+    re.IGNORECASE,
+)
+
+
+def _scope(config: RunnableConfig) -> str:
+    configurable = config["configurable"]
+    return SemanticAnswerCache.scope(configurable.get("user_id", ""), configurable.get("knowledge_id", 1))
+
+
+def _lookup(scope: str, question: str) -> tuple[int, CachedAnswer | None]:
+    cache = get_answer_cache()
+    version = cache.version(scope)
+    # 与检索共用查询 embedding 缓存，未命中时检索阶段不再重复请求
+    vector = milvus_vector.encode_query(question)[0]
+    return version, cache.lookup(scope, vector, version)
+
+
+def _store(scope: str, question: str, answer: str, version: int) -> None:
+    vector = milvus_vector.encode_query(question)[0]
+    get_answer_cache().store(scope, question, vector, answer, version)
+
+
+def _depends_on_context(state: GraphState) -> bool:
+    """问题含指代或省略，且存在可被指代的前文（之前的对话轮次、对话摘要或长期记忆）"""
+    if not _CONTEXT_REFERENCE.search(state.get("original_input", "").strip()):
+        return False
+    earlier_turns = sum(isinstance(message, HumanMessage) for message in state.get("messages", [])) > 1
+    return earlier_turns or bool(state.get("conversation_summary")) or bool(state.get("memory_context"))
+
+
+def _used_tools(messages: list[Any]) -> bool:
+    """本轮（最后一条用户消息之后）是否调用过工具"""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return False
+        if isinstance(message, ToolMessage):
+            return True
+    return False
+
+
+async def answer_cache_lookup(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
+    """查询语义答案缓存"""
+    question = state["original_input"]
+    if _depends_on_context(state):
+        # answer_cache_version 为 None 时 cache_answer 也不写入
+        logger.info("问题依赖上下文，跳过答案缓存: %s", question)
+        return {"answer_cache_version": None}
+    try:
+        version, cached = await asyncio.to_thread(_lookup, _scope(config), question)
+    except Exception as e:
+        logger.warning("答案缓存查询失败: %s", e)
+        return {"answer_cache_version": None}
+    if cached is None:
+        return {"answer_cache_version": version}
+
+    logger.info("答案缓存命中: similarity=%.3f, question=%s", cached.similarity, cached.question)
+    writer = get_stream_writer()
+    for i in range(0, len(cached.answer), STREAM_CHUNK_SIZE):
+        writer({"node": "answer_cache_lookup", "content": cached.answer[i : i + STREAM_CHUNK_SIZE]})
+    return {"final_answer": cached.answer, "answer_cache_hit": True}
+
+
+async def cache_answer(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
+    """评估通过的知识库答案写回缓存"""
+    version = state.get("answer_cache_version")
+    reflection = state.get("reflection")
+    final_answer = state.get("final_answer")
+    if (
+        state.get("route_decision") != "knowledge_base_search"
+        or state.get("answer_cache_hit")
+        or version is None
+        or not final_answer
+        or reflection is None
+        or not reflection.passed
+        or _used_tools(state.get("messages", []))
+    ):
+        return {}
+    try:
+        await asyncio.to_thread(_store, _scope(config), state["original_input"], final_answer, version)
+    except Exception as e:
+        logger.warning("答案缓存写入失败: %s", e)
+    return {}
@@ -1,9 +1,47 @@
-from typing import Any
+"""
+Reflection 评估节点
 
-from langchain_core.messages import ToolMessage
+评估前先走自适应跳过策略，满足任一条件时直接判定通过、不调用 LLM：
+- answer_directly 路由且本轮未调用工具：闲聊 / 常识类回答没有可核对的证据，LLM 评估收益很低；
+- 证据重合度：回答中的词（jieba 分词，按词长加权）在检索分块与本轮工具结果中出现的比例不低于 EVAL_SKIP_OVERLAP。
+评估本身使用 EVAL_LLM_MODEL（为空时与生成共用 LLM_MODEL），可配置为更小更快的模型。
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import Any, Literal
+
+import jieba
+from langchain_core.messages import HumanMessage, ToolMessage
 
 from apps.agent.llm.llm_factory import get_llm
 from apps.agent.state import GraphState, ReflectionState
+from apps.config import settings
+
+logger = logging.getLogger(__name__)
+
+SkipReason = Literal["answer_directly", "evidence_overlap"]
+
+
+class EvaluationStats:
+    """进程级评估计数：实际调用 LLM 评估的次数与各跳过原因的次数"""
+
+    def __init__(self) -> None:
+        self._counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            skipped = {f"skipped_{reason}": self._counts[reason] for reason in ("answer_directly", "evidence_overlap")}
+            return {"run": self._counts["run"], **skipped}
+
+
+evaluation_stats = EvaluationStats()
 
 
 def _extract_tool_results(messages: list[Any]) -> str:
@@ -15,8 +53,52 @@ def _extract_tool_results(messages: list[Any]) -> str:
     return "\n".join(tool_results) if tool_results else "无"
 
 
-def evaluate_node(state: GraphState) -> dict[str, Any]:
+def _turn_tool_results(messages: list[Any]) -> list[str]:
+    """本轮（最后一条用户消息之后）的工具返回结果"""
+    results = []
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        if isinstance(msg, ToolMessage):
+            results.append(str(msg.content))
+    return results
+
+
+def evidence_overlap(answer: str, evidence: str) -> float:
+    """回答中的词在证据中出现的比例（按词长加权，忽略单字与标点）"""
+    terms = {w for w in jieba.cut(answer.lower()) if len(w.strip()) > 1}
+    total = sum(len(term) for term in terms)
+    if not total:
+        return 0.0
+    evidence = evidence.lower()
+    return sum(len(term) for term in terms if term in evidence) / total
+
+
+def skip_reason(state: GraphState) -> SkipReason | None:
+    """自适应跳过策略：返回跳过原因，需要 LLM 评估时返回 None"""
+    if not settings.EVAL_SKIP_ENABLED:
+        return None
+    tool_results = _turn_tool_results(state.get("messages", []))
+    if state.get("route_decision") == "answer_directly" and not tool_results:
+        return "answer_directly"
+    evidence = [d["document_text"] for d in state.get("rag_docs") or []] + tool_results
+    if evidence and evidence_overlap(state["draft_answer"] or "", "\n".join(evidence)) >= settings.EVAL_SKIP_OVERLAP:
+        return "evidence_overlap"
+    return None
+
+
+async def evaluate_node(state: GraphState) -> dict[str, Any]:
     reflection_count = state["reflection_count"]
+    reason = skip_reason(state)
+    if reason is not None:
+        evaluation_stats.record(reason)
+        logger.info("跳过答案评估: reason=%s", reason)
+        return {
+            "reflection": ReflectionState(passed=True, feedback=""),
+            "reflection_count": reflection_count + 1,
+            "evaluations_skipped": state.get("evaluations_skipped", 0) + 1,
+        }
+
     retrieval_data = "\n".join([d["document_text"] for d in state["rag_docs"]]) if state["rag_docs"] else "无"
     memory = state.get("memory_context") or "无"
     enhanced = state.get("enhanced_input") or "无"
@@ -77,6 +159,13 @@ def evaluate_node(state: GraphState) -> dict[str, Any]:
       "feedback": "【不合格维度】具体问题描述。【改进方向】如何修正。"
     }}
     """
-    llm_with_schema = get_llm().with_structured_output(ReflectionState, method="json_mode")
-    response = llm_with_schema.invoke(evaluate_prompt)
-    return {"reflection": response, "reflection_count": reflection_count + 1}
+    llm_with_schema = get_llm(settings.EVAL_LLM_MODEL or None, priority="evaluation").with_structured_output(
+        ReflectionState, method="json_mode"
+    )
+    response = await llm_with_schema.ainvoke(evaluate_prompt)
+    evaluation_stats.record("run")
+    return {
+        "reflection": response,
+        "reflection_count": reflection_count + 1,
+        "evaluations_run": state.get("evaluations_run", 0) + 1,
+    }
@@ -5,10 +5,11 @@ from langchain_core.messages import SystemMessage
 from apps.agent.llm.llm_factory import get_llm
 from apps.agent.state import GraphState
 from apps.agent.tools import tools
-from apps.agent.utils.message_summarizer import summarize_and_prune_messages
+from apps.agent.utils.message_summarizer import update_summary
+from apps.config import settings
 
 
-def generate_response(state: GraphState) -> dict[str, Any]:
+async def generate_response(state: GraphState) -> dict[str, Any]:
     """统一响应节点 - ReAct 模式"""
     if (state["reflection"] and state["reflection"].passed) or state["reflection_count"] >= 3:
         return {"final_answer": state["draft_answer"]}
@@ -67,28 +68,33 @@ def generate_response(state: GraphState) -> dict[str, Any]:
     llm = get_llm()
     llm_with_tools = llm.bind_tools(tools=tools)
 
-    # 每次调用 LLM 前，判断是否需要摘要压缩并回写 state
+    # 滚动摘要每轮最多执行一次（工具循环与反思重试复用本轮第一次的结果）；background 模式由 agent_chat 在本轮结束后执行
     messages = state.get("messages", [])
-    prune_updates = summarize_and_prune_messages(messages, llm)
-
-    # 如果做了摘要压缩，用压缩后的 messages 调用 LLM
-    if prune_updates is not None:
-        # 从 prune_updates 中提取非 RemoveMessage 的消息作为上下文
-        from langchain_core.messages import RemoveMessage
-
-        compressed_messages = [m for m in prune_updates if not isinstance(m, RemoveMessage)]
-        # 加上保留的最近消息（未被删除的部分）
-        removed_ids = {m.id for m in prune_updates if isinstance(m, RemoveMessage)}
-        recent_messages = [m for m in messages if m.id not in removed_ids]
-        llm_messages = compressed_messages + recent_messages
-    else:
-        prune_updates = []
-        llm_messages = messages
-
-    response = llm_with_tools.invoke([SystemMessage(content=generate_response_prompt)] + llm_messages)
+    summary = state.get("conversation_summary")
+    updates: dict[str, Any] = {}
+    if settings.SUMMARY_MODE == "inline" and not state.get("summary_checked"):
+        updates["summary_checked"] = True
+        summarized = await update_summary(
+            messages,
+            summary,
+            get_llm(priority="background"),
+            trigger=settings.SUMMARY_TRIGGER,
+            keep_recent=settings.SUMMARY_KEEP_RECENT,
+            max_tokens=settings.SUMMARY_MAX_TOKENS,
+        )
+        if summarized is not None:
+            updates.update(summarized)
+            summary = summarized["conversation_summary"]
+            removed_ids = {m.id for m in summarized["messages"]}
+            messages = [m for m in messages if m.id not in removed_ids]
+
+    llm_messages = [SystemMessage(content=generate_response_prompt)]
+    if summary:
+        llm_messages.append(SystemMessage(content=f"以下是之前对话的摘要:\n{summary}"))
+    response = await llm_with_tools.ainvoke(llm_messages + messages)
 
     if not response.tool_calls:
-        return {"messages": prune_updates, "draft_answer": response.content}
+        return {**updates, "draft_answer": response.content}
 
     # 有工具调用时，把摘要更新和 LLM response 一起写入 messages
-    return {"messages": prune_updates + [response]}
+    return {**updates, "messages": updates.get("messages", []) + [response]}
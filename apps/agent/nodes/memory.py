@@ -12,53 +12,92 @@ from typing import Any
 from langchain_core.runnables import RunnableConfig
 
 from apps.agent.memory.mem0 import get_memory_client
+from apps.agent.memory.retrieval_cache import get_memory_cache
 from apps.agent.state import GraphState
+from apps.config import settings
+from apps.tasks.memory_queue import get_memory_queue
+from apps.tasks.schemas import MemoryTurn
 
 logger = logging.getLogger(__name__)
 
 
-def retrieve_memories(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
-    """
-    检索记忆节点 - 在生成回复前调用
-
-    从 mem0 中搜索与当前用户输入相关的历史记忆，
-    拼接为 memory_context 注入到 state 中。
-    """
-    user_id = config["configurable"].get("user_id")
-    query = state.get("original_input", "")
-
+def search_memories(query: str, user_id: str | None) -> str | None:
+    """从 mem0 中搜索与 query 相关的历史记忆，拼接为 memory_context；无结果或失败时返回 None"""
     if not user_id or not query:
-        logger.debug("缺少 user_id 或 original_input，跳过记忆检索")
-        return {"memory_context": None}
+        logger.debug("缺少 user_id 或 query，跳过记忆检索")
+        return None
 
     try:
-        memory_client = get_memory_client()
-        results = memory_client.search(query, user_id=user_id, limit=3, threshold=0.7)
-
-        # mem0 返回格式: list[dict] 或 {"results": [...]}
-        memories = results if isinstance(results, list) else results.get("results", [])
+        if settings.MEMORY_CACHE_ENABLED:
+            memories = get_memory_cache().search(user_id, query, limit=3, threshold=0.7)
+        else:
+            results = get_memory_client().search(query, user_id=user_id, limit=3, threshold=0.7)
+            # mem0 返回格式: list[dict] 或 {"results": [...]}
+            memories = results if isinstance(results, list) else results.get("results", [])
 
         if not memories:
             logger.debug("未找到相关记忆: user_id=%s", user_id)
-            return {"memory_context": None}
+            return None
 
         # 拼接记忆上下文
         lines = [f"- {m.get('memory', '')}" for m in memories if m.get("memory")]
         context = "以下是与用户历史对话相关的记忆:\n" + "\n".join(lines)
 
         logger.info("检索到 %d 条相关记忆: user_id=%s", len(lines), user_id)
-        return {"memory_context": context}
+        return context
 
     except Exception as e:
         logger.warning("记忆检索失败: %s", e)
-        return {"memory_context": None}
+        return None
+
+
+def retrieve_memories(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
+    """
+    检索记忆节点 - 在生成回复前调用
+
+    从 mem0 中搜索与当前用户输入相关的历史记忆，
+    拼接为 memory_context 注入到 state 中。
+    """
+    user_id = config["configurable"].get("user_id")
+    # 该节点先于 router 执行，original_input 仍是上一轮的问题，取本轮最新的用户消息
+    messages = state.get("messages", [])
+    query = messages[-1].content if messages else ""
+    return {"memory_context": search_memories(query, user_id)}
+
+
+def persist_memories(user_id: str, turns: list[MemoryTurn]) -> int:
+    """
+    把同一用户的若干轮对话写入 mem0（由记忆写入队列在后台线程调用），返回实际写入的轮数。
+
+    逐轮做语义去重，剩余轮次合并为一次 add，mem0 只做一次 LLM 抽取。
+    """
+    memory_client = get_memory_client()
+    fresh = []
+    for turn in turns:
+        # 语义去重：检查是否已存在高度相似的记忆
+        existing = memory_client.search(turn.question, user_id=user_id, limit=1, threshold=0.95)
+        duplicates = existing if isinstance(existing, list) else existing.get("results", [])
+        if not duplicates:
+            fresh.append(turn)
+    if not fresh:
+        logger.info("已存在相似记忆，跳过存储: user_id=%s", user_id)
+        return 0
+
+    interaction = []
+    for turn in fresh:
+        interaction += [{"role": "user", "content": turn.question}, {"role": "assistant", "content": turn.answer}]
+    memory_client.add(interaction, user_id=user_id)
+    if settings.MEMORY_CACHE_ENABLED:
+        get_memory_cache().invalidate(user_id)
+    logger.info("记忆已存储: user_id=%s, %d 轮", user_id, len(fresh))
+    return len(fresh)
 
 
 def save_memories(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
     """
     存储记忆节点 - 在生成回复后调用
 
-    将本轮用户输入和 AI 回复存入 mem0。
+    将本轮用户输入和 AI 回复放入记忆写入队列，由后台线程写入 mem0，不阻塞本轮响应。
     """
     user_id = config["configurable"].get("user_id")
     original_input = state.get("original_input", "")
@@ -67,20 +106,5 @@ def save_memories(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
     if not user_id or not original_input or not final_answer:
         return {}
 
-    try:
-        memory_client = get_memory_client()
-        # 语义去重：检查是否已存在高度相似的记忆
-        existing = memory_client.search(original_input, user_id=user_id, limit=1, threshold=0.95)
-        duplicates = existing if isinstance(existing, list) else existing.get("results", [])
-        if duplicates:
-            logger.info("已存在相似记忆，跳过存储: user_id=%s", user_id)
-            return {}
-
-        interaction = [{"role": "user", "content": original_input}, {"role": "assistant", "content": final_answer}]
-        mem0_result = memory_client.add(interaction, user_id=user_id)  # noqa: F841
-        logger.info("记忆已存储: user_id=%s", user_id)
-
-    except Exception as e:
-        logger.warning("记忆存储失败: %s", e)
-
+    get_memory_queue().submit(user_id, MemoryTurn(question=original_input, answer=final_answer))
     return {}
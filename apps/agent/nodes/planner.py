@@ -4,7 +4,7 @@ from apps.agent.llm.llm_factory import get_llm
 from apps.agent.state import GraphState, PlanSchema, PlanStepSchema
 
 
-def plan_step(state: GraphState) -> dict[str, Any]:
+async def plan_step(state: GraphState) -> dict[str, Any]:
     """根据用户输入生成计划步骤节点"""
     memory = state.get("memory_context") or "无"
 
@@ -47,14 +47,15 @@ def plan_step(state: GraphState) -> dict[str, Any]:
       """
 
     llm_with_schema = get_llm().with_structured_output(PlanSchema)
-    result: PlanSchema = llm_with_schema.invoke(planner_prompt)
+    result: PlanSchema = await llm_with_schema.ainvoke(planner_prompt)
     return {"plan": result}
 
 
-def work_step(state: PlanStepSchema) -> dict[str, Any]:
+async def work_step(state: PlanStepSchema) -> dict[str, Any]:
     """根据计划步骤生成结果"""
     description = state.description
-    response = get_llm().invoke(description)
+    # 并行子任务与评估同级排队，fan-out 时不挤占交互式生成
+    response = await get_llm(priority="evaluation").ainvoke(description)
     return {"step_results": [response.content]}
 
 
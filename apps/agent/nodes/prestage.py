@@ -0,0 +1,79 @@
+"""
+推测执行的前置阶段
+
+顺序模式下 retrieve_memories → router → query_transform(_HyDE) 依次执行，检索开始前要等待多次 LLM / 向量往返。
+该节点合并三者：意图分类与记忆检索同时发起，记忆返回后立即推测性地生成 HyDE 文档和改写查询；
+路由结果确定后取消未被选中的分支，关键路径由「记忆 + 路由 + 改写」缩短为 max(路由, 记忆 + 改写)。
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import TAG_NOSTREAM
+
+from apps.agent.llm.llm_factory import get_llm
+from apps.agent.nodes.memory import search_memories
+from apps.agent.nodes.query_transformer import rewrite_query
+from apps.agent.nodes.retriever import generate_hyde
+from apps.agent.nodes.router import classify_route, route_state
+from apps.agent.state import GraphState
+
+logger = logging.getLogger(__name__)
+
+Transform = Callable[..., Awaitable[str | None]]
+
+# 路由结果 → 需要的查询转换；plan_and_execute 不需要
+SPECULATIVE_TRANSFORMS: dict[str, Transform] = {
+    "knowledge_base_search": generate_hyde,
+    "answer_directly": rewrite_query,
+}
+
+
+async def prestage(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
+    """并发执行记忆检索、意图路由和查询转换，返回三者合并后的 state 更新"""
+    messages = state.get("messages", [])
+    if not messages:
+        return {"route_decision": "answer_directly", "original_input": ""}
+
+    query = messages[-1].content
+    user_id = config["configurable"].get("user_id")
+    # 推测分支可能被丢弃，不输出到 messages 流
+    speculative_llm = get_llm().with_config(tags=[TAG_NOSTREAM])
+
+    memory_task = asyncio.create_task(asyncio.to_thread(search_memories, query, user_id))
+    route_task = asyncio.create_task(classify_route(query))
+
+    async def speculate(transform: Transform) -> str | None:
+        return await transform(query, await memory_task, llm=speculative_llm)
+
+    transform_tasks = {
+        decision: asyncio.create_task(speculate(transform)) for decision, transform in SPECULATIVE_TRANSFORMS.items()
+    }
+    try:
+        route_result = await route_task
+        decision = route_result.route_decision
+        for other, task in transform_tasks.items():
+            if other != decision:
+                task.cancel()
+
+        memory_context = await memory_task
+        enhanced_input = None
+        if decision in transform_tasks:
+            try:
+                enhanced_input = await transform_tasks[decision]
+            except Exception as e:
+                # 查询转换只是增强，失败时退回原始问题
+                logger.warning("查询转换失败，使用原始问题: %s", e)
+    finally:
+        for task in (memory_task, route_task, *transform_tasks.values()):
+            task.cancel()
+
+    logger.info("前置阶段完成: route=%s, memory=%s, enhanced=%s", decision, bool(memory_context), bool(enhanced_input))
+    return {
+        **route_state(query, route_result),
+        "memory_context": memory_context,
+        "enhanced_input": enhanced_input,
+    }
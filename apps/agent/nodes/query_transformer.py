@@ -1,15 +1,13 @@
 from typing import Any
 
+from langchain_core.language_models import BaseChatModel
+
 from apps.agent.llm.llm_factory import get_llm
 from apps.agent.state import GraphState, QueryTransformSchema
 
 
-def query_transform(state: GraphState) -> dict[str, Any]:
-    """查询转换"""
-    memory = state.get("memory_context") or "无"
-    user_input = state["original_input"]
-
-    query_transform_prompt = f"""你是查询改写器。根据用户的原始问题和记忆上下文，将问题改写为更适合检索的独立查询。
+def rewrite_prompt(user_input: str, memory: str) -> str:
+    return f"""你是查询改写器。根据用户的原始问题和记忆上下文，将问题改写为更适合检索的独立查询。
 
     ## 记忆上下文
     <memory_context>{memory}</memory_context>
@@ -48,11 +46,20 @@ def query_transform(state: GraphState) -> dict[str, Any]:
     - result：改写后的问题（未改写时为原始问题原文）。改写后字数≤100字。
     """
 
-    llm_with_schema = get_llm().with_structured_output(QueryTransformSchema, method="json_mode")
-    response: QueryTransformSchema = llm_with_schema.invoke(query_transform_prompt)
-    if response.transform_flag:
+
+async def rewrite_query(user_input: str, memory_context: str | None, llm: BaseChatModel | None = None) -> str | None:
+    """查询改写，未改写时返回 None"""
+    llm_with_schema = (llm or get_llm()).with_structured_output(QueryTransformSchema, method="json_mode")
+    response: QueryTransformSchema = await llm_with_schema.ainvoke(rewrite_prompt(user_input, memory_context or "无"))
+    return response.result if response.transform_flag else None
+
+
+async def query_transform(state: GraphState) -> dict[str, Any]:
+    """查询转换"""
+    enhanced_input = await rewrite_query(state["original_input"], state.get("memory_context"))
+    if enhanced_input is not None:
         return {
-            "enhanced_input": response.result,
+            "enhanced_input": enhanced_input,
         }
     else:
         return {}
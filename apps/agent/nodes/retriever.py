@@ -1,12 +1,17 @@
+import asyncio
 import logging
 from typing import Any
 
 import jieba
+from langchain_core.language_models import BaseChatModel
 from langchain_core.runnables import RunnableConfig
+from langgraph.types import Overwrite
 
 from apps.agent.llm.llm_factory import get_llm
-from apps.agent.rag import milvus_vector
+from apps.agent.rag import async_milvus_vector
+from apps.agent.rag.reranker import get_reranker
 from apps.agent.state import GraphState
+from apps.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -67,18 +72,19 @@ STOP_WORDS = {
 }
 
 
+def candidate_top_k() -> int:
+    """启用重排时扩大每路召回的候选集，否则直接召回最终条数"""
+    return settings.RERANK_CANDIDATES if settings.RERANK_PROVIDER != "none" else 3
+
+
 def extract_keywords(text: str) -> str:
     """基于 jieba 分词 + 停用词过滤提取关键词"""
     words = [w for w in jieba.cut(text) if len(w) > 1 and w not in STOP_WORDS]
     return " ".join(words)
 
 
-def query_transform_HyDE(state: GraphState) -> dict[str, Any]:  # noqa: N802
-    """指代消解 + HyDE 查询转换"""
-    memory = state.get("memory_context") or "无"
-    user_input = state["original_input"]
-
-    query_transform_prompt = f"""你是检索优化专家。你的任务分两步执行：
+def hyde_prompt(user_input: str, memory: str) -> str:
+    return f"""你是检索优化专家。你的任务分两步执行：
 
     ## 输入
     <user_input>{user_input}</user_input>
@@ -99,23 +105,55 @@ def query_transform_HyDE(state: GraphState) -> dict[str, Any]:  # noqa: N802
     只输出 Step 2 生成的假设性文档片段，不要输出其他任何内容。
     """
 
-    llm = get_llm()
-    response = llm.invoke(query_transform_prompt)
+
+async def generate_hyde(user_input: str, memory_context: str | None, llm: BaseChatModel | None = None) -> str:
+    """生成假设性文档"""
+    response = await (llm or get_llm()).ainvoke(hyde_prompt(user_input, memory_context or "无"))
+    return response.content
+
+
+async def query_transform_HyDE(state: GraphState) -> dict[str, Any]:  # noqa: N802
+    """指代消解 + HyDE 查询转换"""
     return {
-        "enhanced_input": response.content,
+        "enhanced_input": await generate_hyde(state["original_input"], state.get("memory_context")),
     }
 
 
-def hybrid_search(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
+async def multi_search(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
+    """多路检索：原始问题 / HyDE / BM25 / 关键词匹配一次请求完成，Milvus 端统一融合去重"""
+    original_input = state["original_input"]
+    user_id: str = config["configurable"].get("user_id", "")
+    knowledge_id: int = config["configurable"].get("knowledge_id", 1)
+    try:
+        data = await async_milvus_vector.multi_search(
+            original_input,
+            user_id,
+            knowledge_id,
+            hyde=state.get("enhanced_input"),
+            keyword=extract_keywords(original_input),
+            top_k=candidate_top_k(),
+            limit=settings.RERANK_CANDIDATES if settings.RERANK_PROVIDER != "none" else None,
+        )
+    except Exception as e:
+        logger.error("多路检索失败: %s", e, exc_info=True)
+        data = []
+    logger.info("多路检索: %d 条数据", len(data))
+    return {"rag_docs": data}
+
+
+async def hybrid_search(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
     """混合搜索"""
     original_input = state["original_input"]
     user_id: str = config["configurable"].get("user_id", "")
+    knowledge_id: int = config["configurable"].get("knowledge_id", 1)
     try:
-        data = milvus_vector.hybrid_search(original_input, user_id)
+        data = await async_milvus_vector.hybrid_search(original_input, user_id, knowledge_id, top_k=candidate_top_k())
         # 假设性文档嵌入 (HyDE)
         enhanced = state.get("enhanced_input")
         if enhanced:
-            hyde_data = milvus_vector.vector_search(enhanced, user_id)
+            hyde_data = await async_milvus_vector.vector_search(
+                enhanced, user_id, knowledge_id, top_k=candidate_top_k()
+            )
             data.extend(hyde_data)
     except Exception as e:
         logger.error("混合搜索失败: %s", e, exc_info=True)
@@ -124,17 +162,37 @@ def hybrid_search(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
     return {"rag_docs": data}
 
 
-def text_match(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
+async def text_match(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
     """文本匹配"""
     original_input = state["original_input"]
     user_id: str = config["configurable"].get("user_id", "")
+    knowledge_id: int = config["configurable"].get("knowledge_id", 1)
     keyword = extract_keywords(original_input)
     if not keyword:
         return {"rag_docs": []}
     try:
-        data = milvus_vector.text_match(original_input, keyword, user_id)
+        data = await async_milvus_vector.text_match(
+            original_input, keyword, user_id, knowledge_id, limit=candidate_top_k()
+        )
     except Exception as e:
         logger.error("文本匹配失败: %s", e, exc_info=True)
         data = []
     logger.info("文本匹配: %d 条数据", len(data))
     return {"rag_docs": data}
+
+
+async def rerank(state: GraphState) -> dict[str, Any]:
+    """重排：对合并后的候选分块逐对打分，只保留 top-k（覆盖 rag_docs，不再与候选集合并）"""
+    docs = state.get("rag_docs") or []
+    reranker = get_reranker()
+    if reranker is None or not docs:
+        return {}
+    try:
+        ranked = await asyncio.to_thread(
+            reranker.rerank, state["original_input"], docs, settings.RERANK_TOP_K, settings.RERANK_MIN_SCORE
+        )
+    except Exception as e:
+        logger.error("重排失败，按召回顺序截取: %s", e, exc_info=True)
+        ranked = docs[: settings.RERANK_TOP_K]
+    logger.info("重排: %d 条候选 → %d 条", len(docs), len(ranked))
+    return {"rag_docs": Overwrite(ranked)}
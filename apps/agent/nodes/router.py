@@ -1,18 +1,15 @@
 from typing import Any
 
+from langgraph.types import Overwrite
+
+from apps.agent.intent import get_intent_classifier, log_route
 from apps.agent.llm.llm_factory import get_llm
 from apps.agent.state import GraphState, RouteSchema
+from apps.config import settings
 
 
-def router(state: GraphState) -> dict[str, Any]:
-    """Route the agent to the appropriate node."""
-    messages = state.get("messages", [])
-    if not messages:
-        return {"route_decision": "answer_directly", "original_input": ""}
-
-    query = messages[-1].content
-    llm_with_schema = get_llm().with_structured_output(RouteSchema, method="json_mode")
-    router_prompt = f"""你是意图分类器。判断用户输入属于以下哪个类别，输出 JSON。
+def router_prompt(query: str) -> str:
+    return f"""你是意图分类器。判断用户输入属于以下哪个类别，输出 JSON。
 
     <user_input>{query}</user_input>
 
@@ -49,16 +46,61 @@ def router(state: GraphState) -> dict[str, Any]:
     "route_reason": "判定理由"
     }}
     """
-    route_result: RouteSchema = llm_with_schema.invoke(router_prompt)
+
+
+def route_state(query: str, route_result: RouteSchema) -> dict[str, Any]:
+    """路由结果写入 state，并重置上一轮的中间状态"""
     return {
         "route_decision": route_result.route_decision,
         "route_reason": route_result.route_reason,
         "original_input": query,
         "enhanced_input": None,
-        "rag_docs": [],
+        "rag_docs": Overwrite([]),  # merge_rag_docs 只做合并，新一轮需显式清空上一轮的检索结果
         "plan": None,
         "reflection_count": 0,
         "reflection": None,
         "draft_answer": None,
         "final_answer": None,
+        "answer_cache_version": None,
+        "answer_cache_hit": False,
+        "evaluations_run": 0,
+        "evaluations_skipped": 0,
+        "summary_checked": False,
     }
+
+
+def fast_route(query: str) -> RouteSchema | None:
+    """本地意图分类器：规则命中或模型置信度达到阈值时直接返回，否则返回 None 交给 LLM 路由"""
+    if not settings.INTENT_CLASSIFIER_ENABLED:
+        return None
+    classifier = get_intent_classifier()
+    prediction = classifier.predict(query)
+    if prediction is None or prediction.confidence < settings.INTENT_CONFIDENCE_THRESHOLD:
+        classifier.record("fallback")
+        return None
+    classifier.record(prediction.source)
+    log_route(query, prediction.route_decision, prediction.source, prediction.confidence)
+    return RouteSchema(
+        route_decision=prediction.route_decision,
+        route_reason=f"本地意图分类（{prediction.source}，置信度 {prediction.confidence:.2f}）",
+    )
+
+
+async def classify_route(query: str) -> RouteSchema:
+    """意图分类：本地分类器优先，未命中时调用 LLM 路由"""
+    route_result = fast_route(query)
+    if route_result is None:
+        llm_with_schema = get_llm().with_structured_output(RouteSchema, method="json_mode")
+        route_result = await llm_with_schema.ainvoke(router_prompt(query))
+        log_route(query, route_result.route_decision, "llm")
+    return route_result
+
+
+async def router(state: GraphState) -> dict[str, Any]:
+    """Route the agent to the appropriate node."""
+    messages = state.get("messages", [])
+    if not messages:
+        return {"route_decision": "answer_directly", "original_input": ""}
+
+    query = messages[-1].content
+    return route_state(query, await classify_route(query))
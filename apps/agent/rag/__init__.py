@@ -1,5 +1,6 @@
-from .milvus_vector import milvus_vector
+from .milvus_vector import async_milvus_vector, milvus_vector
 
 __all__ = [
     "milvus_vector",
+    "async_milvus_vector",
 ]
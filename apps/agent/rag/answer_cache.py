@@ -0,0 +1,183 @@
+"""
+知识库问答的语义答案缓存
+
+同一知识库中近似重复的问题直接复用已通过评估的答案，跳过 HyDE、检索、生成和反思评估。
+缓存按知识库（tenant_key = user_id:knowledge_id）隔离，条目携带写入时的语料版本：
+入库任务完成或删除文件时版本号加一，旧版本的条目在下次查询时失效。
+
+- 答案条目保存在进程内存中（每个知识库 LRU + TTL），按问题 embedding 的余弦相似度匹配；
+- 语料版本号：local 入库后端保存在进程内；celery 后端保存在 Redis，worker 进程入库后 API 进程可见。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from apps.agent.rag.milvus_schema import tenant_key
+from apps.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CorpusVersionStore(ABC):
+    """知识库语料版本号"""
+
+    @abstractmethod
+    def get(self, scope: str) -> int:
+        """当前版本，未记录过的知识库为 0"""
+
+    @abstractmethod
+    def bump(self, scope: str) -> int:
+        """版本号加一，返回新版本"""
+
+
+class LocalVersionStore(CorpusVersionStore):
+    """进程内版本号，适用于 local 入库后端（入库与问答在同一进程）"""
+
+    def __init__(self) -> None:
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str) -> int:
+        with self._lock:
+            return self._versions.get(scope, 0)
+
+    def bump(self, scope: str) -> int:
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+            return self._versions[scope]
+
+
+class RedisVersionStore(CorpusVersionStore):
+    """Redis 版本号，适用于 celery 入库后端（入库在 worker 进程执行）"""
+
+    key_prefix = "buddy:corpus_version:"
+
+    def __init__(self, url: str) -> None:
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, scope: str) -> int:
+        return int(self._redis.get(self.key_prefix + scope) or 0)
+
+    def bump(self, scope: str) -> int:
+        return int(self._redis.incr(self.key_prefix + scope))
+
+
+class CachedAnswer(BaseModel):
+    question: str = Field(..., description="命中条目的原始问题")
+    answer: str = Field(..., description="缓存的答案")
+    similarity: float = Field(..., description="与当前问题的余弦相似度")
+
+
+@dataclass
+class _Entry:
+    question: str
+    answer: str
+    vector: np.ndarray
+    version: int
+    expires_at: float
+
+
+class SemanticAnswerCache:
+    """线程安全的语义答案缓存"""
+
+    def __init__(
+        self,
+        versions: CorpusVersionStore,
+        threshold: float = 0.95,
+        max_entries: int = 500,
+        ttl: float = 86400.0,
+    ) -> None:
+        self.versions = versions
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: dict[str, OrderedDict[str, _Entry]] = {}
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+    @staticmethod
+    def scope(user_id: str, knowledge_id: int) -> str:
+        return tenant_key(user_id, knowledge_id)
+
+    def version(self, scope: str) -> int:
+        return self.versions.get(scope)
+
+    def lookup(self, scope: str, vector: Sequence[float], version: int) -> CachedAnswer | None:
+        """在当前语料版本的条目中查找最相似的问题，相似度低于阈值时返回 None"""
+        query = _normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(scope)
+            if entries:
+                for key in [k for k, e in entries.items() if e.version != version or e.expires_at <= now]:
+                    del entries[key]
+            if not entries:
+                self._counts["misses"] += 1
+                return None
+            keys = list(entries)
+            similarities = np.stack([entries[k].vector for k in keys]) @ query
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                self._counts["misses"] += 1
+                return None
+            entry = entries[keys[best]]
+            entries.move_to_end(keys[best])
+            self._counts["hits"] += 1
+        return CachedAnswer(question=entry.question, answer=entry.answer, similarity=float(similarities[best]))
+
+    def store(self, scope: str, question: str, vector: Sequence[float], answer: str, version: int) -> None:
+        """
+        写入答案。version 应取自生成答案前的 lookup，
+        生成期间语料发生变更时该条目会随旧版本一起失效，不会把旧语料的答案记到新版本下。
+        """
+        entry = _Entry(question, answer, _normalize(vector), version, time.monotonic() + self.ttl)
+        with self._lock:
+            entries = self._entries.setdefault(scope, OrderedDict())
+            entries[question] = entry
+            entries.move_to_end(question)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._counts["stores"] += 1
+
+    def invalidate(self, user_id: str, knowledge_id: int) -> None:
+        """知识库内容变更：版本号加一并清空本进程中该知识库的条目"""
+        scope = self.scope(user_id, knowledge_id)
+        version = self.versions.bump(scope)
+        with self._lock:
+            self._entries.pop(scope, None)
+            self._counts["invalidations"] += 1
+        logger.info("答案缓存已失效: scope=%s, version=%d", scope, version)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counts, "entries": sum(len(e) for e in self._entries.values())}
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+@lru_cache(maxsize=1)
+def get_answer_cache() -> SemanticAnswerCache:
+    versions = RedisVersionStore(settings.REDIS_URL) if settings.INGEST_BACKEND == "celery" else LocalVersionStore()
+    return SemanticAnswerCache(
+        versions,
+        threshold=settings.ANSWER_CACHE_THRESHOLD,
+        max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        ttl=settings.ANSWER_CACHE_TTL,
+    )
@@ -0,0 +1,86 @@
+"""
+MilvusVector 异步封装
+
+Milvus 调用（含查询 embedding）在有界线程池中执行，协程中 await 不会阻塞事件循环；
+线程池大小即 Milvus 并发上限，超时后抛出 VectorStoreError。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from langchain_core.documents import Document
+
+from apps.exceptions import VectorStoreError
+
+if TYPE_CHECKING:
+    from apps.agent.rag.batch_embedder import EmbeddingMetrics
+    from apps.agent.rag.milvus_vector import MilvusVector
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncMilvusVector:
+    def __init__(self, vector: MilvusVector, max_concurrency: int = 8, timeout: float = 10.0) -> None:
+        self.vector = vector
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="milvus")
+
+    async def vector_search(
+        self, query: str, user_id: str, knowledge_id: int = 1, top_k: int = 3
+    ) -> list[dict[str, Any]]:
+        return await self._run("检索", self.vector.vector_search, query, user_id, knowledge_id, top_k)
+
+    async def hybrid_search(
+        self, query: str, user_id: str, knowledge_id: int = 1, top_k: int = 3
+    ) -> list[dict[str, Any]]:
+        return await self._run("混合检索", self.vector.hybrid_search, query, user_id, knowledge_id, top_k)
+
+    async def text_match(
+        self, query: str, keyword: str, user_id: str, knowledge_id: int = 1, limit: int = 3
+    ) -> list[dict[str, Any]]:
+        return await self._run("文本匹配", self.vector.text_match, query, keyword, user_id, knowledge_id, limit)
+
+    async def multi_search(
+        self,
+        query: str,
+        user_id: str,
+        knowledge_id: int = 1,
+        hyde: str | None = None,
+        keyword: str | None = None,
+        top_k: int = 3,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        return await self._run(
+            "多路检索", self.vector.multi_search, query, user_id, knowledge_id, hyde, keyword, top_k, limit
+        )
+
+    async def save_documents(
+        self, docs: list[Document], user_id: str, knowledge_id: int, file_id: int, timeout: float | None = None
+    ) -> EmbeddingMetrics:
+        """写入耗时与文件大小相关，可单独指定超时"""
+        return await self._run(
+            "写入", self.vector.save_documents, docs, user_id, knowledge_id, file_id, timeout=timeout
+        )
+
+    async def delete_documents(self, file_id: int, user_id: str, knowledge_id: int = 1) -> None:
+        await self._run("删除", self.vector.delete_documents, file_id, user_id, knowledge_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, operation: str, func: Callable[..., T], *args: Any, timeout: float | None = None) -> T:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(func, *args))
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except TimeoutError as e:
+            logger.error("Milvus %s超时（%.1fs）", operation, timeout or self.timeout)
+            raise VectorStoreError(operation, "请求超时") from e
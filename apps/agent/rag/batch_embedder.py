@@ -0,0 +1,154 @@
+"""
+批量并发 Embedding
+
+将文档流切分为有界大小的微批次（按条数和估算 token 数双重限制），
+以有限并发调用 embedding 接口，失败时指数退避重试，
+每完成一个批次就交给调用方写入向量库，避免一次性持有全部向量。
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from langchain_core.documents import Document
+from pydantic import BaseModel, computed_field
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[list[str]], list[list[float]]]
+
+# CJK 字符按 1 字 1 token 估算，其余按空白/标点切分后每 4 个字符约 1 token
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]")
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的 token 数，用于批次大小控制和吞吐统计"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    rest = _CJK_PATTERN.sub(" ", text)
+    words = sum(max(1, (len(w) + 3) // 4) for w in _WORD_PATTERN.findall(rest))
+    return cjk + words
+
+
+class EmbeddingMetrics(BaseModel):
+    """Embedding 吞吐统计"""
+
+    chunks: int = 0
+    tokens: int = 0
+    batches: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def chunks_per_second(self) -> float:
+        return round(self.chunks / self.elapsed, 2) if self.elapsed else 0.0
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def tokens_per_second(self) -> float:
+        return round(self.tokens / self.elapsed, 2) if self.elapsed else 0.0
+
+
+class BatchEmbedder:
+    """有界微批次 + 有限并发 + 重试退避的 embedding 执行器"""
+
+    def __init__(
+        self,
+        encode: EncodeFn,
+        batch_size: int = 64,
+        max_batch_tokens: int = 8000,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ) -> None:
+        self._encode = encode
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def iter_batches(
+        self, docs: Iterable[Document], metrics: EmbeddingMetrics | None = None
+    ) -> Iterator[tuple[list[Document], list[list[float]]]]:
+        """
+        按输入顺序逐批产出 (文档批次, embeddings)。
+
+        同时在途的批次不超过 max_concurrency 个，调用方消费越慢，读取输入越慢，内存占用有界。
+        """
+        metrics = metrics if metrics is not None else EmbeddingMetrics()
+        lock = threading.Lock()
+        start = time.perf_counter()
+        pending: deque[tuple[list[Document], int, Future[list[list[float]]]]] = deque()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed") as executor:
+            try:
+                for batch, tokens in self._make_batches(docs):
+                    future = executor.submit(self._encode_with_retry, batch, metrics, lock)
+                    pending.append((batch, tokens, future))
+                    if len(pending) >= self.max_concurrency:
+                        yield self._collect(pending.popleft(), metrics, start)
+                while pending:
+                    yield self._collect(pending.popleft(), metrics, start)
+            finally:
+                for _, _, future in pending:
+                    future.cancel()
+
+    def embed(self, docs: Iterable[Document]) -> list[list[float]]:
+        """一次性返回全部 embeddings（顺序与输入一致）"""
+        return [embedding for _, embeddings in self.iter_batches(docs) for embedding in embeddings]
+
+    def _make_batches(self, docs: Iterable[Document]) -> Iterator[tuple[list[Document], int]]:
+        batch: list[Document] = []
+        batch_tokens = 0
+        for doc in docs:
+            tokens = estimate_tokens(doc.page_content)
+            if batch and (len(batch) >= self.batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                yield batch, batch_tokens
+                batch, batch_tokens = [], 0
+            batch.append(doc)
+            batch_tokens += tokens
+        if batch:
+            yield batch, batch_tokens
+
+    def _encode_with_retry(
+        self, batch: list[Document], metrics: EmbeddingMetrics, lock: threading.Lock
+    ) -> list[list[float]]:
+        texts = [doc.page_content for doc in batch]
+        attempt = 0
+        while True:
+            try:
+                embeddings = list(self._encode(texts))
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"embedding 数量不匹配: 期望 {len(texts)}，实际 {len(embeddings)}")
+                return embeddings
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                # 指数退避 + 抖动，避免并发批次同时重试
+                delay = min(self.backoff_max, self.backoff_base * 2**attempt) * random.uniform(0.5, 1.0)
+                attempt += 1
+                with lock:
+                    metrics.retries += 1
+                logger.warning("Embedding 批次失败，%.2fs 后第 %d 次重试: %s", delay, attempt, e)
+                time.sleep(delay)
+
+    @staticmethod
+    def _collect(
+        item: tuple[list[Document], int, Future[list[list[float]]]], metrics: EmbeddingMetrics, start: float
+    ) -> tuple[list[Document], list[list[float]]]:
+        batch, tokens, future = item
+        embeddings = future.result()
+        metrics.chunks += len(batch)
+        metrics.tokens += tokens
+        metrics.batches += 1
+        metrics.elapsed = time.perf_counter() - start
+        return batch, embeddings
@@ -0,0 +1,65 @@
+"""
+分块级增量更新
+
+文件内容变更时，按分块指纹对比新旧分块：只写入新增分块、只删除被移除的分块，
+未变化的分块保留原向量，避免整文件删除重建。
+"""
+
+import hashlib
+import json
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Sequence
+
+from langchain_core.documents import Document
+
+
+def chunk_fingerprint(doc: Document) -> str:
+    """分块指纹：文本 + 元数据（如 Markdown 标题层级），任一变化都视为新分块"""
+    payload = doc.page_content + "\0" + json.dumps(doc.metadata or {}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChunkDiff:
+    """流式对比：逐个判断新分块是否需要写入，全部判断完后 to_delete 为需要删除的已入库主键"""
+
+    def __init__(self, existing: Iterable[tuple[int, str | None]]) -> None:
+        self._remaining: defaultdict[str | None, list[int]] = defaultdict(list)
+        for pk, fingerprint in existing:
+            self._remaining[fingerprint].append(pk)
+        self.kept = 0
+
+    def is_new(self, fingerprint: str) -> bool:
+        """与未配对的已入库分块配对成功返回 False（保留原向量），否则需要写入；重复分块按出现次数配对"""
+        if self._remaining[fingerprint]:
+            self._remaining[fingerprint].pop()
+            self.kept += 1
+            return False
+        return True
+
+    def filter(self, docs: Iterable[Document]) -> Iterator[Document]:
+        """只产出需要写入的新分块"""
+        for doc in docs:
+            if self.is_new(chunk_fingerprint(doc)):
+                yield doc
+
+    @property
+    def to_delete(self) -> list[int]:
+        return [pk for pks in self._remaining.values() for pk in pks]
+
+
+def diff_chunks(
+    existing: Sequence[tuple[int, str | None]], new_fingerprints: Sequence[str]
+) -> tuple[list[int], list[int]]:
+    """
+    对比已入库分块与新分块。
+
+    Args:
+        existing: 已入库分块的 (主键, 指纹)，旧版本数据没有指纹时为 None
+        new_fingerprints: 新分块指纹，按文档顺序
+
+    Returns:
+        (需要写入的新分块下标, 需要删除的已入库主键)；重复分块按出现次数配对
+    """
+    diff = ChunkDiff(existing)
+    to_insert = [index for index, fingerprint in enumerate(new_fingerprints) if diff.is_new(fingerprint)]
+    return to_insert, diff.to_delete
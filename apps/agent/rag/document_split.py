@@ -2,52 +2,61 @@
 文档分割模块
 
 根据文件类型选择合适的分割策略：
-- txt: RecursiveCharacterTextSplitter
-- md:  MarkdownHeaderTextSplitter + RecursiveCharacterTextSplitter
-- docx: RecursiveCharacterTextSplitter
+- txt / docx: 文本分割器
+- md:  MarkdownHeaderTextSplitter + 文本分割器
+
+文本分割器由 TEXT_SPLITTER 选择：sentence 为单遍句子边界分割（SentenceSplitter），recursive 为 LangChain
+RecursiveCharacterTextSplitter；分块大小按 SPLIT_LENGTH_UNIT 计数（embedding 模型 token 数或字符数）。
+分割器按参数缓存复用，不在每次调用时重新构造。
+
+iter_split_document 为流式版本：输入为文本片段的迭代器（任意切分，拼接后即全文），逐个产出分块，
+同一时刻只在内存中保留一个窗口的文本，内存占用与文件大小无关：
+- txt / docx：文本累积到 window 个字符后分割，产出除最后一块以外的分块，最后一块（可能被窗口截断）与后续文本合并再分；
+- md：按 h1-h3 标题逐节分割，每节前补上当前生效的上级标题行，标题元数据与整篇分割一致；超长的节按窗口拆开。
 """
 
+import re
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+
 from langchain_core.documents import Document
 from langchain_text_splitters import (
     MarkdownHeaderTextSplitter,
     RecursiveCharacterTextSplitter,
 )
 
+from apps.agent.rag.sentence_splitter import SentenceSplitter, get_length_function
+from apps.config import settings
+
 # 默认分割参数
 DEFAULT_CHUNK_SIZE = 500
 DEFAULT_CHUNK_OVERLAP = 0
+WINDOW_CHUNKS = 16  # 流式分割的窗口大小（chunk_size 的倍数）
+
+TEXT_SEPARATORS = ["\n\n", "\n", "。", "！", "？", ".", "!", "?", " ", ""]
+HEADERS_TO_SPLIT_ON = [
+    ("#", "h1"),
+    ("##", "h2"),
+    ("###", "h3"),
+]
+_HEADER_PATTERN = re.compile(r"^(#{1,3})(?: |$)")
 
 
 def split_text(
     text: str, chunk_size: int = DEFAULT_CHUNK_SIZE, chunk_overlap: int = DEFAULT_CHUNK_OVERLAP
 ) -> list[Document]:
     """通用文本分割，适用于 txt / docx。"""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", "。", "！", "？", ".", "!", "?", " ", ""],
-    )
-    return splitter.create_documents([text])
+    return _text_splitter(chunk_size, chunk_overlap).create_documents([text])
 
 
 def split_markdown(
     text: str, chunk_size: int = DEFAULT_CHUNK_SIZE, chunk_overlap: int = DEFAULT_CHUNK_OVERLAP
 ) -> list[Document]:
     """Markdown 分割：先按标题拆分保留结构，再对过长片段二次分割。"""
-    headers_to_split_on = [
-        ("#", "h1"),
-        ("##", "h2"),
-        ("###", "h3"),
-    ]
-    md_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers_to_split_on)
-    md_docs: list[Document] = md_splitter.split_text(text)
-
-    # 二次分割：对超出 chunk_size 的片段再用 RecursiveCharacterTextSplitter 切分
-    char_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-    )
-    return char_splitter.split_documents(md_docs)
+    md_docs: list[Document] = _header_splitter().split_text(text)
+
+    # 二次分割：对超出 chunk_size 的片段再用文本分割器切分
+    return _text_splitter(chunk_size, chunk_overlap, markdown=True).split_documents(md_docs)
 
 
 def split_document(
@@ -69,3 +78,120 @@ def split_document(
     if ext == "md":
         return split_markdown(text, chunk_size, chunk_overlap)
     return split_text(text, chunk_size, chunk_overlap)
+
+
+def iter_split_document(
+    pieces: Iterable[str],
+    file_type: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+    window: int | None = None,
+) -> Iterator[Document]:
+    """
+    流式分割：逐个产出分块，分割策略与 split_document 相同。
+
+    Args:
+        pieces: 文本片段迭代器，拼接后为全文（片段边界任意）
+        file_type: 文件扩展名，如 "txt", "md", "docx"
+        chunk_size: 分块大小
+        chunk_overlap: 分块重叠大小
+        window: 每次分割的最大文本长度，默认 WINDOW_CHUNKS * chunk_size
+    """
+    window = window or WINDOW_CHUNKS * chunk_size
+    if file_type.lower() == "md":
+        return _iter_split_markdown(pieces, chunk_size, chunk_overlap, window)
+    return _iter_split_text(pieces, chunk_size, chunk_overlap, window)
+
+
+@lru_cache(maxsize=1)
+def _header_splitter() -> MarkdownHeaderTextSplitter:
+    return MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON)
+
+
+@lru_cache(maxsize=32)
+def _text_splitter(
+    chunk_size: int, chunk_overlap: int, markdown: bool = False
+) -> SentenceSplitter | RecursiveCharacterTextSplitter:
+    """按配置构造文本分割器并缓存；分割器无可变状态，可在线程间复用"""
+    if settings.TEXT_SPLITTER == "sentence":
+        return SentenceSplitter(chunk_size, chunk_overlap, get_length_function())
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=get_length_function(),
+        # Markdown 的二次分割沿用 LangChain 默认分隔符
+        separators=None if markdown else TEXT_SEPARATORS,
+    )
+
+
+def _iter_split_text(pieces: Iterable[str], chunk_size: int, chunk_overlap: int, window: int) -> Iterator[Document]:
+    splitter = _text_splitter(chunk_size, chunk_overlap)
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) < window:
+            continue
+        *done, last = splitter.split_text(buffer)
+        for chunk in done:
+            yield Document(page_content=chunk)
+        # 分块是原文的连续片段（去掉首尾空白），从最后一块的起点继续，保留其与后续文本之间的分隔符
+        start = buffer.rfind(last)
+        buffer = buffer[start:] if start >= 0 else last
+    if buffer:
+        for chunk in splitter.split_text(buffer):
+            yield Document(page_content=chunk)
+
+
+def _iter_lines(pieces: Iterable[str]) -> Iterator[str]:
+    """把任意切分的文本片段整理为逐行输出（不含换行符）"""
+    rest = ""
+    for piece in pieces:
+        lines = (rest + piece).split("\n")
+        rest = lines.pop()
+        yield from lines
+    yield rest
+
+
+def _iter_markdown_sections(lines: Iterable[str], window: int) -> Iterator[str]:
+    """按 h1-h3 标题切成小节，每节前补上当前生效的上级标题行；代码块内的 # 不视为标题"""
+    stack: list[tuple[int, str]] = []  # (标题级别, 标题行)
+    section: list[str] = []
+    size = 0
+    fence = ""
+    for line in lines:
+        stripped = line.strip()
+        if not fence:
+            if stripped.startswith("```") and stripped.count("```") == 1:
+                fence = "```"
+            elif stripped.startswith("~~~"):
+                fence = "~~~"
+        elif stripped.startswith(fence):
+            fence = ""
+
+        match = None if fence else _HEADER_PATTERN.match(stripped)
+        if match:
+            if section:
+                yield "\n".join(section)
+            level = len(match.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, stripped))
+            section = [header for _, header in stack]
+            size = sum(len(header) for header in section)
+            continue
+        if size >= window and not fence:
+            # 超长的节在行边界拆开，后半部分沿用同一组标题
+            yield "\n".join(section)
+            section = [header for _, header in stack]
+            size = sum(len(header) for header in section)
+        section.append(line)
+        size += len(line) + 1
+    if section:
+        yield "\n".join(section)
+
+
+def _iter_split_markdown(pieces: Iterable[str], chunk_size: int, chunk_overlap: int, window: int) -> Iterator[Document]:
+    md_splitter = _header_splitter()
+    char_splitter = _text_splitter(chunk_size, chunk_overlap, markdown=True)
+    for section in _iter_markdown_sections(_iter_lines(pieces), window):
+        yield from char_splitter.split_documents(md_splitter.split_text(section))
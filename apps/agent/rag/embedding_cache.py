@@ -0,0 +1,150 @@
+"""
+内容寻址 Embedding 缓存
+
+以 (embedding 模型, 维度, sha256(分块文本)) 为键持久化文档向量（SQLite），
+按最近访问时间做 LRU 淘汰。同一段文本无论出现在哪个文件、哪个用户下，只需 embedding 一次。
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from pathlib import Path
+
+from apps.config import settings
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[list[str]], Sequence[Sequence[float]]]
+
+_SQL_BATCH = 500  # 单条 SQL 中的最大参数个数（hash 数）
+
+
+def content_hash(text: str) -> str:
+    """分块文本的内容指纹"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite 持久化的 LRU embedding 缓存，线程安全"""
+
+    def __init__(self, path: str | Path, max_entries: int = 200_000) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model TEXT NOT NULL,
+                dims INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, dims, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_access ON embedding_cache (last_access)")
+        self._conn.commit()
+
+    def get_many(self, model: str, dims: int, hashes: Sequence[str]) -> dict[str, list[float]]:
+        """批量读取，命中的条目会刷新访问时间"""
+        found: dict[str, list[float]] = {}
+        if not hashes:
+            return found
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(hashes), _SQL_BATCH):
+                part = list(hashes[i : i + _SQL_BATCH])
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache "
+                    f"WHERE model = ? AND dims = ? AND text_hash IN ({placeholders})",
+                    (model, dims, *part),
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+                if rows:
+                    hit_hashes = [row[0] for row in rows]
+                    self._conn.execute(
+                        f"UPDATE embedding_cache SET last_access = ? "
+                        f"WHERE model = ? AND dims = ? AND text_hash IN ({','.join('?' * len(hit_hashes))})",
+                        (now, model, dims, *hit_hashes),
+                    )
+            self._conn.commit()
+        return found
+
+    def put_many(self, model: str, dims: int, items: dict[str, Sequence[float]]) -> None:
+        """批量写入，超出容量时淘汰最久未访问的条目"""
+        if not items:
+            return
+        now = time.time()
+        rows = [(model, dims, h, array("f", vector).tobytes(), now) for h, vector in items.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def embed(self, model: str, dims: int, texts: Sequence[str], encode: EncodeFn) -> list[list[float]]:
+        """
+        带缓存的 embedding：先查缓存，只对未命中的文本（去重后）调用 encode，结果按输入顺序返回。
+        """
+        if not texts:
+            return []
+        hashes = [content_hash(text) for text in texts]
+        cached = self.get_many(model, dims, list(dict.fromkeys(hashes)))
+
+        missing: dict[str, str] = {}
+        for text, h in zip(texts, hashes, strict=True):
+            if h not in cached and h not in missing:
+                missing[h] = text
+
+        with self._lock:
+            self.hits += len(texts) - sum(1 for h in hashes if h in missing)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = encode(list(missing.values()))
+            fresh = {h: list(vector) for h, vector in zip(missing, vectors, strict=True)}
+            self.put_many(model, dims, fresh)
+            cached.update(fresh)
+
+        return [cached[h] for h in hashes]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()
+        if count <= self.max_entries:
+            return
+        # 一次多淘汰 10%，避免每次写入都触发淘汰
+        overflow = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embedding_cache WHERE rowid IN "
+            "(SELECT rowid FROM embedding_cache ORDER BY last_access LIMIT ?)",
+            (overflow,),
+        )
+        logger.info("Embedding 缓存淘汰 %d 条", overflow)
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache() -> EmbeddingCache | None:
+    """进程内共享的 embedding 缓存，EMBEDDING_CACHE_ENABLED=False 时返回 None"""
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    return EmbeddingCache(settings.EMBEDDING_CACHE_PATH, max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES)
@@ -0,0 +1,72 @@
+"""
+Dense 向量索引配置
+
+每个 profile 包含索引类型、建索引参数和与之匹配的检索参数（HNSW → ef，IVF → nprobe，DiskANN → search_list），
+通过 MILVUS_INDEX_PROFILE 选择，MILVUS_INDEX_PARAMS / MILVUS_SEARCH_PARAMS 可覆盖单项参数。
+不同 profile 的召回率与延迟可用 benchmarks/index_sweep.py 在本地 Milvus Lite 上对比。
+"""
+
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+DENSE_METRIC = "COSINE"
+
+
+class IndexProfile(BaseModel):
+    index_type: str = Field(..., description="Milvus 索引类型")
+    build_params: dict[str, Any] = Field(default_factory=dict, description="建索引参数")
+    search_params: dict[str, Any] = Field(default_factory=dict, description="检索参数")
+
+    def search_params_for(self, limit: int) -> dict[str, Any]:
+        """检索参数；HNSW 的 ef 与 DiskANN 的 search_list 不能小于返回条数"""
+        params = dict(self.search_params)
+        for key in ("ef", "search_list"):
+            if key in params:
+                params[key] = max(int(params[key]), limit)
+        return params
+
+
+INDEX_PROFILES: dict[str, IndexProfile] = {
+    # Milvus 自动选择索引与参数
+    "autoindex": IndexProfile(index_type="AUTOINDEX"),
+    # 图索引：内存占用高、召回与延迟最均衡
+    "hnsw": IndexProfile(index_type="HNSW", build_params={"M": 16, "efConstruction": 200}, search_params={"ef": 64}),
+    # 倒排聚类：建索引快，nprobe 越大召回越高
+    "ivf_flat": IndexProfile(index_type="IVF_FLAT", build_params={"nlist": 1024}, search_params={"nprobe": 16}),
+    # 倒排聚类 + 标量量化（float32 → int8），内存约为 IVF_FLAT 的 1/4
+    "ivf_sq8": IndexProfile(index_type="IVF_SQ8", build_params={"nlist": 1024}, search_params={"nprobe": 16}),
+    # 磁盘索引：适合内存放不下的大规模数据
+    "diskann": IndexProfile(index_type="DISKANN", search_params={"search_list": 100}),
+}
+
+# 离线调参时每种索引扫描的检索参数
+SEARCH_PARAM_SWEEP: dict[str, tuple[str, list[int]]] = {
+    "HNSW": ("ef", [16, 32, 64, 128, 256]),
+    "IVF_FLAT": ("nprobe", [4, 8, 16, 32, 64]),
+    "IVF_SQ8": ("nprobe", [4, 8, 16, 32, 64]),
+    "DISKANN": ("search_list", [20, 50, 100, 200]),
+}
+
+
+def resolve_index_profile(
+    name: str, build_overrides: dict[str, Any] | None = None, search_overrides: dict[str, Any] | None = None
+) -> IndexProfile:
+    """按名称获取 profile，并合并覆盖参数"""
+    if name not in INDEX_PROFILES:
+        raise ValueError(f"不支持的索引 profile: {name}，可选: {', '.join(INDEX_PROFILES)}")
+    profile = INDEX_PROFILES[name]
+    return profile.model_copy(
+        update={
+            "build_params": {**profile.build_params, **(build_overrides or {})},
+            "search_params": {**profile.search_params, **(search_overrides or {})},
+        }
+    )
+
+
+def profile_for_index_type(index_type: str) -> IndexProfile:
+    """已存在 Collection 的索引类型对应的默认 profile，未知类型不传检索参数"""
+    for profile in INDEX_PROFILES.values():
+        if profile.index_type == index_type:
+            return profile
+    return IndexProfile(index_type=index_type)
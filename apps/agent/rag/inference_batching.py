@@ -0,0 +1,127 @@
+"""
+本地 embedding 模型的推理批处理
+
+- length_buckets: 按 token 长度从长到短排序后切成微批次，同一批内长度相近，padding 浪费小；
+  每批条数不超过 max_batch_size，padding 后的 token 数（条数 × 批内最长长度）不超过 max_batch_tokens，
+  内存占用有上界而不再随输入列表变长；
+- DynamicBatcher: 动态批处理队列，多个会话并发提交的查询在 max_wait 时间窗口内合并为一次前向计算，
+  由一个后台线程串行执行，调用方阻塞等待各自的结果。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def length_buckets(lengths: Sequence[int], max_batch_size: int, max_batch_tokens: int) -> list[list[int]]:
+    """按长度分桶，返回各微批次的原始下标；单条超过 max_batch_tokens 时独占一批"""
+    order = sorted(range(len(lengths)), key=lengths.__getitem__, reverse=True)
+    buckets: list[list[int]] = []
+    current: list[int] = []
+    for index in order:
+        # 从长到短，批内第一条即最长，padding 后的 token 数为 条数 × 第一条长度
+        if current and (len(current) >= max_batch_size or (len(current) + 1) * lengths[current[0]] > max_batch_tokens):
+            buckets.append(current)
+            current = []
+        current.append(index)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+class DynamicBatcher[T, R]:
+    """
+    动态批处理队列：第一条请求入队后最多等待 max_wait 秒，期间到达的请求（最多 max_batch_size 条）
+    合并为一次 encode 调用；encode 抛出异常时，该批所有请求都以此异常结束。
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[T]], list[R]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        name: str = "dynamic-batcher",
+    ) -> None:
+        self._encode = encode
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._pending: deque[tuple[T, Future[R]]] = deque()
+        self._first_at = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._counts = {"submitted": 0, "batches": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._work, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: T) -> Future[R]:
+        future: Future[R] = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("DynamicBatcher 已关闭")
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append((item, future))
+            self._counts["submitted"] += 1
+            self._cond.notify()
+        return future
+
+    def map(self, items: Sequence[T]) -> list[R]:
+        """提交多条并阻塞等待结果，可能与其他线程的请求合并到同一批"""
+        futures = [self.submit(item) for item in items]
+        return [future.result() for future in futures]
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """停止接收新请求，执行完已排队的请求"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {**self._counts, "pending": len(self._pending)}
+
+    def _next_batch(self) -> list[tuple[T, Future[R]]] | None:
+        """等到攒满一批或首条请求等待超时；队列关闭且已空时返回 None"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    remaining = self._first_at + self._max_wait - time.monotonic()
+                    if self._closed or len(self._pending) >= self._max_batch_size or remaining <= 0:
+                        size = min(len(self._pending), self._max_batch_size)
+                        # 剩余请求保留原入队时间，已等满窗口的会在下一轮立即执行
+                        return [self._pending.popleft() for _ in range(size)]
+                    self._cond.wait(remaining)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _work(self) -> None:
+        while (batch := self._next_batch()) is not None:
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self._encode([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"encode 返回 {len(results)} 条结果，期望 {len(batch)} 条")
+            except Exception as e:
+                logger.warning("动态批处理执行失败: %d 条, %s", len(batch), e)
+                for _, future in batch:
+                    future.set_exception(e)
+                outcome = {"batches": 1, "failed": len(batch)}
+            else:
+                for (_, future), result in zip(batch, results, strict=True):
+                    future.set_result(result)
+                outcome = {"batches": 1}
+            with self._cond:
+                for key, value in outcome.items():
+                    self._counts[key] += value
@@ -0,0 +1,125 @@
+"""
+document_embedding 迁移到 partition_key 多租户模式
+
+将旧版（filter 模式）Collection 的数据连同向量原样复制到新 Collection（不重新 embedding，
+BM25 稀疏向量由新 Collection 的函数自动生成），校验行数后切换名称：
+旧 Collection 重命名为 {name}_legacy，新 Collection 接管原名称。
+
+迁移期间的新写入不会被复制，请在暂停入库时执行：
+    python -m apps.agent.rag.migrate_partition_key [--batch-size 1000] [--drop-legacy]
+"""
+
+import argparse
+import logging
+
+from pymilvus import MilvusClient
+
+from apps.agent.rag.milvus_schema import (
+    COLLECTION_NAME,
+    TENANT_KEY_FIELD,
+    create_document_collection,
+    detect_tenant_mode,
+    tenant_key,
+)
+from apps.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 需要复制的字段；text_sparse 由 BM25 函数生成，id 为 auto_id，chunk_hash 为动态字段
+COPY_FIELDS = [
+    "user_id",
+    "knowledge_id",
+    "file_id",
+    "document_text",
+    "metadata",
+    "text_dense",
+    "create_time",
+    "chunk_hash",
+]
+
+
+def count_rows(client: MilvusClient, collection_name: str) -> int:
+    res = client.query(collection_name=collection_name, filter="", output_fields=["count(*)"])
+    return int(res[0]["count(*)"])
+
+
+def migrate(
+    client: MilvusClient,
+    collection_name: str,
+    batch_size: int = 1000,
+    num_partitions: int = 64,
+    analyzer: str = "chinese",
+    drop_legacy: bool = False,
+) -> int:
+    """
+    执行迁移，返回复制的行数；已是 partition_key 模式时直接返回 0。
+
+    Raises:
+        RuntimeError: 复制后行数不一致（此时不切换名称，原 Collection 保持不变）
+    """
+    if detect_tenant_mode(client, collection_name) == "partition_key":
+        logger.info("%s 已是 partition_key 模式，无需迁移", collection_name)
+        return 0
+
+    target = f"{collection_name}_pk"
+    legacy = f"{collection_name}_legacy"
+    if client.has_collection(collection_name=target):
+        # 上次迁移中断留下的半成品
+        client.drop_collection(collection_name=target)
+    create_document_collection(client, target, "partition_key", num_partitions=num_partitions, analyzer=analyzer)
+
+    copied = 0
+    iterator = client.query_iterator(
+        collection_name=collection_name, filter="", output_fields=COPY_FIELDS, batch_size=batch_size
+    )
+    try:
+        while batch := iterator.next():
+            rows = []
+            for row in batch:
+                row.pop("id", None)
+                row[TENANT_KEY_FIELD] = tenant_key(row["user_id"], row["knowledge_id"])
+                rows.append(row)
+            client.insert(collection_name=target, data=rows)
+            copied += len(rows)
+            logger.info("已复制 %d 行", copied)
+    finally:
+        iterator.close()
+
+    client.flush(collection_name=target)
+    expected = count_rows(client, collection_name)
+    actual = count_rows(client, target)
+    if actual != expected:
+        raise RuntimeError(f"迁移行数不一致: {collection_name}={expected}, {target}={actual}")
+
+    if client.has_collection(collection_name=legacy):
+        client.drop_collection(collection_name=legacy)
+    client.rename_collection(old_name=collection_name, new_name=legacy)
+    client.rename_collection(old_name=target, new_name=collection_name)
+    client.load_collection(collection_name=collection_name)
+    logger.info("迁移完成: %d 行，原 Collection 已重命名为 %s", copied, legacy)
+    if drop_legacy:
+        client.drop_collection(collection_name=legacy)
+        logger.info("已删除 %s", legacy)
+    return copied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="迁移 document_embedding 到 partition_key 多租户模式")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--num-partitions", type=int, default=settings.MILVUS_NUM_PARTITIONS)
+    parser.add_argument("--drop-legacy", action="store_true", help="迁移成功后删除旧 Collection")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    client = MilvusClient(uri=settings.MILVUS_URL, token=settings.MILVUS_TOKEN, db_name=settings.MILVUS_DB_NAME)
+    migrate(
+        client,
+        COLLECTION_NAME,
+        batch_size=args.batch_size,
+        num_partitions=args.num_partitions,
+        drop_legacy=args.drop_legacy,
+    )
+
+
+if __name__ == "__main__":
+    main()
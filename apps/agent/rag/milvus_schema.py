@@ -0,0 +1,139 @@
+"""
+document_embedding Collection 定义
+
+两种多租户模式：
+- filter: 所有租户共用分区，检索时以 user_id / knowledge_id 标量表达式过滤（旧版 Collection）
+- partition_key: 以 tenant_key（"{user_id}:{knowledge_id}"）作为 partition key，
+  Milvus 按租户哈希路由到分区，检索只扫描目标分区
+"""
+
+import logging
+from typing import Literal
+
+from pymilvus import DataType, Function, FunctionType, MilvusClient
+
+from apps.agent.rag.index_profiles import DENSE_METRIC, INDEX_PROFILES, IndexProfile
+
+logger = logging.getLogger(__name__)
+
+TenantMode = Literal["filter", "partition_key"]
+
+COLLECTION_NAME = "document_embedding"
+TENANT_KEY_FIELD = "tenant_key"
+DENSE_INDEX_NAME = "text_dense_index"
+
+SparseIndexAlgo = Literal["DAAT_MAXSCORE", "DAAT_WAND", "TAAT_NAIVE"]
+
+
+def tenant_key(user_id: str, knowledge_id: int) -> str:
+    """租户键：用户 + 知识库"""
+    return f"{user_id}:{int(knowledge_id)}"
+
+
+def create_document_collection(
+    client: MilvusClient,
+    collection_name: str,
+    tenant_mode: TenantMode = "partition_key",
+    num_partitions: int = 64,
+    analyzer: str = "chinese",
+    dense_index: IndexProfile = INDEX_PROFILES["autoindex"],
+    sparse_index_algo: SparseIndexAlgo = "DAAT_MAXSCORE",
+) -> None:
+    """创建文档向量 Collection（含 BM25 函数、向量索引与标量索引）"""
+    schema = MilvusClient.create_schema(
+        auto_id=True,
+        enable_dynamic_field=True,
+    )
+
+    # 文本匹配Analyzer
+    analyzer_params = {"type": analyzer}
+
+    # 创建字段
+    schema.add_field(field_name="id", datatype=DataType.INT64, is_primary=True, auto_id=True, description="primary id")
+    schema.add_field(field_name="user_id", datatype=DataType.VARCHAR, max_length=64, description="knowledge id")
+    schema.add_field(field_name="knowledge_id", datatype=DataType.INT64, description="knowledge id")
+    if tenant_mode == "partition_key":
+        schema.add_field(
+            field_name=TENANT_KEY_FIELD,
+            datatype=DataType.VARCHAR,
+            max_length=128,
+            is_partition_key=True,
+            description="partition key: user_id:knowledge_id",
+        )
+    schema.add_field(field_name="file_id", datatype=DataType.INT64, description="document id")
+    schema.add_field(
+        field_name="document_text",
+        datatype=DataType.VARCHAR,
+        max_length=1000,
+        enable_analyzer=True,
+        enable_match=True,
+        analyzer_params=analyzer_params,
+        description="raw text of document",
+    )
+    schema.add_field(field_name="metadata", datatype=DataType.JSON, nullable=True, description="metadata of document")
+    schema.add_field(
+        field_name="text_dense", datatype=DataType.FLOAT_VECTOR, dim=1024, description="text dense embedding"
+    )
+    schema.add_field(
+        field_name="text_sparse",
+        datatype=DataType.SPARSE_FLOAT_VECTOR,
+        description="text sparse embedding auto-generated by the built-in BM25 function",
+    )
+    schema.add_field(field_name="create_time", datatype=DataType.INT64, description="create time")
+
+    # 创建BM25函数
+    bm25_function = Function(
+        name="text_bm25_emb",
+        input_field_names=["document_text"],
+        output_field_names=["text_sparse"],
+        function_type=FunctionType.BM25,
+    )
+    schema.add_function(bm25_function)
+
+    # 创建索引
+    index_params = client.prepare_index_params()
+    index_params.add_index(
+        field_name="text_dense",
+        index_name=DENSE_INDEX_NAME,
+        index_type=dense_index.index_type,  # 见 index_profiles，默认 AUTOINDEX 由 Milvus 自动优化索引设置
+        metric_type=DENSE_METRIC,
+        params=dense_index.build_params,
+    )
+    index_params.add_index(
+        field_name="text_sparse",
+        index_name="text_sparse_index",
+        index_type="SPARSE_INVERTED_INDEX",  # 倒排索引原理
+        metric_type="BM25",
+        params={"inverted_index_algo": sparse_index_algo},
+    )
+    # 标量索引：按文件删除 / 增量更新，以及 filter 模式下的租户过滤
+    index_params.add_index(field_name="file_id", index_name="file_id_index", index_type="INVERTED")
+    if tenant_mode == "partition_key":
+        index_params.add_index(field_name=TENANT_KEY_FIELD, index_name="tenant_key_index", index_type="INVERTED")
+    else:
+        index_params.add_index(field_name="user_id", index_name="user_id_index", index_type="INVERTED")
+        index_params.add_index(field_name="knowledge_id", index_name="knowledge_id_index", index_type="INVERTED")
+
+    # 创建collection
+    extra = {"num_partitions": num_partitions} if tenant_mode == "partition_key" else {}
+    client.create_collection(collection_name=collection_name, schema=schema, index_params=index_params, **extra)
+
+    res = client.get_load_state(collection_name=collection_name)
+
+    logger.info("Create collection: %s (%s, %s), %s", collection_name, tenant_mode, dense_index.index_type, res)
+
+
+def detect_tenant_mode(client: MilvusClient, collection_name: str) -> TenantMode:
+    """根据已存在 Collection 的 schema 判断多租户模式"""
+    fields = client.describe_collection(collection_name=collection_name)["fields"]
+    has_partition_key = any(field["name"] == TENANT_KEY_FIELD and field.get("is_partition_key") for field in fields)
+    return "partition_key" if has_partition_key else "filter"
+
+
+def detect_dense_index_type(client: MilvusClient, collection_name: str) -> str | None:
+    """已存在 Collection 的 Dense 索引类型"""
+    try:
+        return client.describe_index(collection_name=collection_name, index_name=DENSE_INDEX_NAME).get("index_type")
+    except Exception as e:
+        logger.warning("读取 %s 索引信息失败: %s", collection_name, e)
+        return None
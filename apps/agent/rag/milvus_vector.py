@@ -1,25 +1,99 @@
 import datetime
 import logging
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from functools import cached_property
 from typing import Any
 
 from langchain_core.documents import Document
-from pymilvus import AnnSearchRequest, DataType, Function, FunctionType, MilvusClient, RRFRanker, model
-
+from pymilvus import AnnSearchRequest, MilvusClient, RRFRanker, model
+
+from apps.agent.rag.async_milvus_vector import AsyncMilvusVector
+from apps.agent.rag.batch_embedder import BatchEmbedder, EmbeddingMetrics
+from apps.agent.rag.chunk_diff import ChunkDiff, chunk_fingerprint
+from apps.agent.rag.embedding_cache import get_embedding_cache
+from apps.agent.rag.index_profiles import profile_for_index_type, resolve_index_profile
+from apps.agent.rag.milvus_schema import (
+    COLLECTION_NAME,
+    TENANT_KEY_FIELD,
+    TenantMode,
+    create_document_collection,
+    detect_dense_index_type,
+    detect_tenant_mode,
+    tenant_key,
+)
+from apps.agent.rag.query_cache import QueryEmbeddingCache
 from apps.config import settings
 
 logger = logging.getLogger(__name__)
 
+
 class MilvusVector:
-    collection_name = "document_embedding"
+    collection_name = COLLECTION_NAME
+
+    def __init__(self, url: str, token: str, db_name: str, timeout: float | None = None):
+        self.url = url
+        self.token = token
+        self.db_name = db_name
+        self.timeout = timeout
+        # 首次使用（或 lifespan 中调用 connect()）时才连接 Milvus，导入模块不产生网络请求
+        self._client: MilvusClient | None = None
+        self._tenant_mode: TenantMode = "filter"
+        self._connect_lock = threading.Lock()
+        self.dense_index = resolve_index_profile(
+            settings.MILVUS_INDEX_PROFILE, settings.MILVUS_INDEX_PARAMS, settings.MILVUS_SEARCH_PARAMS
+        )
+        self.embedding_cache = get_embedding_cache()
+        self.query_cache = QueryEmbeddingCache(
+            max_entries=settings.QUERY_EMBEDDING_CACHE_SIZE, ttl=settings.QUERY_EMBEDDING_CACHE_TTL
+        )
+        self.embedder = BatchEmbedder(
+            self._encode_documents,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            max_batch_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS,
+            max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+        )
 
-    def __init__(self, url: str, token: str, db_name: str):
-        self.init_database(url=url, token=token, db_name=db_name)
-        self.client = MilvusClient(uri=url, token=token, db_name=db_name)
-        self.init_collection()
-        self.openai_ef = model.dense.OpenAIEmbeddingFunction(
+    @cached_property
+    def openai_ef(self) -> model.dense.OpenAIEmbeddingFunction:
+        return model.dense.OpenAIEmbeddingFunction(
             model_name=settings.EMBEDDING_MODEL, api_key=settings.OPENAI_API_KEY, dimensions=1024
         )
 
+    @cached_property
+    def dense_ef(self) -> Any:
+        """稠密向量的 embedding 函数：openai 请求接口，huggingface 使用本地 Qwen3-Embedding（查询动态批处理）"""
+        if settings.EMBEDDING_PROVIDER == "huggingface":
+            from apps.agent.rag.qwen3_embedding import get_qwen3_embedding
+
+            return get_qwen3_embedding()
+        return self.openai_ef
+
+    @property
+    def client(self) -> MilvusClient:
+        if self._client is None:
+            self.connect()
+        return self._client
+
+    @property
+    def tenant_mode(self) -> TenantMode:
+        """Collection 的多租户模式，取决于已存在 Collection 的 schema，需先连接"""
+        if self._client is None:
+            self.connect()
+        return self._tenant_mode
+
+    def connect(self) -> None:
+        """连接 Milvus 并初始化 database / collection，重复调用无副作用"""
+        with self._connect_lock:
+            if self._client is not None:
+                return
+            self.init_database(url=self.url, token=self.token, db_name=self.db_name)
+            client = MilvusClient(uri=self.url, token=self.token, db_name=self.db_name)
+            self.init_collection(client)
+            self._client = client
+
     def init_database(self, url: str, token: str, db_name: str) -> None:
         """Init database."""
         client = MilvusClient(uri=url, token=token)
@@ -29,117 +103,226 @@ class MilvusVector:
         client.create_database(db_name=db_name, properties={"timezone": "Asia/Shanghai"})
         logger.info(f"Create database: {db_name}")
 
-    def init_collection(self) -> None:
-        """Init collection."""
+    def init_collection(self, client: MilvusClient) -> None:
+        """Init collection.
+
+        已存在的 Collection 按其 schema 决定多租户模式（旧版 filter 模式可通过 migrate_partition_key 迁移），
+        按实际索引类型选择检索参数。
+        """
 
-        if self.client.has_collection(collection_name=self.collection_name):
+        if client.has_collection(collection_name=self.collection_name):
+            self._tenant_mode = detect_tenant_mode(client, self.collection_name)
+            if self._tenant_mode != settings.MILVUS_TENANT_MODE:
+                logger.warning(
+                    "Collection %s 为 %s 模式，与配置 %s 不一致，请运行 python -m apps.agent.rag.migrate_partition_key",
+                    self.collection_name,
+                    self._tenant_mode,
+                    settings.MILVUS_TENANT_MODE,
+                )
+            index_type = detect_dense_index_type(client, self.collection_name)
+            if index_type and index_type != self.dense_index.index_type:
+                logger.warning(
+                    "Collection %s 的 Dense 索引为 %s，与配置 profile %s (%s) 不一致，按实际索引选择检索参数",
+                    self.collection_name,
+                    index_type,
+                    settings.MILVUS_INDEX_PROFILE,
+                    self.dense_index.index_type,
+                )
+                self.dense_index = profile_for_index_type(index_type)
             return
 
-        schema = MilvusClient.create_schema(
-            auto_id=True,
-            enable_dynamic_field=True,
+        self._tenant_mode = settings.MILVUS_TENANT_MODE
+        create_document_collection(
+            client,
+            self.collection_name,
+            self._tenant_mode,
+            num_partitions=settings.MILVUS_NUM_PARTITIONS,
+            dense_index=self.dense_index,
+            sparse_index_algo=settings.MILVUS_SPARSE_INDEX_ALGO,
         )
 
-        # 文本匹配Analyzer
-        analyzer_params = {"type": "chinese"}
-
-        # 创建字段
-        schema.add_field(
-            field_name="id", datatype=DataType.INT64, is_primary=True, auto_id=True, description="primary id"
-        )
-        schema.add_field(field_name="user_id", datatype=DataType.VARCHAR, max_length=64, description="knowledge id")
-        schema.add_field(field_name="knowledge_id", datatype=DataType.INT64, description="knowledge id")
-        schema.add_field(field_name="file_id", datatype=DataType.INT64, description="document id")
-        schema.add_field(
-            field_name="document_text",
-            datatype=DataType.VARCHAR,
-            max_length=1000,
-            enable_analyzer=True,
-            enable_match=True,
-            analyzer_params=analyzer_params,
-            description="raw text of document",
+    def save_documents(
+        self, docs: Iterable[Document], user_id: str, knowledge_id: int, file_id: int
+    ) -> EmbeddingMetrics:
+        """微批次并发生成 embeddings，每完成一批即写入 Milvus"""
+        metrics = EmbeddingMetrics()
+        for batch, embeddings in self.embedder.iter_batches(docs, metrics):
+            self.insert_documents(batch, embeddings, user_id, knowledge_id, file_id)
+        logger.info(
+            "文档入库完成: file_id=%s, chunks=%d, batches=%d, %.1f chunks/s, %.1f tokens/s",
+            file_id,
+            metrics.chunks,
+            metrics.batches,
+            metrics.chunks_per_second,
+            metrics.tokens_per_second,
         )
-        schema.add_field(
-            field_name="metadata", datatype=DataType.JSON, nullable=True, description="metadata of document"
-        )
-        schema.add_field(
-            field_name="text_dense", datatype=DataType.FLOAT_VECTOR, dim=1024, description="text dense embedding"
-        )
-        schema.add_field(
-            field_name="text_sparse",
-            datatype=DataType.SPARSE_FLOAT_VECTOR,
-            description="text sparse embedding auto-generated by the built-in BM25 function",
-        )
-        schema.add_field(field_name="create_time", datatype=DataType.INT64, description="create time")
-
-        # 创建BM25函数
-        bm25_function = Function(
-            name="text_bm25_emb",
-            input_field_names=["document_text"],
-            output_field_names=["text_sparse"],
-            function_type=FunctionType.BM25,
-        )
-        schema.add_function(bm25_function)
-
-        # 创建索引
-        index_params = self.client.prepare_index_params()
-        index_params.add_index(
-            field_name="text_dense",
-            index_name="text_dense_index",
-            index_type="AUTOINDEX",  # 自动索引类型,允许 Milvus 自动优化索引设置
-        )
-        index_params.add_index(
-            field_name="text_sparse",
-            index_name="text_sparse_index",
-            index_type="SPARSE_INVERTED_INDEX",  # 倒排索引原理
-            metric_type="BM25",
-            params={"inverted_index_algo": "DAAT_MAXSCORE"},  # or "DAAT_WAND" or "TAAT_NAIVE"
+        return metrics
+
+    def save_files(
+        self,
+        files: Iterable[tuple[int, Iterable[Document]]],
+        user_id: str,
+        knowledge_id: int,
+        on_file_saved: Callable[[int, int], None] | None = None,
+        metrics: EmbeddingMetrics | None = None,
+    ) -> EmbeddingMetrics:
+        """
+        多个文件共用一条 embedding 流水线：各文件的分块依次汇入同一个分块流，微批次跨文件凑满，
+        不会在每个文件末尾留下未满的批次。
+
+        Args:
+            files: (文件ID, 分块流)，按顺序消费
+            on_file_saved: 某个文件的分块全部写入后回调 (文件下标, 写入的分块数)，按文件顺序调用
+            metrics: 流水线统计，传入时在其上累计（回调中可读取当前进度）
+        """
+        metrics = metrics if metrics is not None else EmbeddingMetrics()
+        file_ids: list[int] = []
+        pulled: list[int] = []  # 各文件已送入流水线的分块数
+        saved: list[int] = []  # 各文件已写入的分块数
+        owners: deque[int] = deque()  # 已送入流水线、尚未写入的分块所属文件下标，与批次顺序一致
+        exhausted = finished = 0  # 分块已全部送入流水线 / 已回调完成的文件数
+
+        def stream() -> Iterator[Document]:
+            nonlocal exhausted
+            for index, (file_id, docs) in enumerate(files):
+                file_ids.append(file_id)
+                pulled.append(0)
+                saved.append(0)
+                for doc in docs:
+                    owners.append(index)
+                    pulled[index] += 1
+                    yield doc
+                exhausted += 1
+
+        def flush() -> None:
+            nonlocal finished
+            while finished < exhausted and saved[finished] == pulled[finished]:
+                if on_file_saved is not None:
+                    on_file_saved(finished, saved[finished])
+                finished += 1
+
+        for batch, embeddings in self.embedder.iter_batches(stream(), metrics):
+            batch_owners = [owners.popleft() for _ in batch]
+            self.insert_documents(batch, embeddings, user_id, knowledge_id, [file_ids[i] for i in batch_owners])
+            for index in batch_owners:
+                saved[index] += 1
+            flush()
+        flush()
+        logger.info(
+            "批量入库完成: files=%d, chunks=%d, batches=%d, %.1f chunks/s",
+            len(file_ids),
+            metrics.chunks,
+            metrics.batches,
+            metrics.chunks_per_second,
         )
+        return metrics
 
-        # 创建collection
-        self.client.create_collection(collection_name=self.collection_name, schema=schema, index_params=index_params)
+    def update_documents(
+        self, docs: Iterable[Document], user_id: str, knowledge_id: int, file_id: int
+    ) -> tuple[EmbeddingMetrics, int]:
+        """
+        分块级增量更新文件向量：流式写入新增分块，全部写完后再删除被移除的分块，
+        更新过程中未变化的分块始终可检索。
 
-        res = self.client.get_load_state(collection_name=self.collection_name)
+        Returns:
+            (新增分块的 embedding 统计, 删除的分块数)
+        """
+        diff = ChunkDiff(self.list_chunk_fingerprints(file_id, user_id, knowledge_id))
+        metrics = self.save_documents(diff.filter(docs), user_id, knowledge_id, file_id)
+        to_delete = diff.to_delete
+        self.delete_by_ids(to_delete)
+        logger.info(
+            "增量更新完成: file_id=%s, 保留 %d, 新增 %d, 删除 %d",
+            file_id,
+            diff.kept,
+            metrics.chunks,
+            len(to_delete),
+        )
+        return metrics, len(to_delete)
 
-        logger.info("Create collection: %s", res)
+    def list_chunk_fingerprints(self, file_id: int, user_id: str, knowledge_id: int) -> list[tuple[int, str | None]]:
+        """查询文件已入库分块的 (主键, 指纹)，旧数据没有指纹时为 None"""
+        filter = self._file_filter(file_id, user_id, knowledge_id)
+        iterator = self.client.query_iterator(
+            collection_name=self.collection_name, filter=filter, output_fields=["id", "chunk_hash"], batch_size=1000
+        )
+        rows: list[tuple[int, str | None]] = []
+        try:
+            while batch := iterator.next():
+                rows.extend((row["id"], row.get("chunk_hash")) for row in batch)
+        finally:
+            iterator.close()
+        return rows
+
+    def delete_by_ids(self, ids: list[int], batch_size: int = 1000) -> None:
+        """按主键分批删除"""
+        for i in range(0, len(ids), batch_size):
+            self.client.delete(collection_name=self.collection_name, ids=ids[i : i + batch_size], timeout=self.timeout)
+
+    def _encode_documents(self, texts: list[str]) -> list[list[float]]:
+        """文档 embedding，未变更的分块直接命中内容寻址缓存"""
+        if self.embedding_cache is None:
+            return list(self.dense_ef.encode_documents(texts))
+        return self.embedding_cache.embed(
+            settings.embedding_model_name, self.dense_ef.dim, texts, self.dense_ef.encode_documents
+        )
 
-    def save_documents(self, docs: list[Document], user_id: str, knowledge_id: int, file_id: int) -> None:
+    def encode_query(self, query: str) -> list[list[float]]:
+        """查询 embedding（TTL + LRU 缓存，并发的相同查询只请求一次），返回可直接用于 search 的 data"""
+        return [self.query_cache.get(query, self.dense_ef.encode_queries)]
+
+    def embed_documents(self, docs: list[Document]) -> list[list[float]]:
+        """批量生成文档 embeddings"""
+        return self.embedder.embed(docs)
+
+    def insert_documents(
+        self,
+        docs: list[Document],
+        embeddings: list[list[float]],
+        user_id: str,
+        knowledge_id: int,
+        file_id: int | Sequence[int],
+    ) -> None:
+        """写入文档及其 embeddings，file_id 为序列时逐条对应（批次跨文件）"""
         if not docs:
             return
-
-        # 批量生成 embeddings
-        docs_embeddings = self.openai_ef.encode_documents([doc.page_content for doc in docs])
+        file_ids = [file_id] * len(docs) if isinstance(file_id, int) else file_id
 
         # 动态生成 data 列表
+        tenant = {TENANT_KEY_FIELD: tenant_key(user_id, knowledge_id)} if self.tenant_mode == "partition_key" else {}
         data = [
             {
                 "user_id": user_id,
                 "knowledge_id": knowledge_id,
-                "file_id": file_id,
+                "file_id": doc_file_id,
                 "document_text": doc.page_content,
                 "text_dense": embedding,
                 "metadata": doc.metadata or {},
+                "chunk_hash": chunk_fingerprint(doc),  # 动态字段，用于增量更新对比
                 "create_time": int(datetime.datetime.now().timestamp() * 1000),
+                **tenant,
             }
-            for doc, embedding in zip(docs, docs_embeddings, strict=True)
+            for doc, embedding, doc_file_id in zip(docs, embeddings, file_ids, strict=True)
         ]
 
-        res = self.client.insert(collection_name=self.collection_name, data=data)
+        res = self.client.insert(collection_name=self.collection_name, data=data, timeout=self.timeout)
         logger.info("res: %s, 插入 %d 条数据成功", res, len(docs))
 
     def vector_search(self, query: str, user_id: str, knowledge_id: int = 1, top_k: int = 3) -> list[dict[str, Any]]:
         """向量搜索"""
 
         # 创建查询条件
-        query_embeddings = self.openai_ef.encode_queries([query])
+        query_embeddings = self.encode_query(query)
         # 创建查询参数
         result = self.client.search(
             collection_name=self.collection_name,
             anns_field="text_dense",
             data=query_embeddings,
-            filter=f'user_id == "{self._escape(user_id)}" and knowledge_id == {int(knowledge_id)}',
+            filter=self._scope_filter(user_id, knowledge_id),
+            search_params=self.dense_index.search_params_for(top_k),
             limit=top_k,
             output_fields=["id", "document_text"],
+            timeout=self.timeout,
         )
         return [hit["entity"] for hits in result for hit in hits]
 
@@ -147,15 +330,13 @@ class MilvusVector:
         """混合搜索"""
 
         # 创建查询条件
-        query_embeddings = self.openai_ef.encode_queries([query])
+        query_embeddings = self.encode_query(query)
         # 语义搜索
         semantic_search_param = {
             "data": query_embeddings,
             "anns_field": "text_dense",
-            "param": {
-                "nprobe": 10
-            },  # 搜索候选集群的集群数。数值越大，搜索的簇数越多，搜索范围越大，召回率越高，但代价是查询延迟增加。
-            "expr": f'user_id == "{self._escape(user_id)}" and knowledge_id == {int(knowledge_id)}',
+            "param": self.dense_index.search_params_for(top_k),  # 与索引类型匹配的检索参数（ef / nprobe 等）
+            "expr": self._scope_filter(user_id, knowledge_id),
             "limit": top_k,
         }
         semantic_search_request = AnnSearchRequest(**semantic_search_param)
@@ -163,8 +344,8 @@ class MilvusVector:
         full_text_search_param = {
             "data": [query],
             "anns_field": "text_sparse",
-            "param": {},  # BM25 搜索不需要额外参数
-            "expr": f'user_id == "{self._escape(user_id)}" and knowledge_id == {int(knowledge_id)}',
+            "param": self._sparse_search_params(),
+            "expr": self._scope_filter(user_id, knowledge_id),
             "limit": top_k,
         }
         full_text_search_request = AnnSearchRequest(**full_text_search_param)
@@ -180,6 +361,7 @@ class MilvusVector:
             ranker=ranker,
             output_fields=["id", "document_text"],
             limit=top_k,
+            timeout=self.timeout,
         )
         return [hit["entity"] for hits in result for hit in hits]
 
@@ -187,25 +369,97 @@ class MilvusVector:
         self, query: str, keyword: str, user_id: str, knowledge_id: int = 1, limit: int = 3
     ) -> list[dict[str, Any]]:
         """文本匹配与向量相似性搜索结合使用，以缩小搜索范围并提高搜索性能。"""
-        filter = f'user_id == "{self._escape(user_id)}" and knowledge_id == {int(knowledge_id)} and TEXT_MATCH(document_text, "{self._escape(keyword)}")'
-        query_vector = self.openai_ef.encode_queries([query])
+        filter = f'{self._scope_filter(user_id, knowledge_id)} and TEXT_MATCH(document_text, "{self._escape(keyword)}")'
+        query_vector = self.encode_query(query)
         result = self.client.search(
             collection_name=self.collection_name,
             anns_field="text_dense",
             data=query_vector,
             filter=filter,
-            search_params={"params": {"nprobe": 10}},
+            search_params=self.dense_index.search_params_for(limit),
             limit=limit,
             output_fields=["id", "document_text"],
+            timeout=self.timeout,
+        )
+        return [hit["entity"] for hits in result for hit in hits]
+
+    def multi_search(
+        self,
+        query: str,
+        user_id: str,
+        knowledge_id: int = 1,
+        hyde: str | None = None,
+        keyword: str | None = None,
+        top_k: int = 3,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        单次往返的多路检索：原始问题 Dense、BM25、HyDE Dense、TEXT_MATCH 过滤 Dense
+        作为同一个 hybrid_search 请求的子请求，由 Milvus 统一 RRF 融合并按主键去重。
+
+        Args:
+            hyde: 假设性文档，为空时不做 HyDE 检索
+            keyword: 空格分隔的关键词，为空时不做文本匹配
+            top_k: 每路子请求的召回数
+            limit: 融合后返回条数，默认 top_k × 子请求数，与分别检索再合并的召回量一致
+        """
+        scope = self._scope_filter(user_id, knowledge_id)
+        texts = [query, hyde] if hyde else [query]
+        # 原始问题与 HyDE 文本合并为一次 embedding 请求
+        query_vector, *hyde_vector = self.query_cache.get_many(texts, self.dense_ef.encode_queries)
+        dense_param = self.dense_index.search_params_for(top_k)
+
+        reqs = [
+            AnnSearchRequest(data=[query_vector], anns_field="text_dense", param=dense_param, expr=scope, limit=top_k),
+            AnnSearchRequest(
+                data=[query], anns_field="text_sparse", param=self._sparse_search_params(), expr=scope, limit=top_k
+            ),
+        ]
+        if hyde_vector:
+            reqs.append(
+                AnnSearchRequest(data=hyde_vector, anns_field="text_dense", param=dense_param, expr=scope, limit=top_k)
+            )
+        if keyword:
+            match_filter = f'{scope} and TEXT_MATCH(document_text, "{self._escape(keyword)}")'
+            reqs.append(
+                AnnSearchRequest(
+                    data=[query_vector], anns_field="text_dense", param=dense_param, expr=match_filter, limit=top_k
+                )
+            )
+
+        result = self.client.hybrid_search(
+            collection_name=self.collection_name,
+            reqs=reqs,
+            ranker=RRFRanker(100),
+            output_fields=["id", "document_text"],
+            limit=limit or top_k * len(reqs),
+            timeout=self.timeout,
         )
         return [hit["entity"] for hits in result for hit in hits]
 
     def delete_documents(self, file_id: int, user_id: str, knowledge_id: int = 1) -> None:
-        filter = f'file_id == {int(file_id)} and user_id == "{self._escape(user_id)}" and knowledge_id == {int(knowledge_id)}'
-        res = self.client.delete(collection_name=self.collection_name, filter=filter)
+        filter = self._file_filter(file_id, user_id, knowledge_id)
+        res = self.client.delete(collection_name=self.collection_name, filter=filter, timeout=self.timeout)
         logger.info("Delete data: %s", res)
 
+    @staticmethod
+    def _sparse_search_params() -> dict[str, Any]:
+        """BM25 检索参数：drop_ratio_search 忽略低权重查询词以换取速度"""
+        if settings.MILVUS_SPARSE_DROP_RATIO > 0:
+            return {"drop_ratio_search": settings.MILVUS_SPARSE_DROP_RATIO}
+        return {}
+
+    def _scope_filter(self, user_id: str, knowledge_id: int) -> str:
+        """用户 + 知识库范围的过滤表达式；partition_key 模式下按租户键过滤，Milvus 只检索对应分区"""
+        if self.tenant_mode == "partition_key":
+            return f'{TENANT_KEY_FIELD} == "{self._escape(tenant_key(user_id, knowledge_id))}"'
+        return f'user_id == "{self._escape(user_id)}" and knowledge_id == {int(knowledge_id)}'
+
+    def _file_filter(self, file_id: int, user_id: str, knowledge_id: int) -> str:
+        """单个文件范围的过滤表达式"""
+        return f"file_id == {int(file_id)} and {self._scope_filter(user_id, knowledge_id)}"
 
+    @staticmethod
     def _escape(value: str) -> str:
         """转义 Milvus filter 表达式中的特殊字符
 
@@ -215,10 +469,18 @@ class MilvusVector:
         - 单引号 ' -> \\'
         - 空字符 \\0 -> 移除
         """
-        return value.replace("\0", "").translate(str.maketrans({"\\": "\\\\", '"': '\\"', "'": "\\''"}))    
-
-
-milvus_vector = MilvusVector(db_name=settings.MILVUS_DB_NAME, token=settings.MILVUS_TOKEN, url=settings.MILVUS_URL)
+        return value.replace("\0", "").translate(str.maketrans({"\\": "\\\\", '"': '\\"', "'": "\\''"}))
+
+
+milvus_vector = MilvusVector(
+    db_name=settings.MILVUS_DB_NAME,
+    token=settings.MILVUS_TOKEN,
+    url=settings.MILVUS_URL,
+    timeout=settings.MILVUS_TIMEOUT,
+)
+async_milvus_vector = AsyncMilvusVector(
+    milvus_vector, max_concurrency=settings.MILVUS_MAX_CONCURRENCY, timeout=settings.MILVUS_TIMEOUT
+)
 
 if __name__ == "__main__":
     # client = MilvusClient(uri="http://172.16.100.160:19530", token="root:Milvus", db_name="buddy_ai")
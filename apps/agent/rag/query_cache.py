@@ -0,0 +1,101 @@
+"""
+查询 Embedding 缓存
+
+TTL + LRU 内存缓存，并对并发的相同查询做 single-flight 合并：
+同一轮对话中并行的检索分支（hybrid_search / text_match）对同一文本只发起一次 embedding 请求，
+热门查询在 TTL 内跨用户复用。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+
+EncodeFn = Callable[[list[str]], Sequence[Sequence[float]]]
+
+
+class QueryEmbeddingCache:
+    """线程安全的查询 embedding 缓存"""
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 3600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+        self._inflight: dict[str, Future[list[float]]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._shared = 0
+
+    def get(self, text: str, encode: EncodeFn) -> list[float]:
+        return self.get_many([text], encode)[0]
+
+    def get_many(self, texts: Sequence[str], encode: EncodeFn) -> list[list[float]]:
+        """
+        按输入顺序返回 embeddings。
+
+        命中缓存直接返回；其他线程正在计算的文本等待其结果；
+        其余文本合并为一次 encode 调用，由当前线程负责计算并唤醒等待者。
+        """
+        resolved: dict[str, list[float]] = {}
+        waiting: dict[str, Future[list[float]]] = {}
+        owned: dict[str, Future[list[float]]] = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                entry = self._entries.get(text)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(text)
+                    resolved[text] = entry[1]
+                    self._hits += 1
+                elif text in self._inflight:
+                    waiting[text] = self._inflight[text]
+                    self._shared += 1
+                else:
+                    future: Future[list[float]] = Future()
+                    self._inflight[text] = future
+                    owned[text] = future
+                    self._misses += 1
+
+        if owned:
+            try:
+                vectors = [list(vector) for vector in encode(list(owned))]
+                if len(vectors) != len(owned):
+                    raise ValueError(f"encode 返回 {len(vectors)} 条 embedding，期望 {len(owned)} 条")
+                expires = time.monotonic() + self.ttl
+                with self._lock:
+                    for text, vector in zip(owned, vectors, strict=True):
+                        resolved[text] = vector
+                        self._entries[text] = (expires, vector)
+                        self._entries.move_to_end(text)
+                        self._inflight.pop(text, None)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            except BaseException as e:
+                # 失败时清掉本线程登记的全部在途请求并唤醒等待者，避免后续同文本请求永久阻塞
+                with self._lock:
+                    for text, future in owned.items():
+                        if self._inflight.get(text) is future:
+                            del self._inflight[text]
+                for future in owned.values():
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            for text, future in owned.items():
+                future.set_result(resolved[text])
+
+        for text, future in waiting.items():
+            resolved[text] = future.result()
+
+        return [resolved[text] for text in texts]
+
+    def stats(self) -> dict[str, int]:
+        """hits: 命中缓存；misses: 实际发起 embedding；shared: 等待并复用在途请求"""
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "shared": self._shared, "size": len(self._entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -2,10 +2,12 @@
 Qwen3 嵌入模型模块
 
 实现 Qwen3-Embedding-8B 等需要 last-token 池化方式的嵌入模型，
-直接继承 LangChain Embeddings 接口。
+直接继承 LangChain Embeddings 接口；推理按长度分桶的微批次执行，查询可经动态批处理队列合并。
 """
 
 import logging
+import threading
+from functools import lru_cache
 
 import torch
 import torch.nn.functional as F  # noqa: N812
@@ -13,7 +15,9 @@ from langchain_core.embeddings import Embeddings as LCEmbeddings
 from torch import Tensor
 from transformers import AutoModel, AutoTokenizer
 
-# from apps.config import settings
+from apps.agent.rag.embedding_cache import EmbeddingCache
+from apps.agent.rag.inference_batching import DynamicBatcher, length_buckets
+from apps.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +37,13 @@ def last_token_pool(last_hidden_states: Tensor, attention_mask: Tensor) -> Tenso
 
 
 class Qwen3EmbeddingModel(LCEmbeddings):
-    """Qwen3-Embedding-8B 专用嵌入模型，直接实现 LangChain Embeddings 接口"""
+    """
+    Qwen3-Embedding-8B 专用嵌入模型，直接实现 LangChain Embeddings 接口，
+    同时提供与 pymilvus EmbeddingFunction 同名的 encode_documents / encode_queries / dim，可供 MilvusVector 直接使用。
+
+    推理在 torch.inference_mode 下按长度分桶的微批次执行（同一时刻只有一个前向计算，CPU 上由 torch 线程池并行）；
+    max_wait_ms > 0 时查询经动态批处理队列，多个会话并发的查询在该时间窗口内合并为一次前向计算。
+    """
 
     DEFAULT_TASK = "Given a web search query, retrieve relevant passages that answer the query"
 
@@ -44,15 +54,34 @@ class Qwen3EmbeddingModel(LCEmbeddings):
         max_length: int = 8192,
         truncate_dim: int | None = None,
         use_flash_attention: bool = False,
+        cache: EmbeddingCache | None = None,
+        batch_size: int = 16,
+        max_batch_tokens: int = 16384,
+        max_wait_ms: float = 0.0,
+        num_threads: int | None = None,
     ):
         self.model_name = model_name
         self.device = device if device != "auto" else ("cuda" if torch.cuda.is_available() else "cpu")
         self.max_length = max_length
         self.truncate_dim = truncate_dim
         self.use_flash_attention = use_flash_attention
+        # 文档 embedding 缓存，可与 MilvusVector 共享 get_embedding_cache()
+        self.cache = cache
+        # 单次前向计算的最大条数 / padding 后的最大 token 数
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        # CPU 推理的 torch 线程数，None 为 torch 默认
+        self.num_threads = num_threads
 
         self._tokenizer: AutoTokenizer | None = None
         self._model: AutoModel | None = None
+        self._load_lock = threading.Lock()
+        self._inference_lock = threading.Lock()
+        self._query_batcher: DynamicBatcher[str, list[float]] | None = None
+        if max_wait_ms > 0:
+            self._query_batcher = DynamicBatcher(
+                self._encode, max_batch_size=batch_size, max_wait=max_wait_ms / 1000, name="qwen3-query-batcher"
+            )
 
     def _get_model_kwargs(self) -> dict:
         """获取模型加载参数"""
@@ -64,83 +93,124 @@ class Qwen3EmbeddingModel(LCEmbeddings):
 
     def load(self):
         """加载模型和分词器（首次自动下载到缓存目录）"""
-        if self._tokenizer is None:
-            self._tokenizer = AutoTokenizer.from_pretrained(
-                self.model_name,
-                padding_side="left",
-                trust_remote_code=True,
-            )
-
-        if self._model is None:
-            self._model = AutoModel.from_pretrained(self.model_name, **self._get_model_kwargs())
-            self._model.to(self.device)
-            self._model.eval()
-
-        logger.info("模型加载成功: %s", self.model_name)
-        logger.info("设备: %s", self.device)
+        if self._model is not None:
+            return self
+        with self._load_lock:
+            if self._tokenizer is None:
+                self._tokenizer = AutoTokenizer.from_pretrained(
+                    self.model_name,
+                    padding_side="left",
+                    trust_remote_code=True,
+                )
+
+            if self._model is None:
+                if self.num_threads and self.device == "cpu":
+                    torch.set_num_threads(self.num_threads)
+                model = AutoModel.from_pretrained(self.model_name, **self._get_model_kwargs())
+                model.to(self.device)
+                model.eval()
+                self._model = model
+                logger.info("模型加载成功: %s", self.model_name)
+                logger.info("设备: %s", self.device)
         return self
 
-    def _prepare_input(self, texts: list[str], task: str = None) -> dict:
-        """准备输入数据"""
+    @property
+    def dim(self) -> int:
+        """输出向量维度"""
+        return self.truncate_dim or self.load()._model.config.hidden_size
+
+    def _format_queries(self, texts: list[str], task: str | None = None) -> list[str]:
+        """查询加上指令前缀"""
         if task is None:
             task = self.DEFAULT_TASK
-        queries = [f"Instruct: {task}\nQuery: {text}" for text in texts]
-        batch_dict = self._tokenizer(
-            queries,
-            padding=True,
-            truncation=True,
-            max_length=self.max_length,
-            return_tensors="pt",
-        )
-        batch_dict.to(self.device)
-        return batch_dict
+        return [f"Instruct: {task}\nQuery: {text}" for text in texts]
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        """整体分词一次，按长度分桶后逐个微批次 padding、前向计算，结果按输入顺序返回"""
+        self.load()
+        encoded = self._tokenizer(texts, padding=False, truncation=True, max_length=self.max_length)
+        input_ids = encoded["input_ids"]
+        attention_mask = encoded["attention_mask"]
+        embeddings: list[list[float]] = [[] for _ in texts]
+        for bucket in length_buckets([len(ids) for ids in input_ids], self.batch_size, self.max_batch_tokens):
+            batch_dict = self._tokenizer.pad(
+                {"input_ids": [input_ids[i] for i in bucket], "attention_mask": [attention_mask[i] for i in bucket]},
+                padding=True,
+                return_tensors="pt",
+            )
+            batch_dict.to(self.device)
+            with self._inference_lock, torch.inference_mode():
+                outputs = self._model(**batch_dict)
+                vectors = last_token_pool(outputs.last_hidden_state, batch_dict["attention_mask"])
+                vectors = F.normalize(vectors, p=2, dim=1)
+                if self.truncate_dim:
+                    vectors = vectors[:, : self.truncate_dim]
+                rows = vectors.float().cpu().tolist()
+            for index, row in zip(bucket, rows, strict=True):
+                embeddings[index] = row
+        return embeddings
 
     def embed_query(self, text: str, task: str = None) -> list[float]:
         """嵌入单个查询"""
         return self.embed_queries([text], task)[0]
 
     def embed_queries(self, texts: list[str], task: str = None) -> list[list[float]]:
-        """嵌入多个查询"""
+        """嵌入多个查询，开启动态批处理时与其他线程的并发查询合并计算"""
         if not texts:
             return []
-        self.load()
-        batch_dict = self._prepare_input(texts, task)
-        outputs = self._model(**batch_dict)
-        embeddings = last_token_pool(outputs.last_hidden_state, batch_dict["attention_mask"])
-        embeddings = F.normalize(embeddings, p=2, dim=1)
-        if self.truncate_dim:
-            embeddings = embeddings[:, : self.truncate_dim]
-        return embeddings.cpu().tolist()
+        queries = self._format_queries(texts, task)
+        if self._query_batcher is not None:
+            return self._query_batcher.map(queries)
+        return self._encode(queries)
 
     def embed_document(self, text: str) -> list[float]:
         """嵌入单个文档（无需指令前缀）"""
         return self.embed_documents([text])[0]
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        """嵌入多个文档（无需指令前缀）"""
+        """嵌入多个文档（无需指令前缀），配置了缓存时只计算未命中的文本"""
         if not texts:
             return []
-        self.load()
-        batch_dict = self._tokenizer(
-            texts,
-            padding=True,
-            truncation=True,
-            max_length=self.max_length,
-            return_tensors="pt",
-        )
-        batch_dict.to(self.device)
-        outputs = self._model(**batch_dict)
-        embeddings = last_token_pool(outputs.last_hidden_state, batch_dict["attention_mask"])
-        embeddings = F.normalize(embeddings, p=2, dim=1)
-        if self.truncate_dim:
-            embeddings = embeddings[:, : self.truncate_dim]
-        return embeddings.cpu().tolist()
+        if self.cache is not None:
+            return self.cache.embed(self.model_name, self.truncate_dim or 0, texts, self._encode)
+        return self._encode(texts)
+
+    def encode_documents(self, texts: list[str]) -> list[list[float]]:
+        """pymilvus EmbeddingFunction 接口"""
+        return self.embed_documents(texts)
+
+    def encode_queries(self, texts: list[str]) -> list[list[float]]:
+        """pymilvus EmbeddingFunction 接口"""
+        return self.embed_queries(texts)
+
+    def query_batch_stats(self) -> dict[str, int]:
+        """查询动态批处理统计（提交条数、前向计算批数），未开启时为空"""
+        return self._query_batcher.stats() if self._query_batcher is not None else {}
+
+    def close(self) -> None:
+        """停止查询动态批处理线程"""
+        if self._query_batcher is not None:
+            self._query_batcher.shutdown()
 
     def __call__(self, text: str) -> list[float]:
         """支持直接调用"""
         return self.embed_query(text)
 
 
+@lru_cache(maxsize=1)
+def get_qwen3_embedding() -> Qwen3EmbeddingModel:
+    """EMBEDDING_PROVIDER=huggingface 时进程内共享的本地 embedding 模型，所有会话的查询经同一个动态批处理队列"""
+    return Qwen3EmbeddingModel(
+        settings.EMBEDDING_LOCAL_MODEL,
+        device=settings.EMBEDDING_DEVICE,
+        truncate_dim=settings.EMBEDDING_DIMENSIONS,
+        batch_size=settings.EMBEDDING_LOCAL_BATCH_SIZE,
+        max_batch_tokens=settings.EMBEDDING_LOCAL_MAX_BATCH_TOKENS,
+        max_wait_ms=settings.EMBEDDING_QUERY_BATCH_WAIT_MS,
+        num_threads=settings.EMBEDDING_NUM_THREADS or None,
+    )
+
+
 def main():
     model = Qwen3EmbeddingModel()
     test_queries = [
@@ -0,0 +1,125 @@
+"""
+检索结果重排
+
+召回阶段扩大候选集（RERANK_CANDIDATES），由重排器对 (问题, 分块) 逐对打分后截取 top-k：
+- lexical: jieba 分词的查询词覆盖率，纯 CPU、无需模型
+- cross_encoder: 本地 Cross-Encoder 模型（如 BAAI/bge-reranker-base），按批次打分，sigmoid 校准到 0~1
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+
+import jieba
+
+from apps.config import settings
+
+if TYPE_CHECKING:
+    from transformers import PreTrainedModel, PreTrainedTokenizerBase
+
+logger = logging.getLogger(__name__)
+
+
+class Reranker(ABC):
+    """重排器基类，子类实现单批次打分"""
+
+    def __init__(self, batch_size: int = 16) -> None:
+        self.batch_size = batch_size
+
+    @abstractmethod
+    def score_batch(self, query: str, texts: Sequence[str]) -> list[float]:
+        """对一批 (query, text) 打分，分数越高越相关"""
+
+    def score(self, query: str, texts: Sequence[str]) -> list[float]:
+        scores: list[float] = []
+        for i in range(0, len(texts), self.batch_size):
+            scores.extend(self.score_batch(query, texts[i : i + self.batch_size]))
+        return scores
+
+    def rerank(
+        self, query: str, docs: Sequence[dict[str, Any]], top_k: int, min_score: float = 0.0
+    ) -> list[dict[str, Any]]:
+        """
+        按相关性重排，返回带 score 字段的前 top_k 条；分数相同时保持召回顺序。
+
+        Args:
+            min_score: 低于该分数的分块直接丢弃，0 表示不过滤
+        """
+        if not docs:
+            return []
+        scores = self.score(query, [doc.get("document_text", "") for doc in docs])
+        ranked = sorted(zip(docs, scores, strict=True), key=lambda pair: pair[1], reverse=True)
+        return [{**doc, "score": round(score, 4)} for doc, score in ranked[:top_k] if score >= min_score]
+
+
+class LexicalReranker(Reranker):
+    """查询词加权覆盖率：命中的查询词长度之和 / 全部查询词长度之和"""
+
+    def score_batch(self, query: str, texts: Sequence[str]) -> list[float]:
+        terms = {w for w in jieba.cut_for_search(query.lower()) if w.strip()}
+        total = sum(len(term) for term in terms)
+        if not total:
+            return [0.0] * len(texts)
+        return [sum(len(term) for term in terms if term in text.lower()) / total for text in texts]
+
+
+class CrossEncoderReranker(Reranker):
+    """本地 Cross-Encoder 重排模型，首次打分时加载"""
+
+    def __init__(self, model_name: str, device: str = "cpu", max_length: int = 512, batch_size: int = 16) -> None:
+        super().__init__(batch_size=batch_size)
+        self.model_name = model_name
+        self.device = device
+        self.max_length = max_length
+        self._tokenizer: PreTrainedTokenizerBase | None = None
+        self._model: PreTrainedModel | None = None
+
+    def load(self) -> CrossEncoderReranker:
+        if self._model is None:
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            self._model.to(self.device)
+            self._model.eval()
+            logger.info("重排模型加载成功: %s (%s)", self.model_name, self.device)
+        return self
+
+    def score_batch(self, query: str, texts: Sequence[str]) -> list[float]:
+        import torch
+
+        self.load()
+        inputs = self._tokenizer(
+            [query] * len(texts),
+            list(texts),
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="pt",
+        ).to(self.device)
+        with torch.inference_mode():
+            logits = self._model(**inputs).logits.view(-1).float()
+        return [1.0 / (1.0 + math.exp(-logit)) for logit in logits.cpu().tolist()]
+
+
+@lru_cache(maxsize=1)
+def get_reranker() -> Reranker | None:
+    """按 RERANK_PROVIDER 创建进程内共享的重排器，"none" 时返回 None"""
+    provider = settings.RERANK_PROVIDER
+    if provider == "none":
+        return None
+    if provider == "lexical":
+        return LexicalReranker(batch_size=settings.RERANK_BATCH_SIZE)
+    if provider == "cross_encoder":
+        return CrossEncoderReranker(
+            settings.RERANK_MODEL,
+            device=settings.RERANK_DEVICE,
+            max_length=settings.RERANK_MAX_LENGTH,
+            batch_size=settings.RERANK_BATCH_SIZE,
+        )
+    raise ValueError(f"不支持的 RERANK_PROVIDER: {provider}")
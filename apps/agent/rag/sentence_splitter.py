@@ -0,0 +1,168 @@
+"""
+单遍句子边界分割
+
+RecursiveCharacterTextSplitter 按分隔符逐级做正则切分再递归合并，中文长段落没有命中 " " 时会退化到逐字切分；
+这里按原文下标操作，不复制、不反复合并子串：
+- 预编译的各级边界正则只扫描一次：先找段落，只有超出 chunk_size 的段落才继续找其中的换行 / 中英文句末标点 /
+  分句标点，没有任何边界的超长片段按英文单词 / 单个字符拆开；
+- 片段一遍贪心合并，超出 chunk_size 时在块内后半段最强的边界处切开（段落 > 换行 > 句末 > 分句），与递归分割的取舍一致；
+- 分块是原文的连续片段（去掉首尾空白），与 RecursiveCharacterTextSplitter 相同，可用于流式分割的窗口衔接。
+
+长度按片段分别计数后求和，get_length_function 根据 SPLIT_LENGTH_UNIT 返回字符数或 embedding 模型
+tokenizer 的 token 数（tokenizer 不可用时退化为 estimate_tokens 估算）。
+"""
+
+import logging
+import re
+from collections.abc import Callable, Iterable, Iterator
+from functools import lru_cache
+
+from langchain_core.documents import Document
+
+from apps.agent.rag.batch_embedder import estimate_tokens
+from apps.config import settings
+
+logger = logging.getLogger(__name__)
+
+LengthFn = Callable[[str], int]
+
+# 边界强度，数值越小越优先作为切分点；文本末尾视为段落边界
+PARAGRAPH, LINE, SENTENCE, CLAUSE, HARD = range(5)
+# 按 token 计数时，字符数超过 chunk_size 这一倍数的片段不再整体计数、直接按下一级边界拆分（多拆只会得到更细的片段）
+DESCEND_CHARS_RATIO = 4
+
+_CLOSERS = r"[”’」』）)\]\"']*"
+# 各级边界，边界字符归入前一个片段；开头的前瞻字符集让正则引擎直接跳到候选字符，不在每个位置尝试全部分支
+_LEVEL_PATTERNS = [
+    re.compile(r"\n[ \t]*\n\s*"),
+    re.compile(r"\n"),
+    re.compile(rf"(?=[。！？!?….])(?:[。！？!?…]+{_CLOSERS}|\.+{_CLOSERS}(?=\s|$))"),
+    re.compile(r"[，；、]|[,;](?=\s)"),
+    # 兜底拆分单位：英文单词（连同其后的空白，过长的单词按 32 个字符截断）或单个字符
+    re.compile(r"[A-Za-z0-9_]{1,32}\s*|\s+|.", re.DOTALL),
+]
+
+
+class SentenceSplitter:
+    """
+    按句子边界单遍分割文本，接口与 LangChain TextSplitter 的 split_text / create_documents / split_documents 一致。
+    不持有可变状态，同一实例可在多线程间复用。
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int = 0, length_function: LengthFn = len):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) 必须小于 chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._length = length_function
+
+    def split_text(self, text: str) -> list[str]:
+        chunks = (text[start:end].strip() for start, end in self._iter_spans(text))
+        return [chunk for chunk in chunks if chunk]
+
+    def create_documents(self, texts: Iterable[str], metadatas: Iterable[dict] | None = None) -> list[Document]:
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [{}] * len(texts)
+        return [
+            Document(page_content=chunk, metadata=dict(metadata))
+            for text, metadata in zip(texts, metadatas, strict=True)
+            for chunk in self.split_text(text)
+        ]
+
+    def split_documents(self, documents: Iterable[Document]) -> list[Document]:
+        documents = list(documents)
+        return self.create_documents([d.page_content for d in documents], [d.metadata for d in documents])
+
+    def _segments(self, text: str) -> list[tuple[int, int, int, int]]:
+        """扫描边界，返回 (起点, 终点, 结尾边界强度, 长度) 列表"""
+        segments: list[tuple[int, int, int, int]] = []
+        self._collect(text, 0, len(text), PARAGRAPH, PARAGRAPH, segments)
+        return segments
+
+    def _collect(
+        self, text: str, start: int, end: int, level: int, depth: int, segments: list[tuple[int, int, int, int]]
+    ) -> None:
+        """把 [start, end) 按 depth 级边界拆开，超出 chunk_size 的部分再按下一级边界拆分；最后一段沿用原边界强度"""
+        bounds = [match.end() for match in _LEVEL_PATTERNS[depth].finditer(text, start, end)]
+        if not bounds or bounds[-1] < end:
+            bounds.append(end)
+        measure = None if self._length is len else self._length
+        last = len(bounds) - 1
+        for i, bound in enumerate(bounds):
+            child_level = level if i == last else depth
+            if measure is None:
+                length = bound - start
+            elif bound - start > self.chunk_size * DESCEND_CHARS_RATIO and depth < HARD:
+                length = self.chunk_size + 1
+            else:
+                length = measure(text[start:bound])
+            if length <= self.chunk_size or (depth == HARD and bound - start == 1):
+                segments.append((start, bound, child_level, length))
+            elif depth == HARD:
+                # 长于 chunk_size 的单词逐字符拆开，与 RecursiveCharacterTextSplitter 的兜底一致
+                for i in range(start, bound):
+                    char_length = 1 if measure is None else measure(text[i])
+                    segments.append((i, i + 1, child_level if i == bound - 1 else HARD, char_length))
+            else:
+                self._collect(text, start, bound, child_level, depth + 1, segments)
+            start = bound
+
+    def _iter_spans(self, text: str) -> Iterator[tuple[int, int]]:
+        """贪心合并片段，当前窗口为 segments[lo:i]"""
+        segments = self._segments(text)
+        lo = floor = total = 0  # floor 之前是从上一块带回的重叠片段，不作为切分点
+        for i, (_, _, _, length) in enumerate(segments):
+            while lo < i and total + length > self.chunk_size:
+                cut = self._cut_index(segments, lo, floor, i)
+                yield segments[lo][0], segments[cut][1]
+                total -= sum(s[3] for s in segments[lo : cut + 1])
+                chunk_start, lo = lo, cut + 1
+                floor = lo
+                # 重叠：从刚产出的分块末尾带回片段，带回后仍要放得下新片段
+                overlap = 0
+                while lo > chunk_start:
+                    previous = segments[lo - 1][3]
+                    if overlap + previous > self.chunk_overlap or total + previous + length > self.chunk_size:
+                        break
+                    lo -= 1
+                    overlap += previous
+                    total += previous
+            total += length
+        if floor < len(segments):
+            yield segments[lo][0], segments[-1][1]
+
+    def _cut_index(self, segments: list[tuple[int, int, int, int]], lo: int, floor: int, hi: int) -> int:
+        """在累计长度达到 chunk_size 一半之后的位置中，选边界最强的（同等强度取最靠后的）"""
+        best, best_level = hi - 1, HARD + 1
+        prefix = 0
+        half = self.chunk_size / 2
+        for i in range(lo, hi):
+            _, _, level, length = segments[i]
+            prefix += length
+            if i >= floor and prefix >= half and level <= best_level:
+                best, best_level = i, level
+        return best
+
+
+def _tokenizer_length(provider: str, model: str) -> LengthFn:
+    if provider == "openai":
+        import tiktoken
+
+        encoding = tiktoken.encoding_for_model(model)
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+@lru_cache(maxsize=1)
+def get_length_function() -> LengthFn:
+    """分块长度的计数方式：SPLIT_LENGTH_UNIT 为 "tokens" 时使用 embedding 模型的 tokenizer"""
+    if settings.SPLIT_LENGTH_UNIT == "chars":
+        return len
+    try:
+        return _tokenizer_length(settings.EMBEDDING_PROVIDER, settings.embedding_model_name)
+    except Exception as e:
+        logger.warning("加载 %s 的 tokenizer 失败，分块长度改用估算 token 数: %s", settings.embedding_model_name, e)
+        return estimate_tokens
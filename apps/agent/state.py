@@ -72,3 +72,12 @@ class GraphState(MessagesState):
     reflection: NotRequired[ReflectionState | None]
     draft_answer: NotRequired[str | None]
     final_answer: NotRequired[str | None]
+    """ 答案缓存：查询时的语料版本（写入缓存时使用）与是否命中 """
+    answer_cache_version: NotRequired[int | None]
+    answer_cache_hit: NotRequired[bool]
+    """ 本轮调用 LLM 评估的次数与被自适应策略跳过的次数 """
+    evaluations_run: NotRequired[int]
+    evaluations_skipped: NotRequired[int]
+    """ 被淘汰消息的滚动摘要，与本轮是否已检查过摘要（每轮最多摘要一次） """
+    conversation_summary: NotRequired[str | None]
+    summary_checked: NotRequired[bool]
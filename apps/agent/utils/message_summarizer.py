@@ -1,57 +1,98 @@
 """
-Messages 摘要压缩工具
-保留最近 N 条消息，超出部分用 LLM 生成摘要，
-通过 RemoveMessage 删除旧消息并插入摘要 SystemMessage 回写 state。
+Messages 滚动摘要
+超出保留范围的旧消息通过 RemoveMessage 从 state 中删除，并与上一版摘要合并成新的 conversation_summary：
+- 增量：每次只把新淘汰的消息与上一版摘要交给 LLM，不再重读整个历史；
+- 触发：messages 模式按条数（保留最近 keep_recent 条），tokens 模式按估算 token 数
+  （超过 max_tokens 时淘汰最早的消息，直到剩余不超过一半，避免每轮都触发）；
+- 时机：inline 模式在每轮第一次 generate_response 前同步执行（同一轮的工具循环与反思重试不再重复摘要），
+  background 模式在本轮 SSE 结束后由后台任务执行并写回 checkpoint，同一 thread 的下一轮开始前等待其完成。
 """
 
+import asyncio
 import logging
 from typing import Any
 
-from langchain_core.messages import BaseMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.constants import TAG_NOSTREAM
+
+from apps.config import settings
 
 logger = logging.getLogger(__name__)
 
 KEEP_RECENT = 5  # 保留最近 N 条消息
+CHARS_PER_TOKEN = 2  # 字符数 → token 数的粗略换算（中英文混合）
+
+# thread_id → 该会话进行中的后台摘要任务
+_background_tasks: dict[str, asyncio.Task] = {}
 
 
-def summarize_and_prune_messages(
-    messages: list[BaseMessage], llm: Any, keep_recent: int = KEEP_RECENT
-) -> list[BaseMessage] | None:
+def estimate_tokens(messages: list[BaseMessage]) -> int:
+    """按消息文本与工具调用参数长度估算 token 数"""
+    chars = 0
+    for msg in messages:
+        chars += len(str(msg.content))
+        for call in getattr(msg, "tool_calls", None) or []:
+            chars += len(str(call.get("args", "")))
+    return chars // CHARS_PER_TOKEN
+
+
+def select_evicted(
+    messages: list[BaseMessage],
+    trigger: str = "messages",
+    keep_recent: int = KEEP_RECENT,
+    max_tokens: int = 4000,
+) -> int:
+    """返回需要淘汰的消息条数（messages[:n]），0 表示无需摘要"""
+    if trigger == "tokens":
+        total = estimate_tokens(messages)
+        if total <= max_tokens:
+            return 0
+        # 当前轮（最后一条用户消息起）不淘汰
+        limit = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), 0)
+        index = 0
+        while index < limit and total > max_tokens // 2:
+            total -= estimate_tokens([messages[index]])
+            index += 1
+    else:
+        if len(messages) <= keep_recent:
+            return 0
+        index = len(messages) - keep_recent
+    return _find_safe_split_index(messages, index)
+
+
+async def update_summary(
+    messages: list[BaseMessage],
+    previous_summary: str | None,
+    llm: Any,
+    trigger: str = "messages",
+    keep_recent: int = KEEP_RECENT,
+    max_tokens: int = 4000,
+) -> dict[str, Any] | None:
     """
-    对 messages 进行摘要压缩，返回需要回写 state 的 messages 更新列表。
-    - 总条数 <= keep_recent 时返回 None（无需更新）
-    - 否则：返回 [RemoveMessage(...), ..., SystemMessage(摘要)]
+    对 messages 做一次滚动摘要，返回需要回写 state 的更新：
+    {"messages": [RemoveMessage(...), ...], "conversation_summary": 新摘要}；无需摘要或生成失败时返回 None
     """
-    if len(messages) <= keep_recent:
-        return None
-
-    split_index = _find_safe_split_index(messages, keep_recent)
+    split_index = select_evicted(messages, trigger, keep_recent, max_tokens)
     if split_index <= 0:
         return None
 
-    old_messages = messages[:split_index]
-
+    evicted = messages[:split_index]
     try:
-        summary = _generate_summary(old_messages, llm)
+        summary = await _generate_summary(previous_summary, evicted, llm)
     except Exception as e:
         logger.warning("消息摘要生成失败，跳过压缩: %s", e)
         return None
 
-    # 构建 state 更新：删除旧消息 + 插入摘要
-    updates: list[BaseMessage] = []
-    for msg in old_messages:
-        updates.append(RemoveMessage(id=msg.id))
-    updates.append(SystemMessage(content=f"以下是之前对话的摘要:\n{summary}"))
+    return {
+        "messages": [RemoveMessage(id=msg.id) for msg in evicted],
+        "conversation_summary": summary,
+    }
 
-    return updates
 
-
-def _find_safe_split_index(messages: list[BaseMessage], keep_recent: int) -> int:
+def _find_safe_split_index(messages: list[BaseMessage], index: int) -> int:
     """
-    找到安全的切割点，确保不会把 AIMessage(tool_calls) 和对应的 ToolMessage 拆开。
+    调整切割点，确保不会把 AIMessage(tool_calls) 和对应的 ToolMessage 拆开。
     """
-    index = len(messages) - keep_recent
-
     # 如果切割点处是 ToolMessage，向前移动直到找到非 Tool 消息
     while index > 0 and isinstance(messages[index], ToolMessage):
         index -= 1
@@ -59,8 +100,8 @@ def _find_safe_split_index(messages: list[BaseMessage], keep_recent: int) -> int
     return max(index, 0)
 
 
-def _generate_summary(messages: list[BaseMessage], llm: Any) -> str:
-    """用 LLM 对旧消息生成摘要"""
+async def _generate_summary(previous_summary: str | None, messages: list[BaseMessage], llm: Any) -> str:
+    """用 LLM 将新淘汰的消息合并进上一版摘要"""
     parts = []
     for msg in messages:
         if msg.content:
@@ -70,8 +111,9 @@ def _generate_summary(messages: list[BaseMessage], llm: Any) -> str:
     conversation = "\n".join(parts)
 
     summary_prompt = (
-        "请对以下对话历史生成简洁摘要，保留关键信息和上下文：\n\n"
-        f"{conversation}\n\n"
+        "请将以下新增的对话合并进已有摘要，生成更新后的简洁摘要，保留关键信息和上下文：\n\n"
+        f"已有摘要：\n{previous_summary or '无'}\n\n"
+        f"新增对话：\n{conversation}\n\n"
         "摘要要求：\n"
         "- 保留用户的核心问题和意图\n"
         "- 保留重要的工具调用结果\n"
@@ -79,5 +121,54 @@ def _generate_summary(messages: list[BaseMessage], llm: Any) -> str:
         "- 控制在 200 字以内"
     )
 
-    result = llm.invoke(summary_prompt)
+    # 摘要不是面向用户的输出，不进入 messages 流
+    result = await llm.ainvoke(summary_prompt, config={"tags": [TAG_NOSTREAM]})
     return str(result.content)
+
+
+async def summarize_thread(graph: Any, config: dict[str, Any], llm: Any) -> bool:
+    """后台摘要：读取会话最新 checkpoint，按配置的触发条件做一次滚动摘要并写回，返回是否更新"""
+    snapshot = await graph.aget_state(config)
+    values = snapshot.values
+    updates = await update_summary(
+        values.get("messages", []),
+        values.get("conversation_summary"),
+        llm,
+        trigger=settings.SUMMARY_TRIGGER,
+        keep_recent=settings.SUMMARY_KEEP_RECENT,
+        max_tokens=settings.SUMMARY_MAX_TOKENS,
+    )
+    if updates is None:
+        return False
+    # 以 save_memories（图的最后一个节点）的名义写入，不会触发后续节点
+    await graph.aupdate_state(config, updates, as_node="save_memories")
+    thread_id = config["configurable"]["thread_id"]
+    logger.info("后台摘要完成: thread_id=%s, 淘汰 %d 条消息", thread_id, len(updates["messages"]))
+    return True
+
+
+def schedule_background_summary(graph: Any, config: dict[str, Any], llm: Any) -> asyncio.Task:
+    """在当前事件循环中启动后台摘要任务（同一 thread 同时只有一个）"""
+    thread_id = config["configurable"]["thread_id"]
+
+    async def run() -> None:
+        try:
+            await summarize_thread(graph, config, llm)
+        except Exception as e:
+            logger.warning("后台摘要失败: thread_id=%s, %s", thread_id, e)
+
+    def forget(task: asyncio.Task) -> None:
+        if _background_tasks.get(thread_id) is task:
+            del _background_tasks[thread_id]
+
+    task = asyncio.create_task(run())
+    _background_tasks[thread_id] = task
+    task.add_done_callback(forget)
+    return task
+
+
+async def wait_background_summary(thread_id: str) -> None:
+    """新一轮对话开始前等待该会话上一轮的后台摘要写回，避免与本轮的 checkpoint 写入交错"""
+    task = _background_tasks.get(thread_id)
+    if task is not None and not task.done():
+        await asyncio.shield(task)
@@ -4,8 +4,9 @@ from collections.abc import AsyncIterable
 
 from fastapi import APIRouter
 from fastapi.sse import EventSourceResponse
-from langchain_core.messages import AIMessageChunk
 
+from apps.api.chat_stream import AnswerStream, stream_stats
+from apps.config import settings
 from apps.models.request_params import ChatParams
 
 logger = logging.getLogger(__name__)
@@ -17,11 +18,23 @@ router = APIRouter(prefix="/agent", tags=["agent"])
 async def agent_chat(chat_params: ChatParams) -> AsyncIterable[dict]:
     try:
         from apps.agent.graph import get_graph
+        from apps.agent.llm.llm_factory import get_llm
+        from apps.agent.utils.message_summarizer import schedule_background_summary, wait_background_summary
 
         compiled_graph = get_graph()
-        config = {"configurable": {"thread_id": chat_params.thread_id, "user_id": chat_params.user_id}}
+        config = {
+            "configurable": {
+                "thread_id": chat_params.thread_id,
+                "user_id": chat_params.user_id,
+                "knowledge_id": chat_params.knowledge_id,
+            }
+        }
 
-        async for chunk in compiled_graph.astream(
+        # 上一轮的后台摘要写回 checkpoint 后再开始本轮
+        await wait_background_summary(chat_params.thread_id)
+        stream = AnswerStream(chat_params.stream_mode or settings.CHAT_STREAM_MODE)
+        # messages：LLM 逐 token 输出；custom：节点主动写出的片段（如答案缓存命中）；updates：判断草稿是否通过评估
+        async for mode, chunk in compiled_graph.astream(
             {
                 "messages": [
                     {
@@ -31,21 +44,25 @@ async def agent_chat(chat_params: ChatParams) -> AsyncIterable[dict]:
                 ]
             },
             config,
-            stream_mode="messages",
+            stream_mode=["messages", "custom", "updates"],
         ):
-            if isinstance(chunk, tuple):
-                message, metadata = chunk
-                if isinstance(message, AIMessageChunk) and message.content:
-                    yield {
-                        "event": "workflow_node",
-                        "content": message.content,
-                        "node": metadata.get("langgraph_node", ""),
-                    }
+            for event in stream.feed(mode, chunk):
+                yield event
 
         final_state = await compiled_graph.aget_state(config)
+        if settings.SUMMARY_MODE == "background":
+            # 本轮 checkpoint 已写完，摘要与 final_answer 事件的发送并行进行
+            schedule_background_summary(compiled_graph, config, get_llm(priority="background"))
         final_answer = final_state.values.get("final_answer", "")
+        logger.info(
+            "本轮答案评估: thread_id=%s, run=%d, skipped=%d",
+            chat_params.thread_id,
+            final_state.values.get("evaluations_run", 0),
+            final_state.values.get("evaluations_skipped", 0),
+        )
         if final_answer:
             yield {"event": "final_answer", "content": final_answer}
+        stream_stats.record(stream)
     except asyncio.CancelledError:
         logger.info("客户端断开连接，SSE 流已取消: thread_id=%s", chat_params.thread_id)
         return
@@ -0,0 +1,142 @@
+"""
+对话 SSE 流的输出模式与首 token 延迟统计
+
+graph.astream 以 ["messages", "custom", "updates"] 模式运行，AnswerStream 把输出转换为 SSE 事件：
+- full：转发所有节点的 LLM token（含 router / evaluator 的 JSON），用于调试；
+- answer：只转发面向用户的 token（generate_response），草稿在本轮评估通过后才发送，不会出现被否决的内容；
+- optimistic：generate_response 的草稿 token 立即转发，评估不通过时发送 revision 事件，客户端清空当前草稿等待重新生成。
+
+答案缓存命中等节点主动写出的 custom 片段在所有模式下直接转发；最终都以 final_answer 事件给出完整答案。
+"""
+
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Literal
+
+from langchain_core.messages import AIMessageChunk
+
+logger = logging.getLogger(__name__)
+
+StreamMode = Literal["full", "answer", "optimistic"]
+
+# 产出面向用户答案 token 的节点
+ANSWER_NODES = frozenset({"generate_response"})
+
+
+class AnswerStream:
+    """单次对话的流式输出状态"""
+
+    def __init__(self, mode: StreamMode) -> None:
+        self.mode = mode
+        self.started_at = time.perf_counter()
+        self.first_token_at: float | None = None
+        self.revisions = 0
+        self._draft: list[str] = []  # 本轮 generate_response 产生的 token
+
+    @property
+    def ttft(self) -> float | None:
+        """首 token 延迟（秒），未发送任何 token 时为 None"""
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    def feed(self, stream_mode: str, chunk: Any) -> list[dict[str, Any]]:
+        if stream_mode == "messages":
+            return self._on_message(*chunk)
+        if stream_mode == "custom":
+            return self._token(chunk.get("content", ""), chunk.get("node", ""))
+        if stream_mode == "updates":
+            return [event for node, update in chunk.items() for event in self._on_update(node, update or {})]
+        return []
+
+    def _token(self, content: str, node: str) -> list[dict[str, Any]]:
+        if not content:
+            return []
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        return [{"event": "workflow_node", "content": content, "node": node}]
+
+    def _on_message(self, message: Any, metadata: dict[str, Any]) -> list[dict[str, Any]]:
+        if not isinstance(message, AIMessageChunk) or not message.content:
+            return []
+        node = metadata.get("langgraph_node", "")
+        if self.mode == "full":
+            return self._token(message.content, node)
+        if node not in ANSWER_NODES:
+            return []
+        self._draft.append(message.content)
+        return self._token(message.content, node) if self.mode == "optimistic" else []
+
+    def _on_update(self, node: str, update: dict[str, Any]) -> list[dict[str, Any]]:
+        if self.mode == "full":
+            return []
+        if node == "generate_response" and "draft_answer" not in update and "final_answer" not in update:
+            # 本轮以工具调用结束，已产生的文字不是答案
+            return self._discard("tool_call")
+        if node == "evaluate_node" and update.get("reflection") is not None:
+            reflection = update["reflection"]
+            if not reflection.passed:
+                return self._discard(reflection.feedback)
+            draft, self._draft = "".join(self._draft), []
+            return self._token(draft, "generate_response") if self.mode == "answer" else []
+        return []
+
+    def _discard(self, reason: str) -> list[dict[str, Any]]:
+        streamed = self.mode == "optimistic" and bool(self._draft)
+        self._draft = []
+        if not streamed:
+            return []
+        self.revisions += 1
+        return [{"event": "revision", "content": reason, "node": "evaluate_node"}]
+
+
+class StreamStats:
+    """按输出模式统计首 token 延迟、总耗时与 revision 次数（最近 window 次对话）"""
+
+    def __init__(self, window: int = 1000) -> None:
+        self._window = window
+        self._samples: dict[str, deque[tuple[float | None, float, int]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stream: AnswerStream) -> None:
+        total = time.perf_counter() - stream.started_at
+        ttft = stream.ttft
+        logger.info(
+            "对话流结束: mode=%s, ttft=%s, total=%.3fs, revisions=%d",
+            stream.mode,
+            f"{ttft:.3f}s" if ttft is not None else "-",
+            total,
+            stream.revisions,
+        )
+        with self._lock:
+            samples = self._samples.setdefault(stream.mode, deque(maxlen=self._window))
+            samples.append((ttft, total, stream.revisions))
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            snapshot = {mode: list(samples) for mode, samples in self._samples.items()}
+        result = {}
+        for mode, samples in snapshot.items():
+            ttfts = [s[0] for s in samples if s[0] is not None]
+            totals = [s[1] for s in samples]
+            result[mode] = {
+                "count": len(samples),
+                "ttft_p50_ms": _percentile(ttfts, 50),
+                "ttft_p95_ms": _percentile(ttfts, 95),
+                "total_p50_ms": _percentile(totals, 50),
+                "total_p95_ms": _percentile(totals, 95),
+                "revisions": sum(s[2] for s in samples),
+            }
+        return result
+
+
+def _percentile(values: list[float], q: int) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return round(values[0] * 1000, 1)
+    return round(statistics.quantiles(values, n=100)[q - 1] * 1000, 1)
+
+
+stream_stats = StreamStats()
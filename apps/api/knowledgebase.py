@@ -1,30 +1,49 @@
-import hashlib
-import io
+import asyncio
 import logging
-from pathlib import Path
+import zipfile
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any
 from urllib.parse import quote
 
-import docx
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
-from fastapi.responses import StreamingResponse
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from apps.agent.rag import milvus_vector
-from apps.agent.rag.document_split import split_document
+from apps.agent.rag import async_milvus_vector
+from apps.agent.rag.answer_cache import get_answer_cache
+from apps.agent.utils.id_util import generate_id
 from apps.config import settings
 from apps.database.async_engine import get_session
 from apps.database.models import KnowledgeBaseFile
 from apps.exceptions import NotFoundError
 from apps.models.request_params import DeleteFileParams
 from apps.models.response import APIResponse
+from apps.storage import (
+    ArchiveError,
+    BlobStore,
+    RangeNotSatisfiableError,
+    etag_matches,
+    get_blob_store,
+    iter_archive_files,
+    make_etag,
+    parse_range,
+    read_member,
+)
+from apps.tasks import get_job_queue
+from apps.tasks.schemas import IngestJob
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/knowledgebase", tags=["knowledgebase"])
 
 ALLOWED_FILE_TYPE = {"txt", "docx", "md"}
+ARCHIVE_FILE_TYPE = {"zip"}
 MAX_UPLOAD_SIZE = settings.MAX_UPLOAD_SIZE
+MAX_FILE_NAME_LENGTH = 255
 
 
 async def validate_file(file: UploadFile = File(...)) -> UploadFile:
@@ -45,48 +64,53 @@ async def upload_file(
     knowledge_id: int = Form(...),
     session: AsyncSession = Depends(get_session),
 ):
-    """上传单个文件，仅支持 txt、docx、md 格式，返回文件内容。"""
+    """上传单个文件，仅支持 txt、docx、md 格式，文件解析和向量入库在后台任务中执行。"""
     file_type = Path(file.filename or "").suffix.lstrip(".").lower()
-    raw = await file.read()
+    store = get_blob_store()
 
-    # 二次校验文件大小（file.size 可能为 None）
-    if len(raw) > MAX_UPLOAD_SIZE:
-        max_mb = MAX_UPLOAD_SIZE / (1024 * 1024)
-        raise HTTPException(status_code=400, detail=f"文件大小超过限制，最大允许 {max_mb:.0f}MB")
+    # 分块写入临时文件并计算 md5，文件内容不整体读入内存
+    with store.writer() as writer:
+        while chunk := await file.read(settings.BLOB_CHUNK_SIZE):
+            await asyncio.to_thread(writer.write, chunk)
+            # 二次校验文件大小（file.size 可能为 None）
+            if writer.size > MAX_UPLOAD_SIZE:
+                max_mb = MAX_UPLOAD_SIZE / (1024 * 1024)
+                raise HTTPException(status_code=400, detail=f"文件大小超过限制，最大允许 {max_mb:.0f}MB")
+        file_md5 = writer.md5
+        file_size = writer.size
 
-    file_md5 = hashlib.md5(raw).hexdigest()
-
-    # 查询是否已存在同名文件
-    result = await session.execute(
-        select(KnowledgeBaseFile).where(
-            KnowledgeBaseFile.creator_id == user_id,
-            KnowledgeBaseFile.knowledge_id == knowledge_id,
-            KnowledgeBaseFile.file_name == file.filename,
+        # 查询是否已存在同名文件
+        result = await session.execute(
+            select(KnowledgeBaseFile).where(
+                KnowledgeBaseFile.creator_id == user_id,
+                KnowledgeBaseFile.knowledge_id == knowledge_id,
+                KnowledgeBaseFile.file_name == file.filename,
+            )
         )
-    )
-    existing = result.scalar_one_or_none()
+        existing = result.scalar_one_or_none()
+        if existing and existing.file_md5 == file_md5:
+            return APIResponse(success=True, data={"filename": file.filename}, message="文件未变更，跳过上传")
+        key = await asyncio.to_thread(writer.commit, file_type)
+
     file_id = None
     if existing:
-        if existing.file_md5 == file_md5:
-            return APIResponse(success=True, data={"filename": file.filename}, message="文件未变更，跳过上传")
-        # md5 不一致，更新文件
-        existing.file_size = len(raw)
+        # md5 不一致，更新文件，旧向量数据由入库任务替换
+        existing.file_size = file_size
         existing.file_type = file_type
-        existing.file_content = raw
+        existing.file_path = key
+        existing.file_content = None
         existing.file_md5 = file_md5
         existing.update_id = user_id
         await session.commit()
         file_id = existing.id
-        # 删除向量数据
-        milvus_vector.delete_documents(file_id, user_id, knowledge_id)
     else:
         # 新文件，直接保存
         knowledge_base_file = KnowledgeBaseFile(
             knowledge_id=knowledge_id,
             file_name=file.filename,
-            file_size=len(raw),
+            file_size=file_size,
             file_type=file_type,
-            file_content=raw,
+            file_path=key,
             file_md5=file_md5,
             creator_id=user_id,
             update_id=user_id,
@@ -96,15 +120,266 @@ async def upload_file(
         await session.refresh(knowledge_base_file)  # 确保从数据库刷新自增ID
         file_id = knowledge_base_file.id
 
-    if file_type in ("txt", "md"):
-        content = raw.decode("utf-8")
-    else:
-        doc = docx.Document(io.BytesIO(raw))
-        content = "\n".join(p.text for p in doc.paragraphs)
-    # 切分文档，保存向量数据
-    document_list = split_document(content, file_type, 200)
-    milvus_vector.save_documents(document_list, user_id, knowledge_id, file_id)
-    return APIResponse(success=True, data={"filename": file.filename, "file_id": file_id}, message="上传成功")
+    # 解析、切分、向量化、入库交给后台任务队列，任务只携带对象存储 key
+    job = IngestJob(
+        job_id=str(generate_id()),
+        file_id=file_id,
+        file_name=file.filename or "",
+        file_type=file_type,
+        user_id=user_id,
+        knowledge_id=knowledge_id,
+        blob_key=key,
+        replace=existing is not None,
+    )
+    status = get_job_queue().submit(job)
+    return APIResponse(
+        success=True,
+        data={"filename": file.filename, "file_id": file_id, "job_id": status.job_id},
+        message="上传成功，正在后台入库",
+    )
+
+
+@dataclass
+class _StagedFile:
+    """已存入对象存储、等待写入文件记录的上传文件"""
+
+    name: str
+    file_type: str
+    key: str
+    md5: str
+    size: int
+    result: dict[str, Any] = field(default_factory=dict)  # 返回给调用方的该文件处理结果
+
+
+class _BulkStaging:
+    """批量上传暂存：文件逐个流式写入对象存储并计算 md5，整批超出数量 / 大小限制时抛出 400"""
+
+    def __init__(self, store: BlobStore) -> None:
+        self.store = store
+        self.staged: list[_StagedFile] = []
+        self.results: list[dict[str, Any]] = []  # 按提交顺序的每个文件结果
+        self.total_size = 0
+
+    def reject(self, name: str, reason: str) -> None:
+        self.results.append({"filename": name, "status": "rejected", "message": reason})
+
+    def add(self, name: str, file_type: str, key: str, md5: str, size: int) -> None:
+        result = {"filename": name, "status": "queued"}
+        self.staged.append(_StagedFile(name, file_type, key, md5, size, result))
+        self.results.append(result)
+        self.total_size += size
+        if len(self.staged) > settings.BULK_UPLOAD_MAX_FILES:
+            raise HTTPException(
+                status_code=400, detail=f"文件数量超过限制，单次最多 {settings.BULK_UPLOAD_MAX_FILES} 个"
+            )
+        if self.total_size > settings.BULK_UPLOAD_MAX_TOTAL_SIZE:
+            max_mb = settings.BULK_UPLOAD_MAX_TOTAL_SIZE / (1024 * 1024)
+            raise HTTPException(status_code=400, detail=f"文件总大小超过限制，单次最多 {max_mb:.0f}MB")
+
+    async def add_upload(self, file: UploadFile, file_type: str) -> None:
+        name = file.filename or ""
+        if len(name) > MAX_FILE_NAME_LENGTH:
+            self.reject(name, "文件名过长")
+            return
+        with self.store.writer() as writer:
+            while chunk := await file.read(settings.BLOB_CHUNK_SIZE):
+                await asyncio.to_thread(writer.write, chunk)
+                if writer.size > MAX_UPLOAD_SIZE:
+                    self.reject(name, "文件大小超过限制")
+                    return
+            key = await asyncio.to_thread(writer.commit, file_type)
+        self.add(name, file_type, key, writer.md5, writer.size)
+
+    def add_archive(self, file: UploadFile) -> None:
+        """逐个解压 zip 中的 txt / docx / md 文件并存入对象存储（阻塞 IO，在线程中调用）"""
+        try:
+            archive = zipfile.ZipFile(file.file)
+        except zipfile.BadZipFile:
+            self.reject(file.filename or "", "无法读取的 zip 压缩包")
+            return
+        with archive:
+            for name, info in iter_archive_files(archive):
+                file_type = PurePosixPath(name).suffix.lstrip(".").lower()
+                if file_type not in ALLOWED_FILE_TYPE:
+                    self.reject(name, f"不支持的文件格式: {file_type}")
+                    continue
+                if len(name) > MAX_FILE_NAME_LENGTH:
+                    self.reject(name, "文件名过长")
+                    continue
+                try:
+                    with self.store.writer() as writer:
+                        for chunk in read_member(archive, info, settings.BLOB_CHUNK_SIZE, MAX_UPLOAD_SIZE):
+                            writer.write(chunk)
+                        key = writer.commit(file_type)
+                except ArchiveError as e:
+                    self.reject(name, str(e))
+                    continue
+                self.add(name, file_type, key, writer.md5, writer.size)
+
+
+@router.post("/upload_files")
+async def upload_files(
+    files: list[UploadFile] = File(..., description="txt / docx / md 文件或 zip 压缩包，可多个"),
+    user_id: str = Form(...),
+    knowledge_id: int = Form(...),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    批量上传多个文件或 zip 压缩包。
+
+    文件逐个流式存入对象存储，按文件名一次查询已有记录做 md5 去重，新文件一次批量插入、变更文件一次批量更新；
+    整批文件作为一个入库任务执行，分块跨文件凑满 embedding 批次。每个文件返回独立的 job_id，
+    可通过 /upload_status 或 /upload_batch_status 查询各文件进度。
+    """
+    # 整批被拒绝时，已存入但没有记录引用的对象由 sweep_blobs 在宽限期后清理
+    staging = _BulkStaging(get_blob_store())
+    for file in files:
+        file_type = Path(file.filename or "").suffix.lstrip(".").lower()
+        if file_type in ARCHIVE_FILE_TYPE:
+            await asyncio.to_thread(staging.add_archive, file)
+        elif file_type in ALLOWED_FILE_TYPE:
+            await staging.add_upload(file, file_type)
+        else:
+            staging.reject(file.filename or "", f"不支持的文件格式: {file_type}")
+
+    # 同一批内的同名文件只保留第一个
+    unique: dict[str, _StagedFile] = {}
+    for staged in staging.staged:
+        if staged.name in unique:
+            staged.result.update(status="rejected", message="同一批次中存在同名文件")
+        else:
+            unique[staged.name] = staged
+
+    # 一次查询已有记录：同名且 md5 相同的跳过，md5 不同的更新
+    existing: dict[str, Any] = {}
+    if unique:
+        result = await session.execute(
+            select(
+                KnowledgeBaseFile.id,
+                KnowledgeBaseFile.file_name,
+                KnowledgeBaseFile.file_md5,
+            ).where(
+                KnowledgeBaseFile.creator_id == user_id,
+                KnowledgeBaseFile.knowledge_id == knowledge_id,
+                KnowledgeBaseFile.file_name.in_(list(unique)),
+            )
+        )
+        existing = {row.file_name: row for row in result}
+    new_files: list[_StagedFile] = []
+    changed: list[tuple[_StagedFile, int]] = []
+    for name, staged in unique.items():
+        row = existing.get(name)
+        if row is None:
+            new_files.append(staged)
+        elif row.file_md5 == staged.md5:
+            staged.result.update(status="unchanged", file_id=row.id, message="文件未变更，跳过上传")
+        else:
+            changed.append((staged, row.id))
+
+    if new_files:
+        await session.execute(
+            insert(KnowledgeBaseFile),
+            [
+                {
+                    "knowledge_id": knowledge_id,
+                    "file_name": staged.name,
+                    "file_size": staged.size,
+                    "file_type": staged.file_type,
+                    "file_path": staged.key,
+                    "file_md5": staged.md5,
+                    "creator_id": user_id,
+                    "update_id": user_id,
+                }
+                for staged in new_files
+            ],
+        )
+    if changed:
+        # 按主键批量更新，旧向量数据由入库任务按分块指纹增量替换
+        await session.execute(
+            update(KnowledgeBaseFile),
+            [
+                {
+                    "id": file_id,
+                    "file_size": staged.size,
+                    "file_type": staged.file_type,
+                    "file_path": staged.key,
+                    "file_content": None,
+                    "file_md5": staged.md5,
+                    "update_id": user_id,
+                }
+                for staged, file_id in changed
+            ],
+        )
+    await session.commit()
+
+    file_ids = {staged.name: file_id for staged, file_id in changed}
+    if new_files:
+        # MySQL 批量插入不返回自增主键，按文件名再查一次
+        result = await session.execute(
+            select(KnowledgeBaseFile.id, KnowledgeBaseFile.file_name).where(
+                KnowledgeBaseFile.creator_id == user_id,
+                KnowledgeBaseFile.knowledge_id == knowledge_id,
+                KnowledgeBaseFile.file_name.in_([staged.name for staged in new_files]),
+            )
+        )
+        file_ids.update({row.file_name: row.id for row in result})
+
+    targets = [(staged, False) for staged in new_files] + [(staged, True) for staged, _ in changed]
+    jobs = [
+        IngestJob(
+            job_id=str(generate_id()),
+            file_id=file_ids[staged.name],
+            file_name=staged.name,
+            file_type=staged.file_type,
+            user_id=user_id,
+            knowledge_id=knowledge_id,
+            blob_key=staged.key,
+            replace=replace,
+        )
+        for staged, replace in targets
+    ]
+    # 整批作为一个任务执行，各文件仍有独立的 job_id
+    statuses = get_job_queue().submit_batch(jobs) if jobs else []
+    for (staged, _), status in zip(targets, statuses, strict=True):
+        staged.result.update(file_id=status.file_id, job_id=status.job_id)
+
+    counts = Counter(result["status"] for result in staging.results)
+    return APIResponse(
+        success=True,
+        data={"files": staging.results, "job_ids": [job.job_id for job in jobs]},
+        message=(
+            f"已提交 {counts['queued']} 个文件后台入库，"
+            f"未变更 {counts['unchanged']} 个，未通过校验 {counts['rejected']} 个"
+        ),
+    )
+
+
+@router.get("/upload_status")
+async def upload_status(job_id: str = Query(..., description="入库任务ID")):
+    """查询文件入库任务状态。"""
+    status = get_job_queue().get_status(job_id)
+    if status is None:
+        raise NotFoundError("入库任务", f"job_id={job_id}")
+    return APIResponse(success=True, data=status.model_dump())
+
+
+@router.get("/upload_batch_status")
+async def upload_batch_status(job_ids: list[str] = Query(..., description="入库任务ID，可传入多个")):
+    """批量查询入库任务状态，返回每个文件的状态与整批汇总。"""
+    queue = get_job_queue()
+    statuses = await asyncio.to_thread(lambda: [queue.get_status(job_id) for job_id in job_ids])
+    found = [status for status in statuses if status is not None]
+    states = Counter(status.state for status in found)
+    return APIResponse(
+        success=True,
+        data={
+            "total": len(job_ids),
+            "states": {state: states[state] for state in ("pending", "running", "succeeded", "failed")},
+            "chunks": sum(status.chunks or 0 for status in found),
+            "files": [status.model_dump() for status in found],
+            "missing": [job_id for job_id, status in zip(job_ids, statuses, strict=True) if status is None],
+        },
+    )
 
 
 @router.get("/get_files")
@@ -150,7 +425,9 @@ async def delete_file(params: DeleteFileParams, session: AsyncSession = Depends(
     if not doc:
         raise NotFoundError("文件", f"id={params.file_id}")
     await session.delete(doc)
-    milvus_vector.delete_documents(params.file_id, params.user_id, params.knowledge_id)
+    await session.commit()
+    await async_milvus_vector.delete_documents(params.file_id, params.user_id, params.knowledge_id)
+    await asyncio.to_thread(get_answer_cache().invalidate, params.user_id, params.knowledge_id)
     return APIResponse(success=True, data={"file_id": params.file_id}, message="删除成功")
 
 
@@ -164,19 +441,62 @@ CONTENT_TYPE_MAP = {
 
 @router.get("/download_file")
 async def download_file(
+    request: Request,
     file_id: int = Query(..., description="文件ID"),
     session: AsyncSession = Depends(get_session),
 ):
-    """通过文件ID下载文件。"""
+    """通过文件ID下载文件，支持 ETag 缓存校验与 Range 断点续传。"""
     result = await session.execute(select(KnowledgeBaseFile).where(KnowledgeBaseFile.id == file_id))
     file = result.scalar_one_or_none()
     if not file:
         raise HTTPException(status_code=404, detail="文件不存在")
 
-    content_type = CONTENT_TYPE_MAP.get(file.file_type, "application/octet-stream")
-    encoded_filename = quote(file.file_name)
+    etag = make_etag(file.file_md5) if file.file_md5 else None
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    if file.file_path:
+        store = get_blob_store()
+        try:
+            size = await asyncio.to_thread(store.size, file.file_path)
+        except FileNotFoundError as e:
+            logger.error("文件对象缺失: file_id=%s, key=%s", file_id, file.file_path)
+            raise HTTPException(status_code=404, detail="文件不存在") from e
+
+        def read_range(start: int, end: int) -> Iterator[bytes]:
+            return store.iter_range(file.file_path, start, end)
+
+    else:
+        # 未迁移到对象存储的旧数据，内容仍在 file_content 列
+        content = (
+            await session.scalar(select(KnowledgeBaseFile.file_content).where(KnowledgeBaseFile.id == file_id)) or b""
+        )
+        size = len(content)
+
+        def read_range(start: int, end: int) -> Iterator[bytes]:
+            yield content[start : end + 1]
+
+    # 批量上传的 zip 成员以压缩包内相对路径为文件名，下载时只保留文件名部分
+    encoded_filename = quote(PurePosixPath(file.file_name).name)
+    headers = {"Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}", "Accept-Ranges": "bytes"}
+    if etag:
+        headers["ETag"] = etag
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or (etag is not None and etag_matches(if_range, etag)):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiableError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    start, end = byte_range or (0, size - 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
     return StreamingResponse(
-        io.BytesIO(file.file_content),
-        media_type=content_type,
-        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"},
+        read_range(start, end),
+        status_code=206 if byte_range else 200,
+        media_type=CONTENT_TYPE_MAP.get(file.file_type, "application/octet-stream"),
+        headers=headers,
     )
@@ -0,0 +1,42 @@
+import logging
+from typing import Any
+
+from fastapi import APIRouter
+
+from apps.agent.intent import get_intent_classifier
+from apps.agent.llm.llm_factory import scheduler_stats
+from apps.agent.memory.retrieval_cache import get_memory_cache
+from apps.agent.nodes.evaluator import evaluation_stats
+from apps.agent.rag import milvus_vector
+from apps.agent.rag.answer_cache import get_answer_cache
+from apps.api.chat_stream import stream_stats
+from apps.config import settings
+from apps.models.response import APIResponse
+from apps.tasks import get_memory_queue
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("")
+async def get_metrics():
+    """
+    运行时统计：各类缓存命中、意图分类覆盖、答案评估、LLM 调度、记忆写入队列、
+    本地 embedding 查询合并与对话首 token 延迟等。
+    """
+    data: dict[str, dict[str, Any]] = {"query_embedding_cache": milvus_vector.query_cache.stats()}
+    data["intent_router"] = get_intent_classifier().stats()
+    data["answer_cache"] = get_answer_cache().stats()
+    data["evaluation"] = evaluation_stats.stats()
+    data["llm_scheduler"] = scheduler_stats()
+    data["memory_queue"] = get_memory_queue().stats()
+    data["memory_cache"] = get_memory_cache().stats()
+    data["chat_stream"] = stream_stats.stats()
+    if milvus_vector.embedding_cache is not None:
+        data["embedding_cache"] = milvus_vector.embedding_cache.stats()
+    if settings.EMBEDDING_PROVIDER == "huggingface":
+        from apps.agent.rag.qwen3_embedding import get_qwen3_embedding
+
+        data["query_embedding_batcher"] = get_qwen3_embedding().query_batch_stats()
+    return APIResponse(success=True, data=data)
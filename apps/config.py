@@ -3,6 +3,7 @@
 """
 
 from pathlib import Path
+from typing import Any, Literal
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -26,6 +27,14 @@ class Settings(BaseSettings):
 
     LLM_PROVIDER: str = "openai"
     LLM_MODEL: str = "gpt-5.2"
+    LLM_MAX_CONNECTIONS: int = 100  # 每个 provider 共享连接池的最大连接数（同时也是并发请求上限）
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_TIMEOUT: float = 120.0  # 单次请求超时（秒）
+    # LLM 请求调度（每个 provider 独立），RPM / TPM 为 0 表示不限制
+    LLM_MAX_CONCURRENCY: int = 32  # 同时在途的请求数
+    LLM_RPM: int = 0  # 每分钟请求数
+    LLM_TPM: int = 0  # 每分钟 token 数（按请求体大小估算）
+    LLM_MAX_RETRIES: int = 3  # 429 / 5xx / 连接错误的重试次数（指数退避 + 抖动）
 
     # ========== API Keys ==========
     DASHSCOPE_API_KEY: str = ""
@@ -37,6 +46,28 @@ class Settings(BaseSettings):
 
     # ========== 上传配置 ==========
     MAX_UPLOAD_SIZE: int = 5 * 1024 * 1024  # 5MB
+    BULK_UPLOAD_MAX_FILES: int = 500  # 批量上传单次最多文件数（zip 按解压出的文件计）
+    BULK_UPLOAD_MAX_TOTAL_SIZE: int = 200 * 1024 * 1024  # 批量上传单次文件总大小（解压后）
+
+    # ========== 文件存储配置 ==========
+    # 上传文件按 md5 内容寻址存放，key 记录在 knowledge_base_file.file_path；"s3" 需要安装 boto3
+    BLOB_STORE: Literal["local", "s3"] = "local"
+    BLOB_LOCAL_ROOT: str = str(_PROJECT_ROOT / "data" / "blobs")
+    BLOB_CHUNK_SIZE: int = 256 * 1024  # 上传 / 下载的分块大小（字节）
+    BLOB_SWEEP_GRACE_SECONDS: int = 86400  # sweep_blobs 只清理早于该时长写入且无人引用的对象，应大于入库任务排队时长
+    S3_ENDPOINT_URL: str = ""  # S3 兼容服务地址，为空时使用 AWS 默认地址
+    S3_BUCKET: str = "buddy-ai"
+    S3_PREFIX: str = "knowledge_base/"
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
+    S3_REGION: str = ""
+
+    # ========== 入库任务配置 ==========
+    INGEST_BACKEND: str = "local"  # "celery"
+    INGEST_WORKERS: int = 2  # local 后端的并发入库线程数
+    INGEST_JOB_RETENTION: int = 1000  # local 后端最多保留的已结束任务状态数
+    CELERY_BROKER_URL: str = "redis://localhost:6379/1"
+    CELERY_RESULT_BACKEND: str = "redis://localhost:6379/1"
 
     # ========== 数据库配置 ==========
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -51,15 +82,110 @@ class Settings(BaseSettings):
     MILVUS_TOKEN: str = ""
     MILVUS_DB_NAME: str = ""
     MILVUS_MEM0_COLLECTION_NAME: str = "mem0"
+    # mem0 Collection 的距离度量，仅在创建 Collection 时生效；mem0 默认 L2，旧 Collection 需重建后迁入记忆，
+    # 或将此项设为实际度量（非 COSINE 时记忆检索缓存不做本地打分）
+    MILVUS_MEM0_METRIC_TYPE: Literal["COSINE", "L2", "IP"] = "COSINE"
+    MILVUS_MAX_CONCURRENCY: int = 8  # 异步封装的线程池大小，即并发 Milvus 请求上限
+    MILVUS_TIMEOUT: float = 10.0  # 单次检索 / 删除请求超时（秒）
+    # "filter"：共享分区 + 标量过滤（旧版 Collection）；"partition_key"：按 user_id:knowledge_id 分区
+    MILVUS_TENANT_MODE: Literal["filter", "partition_key"] = "partition_key"
+    MILVUS_NUM_PARTITIONS: int = 64  # partition_key 模式下的物理分区数
+    # Dense 索引 profile（见 apps/agent/rag/index_profiles.py）: autoindex / hnsw / ivf_flat / ivf_sq8 / diskann
+    # 仅在创建 Collection 时生效；已有 Collection 按实际索引类型选择检索参数
+    MILVUS_INDEX_PROFILE: str = "autoindex"
+    MILVUS_INDEX_PARAMS: dict[str, Any] = {}  # 覆盖建索引参数，如 {"M": 32}
+    MILVUS_SEARCH_PARAMS: dict[str, Any] = {}  # 覆盖检索参数，如 {"ef": 128}
+    MILVUS_SPARSE_INDEX_ALGO: Literal["DAAT_MAXSCORE", "DAAT_WAND", "TAAT_NAIVE"] = "DAAT_MAXSCORE"
+    MILVUS_SPARSE_DROP_RATIO: float = 0.0  # BM25 检索时忽略的低权重查询词比例，越大越快、召回越低
+    MILVUS_MULTI_SEARCH: bool = True  # 知识库检索合并为一次 multi_search 请求；False 时 hybrid_search / text_match 并行
+
+    # ========== 记忆检索缓存配置 ==========
+    MEMORY_CACHE_ENABLED: bool = True  # 按用户缓存 mem0 检索结果，写入记忆时失效
+    MEMORY_CACHE_SIMILARITY: float = 0.95  # 与最近查询的 embedding 余弦相似度不低于该值时复用其结果
+    MEMORY_CACHE_LOCAL_MAX: int = 200  # 记忆不超过该条数的用户整体载入内存本地打分，0 表示不载入
+    MEMORY_CACHE_MAX_USERS: int = 1000
+    MEMORY_CACHE_TTL: int = 600  # 缓存有效期（秒），兜底其他进程写入的记忆
+
+    # ========== 记忆写入队列配置 ==========
+    MEMORY_WRITE_QUEUE_SIZE: int = 1000  # 最多排队的对话轮数，超出时丢弃新写入
+    MEMORY_WRITE_WORKERS: int = 2  # 后台写入线程数（不同用户并行，同一用户串行）
+    MEMORY_WRITE_BATCH_SIZE: int = 5  # 同一用户合并为一次 mem0 写入的最大轮数
+    MEMORY_WRITE_LINGER: float = 0.5  # 首轮入队后等待合并的时间（秒）
+    MEMORY_WRITE_DRAIN_TIMEOUT: float = 30.0  # 关闭时写完剩余轮次的最长等待时间（秒）
 
     # ========== Embedding 配置 ==========
-    EMBEDDING_PROVIDER: str = "openai"  # "huggingface"
-    EMBEDDING_MODEL: str = "text-embedding-3-large"  # "Qwen/Qwen3-Embedding-8B"
+    EMBEDDING_PROVIDER: Literal["openai", "huggingface"] = "openai"
+    EMBEDDING_MODEL: str = "text-embedding-3-large"  # openai embedding 模型
+    EMBEDDING_LOCAL_MODEL: str = "Qwen/Qwen3-Embedding-0.6B"  # huggingface 本地模型，如 "Qwen/Qwen3-Embedding-8B"
     EMBEDDING_DIMENSIONS: int = 1024
+    EMBEDDING_BATCH_SIZE: int = 64  # 单个 embedding 请求的最大条数
+    EMBEDDING_BATCH_MAX_TOKENS: int = 8000  # 单个 embedding 请求的最大估算 token 数
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # 同时在途的 embedding 请求数
+    EMBEDDING_MAX_RETRIES: int = 3  # 单个批次失败后的最大重试次数
+    EMBEDDING_CACHE_ENABLED: bool = True  # 文档 embedding 内容寻址缓存
+    EMBEDDING_CACHE_PATH: str = str(_PROJECT_ROOT / "data" / "embedding_cache.db")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+    QUERY_EMBEDDING_CACHE_SIZE: int = 10_000  # 查询 embedding 内存缓存条数
+    QUERY_EMBEDDING_CACHE_TTL: int = 3600  # 查询 embedding 缓存有效期（秒）
+    # huggingface 本地模型（Qwen3-Embedding）推理
+    EMBEDDING_DEVICE: str = "auto"  # "cpu" / "cuda"
+    EMBEDDING_LOCAL_BATCH_SIZE: int = 16  # 单次前向计算的最大条数
+    EMBEDDING_LOCAL_MAX_BATCH_TOKENS: int = 16384  # 单次前向计算 padding 后的最大 token 数
+    EMBEDDING_QUERY_BATCH_WAIT_MS: float = 5.0  # 并发查询合并为一次前向计算的等待窗口（毫秒），0 关闭动态批处理
+    EMBEDDING_NUM_THREADS: int = 0  # CPU 推理的 torch 线程数，0 为 torch 默认
+
+    # ========== 文档分割配置 ==========
+    TEXT_SPLITTER: Literal["sentence", "recursive"] = "sentence"  # 单遍句子边界分割 / LangChain 递归分割
+    SPLIT_LENGTH_UNIT: Literal["tokens", "chars"] = "tokens"  # 分块大小按 embedding 模型 token 数 / 字符数计
+
+    # ========== 重排配置 ==========
+    RERANK_PROVIDER: str = "cross_encoder"  # "lexical" / "none"
+    RERANK_MODEL: str = "BAAI/bge-reranker-base"
+    RERANK_DEVICE: str = "cpu"
+    RERANK_MAX_LENGTH: int = 512
+    RERANK_BATCH_SIZE: int = 16  # 单次前向计算的 (问题, 分块) 对数
+    RERANK_CANDIDATES: int = 50  # 启用重排时每路召回的候选数
+    RERANK_TOP_K: int = 5  # 重排后保留的分块数
+    RERANK_MIN_SCORE: float = 0.0  # 低于该分数的分块丢弃，0 表示不过滤
+
+    # ========== 答案缓存配置 ==========
+    ANSWER_CACHE_ENABLED: bool = True  # 知识库问答的语义答案缓存
+    ANSWER_CACHE_THRESHOLD: float = 0.95  # 问题 embedding 余弦相似度不低于该值视为命中
+    ANSWER_CACHE_MAX_ENTRIES: int = 500  # 每个知识库最多缓存的答案数
+    ANSWER_CACHE_TTL: int = 86400  # 答案有效期（秒）
+
+    # ========== Agent 配置 ==========
+    # 记忆检索、意图路由与查询转换在同一节点内并发执行；False 时按 retrieve_memories → router → query_transform 顺序执行
+    AGENT_SPECULATIVE_PRESTAGE: bool = True
+    # 对话流式输出：full 所有节点 token / answer 仅评估通过的答案 / optimistic 草稿即时输出，评估不通过发送 revision
+    CHAT_STREAM_MODE: Literal["full", "answer", "optimistic"] = "optimistic"
+    # 本地意图分类器（规则 + softmax 回归），置信度不低于阈值时跳过 LLM 路由
+    INTENT_CLASSIFIER_ENABLED: bool = True
+    INTENT_MODEL_PATH: str = str(_PROJECT_ROOT / "data" / "intent_model.npz")
+    INTENT_CONFIDENCE_THRESHOLD: float = 0.9
+    # 路由决策日志（训练数据，含用户问题原文），默认不记录；如 data/route_log.jsonl，超过大小上限时轮转
+    ROUTE_LOG_PATH: str = ""
+    ROUTE_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    ROUTE_LOG_BACKUP_COUNT: int = 3
+    # Reflection 评估：EVAL_LLM_MODEL 为空时使用 LLM_MODEL；满足跳过条件（answer_directly / 证据重合度）时不调用 LLM
+    EVAL_LLM_MODEL: str = ""
+    EVAL_SKIP_ENABLED: bool = True
+    EVAL_SKIP_OVERLAP: float = 0.8  # 回答词在检索分块与工具结果中的加权覆盖率不低于该值时跳过评估
+    # 对话滚动摘要：inline 每轮第一次生成前同步摘要 / background 本轮结束后后台摘要；
+    # messages 保留最近 SUMMARY_KEEP_RECENT 条，tokens 在估算 token 数超过 SUMMARY_MAX_TOKENS 时淘汰最早的消息
+    SUMMARY_MODE: Literal["inline", "background"] = "inline"
+    SUMMARY_TRIGGER: Literal["messages", "tokens"] = "messages"
+    SUMMARY_KEEP_RECENT: int = 5
+    SUMMARY_MAX_TOKENS: int = 4000
 
     # ========== 日志配置 ==========
     LOG_LEVEL: str = "INFO"
 
+    @property
+    def embedding_model_name(self) -> str:
+        """当前 EMBEDDING_PROVIDER 实际使用的 embedding 模型（embedding 缓存键、分块 tokenizer、本地模型加载共用）"""
+        return self.EMBEDDING_LOCAL_MODEL if self.EMBEDDING_PROVIDER == "huggingface" else self.EMBEDDING_MODEL
+
 
 # 创建全局配置实例
 settings = Settings()
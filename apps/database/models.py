@@ -40,6 +40,9 @@ class KnowledgeBaseFile(Base):
     file_name: Mapped[str] = mapped_column(String(255), comment="文件名")
     file_type: Mapped[str] = mapped_column(String(32), comment="文件类型")
     file_size: Mapped[int] = mapped_column(BigInteger, comment="文件大小(字节)")
-    file_path: Mapped[str | None] = mapped_column(String(255), comment="文件存储路径")
+    file_path: Mapped[str | None] = mapped_column(String(255), comment="文件存储路径（对象存储 key）")
     file_md5: Mapped[str | None] = mapped_column(String(255), comment="文件MD5校验值")
-    file_content: Mapped[bytes | None] = mapped_column(LargeBinary(length=2**32 - 1), comment="文件内容")
+    # 旧版直接存放文件内容，新文件写入对象存储后为空；延迟加载，查询文件信息时不读取大字段
+    file_content: Mapped[bytes | None] = mapped_column(
+        LargeBinary(length=2**32 - 1), deferred=True, comment="文件内容（旧版，迁移后清空）"
+    )
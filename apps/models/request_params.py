@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field, field_validator
 
 
@@ -7,6 +9,10 @@ class ChatParams(BaseModel):
     user_id: str = Field(..., min_length=1, max_length=64, pattern=r"^[a-zA-Z0-9_-]+$", description="用户ID")
     thread_id: str = Field(..., min_length=1, max_length=64, pattern=r"^[a-zA-Z0-9_-]+$", description="会话ID")
     user_input: str = Field(..., min_length=1, max_length=10000, description="用户输入")
+    knowledge_id: int = Field(1, ge=1, description="检索的知识库ID")
+    stream_mode: Literal["full", "answer", "optimistic"] | None = Field(
+        None, description="流式输出模式，默认取 CHAT_STREAM_MODE"
+    )
 
     @field_validator("user_id", "thread_id")
     @classmethod
@@ -22,7 +28,8 @@ class ChatParams(BaseModel):
             raise ValueError("用户输入不能为空或仅包含空白字符")
         return v.strip()
 
+
 class DeleteFileParams(BaseModel):
     user_id: str = Field(..., pattern=r"^[a-zA-Z0-9_-]+$", description="用户ID")
     knowledge_id: int = Field(..., description="知识库ID")
-    file_id: int = Field(..., description="文件ID")
\ No newline at end of file
+    file_id: int = Field(..., description="文件ID")
@@ -0,0 +1,20 @@
+from .archive import ArchiveError, iter_archive_files, member_name, read_member
+from .blob_store import BlobStore, BlobWriter, LocalBlobStore, S3BlobStore, blob_key, get_blob_store
+from .ranges import RangeNotSatisfiableError, etag_matches, make_etag, parse_range
+
+__all__ = [
+    "ArchiveError",
+    "iter_archive_files",
+    "member_name",
+    "read_member",
+    "BlobStore",
+    "BlobWriter",
+    "LocalBlobStore",
+    "S3BlobStore",
+    "blob_key",
+    "get_blob_store",
+    "RangeNotSatisfiableError",
+    "etag_matches",
+    "make_etag",
+    "parse_range",
+]
@@ -0,0 +1,64 @@
+"""
+批量上传的 zip 压缩包读取
+
+逐个成员分块解压，不整体解压到内存或磁盘；成员实际解压出的字节数超过上限即中止（不信任压缩包声明的大小）。
+未设置 UTF-8 标志的成员名按 Windows 中文环境常见的 GBK 编码修正。
+"""
+
+import zipfile
+from collections.abc import Iterator
+from pathlib import PurePosixPath
+
+_UTF8_FLAG = 0x800
+_ENCRYPTED_FLAG = 0x1
+
+
+class ArchiveError(ValueError):
+    """压缩包成员无法读取（加密、损坏或超出大小限制）"""
+
+
+def member_name(info: zipfile.ZipInfo) -> str:
+    """成员在压缩包内的相对路径：修正文件名编码，去掉盘符、绝对路径与 .. 等路径成分"""
+    name = info.filename
+    if not info.flag_bits & _UTF8_FLAG:
+        # zipfile 按 cp437 解码未标记 UTF-8 的文件名，还原字节后依次尝试 UTF-8、GBK
+        raw = name.encode("cp437", errors="ignore")
+        for encoding in ("utf-8", "gbk"):
+            try:
+                name = raw.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+    parts = PurePosixPath(name.replace("\\", "/")).parts
+    return "/".join(part for part in parts if part not in ("/", ".", "..") and not part.endswith(":"))
+
+
+def iter_archive_files(archive: zipfile.ZipFile) -> Iterator[tuple[str, zipfile.ZipInfo]]:
+    """压缩包中的文件 (相对路径, ZipInfo)，跳过目录、__MACOSX 资源文件与隐藏文件"""
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        name = member_name(info)
+        parts = name.split("/")
+        if not name or parts[0] == "__MACOSX" or any(part.startswith(".") for part in parts):
+            continue
+        yield name, info
+
+
+def read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, chunk_size: int, max_size: int) -> Iterator[bytes]:
+    """按 chunk_size 分块解压成员内容，超过 max_size 字节时抛出 ArchiveError"""
+    if info.flag_bits & _ENCRYPTED_FLAG:
+        raise ArchiveError("不支持加密的压缩文件")
+    if info.file_size > max_size:
+        raise ArchiveError("文件大小超过限制")
+    size = 0
+    try:
+        with archive.open(info) as member:
+            while chunk := member.read(chunk_size):
+                size += len(chunk)
+                if size > max_size:
+                    raise ArchiveError("文件大小超过限制")
+                yield chunk
+    except (zipfile.BadZipFile, EOFError, NotImplementedError) as e:
+        # CRC 校验失败 / 截断 / 不支持的压缩算法
+        raise ArchiveError(f"压缩文件已损坏或格式不支持: {e}") from e
@@ -0,0 +1,262 @@
+"""
+知识库文件对象存储
+
+文件内容不再写入 MySQL 的 file_content 列，按 md5 内容寻址存放在对象存储中，key 记录在 file_path 列：
+- local：本地目录，路径为 {root}/{md5[:2]}/{md5[2:4]}/{md5}.{file_type}，同内容文件只存一份；
+- s3：S3 兼容对象存储（MinIO / OSS / COS 等），key 加 S3_PREFIX 前缀，需要额外安装 boto3。
+
+上传通过 BlobWriter 分块写入临时文件并同时计算 md5，内容不整体驻留内存；下载通过 iter_range 按字节区间分块读取。
+同内容对象被多条记录共用，接口不在删除记录时同步删除对象，由 sweep_blobs 按宽限期清理不再被引用的对象；
+put_file 复用已有对象时刷新其写入时间，宽限期从最近一次上传算起。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from functools import lru_cache
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+from apps.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024  # 上传 / 下载的分块大小（字节）
+
+
+def blob_key(md5: str, file_type: str) -> str:
+    """内容寻址的 key，前两级目录避免单目录文件过多"""
+    suffix = f".{file_type}" if file_type else ""
+    return f"{md5[:2]}/{md5[2:4]}/{md5}{suffix}"
+
+
+class BlobWriter:
+    """流式写入：边写临时文件边计算 md5 与大小，commit 时按 md5 存入对象存储；未 commit 的临时文件在退出时删除"""
+
+    def __init__(self, store: BlobStore, tmp_dir: Path | None = None) -> None:
+        self._store = store
+        self._file = tempfile.NamedTemporaryFile(dir=tmp_dir, prefix="upload-", delete=False)  # noqa: SIM115
+        self._hash = hashlib.md5()
+        self.size = 0
+
+    @property
+    def md5(self) -> str:
+        return self._hash.hexdigest()
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self, file_type: str) -> str:
+        """存入对象存储并返回 key；相同内容已存在时直接复用"""
+        self._file.close()
+        return self._store.put_file(Path(self._file.name), self.md5, file_type)
+
+    def close(self) -> None:
+        self._file.close()
+        Path(self._file.name).unlink(missing_ok=True)
+
+    def __enter__(self) -> BlobWriter:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        self.close()
+
+
+class BlobStore(ABC):
+    """对象存储接口，key 由 blob_key 生成"""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE) -> None:
+        self.chunk_size = chunk_size
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    @abstractmethod
+    def put_file(self, path: Path, md5: str, file_type: str) -> str:
+        """把本地文件存入（可能移动该文件），返回 key；对象已存在时复用并刷新其写入时间"""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """对象大小（字节），不存在时抛出 FileNotFoundError"""
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        """按 chunk_size 分块读取 [start, end] 闭区间，end 为 None 时读到末尾"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除对象，不存在时忽略"""
+
+    @abstractmethod
+    def modified(self, key: str) -> float:
+        """对象最近一次写入的时间戳，不存在时抛出 FileNotFoundError"""
+
+    @abstractmethod
+    def iter_objects(self) -> Iterator[tuple[str, float]]:
+        """遍历全部对象，返回 (key, 最近一次写入的时间戳)"""
+
+    def put_bytes(self, data: bytes, file_type: str) -> str:
+        with self.writer() as writer:
+            writer.write(data)
+            return writer.commit(file_type)
+
+    def read_bytes(self, key: str) -> bytes:
+        return b"".join(self.iter_range(key))
+
+
+class LocalBlobStore(BlobStore):
+    """本地目录存储"""
+
+    def __init__(self, root: str | Path, chunk_size: int = CHUNK_SIZE) -> None:
+        super().__init__(chunk_size)
+        self.root = Path(root).resolve()
+        self._staging = self.root / ".staging"  # 与对象同一文件系统，commit 时原子 rename
+        self._staging.mkdir(parents=True, exist_ok=True)
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self, self._staging)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root) or path.is_relative_to(self._staging):
+            raise ValueError(f"非法的对象 key: {key}")
+        return path
+
+    def put_file(self, path: Path, md5: str, file_type: str) -> str:
+        key = blob_key(md5, file_type)
+        target = self._path(key)
+        if target.exists():
+            path.unlink(missing_ok=True)
+            os.utime(target)
+            return key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+        return key
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def iter_range(self, key: str, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        path = self._path(key)
+        with path.open("rb") as f:
+            f.seek(start)
+            remaining = (end + 1 - start) if end is not None else None
+            while remaining is None or remaining > 0:
+                chunk = f.read(self.chunk_size if remaining is None else min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def modified(self, key: str) -> float:
+        return self._path(key).stat().st_mtime
+
+    def iter_objects(self) -> Iterator[tuple[str, float]]:
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if Path(dirpath) == self.root:
+                dirnames[:] = [name for name in dirnames if self.root / name != self._staging]
+            for name in filenames:
+                path = Path(dirpath) / name
+                try:
+                    mtime = path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                yield path.relative_to(self.root).as_posix(), mtime
+
+
+class S3BlobStore(BlobStore):
+    """S3 兼容对象存储（依赖 boto3）"""
+
+    def __init__(self, bucket: str, prefix: str = "", chunk_size: int = CHUNK_SIZE, **client_kwargs: Any) -> None:
+        super().__init__(chunk_size)
+        try:
+            import boto3
+        except ImportError as e:
+            raise ImportError("BLOB_STORE=s3 需要安装 boto3: pip install boto3") from e
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = boto3.client("s3", **client_kwargs)
+
+    def _head(self, key: str) -> dict[str, Any]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self._client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def put_file(self, path: Path, md5: str, file_type: str) -> str:
+        key = blob_key(md5, file_type)
+        try:
+            self._head(key)
+        except FileNotFoundError:
+            self._client.upload_file(str(path), self.bucket, self.prefix + key)
+        else:
+            # 原地复制一次刷新 LastModified
+            self._client.copy_object(
+                Bucket=self.bucket,
+                Key=self.prefix + key,
+                CopySource={"Bucket": self.bucket, "Key": self.prefix + key},
+                MetadataDirective="REPLACE",
+            )
+        finally:
+            path.unlink(missing_ok=True)
+        return key
+
+    def size(self, key: str) -> int:
+        return int(self._head(key)["ContentLength"])
+
+    def iter_range(self, key: str, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        if end is not None and end < start:
+            return
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        body = self._client.get_object(Bucket=self.bucket, Key=self.prefix + key, Range=byte_range)["Body"]
+        try:
+            yield from body.iter_chunks(self.chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def modified(self, key: str) -> float:
+        return self._head(key)["LastModified"].timestamp()
+
+    def iter_objects(self) -> Iterator[tuple[str, float]]:
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix) :], item["LastModified"].timestamp()
+
+
+@lru_cache(maxsize=1)
+def get_blob_store() -> BlobStore:
+    if settings.BLOB_STORE == "s3":
+        logger.info("文件对象存储: s3 bucket=%s", settings.S3_BUCKET)
+        return S3BlobStore(
+            settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            chunk_size=settings.BLOB_CHUNK_SIZE,
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            aws_access_key_id=settings.S3_ACCESS_KEY or None,
+            aws_secret_access_key=settings.S3_SECRET_KEY or None,
+            region_name=settings.S3_REGION or None,
+        )
+    logger.info("文件对象存储: local root=%s", settings.BLOB_LOCAL_ROOT)
+    return LocalBlobStore(settings.BLOB_LOCAL_ROOT, chunk_size=settings.BLOB_CHUNK_SIZE)
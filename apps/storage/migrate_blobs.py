@@ -0,0 +1,96 @@
+"""
+knowledge_base_file.file_content 迁移到对象存储
+
+逐行读取尚未迁移（file_path 为空且 file_content 不为空）的文件内容，按 md5 写入对象存储，
+回填 file_path / file_md5 / file_size 并清空 file_content；每批提交一次，中断后重新执行会从未迁移的行继续。
+下载接口兼容未迁移的旧数据，可在服务运行期间执行：
+    python -m apps.storage.migrate_blobs [--batch-size 50] [--keep-content]
+
+清空 file_content 后 InnoDB 不会自动归还磁盘空间，迁移完成后可执行 OPTIMIZE TABLE knowledge_base_file。
+"""
+
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from apps.config import settings
+from apps.database.models import KnowledgeBaseFile
+from apps.storage.blob_store import BlobStore, get_blob_store
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate(
+    session_factory: async_sessionmaker[AsyncSession],
+    store: BlobStore,
+    batch_size: int = 50,
+    keep_content: bool = False,
+) -> int:
+    """执行迁移，返回迁移的文件数"""
+    migrated = 0
+    last_id = 0
+    while True:
+        async with session_factory() as session:
+            ids = (
+                await session.scalars(
+                    select(KnowledgeBaseFile.id)
+                    .where(
+                        KnowledgeBaseFile.id > last_id,
+                        KnowledgeBaseFile.file_path.is_(None),
+                        KnowledgeBaseFile.file_content.is_not(None),
+                    )
+                    .order_by(KnowledgeBaseFile.id)
+                    .limit(batch_size)
+                )
+            ).all()
+            if not ids:
+                break
+            for file_id in ids:
+                # 每次只载入一行的文件内容
+                row = await session.get(KnowledgeBaseFile, file_id)
+                content = await session.scalar(
+                    select(KnowledgeBaseFile.file_content).where(KnowledgeBaseFile.id == file_id)
+                )
+                if row is None or content is None:
+                    continue
+                with store.writer() as writer:
+                    writer.write(content)
+                    if row.file_md5 and row.file_md5 != writer.md5:
+                        logger.warning("文件 MD5 与记录不一致，以实际内容为准: id=%s", file_id)
+                    row.file_path = writer.commit(row.file_type)
+                    row.file_md5 = writer.md5
+                    row.file_size = writer.size
+                if not keep_content:
+                    row.file_content = None
+                del content
+            await session.commit()
+            migrated += len(ids)
+            last_id = ids[-1]
+            logger.info("已迁移 %d 个文件", migrated)
+    logger.info("迁移完成: %d 个文件", migrated)
+    return migrated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="迁移 knowledge_base_file.file_content 到对象存储")
+    parser.add_argument("--batch-size", type=int, default=50, help="每次提交的文件数")
+    parser.add_argument("--keep-content", action="store_true", help="保留 file_content 列中的原内容")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    from apps.database.async_engine import async_engine, async_session
+
+    async def run() -> None:
+        try:
+            await migrate(async_session, get_blob_store(), batch_size=args.batch_size, keep_content=args.keep_content)
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
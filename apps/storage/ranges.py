@@ -0,0 +1,53 @@
+"""
+下载接口的 HTTP 条件请求与字节区间解析（ETag / If-None-Match / Range / If-Range）
+"""
+
+import re
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiableError(ValueError):
+    """Range 超出文件大小，应返回 416"""
+
+
+def make_etag(md5: str) -> str:
+    return f'"{md5}"'
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """If-None-Match / If-Range 是否与 etag 匹配（弱校验，忽略 W/ 前缀）"""
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    解析单个字节区间，返回 [start, end] 闭区间。
+
+    无 Range、格式不合法或多区间请求时返回 None（按完整内容响应）；
+    区间起点超出文件大小时抛出 RangeNotSatisfiableError。
+    """
+    if not header:
+        return None
+    match = _RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # 后缀区间：最后 N 个字节
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiableError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError(header)
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
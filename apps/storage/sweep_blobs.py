@@ -0,0 +1,104 @@
+"""
+清理不再被引用的文件对象
+
+对象按内容寻址被多条文件记录共用，接口在替换 / 删除记录时不同步删除对象：判断"无人引用"与并发上传插入新记录
+不在同一事务中，排队中的入库任务也可能仍按旧 key 读取对象。本脚本按宽限期清理：
+只删除最近一次写入早于 grace_seconds 且没有任何 file_path 引用的对象（put_file 复用对象时会刷新写入时间），
+宽限期应大于上传到提交记录、入库任务排队执行的最长耗时。可在服务运行期间定时执行：
+    python -m apps.storage.sweep_blobs [--grace-seconds 86400] [--batch-size 500] [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from itertools import islice
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select
+
+from apps.config import settings
+from apps.database.models import KnowledgeBaseFile
+from apps.storage.blob_store import BlobStore, get_blob_store
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+ReferencedFn = Callable[[list[str]], Awaitable[set[str]]]  # 返回给定 key 中仍被文件记录引用的部分
+
+
+async def sweep(
+    store: BlobStore,
+    referenced: ReferencedFn,
+    grace_seconds: float,
+    batch_size: int = 500,
+    dry_run: bool = False,
+) -> int:
+    """执行清理，返回删除（dry_run 时为待删除）的对象数"""
+    cutoff = time.time() - grace_seconds
+    stale: Iterator[str] = (key for key, mtime in store.iter_objects() if mtime < cutoff)
+    swept = 0
+    while batch := await asyncio.to_thread(lambda: list(islice(stale, batch_size))):
+        unreferenced = set(batch) - await referenced(batch)
+        for key in sorted(unreferenced):
+            # 列举之后可能又被上传复用，删除前重新确认写入时间
+            try:
+                if await asyncio.to_thread(store.modified, key) >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            if not dry_run:
+                await asyncio.to_thread(store.delete, key)
+            swept += 1
+        logger.info("已检查 %d 个过期对象，%s %d 个", len(batch), "待删除" if dry_run else "删除", swept)
+    logger.info("清理完成: %s %d 个对象", "待删除" if dry_run else "删除", swept)
+    return swept
+
+
+def referenced_in(session_factory: async_sessionmaker[AsyncSession]) -> ReferencedFn:
+    """按 file_path 查询仍被引用的 key"""
+
+    async def referenced(keys: list[str]) -> set[str]:
+        async with session_factory() as session:
+            result = await session.scalars(
+                select(KnowledgeBaseFile.file_path).where(KnowledgeBaseFile.file_path.in_(keys)).distinct()
+            )
+            return set(result)
+
+    return referenced
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="清理不再被文件记录引用的对象")
+    parser.add_argument(
+        "--grace-seconds", type=float, default=settings.BLOB_SWEEP_GRACE_SECONDS, help="只清理早于该时长写入的对象"
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="每次查询引用的对象数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不删除")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    from apps.database.async_engine import async_engine, async_session
+
+    async def run() -> None:
+        try:
+            await sweep(
+                get_blob_store(),
+                referenced_in(async_session),
+                args.grace_seconds,
+                batch_size=args.batch_size,
+                dry_run=args.dry_run,
+            )
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
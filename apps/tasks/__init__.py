@@ -0,0 +1,11 @@
+from .memory_queue import get_memory_queue, init_memory_queue, shutdown_memory_queue
+from .queue import get_job_queue, init_job_queue, shutdown_job_queue
+
+__all__ = [
+    "init_job_queue",
+    "get_job_queue",
+    "shutdown_job_queue",
+    "init_memory_queue",
+    "get_memory_queue",
+    "shutdown_memory_queue",
+]
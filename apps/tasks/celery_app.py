@@ -0,0 +1,66 @@
+"""
+Celery 应用 - 入库任务的分布式执行后端
+
+启动 worker:
+    celery -A apps.tasks.celery_app worker --loglevel=info
+"""
+
+from datetime import datetime
+from typing import Any
+
+from celery import Celery, Task
+
+from apps.config import settings
+from apps.tasks.schemas import IngestJob, IngestJobStatus, IngestResult, JobStage
+
+celery_app = Celery("buddy_ai", broker=settings.CELERY_BROKER_URL, backend=settings.CELERY_RESULT_BACKEND)
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_track_started=True,
+    timezone="Asia/Shanghai",
+)
+
+
+@celery_app.task(bind=True, name="apps.tasks.ingest_file")
+def ingest_file_task(self: Task, payload: str) -> dict[str, Any]:
+    from apps.tasks.ingestion import run_ingestion
+
+    job = IngestJob.model_validate_json(payload)
+    result = run_ingestion(job, lambda stage: self.update_state(state="PROGRESS", meta={"stage": stage}))
+    return _succeeded(job, result)
+
+
+@celery_app.task(bind=True, name="apps.tasks.ingest_batch")
+def ingest_batch_task(self: Task, payloads: list[str]) -> list[str]:
+    """批量入库：整批共用 embedding 流水线，各文件的进度与结果按各自的 job_id 写入 result backend"""
+    from apps.tasks.ingestion import run_bulk_ingestion
+
+    jobs = {job.job_id: job for job in map(IngestJob.model_validate_json, payloads)}
+
+    def on_stage(job_id: str, stage: JobStage) -> None:
+        self.update_state(task_id=job_id, state="PROGRESS", meta={"stage": stage})
+
+    def on_done(job_id: str, outcome: IngestResult | Exception) -> None:
+        if isinstance(outcome, Exception):
+            self.backend.mark_as_failure(job_id, outcome)
+        else:
+            self.backend.mark_as_done(job_id, _succeeded(jobs[job_id], outcome))
+
+    run_bulk_ingestion(list(jobs.values()), on_stage, on_done)
+    return list(jobs)
+
+
+def _succeeded(job: IngestJob, result: IngestResult) -> dict[str, Any]:
+    status = IngestJobStatus(
+        job_id=job.job_id,
+        state="succeeded",
+        stage="done",
+        file_id=job.file_id,
+        file_name=job.file_name,
+        chunks=result.chunks,
+        metrics=result.metrics,
+        update_time=datetime.now(),
+    )
+    return status.model_dump(mode="json")
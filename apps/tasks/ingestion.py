@@ -0,0 +1,240 @@
+"""
+知识库文件入库流水线
+
+parse → split → embed/insert，由后台任务队列执行，不占用请求协程。
+批量上传的多个文件由 run_bulk_ingestion 共用一条 embedding 流水线，批次跨文件凑满。
+
+各阶段以生成器串联：从对象存储分块读取 → 增量 UTF-8 解码 / docx 逐段落解析 → 流式分割 → 微批次 embedding 与写入，
+下游消费多少上游才读取多少，内存中只保留当前窗口的文本与在途的 embedding 批次，峰值内存与文件大小无关。
+"""
+
+import codecs
+import logging
+import tempfile
+import zipfile
+from collections.abc import Callable, Iterable, Iterator
+from typing import IO
+from xml.etree import ElementTree
+
+from langchain_core.documents import Document
+
+from apps.agent.rag import milvus_vector
+from apps.agent.rag.answer_cache import get_answer_cache
+from apps.agent.rag.batch_embedder import EmbeddingMetrics
+from apps.agent.rag.chunk_diff import ChunkDiff
+from apps.agent.rag.document_split import iter_split_document
+from apps.storage import get_blob_store
+from apps.tasks.schemas import IngestJob, IngestResult, JobStage
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 200  # 上传文件的分块大小
+DOCX_SPOOL_SIZE = 1024 * 1024  # docx 需要随机读取（zip），超过该大小的文件暂存到磁盘而不是内存
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def iter_raw(job: IngestJob) -> Iterator[bytes]:
+    """按块读取文件原始内容（兼容直接携带 raw 的任务）"""
+    if job.raw is not None:
+        yield job.raw
+    elif job.blob_key:
+        yield from get_blob_store().iter_range(job.blob_key)
+    else:
+        raise ValueError(f"入库任务缺少文件内容: job_id={job.job_id}")
+
+
+def iter_content(chunks: Iterable[bytes], file_type: str) -> Iterator[str]:
+    """流式提取文件文本内容，产出的片段拼接后即全文"""
+    if file_type in ("txt", "md"):
+        # 增量解码：多字节字符被分块截断时，剩余字节留到下一块
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for chunk in chunks:
+            if text := decoder.decode(chunk):
+                yield text
+        if tail := decoder.decode(b"", final=True):
+            yield tail
+        return
+    with tempfile.SpooledTemporaryFile(max_size=DOCX_SPOOL_SIZE) as file:
+        for chunk in chunks:
+            file.write(chunk)
+        file.seek(0)
+        for index, paragraph in enumerate(iter_docx_paragraphs(file)):
+            yield paragraph if index == 0 else "\n" + paragraph
+
+
+def iter_docx_paragraphs(file: IO[bytes]) -> Iterator[str]:
+    """
+    逐段落解析 docx 正文（与 python-docx 的 Document.paragraphs 相同，只取 body 下的段落，不含表格）。
+
+    用 iterparse 流式读取 word/document.xml，每个段落处理完即从树中移除，不构建整篇文档的 DOM。
+    """
+    with zipfile.ZipFile(file) as archive, archive.open("word/document.xml") as xml:
+        path: list[ElementTree.Element] = []
+        for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                path.append(elem)
+                continue
+            path.pop()
+            if path and path[-1].tag == f"{_W}body":
+                if elem.tag == f"{_W}p":
+                    yield _paragraph_text(elem)
+                path[-1].remove(elem)
+
+
+def _paragraph_text(paragraph: ElementTree.Element) -> str:
+    """
+    与 python-docx 的 Paragraph.text 相同：只取段落直接包含的 w:r 与 w:hyperlink 下的 w:r，
+    不深入文本框（mc:AlternateContent 的 Choice / Fallback）、w:sdt、w:ins 等嵌套内容
+    """
+    parts: list[str] = []
+    for child in paragraph:
+        if child.tag == f"{_W}r":
+            _run_text(child, parts)
+        elif child.tag == f"{_W}hyperlink":
+            for run in child.iterfind(f"{_W}r"):
+                _run_text(run, parts)
+    return "".join(parts)
+
+
+def _run_text(run: ElementTree.Element, parts: list[str]) -> None:
+    for node in run:
+        tag = node.tag
+        if tag == f"{_W}t":
+            parts.append(node.text or "")
+        elif tag in (f"{_W}tab", f"{_W}ptab"):
+            parts.append("\t")
+        elif tag == f"{_W}cr" or (tag == f"{_W}br" and node.get(f"{_W}type", "textWrapping") == "textWrapping"):
+            parts.append("\n")
+        elif tag == f"{_W}noBreakHyphen":
+            parts.append("-")
+
+
+def _on_first[T](items: Iterable[T], callback: Callable[[], None]) -> Iterator[T]:
+    """产出第一个元素前调用 callback（用于上报流水线阶段）"""
+    started = False
+    for item in items:
+        if not started:
+            started = True
+            callback()
+        yield item
+
+
+def run_ingestion(job: IngestJob, on_stage: Callable[[JobStage], None] | None = None) -> IngestResult:
+    """
+    执行入库流水线，返回写入的分块数量和吞吐统计。
+
+    Args:
+        job: 入库任务
+        on_stage: 阶段切换回调，用于上报任务进度
+    """
+
+    def report(stage: JobStage) -> None:
+        if on_stage is not None:
+            on_stage(stage)
+
+    # 各阶段流水线执行，stage 为已进入的最后一个阶段
+    report("parse")
+    pieces = _on_first(iter_content(iter_raw(job), job.file_type), lambda: report("split"))
+    document_list = _on_first(iter_split_document(pieces, job.file_type, UPLOAD_CHUNK_SIZE), lambda: report("embed"))
+
+    # embedding 与写入按微批次流式进行
+    deleted = 0
+    try:
+        if job.replace:
+            # 文件更新：只写入新增分块、只删除被移除的分块，先写后删，更新期间检索不会出现空窗
+            metrics, deleted = milvus_vector.update_documents(document_list, job.user_id, job.knowledge_id, job.file_id)
+        else:
+            metrics = milvus_vector.save_documents(document_list, job.user_id, job.knowledge_id, job.file_id)
+    finally:
+        # 失败时也可能已写入部分分块，知识库内容有变化即让答案缓存失效
+        get_answer_cache().invalidate(job.user_id, job.knowledge_id)
+
+    return IngestResult(chunks=metrics.chunks, metrics=_result_metrics(metrics, deleted))
+
+
+def run_bulk_ingestion(
+    jobs: list[IngestJob],
+    on_stage: Callable[[str, JobStage], None] | None = None,
+    on_done: Callable[[str, IngestResult | Exception], None] | None = None,
+) -> EmbeddingMetrics:
+    """
+    批量入库：同一知识库的多个文件依次解析、分割，分块汇入同一条 embedding 流水线（批次跨文件凑满）。
+
+    每个文件的分块全部写入后单独回调 on_done(job_id, 结果)；单个文件解析失败只影响该文件（已写入的分块保留，
+    与单文件入库失败时相同），embedding / 写入失败时所有未完成的文件都以该异常结束并继续抛出。
+    吞吐统计为整批共享的流水线统计。
+
+    Args:
+        jobs: 入库任务，user_id / knowledge_id 必须相同
+        on_stage: 阶段切换回调 (job_id, 阶段)
+        on_done: 文件完成回调 (job_id, IngestResult 或异常)
+    """
+    scopes = {(job.user_id, job.knowledge_id) for job in jobs}
+    if len(scopes) > 1:
+        raise ValueError("批量入库的文件必须属于同一用户的同一知识库")
+
+    def report(job: IngestJob, stage: JobStage) -> None:
+        if on_stage is not None:
+            on_stage(job.job_id, stage)
+
+    done = [False] * len(jobs)
+
+    def finish(index: int, outcome: IngestResult | Exception) -> None:
+        done[index] = True
+        if on_done is not None:
+            on_done(jobs[index].job_id, outcome)
+
+    errors: dict[int, Exception] = {}
+    diffs: dict[int, ChunkDiff] = {}
+
+    def file_documents(index: int, job: IngestJob) -> Iterator[Document]:
+        report(job, "parse")
+        pieces = _on_first(iter_content(iter_raw(job), job.file_type), lambda: report(job, "split"))
+        docs = _on_first(iter_split_document(pieces, job.file_type, UPLOAD_CHUNK_SIZE), lambda: report(job, "embed"))
+        try:
+            if job.replace:
+                existing = milvus_vector.list_chunk_fingerprints(job.file_id, job.user_id, job.knowledge_id)
+                diffs[index] = ChunkDiff(existing)
+                docs = diffs[index].filter(docs)
+            yield from docs
+        except Exception as e:
+            logger.error("批量入库中文件解析失败: job_id=%s, %s", job.job_id, e, exc_info=True)
+            errors[index] = e
+
+    def on_file_saved(index: int, chunks: int) -> None:
+        if index in errors:
+            finish(index, errors[index])
+            return
+        deleted = 0
+        if index in diffs:
+            # 该文件的新分块已全部写入，再删除被移除的分块
+            to_delete = diffs[index].to_delete
+            milvus_vector.delete_by_ids(to_delete)
+            deleted = len(to_delete)
+        finish(index, IngestResult(chunks=chunks, metrics=_result_metrics(metrics, deleted)))
+
+    metrics = EmbeddingMetrics()
+    try:
+        files = ((job.file_id, file_documents(index, job)) for index, job in enumerate(jobs))
+        milvus_vector.save_files(files, jobs[0].user_id, jobs[0].knowledge_id, on_file_saved, metrics)
+    except Exception as e:
+        for index, finished in enumerate(done):
+            if not finished:
+                finish(index, e)
+        raise
+    finally:
+        for user_id, knowledge_id in scopes:
+            get_answer_cache().invalidate(user_id, knowledge_id)
+    return metrics
+
+
+def _result_metrics(metrics: EmbeddingMetrics, deleted: int) -> dict[str, float]:
+    return {
+        "deleted": deleted,
+        "batches": metrics.batches,
+        "retries": metrics.retries,
+        "elapsed": round(metrics.elapsed, 3),
+        "chunks_per_second": metrics.chunks_per_second,
+        "tokens_per_second": metrics.tokens_per_second,
+    }
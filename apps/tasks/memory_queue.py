@@ -0,0 +1,192 @@
+"""
+长期记忆写入队列
+
+save_memories 节点只把本轮问答放入队列即返回，mem0 的去重检索、LLM 抽取与 embedding 在后台线程执行，
+不再拖慢 SSE 流的结束与 final_answer 事件：
+- 有界：排队的对话轮数超过 max_pending 时丢弃新写入并记录告警；
+- 按 user_id 合并：同一用户的待写入轮次合并为一批（最多 batch_size 轮）一次写入 mem0，
+  同一用户同时只有一个批次在执行，保证写入顺序；批内重复的问题只保留最新答案；
+- linger：用户第一条待写入轮次最多等待 linger 秒再写，给连续对话留出合并窗口；
+- 关闭时停止接收新写入，在 timeout 内写完已排队的轮次。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+from apps.config import settings
+from apps.tasks.schemas import MemoryTurn
+
+logger = logging.getLogger(__name__)
+
+# (user_id, 本批对话) → 实际写入的轮数（其余被去重跳过）
+MemoryWriter = Callable[[str, list[MemoryTurn]], int]
+
+
+class MemoryWriteQueue:
+    """按用户合并的后台记忆写入队列"""
+
+    def __init__(
+        self,
+        writer: MemoryWriter,
+        max_pending: int = 1000,
+        workers: int = 2,
+        batch_size: int = 5,
+        linger: float = 0.5,
+    ) -> None:
+        self._writer = writer
+        self._max_pending = max_pending
+        self._batch_size = batch_size
+        self._linger = linger
+        self._pending: OrderedDict[str, list[MemoryTurn]] = OrderedDict()
+        self._first_at: dict[str, float] = {}
+        self._active: set[str] = set()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._counts = {
+            "submitted": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "batches": 0,
+            "written": 0,
+            "duplicates": 0,
+            "failed": 0,
+        }
+        self._threads = [
+            threading.Thread(target=self._work, name=f"memory-write-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, user_id: str, turn: MemoryTurn) -> bool:
+        """放入队列，队列已满或已关闭时返回 False"""
+        with self._cond:
+            if self._closed:
+                return False
+            if self._size >= self._max_pending:
+                self._counts["dropped"] += 1
+                logger.warning("记忆写入队列已满，丢弃: user_id=%s", user_id)
+                return False
+            self._counts["submitted"] += 1
+            turns = self._pending.setdefault(user_id, [])
+            self._first_at.setdefault(user_id, time.monotonic())
+            for i, queued in enumerate(turns):
+                if queued.question == turn.question:
+                    turns[i] = turn
+                    self._counts["coalesced"] += 1
+                    break
+            else:
+                turns.append(turn)
+                self._size += 1
+            self._cond.notify()
+            return True
+
+    def join(self, timeout: float | None = None) -> bool:
+        """等待已排队的轮次全部写完，返回是否在 timeout 内完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._active:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """停止接收新写入，在 timeout 内写完剩余轮次"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            if self._size:
+                logger.warning("记忆写入队列关闭超时，%d 轮对话未写入", self._size)
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {**self._counts, "pending": self._size, "users": len(self._pending)}
+
+    def _next_batch(self) -> tuple[str, list[MemoryTurn]] | None:
+        """取出一个可写的用户批次；队列关闭且已空时返回 None"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait: float | None = None
+                for user_id, turns in self._pending.items():
+                    if user_id in self._active:
+                        continue
+                    remaining = self._first_at[user_id] + self._linger - now
+                    if self._closed or len(turns) >= self._batch_size or remaining <= 0:
+                        return self._take(user_id)
+                    wait = remaining if wait is None else min(wait, remaining)
+                if self._closed and not self._pending:
+                    return None
+                self._cond.wait(wait)
+
+    def _take(self, user_id: str) -> tuple[str, list[MemoryTurn]]:
+        """调用方持有锁"""
+        turns = self._pending[user_id]
+        batch, rest = turns[: self._batch_size], turns[self._batch_size :]
+        if rest:
+            self._pending[user_id] = rest
+            self._pending.move_to_end(user_id)
+            self._first_at[user_id] = time.monotonic()
+        else:
+            del self._pending[user_id]
+            del self._first_at[user_id]
+        self._size -= len(batch)
+        self._active.add(user_id)
+        return user_id, batch
+
+    def _work(self) -> None:
+        while (item := self._next_batch()) is not None:
+            user_id, batch = item
+            try:
+                written = self._writer(user_id, batch)
+                outcome = {"batches": 1, "written": written, "duplicates": len(batch) - written}
+            except Exception as e:
+                logger.warning("记忆写入失败: user_id=%s, %d 轮, %s", user_id, len(batch), e)
+                outcome = {"failed": len(batch)}
+            with self._cond:
+                for key, value in outcome.items():
+                    self._counts[key] += value
+                self._active.discard(user_id)
+                self._cond.notify_all()
+
+
+# 模块级单例，由 lifespan 初始化
+_memory_queue: MemoryWriteQueue | None = None
+
+
+def init_memory_queue() -> None:
+    global _memory_queue
+    from apps.agent.nodes.memory import persist_memories
+
+    _memory_queue = MemoryWriteQueue(
+        persist_memories,
+        max_pending=settings.MEMORY_WRITE_QUEUE_SIZE,
+        workers=settings.MEMORY_WRITE_WORKERS,
+        batch_size=settings.MEMORY_WRITE_BATCH_SIZE,
+        linger=settings.MEMORY_WRITE_LINGER,
+    )
+    logger.info("记忆写入队列已初始化: workers=%d", settings.MEMORY_WRITE_WORKERS)
+
+
+def get_memory_queue() -> MemoryWriteQueue:
+    if _memory_queue is None:
+        raise RuntimeError("MemoryWriteQueue 未初始化，请先在 lifespan 中调用 init_memory_queue()")
+    return _memory_queue
+
+
+def shutdown_memory_queue() -> None:
+    global _memory_queue
+    if _memory_queue is not None:
+        _memory_queue.shutdown(timeout=settings.MEMORY_WRITE_DRAIN_TIMEOUT)
+        _memory_queue = None
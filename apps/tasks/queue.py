@@ -0,0 +1,219 @@
+"""
+入库任务队列
+
+- local: 进程内线程池执行，任务状态保存在内存中，无需 broker，便于开发和测试
+- celery: 投递到 Celery worker 执行，任务状态从 result backend 读取
+
+submit_batch 把批量上传的多个文件作为一个整体执行（共用 embedding 流水线），每个文件仍有独立的 job_id 和状态。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any
+
+from apps.config import settings
+from apps.tasks.schemas import IngestJob, IngestJobStatus, IngestResult, JobStage
+
+logger = logging.getLogger(__name__)
+
+IngestRunner = Callable[[IngestJob, Callable[[JobStage], None]], IngestResult]
+# (任务列表, 阶段回调 (job_id, 阶段), 完成回调 (job_id, 结果或异常))
+BatchIngestRunner = Callable[
+    [list[IngestJob], Callable[[str, JobStage], None], Callable[[str, IngestResult | Exception], None]], Any
+]
+
+
+class JobQueue(ABC):
+    """入库任务队列接口"""
+
+    @abstractmethod
+    def submit(self, job: IngestJob) -> IngestJobStatus:
+        """提交任务，立即返回初始状态"""
+
+    def submit_batch(self, jobs: list[IngestJob]) -> list[IngestJobStatus]:
+        """提交一批文件作为一个整体执行，默认逐个提交"""
+        return [self.submit(job) for job in jobs]
+
+    @abstractmethod
+    def get_status(self, job_id: str) -> IngestJobStatus | None:
+        """查询任务状态，任务不存在时返回 None"""
+
+    def shutdown(self, wait: bool = True) -> None:  # noqa: B027
+        """关闭队列，默认无需释放资源"""
+
+
+class LocalJobQueue(JobQueue):
+    """进程内线程池任务队列"""
+
+    def __init__(
+        self,
+        runner: IngestRunner,
+        max_workers: int = 2,
+        retention: int = 1000,
+        batch_runner: BatchIngestRunner | None = None,
+    ) -> None:
+        self._runner = runner
+        self._batch_runner = batch_runner
+        self._retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._statuses: OrderedDict[str, IngestJobStatus] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, job: IngestJob) -> IngestJobStatus:
+        (snapshot,) = self._register([job])
+        self._executor.submit(self._run, job)
+        return snapshot
+
+    def submit_batch(self, jobs: list[IngestJob]) -> list[IngestJobStatus]:
+        if self._batch_runner is None or len(jobs) < 2:
+            return super().submit_batch(jobs)
+        snapshots = self._register(jobs)
+        self._executor.submit(self._run_batch, jobs)
+        return snapshots
+
+    def _register(self, jobs: list[IngestJob]) -> list[IngestJobStatus]:
+        statuses = [IngestJobStatus(job_id=job.job_id, file_id=job.file_id, file_name=job.file_name) for job in jobs]
+        with self._lock:
+            for status in statuses:
+                self._statuses[status.job_id] = status
+            self._evict()
+            return [status.model_copy() for status in statuses]
+
+    def get_status(self, job_id: str) -> IngestJobStatus | None:
+        with self._lock:
+            status = self._statuses.get(job_id)
+            return status.model_copy() if status else None
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _run(self, job: IngestJob) -> None:
+        self._update(job.job_id, state="running")
+        try:
+            result = self._runner(job, lambda stage: self._update(job.job_id, stage=stage))
+        except Exception as e:
+            logger.error("入库任务失败: job_id=%s, %s", job.job_id, e, exc_info=True)
+            self._finish(job.job_id, e)
+            return
+        self._finish(job.job_id, result)
+
+    def _run_batch(self, jobs: list[IngestJob]) -> None:
+        assert self._batch_runner is not None
+        try:
+            self._batch_runner(
+                jobs, lambda job_id, stage: self._update(job_id, state="running", stage=stage), self._finish
+            )
+        except Exception as e:
+            # 未完成的文件已由 batch_runner 标记为失败
+            logger.error("批量入库任务失败: job_ids=%s, %s", [job.job_id for job in jobs], e, exc_info=True)
+
+    def _finish(self, job_id: str, outcome: IngestResult | Exception) -> None:
+        if isinstance(outcome, Exception):
+            self._update(job_id, state="failed", error=str(outcome))
+        else:
+            self._update(job_id, state="succeeded", stage="done", chunks=outcome.chunks, metrics=outcome.metrics)
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            status = self._statuses.get(job_id)
+            if status is None:
+                return
+            for key, value in fields.items():
+                setattr(status, key, value)
+            status.update_time = datetime.now()
+
+    def _evict(self) -> None:
+        """只淘汰已结束的任务，超出保留数量时从最早的开始"""
+        overflow = len(self._statuses) - self._retention
+        if overflow <= 0:
+            return
+        finished = [k for k, v in self._statuses.items() if v.state in ("succeeded", "failed")]
+        for job_id in finished[:overflow]:
+            del self._statuses[job_id]
+
+
+class CeleryJobQueue(JobQueue):
+    """Celery 任务队列"""
+
+    # Celery 内置状态 → 任务状态
+    _STATE_MAP = {
+        "PENDING": "pending",
+        "RECEIVED": "pending",
+        "STARTED": "running",
+        "PROGRESS": "running",
+        "RETRY": "running",
+        "SUCCESS": "succeeded",
+        "FAILURE": "failed",
+        "REVOKED": "failed",
+    }
+
+    def __init__(self) -> None:
+        from apps.tasks.celery_app import celery_app, ingest_batch_task, ingest_file_task
+
+        self._app = celery_app
+        self._task = ingest_file_task
+        self._batch_task = ingest_batch_task
+
+    def submit(self, job: IngestJob) -> IngestJobStatus:
+        self._task.apply_async(args=[job.model_dump_json()], task_id=job.job_id)
+        return IngestJobStatus(job_id=job.job_id, file_id=job.file_id, file_name=job.file_name)
+
+    def submit_batch(self, jobs: list[IngestJob]) -> list[IngestJobStatus]:
+        if len(jobs) < 2:
+            return super().submit_batch(jobs)
+        # 整批作为一个 Celery 任务执行，各文件的状态由该任务按 job_id 写入 result backend
+        self._batch_task.apply_async(args=[[job.model_dump_json() for job in jobs]])
+        return [IngestJobStatus(job_id=job.job_id, file_id=job.file_id, file_name=job.file_name) for job in jobs]
+
+    def get_status(self, job_id: str) -> IngestJobStatus | None:
+        result = self._app.AsyncResult(job_id)
+        # 未知任务在 Celery 中同样表现为 PENDING，无法与排队中的任务区分
+        status = IngestJobStatus(job_id=job_id, state=self._STATE_MAP.get(result.state, "pending"))
+        info = result.info
+        if result.state == "PROGRESS" and isinstance(info, dict):
+            status.stage = info.get("stage", status.stage)
+        elif result.state == "SUCCESS" and isinstance(info, dict):
+            status = IngestJobStatus.model_validate(info)
+        elif result.state == "FAILURE":
+            status.error = str(info)
+        return status
+
+
+# 模块级单例，由 lifespan 初始化
+_job_queue: JobQueue | None = None
+
+
+def init_job_queue() -> None:
+    global _job_queue
+    if settings.INGEST_BACKEND == "celery":
+        _job_queue = CeleryJobQueue()
+    else:
+        from apps.tasks.ingestion import run_bulk_ingestion, run_ingestion
+
+        _job_queue = LocalJobQueue(
+            run_ingestion,
+            max_workers=settings.INGEST_WORKERS,
+            retention=settings.INGEST_JOB_RETENTION,
+            batch_runner=run_bulk_ingestion,
+        )
+    logger.info("入库任务队列已初始化: backend=%s", settings.INGEST_BACKEND)
+
+
+def get_job_queue() -> JobQueue:
+    if _job_queue is None:
+        raise RuntimeError("JobQueue 未初始化，请先在 lifespan 中调用 init_job_queue()")
+    return _job_queue
+
+
+def shutdown_job_queue() -> None:
+    global _job_queue
+    if _job_queue is not None:
+        _job_queue.shutdown(wait=True)
+        _job_queue = None
@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+JobState = Literal["pending", "running", "succeeded", "failed"]
+JobStage = Literal["queued", "parse", "split", "embed", "done"]  # 各阶段流水线执行，stage 为已进入的最后一个阶段
+
+
+class IngestJob(BaseModel):
+    """知识库文件入库任务"""
+
+    # bytes 以 base64 序列化，保证可以通过 Celery 的 json 序列化传输
+    model_config = ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
+
+    job_id: str = Field(..., description="任务ID")
+    file_id: int = Field(..., description="文件ID")
+    file_name: str = Field(..., description="文件名")
+    file_type: str = Field(..., description="文件类型")
+    user_id: str = Field(..., description="用户ID")
+    knowledge_id: int = Field(..., description="知识库ID")
+    raw: bytes | None = Field(None, description="文件原始内容（为空时从对象存储读取 blob_key）")
+    blob_key: str | None = Field(None, description="文件在对象存储中的 key")
+    replace: bool = Field(False, description="是否替换该文件已有的向量数据")
+
+
+class IngestResult(BaseModel):
+    """入库任务结果"""
+
+    chunks: int = Field(0, description="写入的分块数量")
+    metrics: dict[str, float] = Field(default_factory=dict, description="吞吐统计（chunks/s、tokens/s 等）")
+
+
+class IngestJobStatus(BaseModel):
+    """入库任务状态"""
+
+    job_id: str
+    state: JobState = "pending"
+    stage: JobStage = "queued"
+    file_id: int | None = None
+    file_name: str | None = None
+    chunks: int | None = None
+    metrics: dict[str, float] | None = None
+    error: str | None = None
+    create_time: datetime = Field(default_factory=datetime.now)
+    update_time: datetime = Field(default_factory=datetime.now)
+
+
+class MemoryTurn(BaseModel):
+    """待写入长期记忆的一轮对话"""
+
+    question: str = Field(..., description="用户问题")
+    answer: str = Field(..., description="最终答案")
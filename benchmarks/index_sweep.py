@@ -0,0 +1,147 @@
+"""
+Dense 索引召回率 / 延迟离线扫描
+
+对每个索引 profile 在本地 Milvus Lite 文件中建索引，按 SEARCH_PARAM_SWEEP 扫描检索参数，
+以 numpy 暴力检索的精确结果为基准计算 recall@k，并统计 p50 / p95 延迟。
+
+语料可取自线上 document_embedding 的 text_dense（--source collection，按 settings.MILVUS_URL 连接），
+也可用随机向量（--source synthetic）。留出 --queries 条向量作为查询，其余建索引：
+
+    python -m benchmarks.index_sweep --source collection --rows 50000 --profiles hnsw ivf_flat ivf_sq8
+
+Milvus Lite 用于快速筛选参数区间，最终取值建议在与线上同版本的 Milvus 服务端（--uri）上复核。
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+from pymilvus import DataType, MilvusClient
+
+from apps.agent.rag.index_profiles import DENSE_METRIC, INDEX_PROFILES, SEARCH_PARAM_SWEEP, IndexProfile
+from apps.agent.rag.milvus_schema import COLLECTION_NAME
+from apps.config import settings
+
+DEFAULT_URI = str(Path(settings.EMBEDDING_CACHE_PATH).parent / "index_sweep.db")
+INSERT_BATCH = 2000
+
+
+def load_collection_vectors(rows: int) -> np.ndarray:
+    """从线上 Collection 读取最多 rows 条 Dense 向量"""
+    client = MilvusClient(uri=settings.MILVUS_URL, token=settings.MILVUS_TOKEN, db_name=settings.MILVUS_DB_NAME)
+    iterator = client.query_iterator(
+        collection_name=COLLECTION_NAME, filter="", output_fields=["text_dense"], batch_size=1000, limit=rows
+    )
+    vectors: list[list[float]] = []
+    try:
+        while batch := iterator.next():
+            vectors.extend(row["text_dense"] for row in batch)
+    finally:
+        iterator.close()
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_vectors(rows: int, dim: int, seed: int) -> np.ndarray:
+    """带簇结构的随机向量，比均匀随机更接近真实 embedding 分布"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(rows // 100, 1), dim), dtype=np.float32)
+    labels = rng.integers(0, len(centers), rows)
+    return centers[labels] + 0.3 * rng.standard_normal((rows, dim), dtype=np.float32)
+
+
+def ground_truth(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """余弦相似度精确 top-k"""
+    normalized = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def build(client: MilvusClient, name: str, profile: IndexProfile, corpus: np.ndarray) -> float:
+    """建 Collection、写入并建索引，返回耗时（秒）"""
+    if client.has_collection(collection_name=name):
+        client.drop_collection(collection_name=name)
+    schema = MilvusClient.create_schema(auto_id=False)
+    schema.add_field(field_name="id", datatype=DataType.INT64, is_primary=True)
+    schema.add_field(field_name="vector", datatype=DataType.FLOAT_VECTOR, dim=corpus.shape[1])
+    index_params = client.prepare_index_params()
+    index_params.add_index(
+        field_name="vector",
+        index_type=profile.index_type,
+        metric_type=DENSE_METRIC,
+        params=profile.build_params,
+    )
+    start = time.perf_counter()
+    client.create_collection(collection_name=name, schema=schema, index_params=index_params)
+    for i in range(0, len(corpus), INSERT_BATCH):
+        rows = [{"id": i + j, "vector": vector.tolist()} for j, vector in enumerate(corpus[i : i + INSERT_BATCH])]
+        client.insert(collection_name=name, data=rows)
+    client.flush(collection_name=name)
+    client.load_collection(collection_name=name)
+    return time.perf_counter() - start
+
+
+def evaluate(
+    client: MilvusClient, name: str, queries: np.ndarray, truth: np.ndarray, k: int, search_params: dict
+) -> dict[str, float]:
+    latencies: list[float] = []
+    hits = 0
+    for query, expected in zip(queries, truth, strict=True):
+        start = time.perf_counter()
+        result = client.search(
+            collection_name=name, data=[query.tolist()], anns_field="vector", limit=k, search_params=search_params
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len({hit["id"] for hit in result[0]} & set(expected.tolist()))
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {"recall": hits / truth.size, "p50": quantiles[49], "p95": quantiles[94]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dense 索引召回率 / 延迟离线扫描")
+    parser.add_argument("--uri", default=DEFAULT_URI, help="Milvus Lite 文件路径或服务端地址")
+    parser.add_argument("--source", choices=["collection", "synthetic"], default="synthetic")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=settings.EMBEDDING_DIMENSIONS, help="仅 synthetic 使用")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--profiles", nargs="+", default=[p for p in INDEX_PROFILES if p != "diskann"])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.source == "collection":
+        vectors = load_collection_vectors(args.rows + args.queries)
+    else:
+        vectors = synthetic_vectors(args.rows + args.queries, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed)
+    vectors = vectors[rng.permutation(len(vectors))]
+    queries, corpus = vectors[: args.queries], vectors[args.queries :]
+    truth = ground_truth(corpus, queries, args.top_k)
+    print(f"corpus={len(corpus)}, queries={len(queries)}, dim={corpus.shape[1]}, recall@{args.top_k}\n")
+
+    if "://" not in args.uri:
+        Path(args.uri).parent.mkdir(parents=True, exist_ok=True)
+    client = MilvusClient(uri=args.uri)
+    print("| profile | build params | search params | build (s) | recall | p50 (ms) | p95 (ms) |")
+    print("|---|---|---|---|---|---|---|")
+    for name in args.profiles:
+        profile = INDEX_PROFILES[name]
+        collection = f"index_sweep_{name}"
+        build_seconds = build(client, collection, profile, corpus)
+        # 预热
+        evaluate(client, collection, queries, truth, args.top_k, profile.search_params_for(args.top_k))
+        key, values = SEARCH_PARAM_SWEEP.get(profile.index_type, (None, [None]))
+        for value in values:
+            candidate = profile.model_copy(update={"search_params": {key: value} if key else {}})
+            search_params = candidate.search_params_for(args.top_k)
+            result = evaluate(client, collection, queries, truth, args.top_k, search_params)
+            print(
+                f"| {name} | {profile.build_params or '-'} | {search_params or '-'} | {build_seconds:.1f} | "
+                f"{result['recall']:.3f} | {result['p50']:.2f} | {result['p95']:.2f} |"
+            )
+        client.drop_collection(collection_name=collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+入库流水线峰值内存对比：整文件读入（bytes → str → docx DOM → list[Document]） vs 流式（分块读取 → 增量解析 → 流式分割）
+
+生成不同大小的 txt / md / docx 文件（大小按文本字节数计，docx 压缩后更小），两种方式都接入同一个
+BatchEmbedder（模拟 embedding，不请求模型）并丢弃结果，用 tracemalloc 记录 Python 堆的峰值内存。
+流式方式的峰值应不随文件大小增长（tracemalloc 只统计 Python 分配，整文件方式中 python-docx / lxml 的 DOM 不计入，
+实际差距更大；tracemalloc 会明显拖慢运行）：
+
+    python -m benchmarks.ingest_memory --sizes 1 4 16 --types txt md docx
+"""
+
+import argparse
+import io
+import random
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Iterable
+from pathlib import Path
+
+import docx
+from langchain_core.documents import Document
+
+from apps.agent.rag.batch_embedder import BatchEmbedder
+from apps.agent.rag.document_split import iter_split_document, split_document
+from apps.storage import LocalBlobStore
+from apps.tasks.ingestion import UPLOAD_CHUNK_SIZE, iter_content
+
+WORDS = ["知识库", "检索增强生成", "向量数据库", "大模型", "embedding", "分块", "重排序", "召回率", "。", "，", "！"]
+DIMENSIONS = 1024
+
+
+def _paragraph(rng: random.Random) -> str:
+    return "".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120)))
+
+
+def make_file(directory: Path, file_type: str, size_mb: int) -> Path:
+    """生成约 size_mb MB 文本的测试文件"""
+    rng = random.Random(size_mb)
+    target = size_mb * 1024 * 1024
+    path = directory / f"bench_{size_mb}mb.{file_type}"
+    if file_type == "docx":
+        document = docx.Document()
+        written = 0
+        while written < target:
+            text = _paragraph(rng)
+            document.add_paragraph(text)
+            written += len(text.encode("utf-8"))
+        document.save(str(path))
+        return path
+    with path.open("w", encoding="utf-8") as f:
+        written = 0
+        section = 0
+        while written < target:
+            if file_type == "md" and written // 20000 >= section:
+                section += 1
+                f.write(f"{'#' * (section % 3 + 1)} 第 {section} 节\n\n")
+            text = _paragraph(rng) + "\n\n"
+            f.write(text)
+            written += len(text.encode("utf-8"))
+    return path
+
+
+def _embed(docs: Iterable[Document]) -> int:
+    """模拟 embedding + 写入：结果直接丢弃"""
+    embedder = BatchEmbedder(lambda texts: [[0.0] * DIMENSIONS for _ in texts], max_concurrency=4)
+    return sum(len(batch) for batch, _ in embedder.iter_batches(docs))
+
+
+def buffered(path: Path, file_type: str) -> int:
+    raw = path.read_bytes()
+    if file_type == "docx":
+        content = "\n".join(p.text for p in docx.Document(io.BytesIO(raw)).paragraphs)
+    else:
+        content = raw.decode("utf-8")
+    return _embed(split_document(content, file_type, UPLOAD_CHUNK_SIZE))
+
+
+def streaming(store: LocalBlobStore, key: str, file_type: str) -> int:
+    pieces = iter_content(store.iter_range(key), file_type)
+    return _embed(iter_split_document(pieces, file_type, UPLOAD_CHUNK_SIZE))
+
+
+def measure(fn, *args) -> tuple[int, float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, peak / 1024 / 1024, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="整文件 / 流式入库的峰值内存对比")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16], help="文件文本大小（MB）")
+    parser.add_argument("--types", nargs="+", default=["txt", "md", "docx"], choices=["txt", "md", "docx"])
+    args = parser.parse_args()
+
+    print(
+        f"{'type':<5} {'size':>6} {'chunks':>8} {'buffered peak':>14} {'streaming peak':>15} "
+        f"{'buffered s':>11} {'streaming s':>12}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalBlobStore(Path(tmp) / "blobs")
+        for file_type in args.types:
+            for size_mb in args.sizes:
+                path = make_file(Path(tmp), file_type, size_mb)
+                key = store.put_bytes(path.read_bytes(), file_type)
+                chunks, buffered_peak, buffered_s = measure(buffered, path, file_type)
+                streamed, streaming_peak, streaming_s = measure(streaming, store, key, file_type)
+                assert abs(chunks - streamed) <= max(1, chunks // 100), (chunks, streamed)
+                print(
+                    f"{file_type:<5} {size_mb:>4}MB {chunks:>8} {buffered_peak:>12.1f}MB {streaming_peak:>13.1f}MB "
+                    f"{buffered_s:>11.2f} {streaming_s:>12.2f}"
+                )
+                path.unlink()
+                store.delete(key)
+
+
+if __name__ == "__main__":
+    main()
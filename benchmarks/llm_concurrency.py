@@ -0,0 +1,141 @@
+"""
+并发对话吞吐对比：同步节点（llm.invoke，由 LangGraph 放入线程池执行） vs 异步节点（llm.ainvoke）
+
+本地启动一个模拟 OpenAI Chat Completions 接口（每次请求固定延迟 --latency 秒），
+构建由 --nodes 个串行 LLM 节点组成的 LangGraph（对应 router → generate_response → evaluate_node），
+以不同并发数运行 --sessions 个会话，输出吞吐（会话 / 秒）与 p50 / p95 会话耗时。
+两种模式共用 llm_factory 的 httpx 连接池，无需外部服务。模拟接口与压测客户端在同一进程内运行，
+核数较少时高并发下 CPU 会先成为瓶颈：
+
+    python -m benchmarks.llm_concurrency --sessions 200 --concurrency 10 50 100 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+from typing import Any, TypedDict
+
+import uvicorn
+from fastapi import FastAPI
+from langchain_openai import ChatOpenAI
+from langgraph.graph import END, START, StateGraph
+
+from apps.agent.llm.llm_factory import close_http_clients, get_http_clients
+from apps.config import settings
+
+
+class BenchState(TypedDict):
+    calls: int
+
+
+def _mock_server(latency: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(latency)
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "bench"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    return app
+
+
+def _start_server(latency: float) -> tuple[uvicorn.Server, int]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    config = uvicorn.Config(_mock_server(latency), host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+def _build_graph(llm: ChatOpenAI, nodes: int, use_async: bool) -> Any:
+    def sync_node(state: BenchState) -> dict[str, int]:
+        llm.invoke("ping")
+        return {"calls": state["calls"] + 1}
+
+    async def async_node(state: BenchState) -> dict[str, int]:
+        await llm.ainvoke("ping")
+        return {"calls": state["calls"] + 1}
+
+    workflow = StateGraph(BenchState)
+    previous = START
+    for i in range(nodes):
+        workflow.add_node(f"llm_{i}", async_node if use_async else sync_node)
+        workflow.add_edge(previous, f"llm_{i}")
+        previous = f"llm_{i}"
+    workflow.add_edge(previous, END)
+    return workflow.compile()
+
+
+async def _run(graph: Any, sessions: int, concurrency: int) -> dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    durations: list[float] = []
+
+    async def session() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            async for _ in graph.astream({"calls": 0}):
+                pass
+            durations.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(durations, n=100)
+    return {"throughput": sessions / elapsed, "p50": quantiles[49], "p95": quantiles[94]}
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    server, port = _start_server(args.latency)
+    settings.LLM_MAX_CONNECTIONS = max(args.concurrency)
+    settings.LLM_MAX_KEEPALIVE_CONNECTIONS = max(args.concurrency)
+    settings.LLM_MAX_CONCURRENCY = max(args.concurrency)
+    client, async_client = get_http_clients("benchmark")
+    llm = ChatOpenAI(
+        model="bench",
+        api_key="bench",
+        base_url=f"http://127.0.0.1:{port}/v1",
+        http_client=client,
+        http_async_client=async_client,
+        max_retries=0,
+    )
+    print(f"sessions={args.sessions}, nodes={args.nodes}, latency={args.latency}s\n")
+    print(f"{'mode':<6} {'concurrency':>11} {'sessions/s':>11} {'p50(s)':>8} {'p95(s)':>8}")
+    try:
+        for use_async in (False, True):
+            graph = _build_graph(llm, args.nodes, use_async)
+            for concurrency in args.concurrency:
+                result = await _run(graph, args.sessions, concurrency)
+                print(
+                    f"{'async' if use_async else 'sync':<6} {concurrency:>11} {result['throughput']:>11.1f} "
+                    f"{result['p50']:>8.2f} {result['p95']:>8.2f}"
+                )
+    finally:
+        await close_http_clients()
+        server.should_exit = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="同步 / 异步 LLM 节点的并发会话吞吐对比")
+    parser.add_argument("--sessions", type=int, default=200, help="每组运行的会话数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100], help="同时进行的会话数")
+    parser.add_argument("--nodes", type=int, default=3, help="每个会话串行调用 LLM 的节点数")
+    parser.add_argument("--latency", type=float, default=0.5, help="模拟 LLM 每次请求的耗时（秒）")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
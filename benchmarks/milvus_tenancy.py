@@ -0,0 +1,129 @@
+"""
+多租户模式检索延迟对比：filter（共享分区 + 标量过滤） vs partition_key（按租户分区）
+
+在临时 Collection 中写入随机向量（每个租户 --docs-per-tenant 条），对随机租户执行带租户过滤的
+Dense 检索，输出 p50 / p95 / p99 延迟与 QPS。需要 Milvus 服务端（默认 settings.MILVUS_URL）：
+
+    python -m benchmarks.milvus_tenancy --tenants 1000 10000 --docs-per-tenant 10 --queries 500
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+from pymilvus import MilvusClient
+
+from apps.agent.rag.milvus_schema import TENANT_KEY_FIELD, TenantMode, create_document_collection, tenant_key
+from apps.config import settings
+
+DIM = 1024
+INSERT_BATCH = 5000
+
+
+def _tenant(index: int) -> tuple[str, int]:
+    return f"user-{index // 4}", index % 4 + 1
+
+
+def _scope_filter(mode: TenantMode, user_id: str, knowledge_id: int) -> str:
+    if mode == "partition_key":
+        return f'{TENANT_KEY_FIELD} == "{tenant_key(user_id, knowledge_id)}"'
+    return f'user_id == "{user_id}" and knowledge_id == {knowledge_id}'
+
+
+def _vectors(rng: np.random.Generator, count: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, DIM), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load(
+    client: MilvusClient, name: str, mode: TenantMode, tenants: int, docs_per_tenant: int, seed: int, analyzer: str
+) -> None:
+    if client.has_collection(collection_name=name):
+        client.drop_collection(collection_name=name)
+    create_document_collection(client, name, mode, num_partitions=settings.MILVUS_NUM_PARTITIONS, analyzer=analyzer)
+
+    rng = np.random.default_rng(seed)
+    rows: list[dict] = []
+    for t in range(tenants):
+        user_id, knowledge_id = _tenant(t)
+        for d, vector in enumerate(_vectors(rng, docs_per_tenant)):
+            row = {
+                "user_id": user_id,
+                "knowledge_id": knowledge_id,
+                "file_id": t * docs_per_tenant + d,
+                "document_text": f"tenant {t} document {d}",
+                "metadata": {},
+                "text_dense": vector.tolist(),
+                "create_time": 0,
+            }
+            if mode == "partition_key":
+                row[TENANT_KEY_FIELD] = tenant_key(user_id, knowledge_id)
+            rows.append(row)
+            if len(rows) >= INSERT_BATCH:
+                client.insert(collection_name=name, data=rows)
+                rows = []
+    if rows:
+        client.insert(collection_name=name, data=rows)
+    client.flush(collection_name=name)
+
+
+def measure(client: MilvusClient, name: str, mode: TenantMode, tenants: int, queries: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed + 1)
+    picker = random.Random(seed)
+    query_vectors = _vectors(rng, queries)
+    latencies: list[float] = []
+    for vector in query_vectors:
+        user_id, knowledge_id = _tenant(picker.randrange(tenants))
+        start = time.perf_counter()
+        client.search(
+            collection_name=name,
+            anns_field="text_dense",
+            data=[vector.tolist()],
+            filter=_scope_filter(mode, user_id, knowledge_id),
+            limit=3,
+            output_fields=["id"],
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "p50": quantiles[49],
+        "p95": quantiles[94],
+        "p99": quantiles[98],
+        "qps": len(latencies) / (sum(latencies) / 1000),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="多租户模式检索延迟对比")
+    parser.add_argument("--uri", default=settings.MILVUS_URL)
+    parser.add_argument("--token", default=settings.MILVUS_TOKEN)
+    parser.add_argument("--tenants", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--docs-per-tenant", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--analyzer", default="chinese", help="Milvus Lite 不支持 chinese，可改用 standard")
+    parser.add_argument("--keep", action="store_true", help="保留测试 Collection")
+    args = parser.parse_args()
+
+    client = MilvusClient(uri=args.uri, token=args.token)
+    print("| tenants | mode | rows | p50 (ms) | p95 (ms) | p99 (ms) | QPS |")
+    print("|---|---|---|---|---|---|---|")
+    for tenants in args.tenants:
+        for mode in ("filter", "partition_key"):
+            name = f"bench_tenancy_{mode}_{tenants}"
+            load(client, name, mode, tenants, args.docs_per_tenant, args.seed, args.analyzer)
+            # 预热
+            measure(client, name, mode, tenants, min(50, args.queries), args.seed + 7)
+            result = measure(client, name, mode, tenants, args.queries, args.seed)
+            print(
+                f"| {tenants} | {mode} | {tenants * args.docs_per_tenant} | {result['p50']:.2f} | "
+                f"{result['p95']:.2f} | {result['p99']:.2f} | {result['qps']:.0f} |"
+            )
+            if not args.keep:
+                client.drop_collection(collection_name=name)
+
+
+if __name__ == "__main__":
+    main()
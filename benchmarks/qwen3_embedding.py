@@ -0,0 +1,111 @@
+"""
+本地 Qwen3-Embedding 推理对比
+
+1. 文档：原实现（整个列表 pad 到最长一条、单次前向计算、未关闭 autograd） vs 长度分桶微批次 + inference_mode，
+   输入为长短混合的中文分块，输出耗时与进程峰值常驻内存（ru_maxrss）的增量，分桶先运行，
+   原实现的增量即其超出分桶方式的峰值内存；
+2. 查询：--sessions 个线程模拟并发会话，各自连续发送 --queries 条查询，对比逐条前向计算与动态批处理
+   （EMBEDDING_QUERY_BATCH_WAIT_MS 窗口内合并）的吞吐与前向计算次数。
+
+需要安装 torch + transformers，首次运行会下载模型：
+
+    python -m benchmarks.qwen3_embedding --model Qwen/Qwen3-Embedding-0.6B --docs 256 --sessions 16 --wait-ms 5
+"""
+
+import argparse
+import random
+import resource
+import threading
+import time
+
+import torch.nn.functional as F  # noqa: N812
+
+from apps.agent.rag.qwen3_embedding import Qwen3EmbeddingModel, last_token_pool
+
+SENTENCE = "检索增强生成先从向量数据库召回相关分块，再交给大模型生成回答。"
+
+
+def make_docs(n: int) -> list[str]:
+    """长短混合的分块：多数为短分块，少数接近上限"""
+    rng = random.Random(n)
+    return [SENTENCE * (rng.randint(20, 40) if rng.random() < 0.1 else rng.randint(1, 4)) for _ in range(n)]
+
+
+def baseline(model: Qwen3EmbeddingModel, texts: list[str]) -> list[list[float]]:
+    """原实现：整体 padding，单次前向计算，未关闭 autograd"""
+    batch_dict = model._tokenizer(
+        texts, padding=True, truncation=True, max_length=model.max_length, return_tensors="pt"
+    ).to(model.device)
+    outputs = model._model(**batch_dict)
+    embeddings = F.normalize(last_token_pool(outputs.last_hidden_state, batch_dict["attention_mask"]), p=2, dim=1)
+    return embeddings.detach().cpu().tolist()
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_sessions(model: Qwen3EmbeddingModel, sessions: int, queries: int) -> float:
+    barrier = threading.Barrier(sessions)
+
+    def session(i: int) -> None:
+        barrier.wait()
+        for j in range(queries):
+            model.embed_query(f"会话 {i} 的第 {j} 个问题：检索增强生成如何减少幻觉？")
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地 Qwen3-Embedding 推理对比")
+    parser.add_argument("--model", default="Qwen/Qwen3-Embedding-0.6B")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--docs", type=int, default=256)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=8, help="每个会话的查询数")
+    parser.add_argument("--wait-ms", type=float, default=5.0, help="动态批处理窗口（毫秒）")
+    args = parser.parse_args()
+
+    docs = make_docs(args.docs)
+    model = Qwen3EmbeddingModel(args.model, device=args.device).load()
+    model.embed_documents(docs[:4])  # 预热
+
+    start_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    bucketed = model.embed_documents(docs)
+    bucketed_s = time.perf_counter() - start
+    bucketed_rss = _peak_rss_mb() - start_rss
+
+    start_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    expected = baseline(model, docs)
+    baseline_s = time.perf_counter() - start
+    baseline_rss = _peak_rss_mb() - start_rss
+    drift = max(abs(a - b) for row, ref in zip(bucketed, expected, strict=True) for a, b in zip(row, ref, strict=True))
+    print(
+        f"文档 {args.docs} 条: 原实现 {baseline_s:.2f}s / +{baseline_rss:.0f}MB RSS，"
+        f"分桶 {bucketed_s:.2f}s / +{bucketed_rss:.0f}MB RSS，最大误差 {drift:.2e}"
+    )
+
+    total = args.sessions * args.queries
+    elapsed = run_sessions(model, args.sessions, args.queries)
+    print(f"查询 {total} 条（{args.sessions} 个并发会话）: 逐条前向计算 {total / elapsed:.1f} 条/s")
+    batched = Qwen3EmbeddingModel(args.model, device=args.device, max_wait_ms=args.wait_ms)
+    batched._tokenizer, batched._model = model._tokenizer, model._model
+    elapsed = run_sessions(batched, args.sessions, args.queries)
+    stats = batched.query_batch_stats()
+    print(
+        f"查询 {total} 条（{args.sessions} 个并发会话）: 动态批处理 {total / elapsed:.1f} 条/s，"
+        f"前向计算 {stats['batches']} 次"
+    )
+    batched.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+文本分割耗时对比：原实现（每次调用新建 RecursiveCharacterTextSplitter，按字符计数） vs SentenceSplitter
+
+生成不同大小的中英混排 txt / md 文本（md 含 h1-h3 标题），分别用原实现、SentenceSplitter 按字符计数、
+SentenceSplitter 按 token 计数（SPLIT_LENGTH_UNIT=tokens 时的 embedding 模型 tokenizer，不可用时为估算值）分割，
+输出耗时（重复 --repeat 次取最短）、分块数与平均分块长度，并校验 md 分块的标题元数据与原实现一致：
+
+    python -m benchmarks.text_splitter --sizes 1 4 --types txt md --chunk-size 200
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+from langchain_core.documents import Document
+from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+
+from apps.agent.rag.batch_embedder import estimate_tokens
+from apps.agent.rag.document_split import HEADERS_TO_SPLIT_ON, TEXT_SEPARATORS
+from apps.agent.rag.sentence_splitter import SentenceSplitter, get_length_function
+
+SENTENCES = [
+    "知识库问答先从向量数据库召回相关分块，再交给大模型生成回答。",
+    "检索增强生成可以显著降低幻觉！",
+    "分块太大会稀释语义，分块太小又会丢失上下文？",
+    "混合检索同时使用稠密向量和 BM25 稀疏向量，",
+    "重排序模型对候选分块逐一打分；",
+    "Retrieval augmented generation grounds answers in your own documents. ",
+    "Chunk size is measured in tokens of the embedding model. ",
+]
+
+
+def make_text(file_type: str, size_mb: int) -> str:
+    rng = random.Random(size_mb)
+    target = size_mb * 1024 * 1024
+    parts: list[str] = []
+    written = 0
+    section = 0
+    while written < target:
+        if file_type == "md" and written // 20000 >= section:
+            section += 1
+            parts.append(f"{'#' * (section % 3 + 1)} 第 {section} 节\n\n")
+        paragraph = "".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 20))) + "\n\n"
+        parts.append(paragraph)
+        written += len(paragraph.encode("utf-8"))
+    return "".join(parts)
+
+
+def baseline(text: str, file_type: str, chunk_size: int) -> list[Document]:
+    """原实现：每次调用新建分割器，Markdown 二次分割使用 LangChain 默认分隔符"""
+    if file_type == "md":
+        md_docs = MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON).split_text(text)
+        return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0).split_documents(md_docs)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0, separators=TEXT_SEPARATORS)
+    return splitter.create_documents([text])
+
+
+def sentence(splitter: SentenceSplitter) -> Callable[[str, str, int], list[Document]]:
+    """新实现：分割器只构造一次"""
+    header_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON)
+
+    def split(text: str, file_type: str, chunk_size: int) -> list[Document]:
+        if file_type == "md":
+            return splitter.split_documents(header_splitter.split_text(text))
+        return splitter.create_documents([text])
+
+    return split
+
+
+def _headers(docs: list[Document]) -> list[dict]:
+    metadata = [d.metadata for d in docs]
+    return [m for i, m in enumerate(metadata) if i == 0 or m != metadata[i - 1]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="原实现 / SentenceSplitter 分割耗时对比")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4], help="文本大小（MB）")
+    parser.add_argument("--types", nargs="+", default=["txt", "md"], choices=["txt", "md"])
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3, help="每种方法重复次数，取最短耗时")
+    args = parser.parse_args()
+
+    length = get_length_function()
+    methods = {
+        "recursive (chars)": baseline,
+        "sentence (chars)": sentence(SentenceSplitter(args.chunk_size)),
+        "sentence (tokens)": sentence(SentenceSplitter(args.chunk_size, length_function=length)),
+    }
+    print(f"token 计数: {'estimate_tokens 估算' if length is estimate_tokens else 'embedding 模型 tokenizer'}")
+    print(f"{'type':<5} {'size':>6} {'method':<18} {'seconds':>8} {'chunks':>8} {'avg chars':>10} {'avg tokens':>11}")
+    for file_type in args.types:
+        for size_mb in args.sizes:
+            text = make_text(file_type, size_mb)
+            expected_headers = None
+            for name, split in methods.items():
+                elapsed = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    docs = split(text, file_type, args.chunk_size)
+                    elapsed = min(elapsed, time.perf_counter() - start)
+                if expected_headers is None:
+                    expected_headers = _headers(docs)
+                assert _headers(docs) == expected_headers, name
+                sample = docs[:: max(1, len(docs) // 500)]
+                avg_chars = sum(len(d.page_content) for d in docs) / len(docs)
+                avg_tokens = sum(length(d.page_content) for d in sample) / len(sample)
+                print(
+                    f"{file_type:<5} {size_mb:>4}MB {name:<18} {elapsed:>8.2f} {len(docs):>8} "
+                    f"{avg_chars:>10.1f} {avg_tokens:>11.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import request from './request'
 export interface SSEClientOptions {
   onWorkflowNode: (data: { content: string; node: string }) => void
   onFinalAnswer: (data: { content: string }) => void
+  /** 草稿未通过评估（optimistic 模式），应清空当前草稿等待重新生成 */
+  onRevision: (data: { reason: string }) => void
   onError: (error: string) => void
   onComplete: () => void
 }
@@ -37,6 +39,10 @@ function dispatchEvent(
       options.onFinalAnswer({
         content: parsed.content ?? '',
       })
+    } else if (event === 'revision') {
+      options.onRevision({
+        reason: parsed.content ?? '',
+      })
     }
   } catch {
     options.onError(`Failed to parse SSE data: ${dataStr}`)
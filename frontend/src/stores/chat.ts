@@ -109,6 +109,11 @@ export const useChatStore = defineStore('chat', () => {
     persist()
   }
 
+  /** 清空正在生成的 assistant 草稿（评估未通过，等待重新生成） */
+  function clearLastAIMessage(threadId: string) {
+    upsertAssistantMessage(threadId, '', false)
+  }
+
   function setStreaming(value: boolean) {
     isStreaming.value = value
     if (!value) persist() // 流结束时统一持久化
@@ -141,6 +146,7 @@ export const useChatStore = defineStore('chat', () => {
     addUserMessage,
     appendToLastAIMessage,
     setFinalAnswer,
+    clearLastAIMessage,
     setStreaming,
     setActiveController,
     cancelActiveStream,
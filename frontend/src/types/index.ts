@@ -64,4 +64,5 @@ export const DEFAULT_KNOWLEDGE_ID = 1
 export interface UploadFileResponse {
   filename: string
   file_id: number
+  job_id?: string
 }
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -5,11 +6,16 @@ from fastapi import FastAPI
 from langgraph.checkpoint.redis.aio import AsyncRedisSaver
 
 from apps.agent.graph import init_graph
+from apps.agent.intent import shutdown_route_log
+from apps.agent.llm.llm_factory import close_http_clients
 from apps.agent.memory.mem0 import init_memory
+from apps.agent.rag import async_milvus_vector, milvus_vector
 from apps.api.agent_chat import router as agent_chat_router
 from apps.api.knowledgebase import router as knowledgebase_router
+from apps.api.metrics import router as metrics_router
 from apps.config import settings
 from apps.database.async_engine import create_tables
+from apps.tasks import init_job_queue, init_memory_queue, shutdown_job_queue, shutdown_memory_queue
 
 logging.basicConfig(
     level=getattr(logging, settings.LOG_LEVEL, logging.INFO),
@@ -20,20 +26,31 @@ logging.basicConfig(
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """初始化数据库表 & Agent Graph & Memory"""
+    """初始化数据库表 & Milvus & Agent Graph & Memory & 入库任务队列 & 记忆写入队列"""
     await create_tables()
+    milvus_vector.connect()
     init_memory()
+    init_memory_queue()
+    init_job_queue()
     async with AsyncRedisSaver.from_conn_string(settings.REDIS_URL) as checkpointer:
         await checkpointer.asetup()
         init_graph(checkpointer)
         yield
     # async with 退出时自动关闭 Redis 连接
+    # 等待本地线程池中的入库任务结束（可能较久），放到线程中等待，不阻塞事件循环
+    await asyncio.to_thread(shutdown_job_queue)
+    # 写完已排队的记忆再退出（mem0 写入较慢，放到线程中等待，不阻塞事件循环）
+    await asyncio.to_thread(shutdown_memory_queue)
+    shutdown_route_log()
+    async_milvus_vector.shutdown()
+    await close_http_clients()
 
 
 app = FastAPI(lifespan=lifespan)
 
 app.include_router(knowledgebase_router)
 app.include_router(agent_chat_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
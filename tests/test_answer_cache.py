@@ -0,0 +1,183 @@
+"""语义答案缓存测试：相似度阈值、语料版本失效、知识库隔离、LRU / TTL，以及缓存节点的读写条件"""
+
+import asyncio
+import importlib
+
+import pytest
+
+from apps.agent.rag.answer_cache import LocalVersionStore, SemanticAnswerCache
+
+SCOPE = SemanticAnswerCache.scope("u1", 1)
+
+
+def _cache(**kwargs) -> SemanticAnswerCache:
+    return SemanticAnswerCache(LocalVersionStore(), **kwargs)
+
+
+class TestSemanticAnswerCache:
+    def test_hit_above_threshold(self):
+        cache = _cache(threshold=0.9)
+        cache.store(SCOPE, "什么是RAG", [1.0, 0.0], "检索增强生成", version=0)
+
+        hit = cache.lookup(SCOPE, [0.99, 0.05], version=0)
+        assert hit is not None
+        assert hit.answer == "检索增强生成"
+        assert hit.question == "什么是RAG"
+        assert hit.similarity > 0.9
+        assert cache.lookup(SCOPE, [0.5, 0.5], version=0) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_invalidate_bumps_version_and_drops_entries(self):
+        cache = _cache()
+        version = cache.version(SCOPE)
+        cache.store(SCOPE, "q", [1.0, 0.0], "a", version)
+
+        cache.invalidate("u1", 1)
+        new_version = cache.version(SCOPE)
+        assert new_version == version + 1
+        assert cache.lookup(SCOPE, [1.0, 0.0], new_version) is None
+        assert cache.stats()["entries"] == 0
+
+    def test_answer_generated_before_invalidation_is_never_served(self):
+        cache = _cache()
+        version = cache.version(SCOPE)
+        # 生成答案期间知识库发生变更，答案按旧版本写入
+        cache.invalidate("u1", 1)
+        cache.store(SCOPE, "q", [1.0, 0.0], "stale", version)
+        assert cache.lookup(SCOPE, [1.0, 0.0], cache.version(SCOPE)) is None
+
+    def test_knowledge_bases_are_isolated(self):
+        cache = _cache()
+        cache.store(SCOPE, "q", [1.0, 0.0], "a", version=0)
+        other = SemanticAnswerCache.scope("u2", 1)
+        assert cache.lookup(other, [1.0, 0.0], version=0) is None
+
+        cache.invalidate("u2", 1)
+        assert cache.lookup(SCOPE, [1.0, 0.0], version=0) is not None
+
+    def test_lru_eviction_per_knowledge_base(self):
+        cache = _cache(max_entries=2)
+        cache.store(SCOPE, "a", [1.0, 0.0, 0.0], "A", version=0)
+        cache.store(SCOPE, "b", [0.0, 1.0, 0.0], "B", version=0)
+        assert cache.lookup(SCOPE, [1.0, 0.0, 0.0], version=0).answer == "A"
+        cache.store(SCOPE, "c", [0.0, 0.0, 1.0], "C", version=0)
+
+        assert cache.lookup(SCOPE, [0.0, 1.0, 0.0], version=0) is None
+        assert cache.lookup(SCOPE, [1.0, 0.0, 0.0], version=0).answer == "A"
+
+    def test_expired_entries_are_dropped(self):
+        cache = _cache(ttl=-1)
+        cache.store(SCOPE, "q", [1.0, 0.0], "a", version=0)
+        assert cache.lookup(SCOPE, [1.0, 0.0], version=0) is None
+        assert cache.stats()["entries"] == 0
+
+
+class FakeVector:
+    def __init__(self, vectors: dict[str, list[float]]) -> None:
+        self.vectors = vectors
+
+    def encode_query(self, query: str) -> list[list[float]]:
+        return [self.vectors[query]]
+
+
+class TestAnswerCacheNodes:
+    @pytest.fixture
+    def nodes(self, monkeypatch):
+        pytest.importorskip("langchain")
+        pytest.importorskip("mem0")
+        module = importlib.import_module("apps.agent.nodes.answer_cache")
+        cache = _cache(threshold=0.9)
+        streamed: list[dict] = []
+        monkeypatch.setattr(module, "get_answer_cache", lambda: cache)
+        monkeypatch.setattr(module, "get_stream_writer", lambda: streamed.append)
+        monkeypatch.setattr(module, "milvus_vector", FakeVector({"什么是RAG": [1.0, 0.0], "RAG是什么": [0.98, 0.1]}))
+        return module, cache, streamed
+
+    @staticmethod
+    def _state(**kwargs):
+        from langchain_core.messages import HumanMessage
+
+        from apps.agent.state import ReflectionState
+
+        state = {
+            "messages": [HumanMessage(content="什么是RAG")],
+            "route_decision": "knowledge_base_search",
+            "original_input": "什么是RAG",
+            "final_answer": "检索增强生成" * 5,
+            "reflection": ReflectionState(passed=True, feedback=""),
+            "answer_cache_version": 0,
+        }
+        return {**state, **kwargs}
+
+    def test_miss_then_store_then_hit(self, nodes):
+        module, cache, streamed = nodes
+        config = {"configurable": {"user_id": "u1", "knowledge_id": 1}}
+
+        miss = asyncio.run(module.answer_cache_lookup({"original_input": "什么是RAG"}, config))
+        assert miss == {"answer_cache_version": 0}
+
+        asyncio.run(module.cache_answer(self._state(), config))
+        hit = asyncio.run(module.answer_cache_lookup({"original_input": "RAG是什么"}, config))
+        assert hit == {"final_answer": "检索增强生成" * 5, "answer_cache_hit": True}
+        assert "".join(chunk["content"] for chunk in streamed) == "检索增强生成" * 5
+        assert len(streamed) == 2
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            {"route_decision": "answer_directly"},
+            {"answer_cache_hit": True},
+            {"answer_cache_version": None},
+            {"reflection": None},
+        ],
+    )
+    def test_store_skipped(self, nodes, overrides):
+        module, cache, _ = nodes
+        config = {"configurable": {"user_id": "u1"}}
+        asyncio.run(module.cache_answer(self._state(**overrides), config))
+        assert cache.stats()["stores"] == 0
+
+    def test_store_skipped_when_tools_were_used(self, nodes):
+        from langchain_core.messages import HumanMessage, ToolMessage
+
+        module, cache, _ = nodes
+        messages = [HumanMessage(content="什么是RAG"), ToolMessage(content="...", tool_call_id="1")]
+        asyncio.run(module.cache_answer(self._state(messages=messages), {"configurable": {"user_id": "u1"}}))
+        assert cache.stats()["stores"] == 0
+
+    @pytest.mark.parametrize(
+        "context",
+        [
+            {"messages": ["什么是RAG", "检索增强生成", "它的价格呢？"]},
+            {"conversation_summary": "用户在咨询 iPhone 16"},
+            {"memory_context": "用户正在对比两款手机"},
+        ],
+    )
+    def test_follow_up_question_skips_cache(self, nodes, context):
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        module, cache, _ = nodes
+        config = {"configurable": {"user_id": "u1"}}
+        module.milvus_vector.vectors["它的价格呢？"] = [1.0, 0.0]  # 与已缓存问题的向量相同
+        asyncio.run(module.cache_answer(self._state(), config))
+
+        messages = [
+            (HumanMessage if i % 2 == 0 else AIMessage)(content=text)
+            for i, text in enumerate(context.pop("messages", ["它的价格呢？"]))
+        ]
+        state = self._state(original_input="它的价格呢？", messages=messages, **context)
+        result = asyncio.run(module.answer_cache_lookup(state, config))
+        assert result == {"answer_cache_version": None}
+        asyncio.run(module.cache_answer({**state, **result}, config))
+        assert cache.stats()["stores"] == 1
+
+    def test_self_contained_question_in_conversation_uses_cache(self, nodes):
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        module, cache, _ = nodes
+        config = {"configurable": {"user_id": "u1"}}
+        asyncio.run(module.cache_answer(self._state(), config))
+        messages = [HumanMessage(content="你好"), AIMessage(content="你好！"), HumanMessage(content="RAG是什么")]
+        state = {"original_input": "RAG是什么", "messages": messages, "memory_context": "用户是工程师"}
+        assert asyncio.run(module.answer_cache_lookup(state, config))["answer_cache_hit"] is True
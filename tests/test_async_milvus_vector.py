@@ -0,0 +1,72 @@
+"""
+测试 MilvusVector 异步封装
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestAsyncMilvusVector:
+    """测试 AsyncMilvusVector 的线程池执行、并发上限与超时"""
+
+    def test_runs_off_event_loop_thread(self):
+        from apps.agent.rag.async_milvus_vector import AsyncMilvusVector
+
+        threads = []
+        vector = MagicMock()
+        vector.hybrid_search.side_effect = lambda *args: threads.append(threading.current_thread()) or [{"id": 1}]
+        wrapper = AsyncMilvusVector(vector, max_concurrency=2)
+        try:
+            result = asyncio.run(wrapper.hybrid_search("q", "u1", 2, 5))
+        finally:
+            wrapper.shutdown()
+        assert result == [{"id": 1}]
+        vector.hybrid_search.assert_called_once_with("q", "u1", 2, 5)
+        assert threads[0] is not threading.main_thread()
+
+    def test_concurrency_bounded_by_pool_size(self):
+        from apps.agent.rag.async_milvus_vector import AsyncMilvusVector
+
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def slow_search(*args):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.05)
+            with lock:
+                state["active"] -= 1
+            return []
+
+        vector = MagicMock()
+        vector.vector_search.side_effect = slow_search
+        wrapper = AsyncMilvusVector(vector, max_concurrency=2)
+
+        async def main():
+            await asyncio.gather(*(wrapper.vector_search("q", "u1") for _ in range(6)))
+
+        try:
+            asyncio.run(main())
+        finally:
+            wrapper.shutdown()
+        assert state["peak"] == 2
+
+    def test_timeout_raises_vector_store_error(self):
+        from apps.agent.rag.async_milvus_vector import AsyncMilvusVector
+        from apps.exceptions import VectorStoreError
+
+        vector = MagicMock()
+        vector.delete_documents.side_effect = lambda *args: time.sleep(0.2)
+        wrapper = AsyncMilvusVector(vector, timeout=0.01)
+        try:
+            with pytest.raises(VectorStoreError) as exc_info:
+                asyncio.run(wrapper.delete_documents(1, "u1"))
+        finally:
+            wrapper.shutdown()
+        assert exc_info.value.status_code == 502
+        assert "超时" in exc_info.value.detail
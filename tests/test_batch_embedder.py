@@ -0,0 +1,92 @@
+"""
+测试批量并发 Embedding
+"""
+
+import pytest
+from langchain_core.documents import Document
+
+
+def _docs(n: int) -> list[Document]:
+    return [Document(page_content=f"chunk {i}") for i in range(n)]
+
+
+def _fake_encode(texts: list[str]) -> list[list[float]]:
+    return [[float(t.split()[-1])] for t in texts]
+
+
+class TestBatchEmbedder:
+    """测试 BatchEmbedder 的分批、顺序、重试和统计"""
+
+    def test_batches_bounded_by_size(self):
+        from apps.agent.rag.batch_embedder import BatchEmbedder
+
+        calls = []
+
+        def encode(texts):
+            calls.append(len(texts))
+            return _fake_encode(texts)
+
+        embedder = BatchEmbedder(encode, batch_size=4, max_concurrency=2)
+        batches = list(embedder.iter_batches(_docs(10)))
+        assert [len(b) for b, _ in batches] == [4, 4, 2]
+        assert sorted(calls) == [2, 4, 4]
+
+    def test_batches_bounded_by_tokens(self):
+        from apps.agent.rag.batch_embedder import BatchEmbedder
+
+        docs = [Document(page_content="人" * 30) for _ in range(5)]
+        embedder = BatchEmbedder(lambda texts: [[0.0]] * len(texts), batch_size=100, max_batch_tokens=60)
+        assert [len(b) for b, _ in embedder.iter_batches(docs)] == [2, 2, 1]
+
+    def test_preserves_input_order(self):
+        from apps.agent.rag.batch_embedder import BatchEmbedder
+
+        embedder = BatchEmbedder(_fake_encode, batch_size=3, max_concurrency=4)
+        assert embedder.embed(_docs(20)) == [[float(i)] for i in range(20)]
+
+    def test_retries_then_succeeds(self):
+        from apps.agent.rag.batch_embedder import BatchEmbedder, EmbeddingMetrics
+
+        failures = {"left": 2}
+
+        def flaky(texts):
+            if failures["left"]:
+                failures["left"] -= 1
+                raise ConnectionError("429 Too Many Requests")
+            return _fake_encode(texts)
+
+        metrics = EmbeddingMetrics()
+        embedder = BatchEmbedder(flaky, batch_size=10, max_retries=3, backoff_base=0.001)
+        batches = list(embedder.iter_batches(_docs(5), metrics))
+        assert len(batches) == 1
+        assert metrics.retries == 2
+        assert metrics.chunks == 5
+
+    def test_raises_after_max_retries(self):
+        from apps.agent.rag.batch_embedder import BatchEmbedder
+
+        def broken(texts):
+            raise ConnectionError("down")
+
+        embedder = BatchEmbedder(broken, max_retries=1, backoff_base=0.001)
+        with pytest.raises(ConnectionError):
+            embedder.embed(_docs(3))
+
+    def test_metrics_throughput(self):
+        from apps.agent.rag.batch_embedder import BatchEmbedder, EmbeddingMetrics
+
+        metrics = EmbeddingMetrics()
+        list(BatchEmbedder(_fake_encode, batch_size=2).iter_batches(_docs(6), metrics))
+        assert metrics.chunks == 6
+        assert metrics.batches == 3
+        assert metrics.tokens > 0
+        assert metrics.chunks_per_second > 0
+        assert "tokens_per_second" in metrics.model_dump()
+
+
+def test_estimate_tokens_counts_cjk_per_char():
+    from apps.agent.rag.batch_embedder import estimate_tokens
+
+    assert estimate_tokens("人工智能") == 4
+    assert estimate_tokens("hello world") == 4
+    assert estimate_tokens("") == 0
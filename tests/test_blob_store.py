@@ -0,0 +1,124 @@
+"""文件对象存储测试：流式写入与内容寻址去重、按区间分块读取、Range / ETag 解析、按宽限期清理未引用对象"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from apps.storage import LocalBlobStore, RangeNotSatisfiableError, blob_key, etag_matches, make_etag, parse_range
+
+DATA = bytes(range(256)) * 40  # 10240 字节
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBlobStore(tmp_path / "blobs", chunk_size=1000)
+
+
+def test_writer_hashes_while_streaming_and_dedupes(store):
+    with store.writer() as writer:
+        for i in range(0, len(DATA), 3000):
+            writer.write(DATA[i : i + 3000])
+        key = writer.commit("txt")
+    assert writer.size == len(DATA)
+    assert key == blob_key(writer.md5, "txt")
+    assert (store.root / key).read_bytes() == DATA
+
+    # 相同内容只存一份，临时文件全部清理
+    assert store.put_bytes(DATA, "txt") == key
+    assert list((store.root / ".staging").iterdir()) == []
+
+
+def test_uncommitted_writer_leaves_nothing(store):
+    with pytest.raises(RuntimeError), store.writer() as writer:
+        writer.write(DATA)
+        raise RuntimeError("upload aborted")
+    assert list((store.root / ".staging").iterdir()) == []
+    assert not any(p.is_file() for p in store.root.rglob("*"))
+
+
+def test_iter_range_reads_in_chunks(store):
+    key = store.put_bytes(DATA, "md")
+    assert store.size(key) == len(DATA)
+    chunks = list(store.iter_range(key, 100, 2599))
+    assert [len(c) for c in chunks] == [1000, 1000, 500]
+    assert b"".join(chunks) == DATA[100:2600]
+    assert store.read_bytes(key) == DATA
+    assert list(store.iter_range(key, 0, -1)) == []
+
+    store.delete(key)
+    with pytest.raises(FileNotFoundError):
+        store.size(key)
+    store.delete(key)
+
+
+def test_reuse_refreshes_modified_time_and_listing_skips_staging(store):
+    key = store.put_bytes(DATA, "txt")
+    os.utime(store.root / key, (0, 0))
+    (store.root / ".staging" / "upload-leftover").write_bytes(b"x")
+
+    assert list(store.iter_objects()) == [(key, 0)]
+    assert store.put_bytes(DATA, "txt") == key
+    assert store.modified(key) > time.time() - 60
+
+
+def test_sweep_deletes_only_stale_unreferenced_objects(store):
+    from apps.storage.sweep_blobs import sweep
+
+    referenced, stale, fresh = (store.put_bytes(bytes([i]) * 10, "txt") for i in range(3))
+    for key in (referenced, stale):
+        os.utime(store.root / key, (0, 0))
+    lookups = []
+
+    async def lookup(keys):
+        lookups.append(sorted(keys))
+        return {referenced} & set(keys)
+
+    assert asyncio.run(sweep(store, lookup, grace_seconds=3600, dry_run=True)) == 1
+    assert len(list(store.iter_objects())) == 3
+    assert asyncio.run(sweep(store, lookup, grace_seconds=3600, batch_size=1)) == 1
+    assert {key for key, _ in store.iter_objects()} == {referenced, fresh}
+    # 只查询过期对象的引用
+    assert lookups[0] == sorted([referenced, stale])
+
+
+def test_rejects_keys_outside_root(store):
+    with pytest.raises(ValueError):
+        store.size("../../etc/passwd")
+    with pytest.raises(ValueError):
+        store.size(".staging/upload-x")
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, None),
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=500-5000", (500, 999)),
+        ("bytes=0-1,5-9", None),  # 多区间按完整内容响应
+        ("items=0-1", None),
+        ("bytes=9-1", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize(("header", "size"), [("bytes=1000-", 1000), ("bytes=-0", 1000), ("bytes=0-", 0)])
+def test_unsatisfiable_range(header, size):
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range(header, size)
+
+
+def test_etag_matching():
+    etag = make_etag("abc")
+    assert etag == '"abc"'
+    assert etag_matches('"x", "abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches(None, etag)
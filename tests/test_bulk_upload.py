@@ -0,0 +1,164 @@
+"""批量上传测试：zip 成员读取、跨文件凑满 embedding 批次、批量入库的逐文件结果与任务队列"""
+
+import io
+import threading
+import time
+import zipfile
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from apps.agent.rag.batch_embedder import BatchEmbedder
+from apps.agent.rag.chunk_diff import chunk_fingerprint
+from apps.agent.rag.milvus_vector import MilvusVector
+from apps.storage import ArchiveError, iter_archive_files, member_name, read_member
+from apps.tasks import ingestion
+from apps.tasks.queue import LocalJobQueue
+from apps.tasks.schemas import IngestJob, IngestResult
+
+
+def _zip(members: dict[str, bytes]) -> zipfile.ZipFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return zipfile.ZipFile(buffer)
+
+
+def test_archive_member_names_and_filtering():
+    archive = _zip(
+        {
+            "docs/说明.md": b"# a",
+            "../../etc/a.txt": b"x",
+            "__MACOSX/docs/._说明.md": b"",
+            "docs/.DS_Store": b"",
+            "empty/": b"",
+        }
+    )
+    assert [name for name, _ in iter_archive_files(archive)] == ["docs/说明.md", "etc/a.txt"]
+
+    # 未设置 UTF-8 标志的 GBK 文件名（Windows 中文环境压缩）
+    info = zipfile.ZipInfo("x")
+    info.filename = "资料/手册.txt".encode("gbk").decode("cp437")
+    info.flag_bits = 0
+    assert member_name(info) == "资料/手册.txt"
+
+
+def test_read_member_streams_and_enforces_size():
+    data = bytes(range(256)) * 100
+    archive = _zip({"a.txt": data})
+    info = archive.getinfo("a.txt")
+    assert b"".join(read_member(archive, info, 1000, len(data))) == data
+    with pytest.raises(ArchiveError):
+        list(read_member(archive, info, 1000, len(data) - 1))
+
+    info.file_size = 10  # 声明的大小不可信，按实际解压字节数中止
+    with pytest.raises(ArchiveError):
+        list(read_member(archive, info, 1000, 100))
+
+
+@pytest.fixture
+def vector():
+    instance = MilvusVector.__new__(MilvusVector)
+    instance.timeout = 5.0
+    instance._tenant_mode = "filter"
+    instance._client = MagicMock()
+    instance.embedder = BatchEmbedder(lambda texts: [[1.0] for _ in texts], batch_size=4, max_concurrency=2)
+    return instance
+
+
+def _docs(prefix: str, n: int) -> list[Document]:
+    return [Document(page_content=f"{prefix}-{i}") for i in range(n)]
+
+
+def test_save_files_pools_batches_across_files(vector):
+    saved: list[tuple[int, int]] = []
+    files = [(10, _docs("a", 3)), (11, []), (12, _docs("c", 5))]
+    metrics = vector.save_files(files, "u1", 1, lambda index, chunks: saved.append((index, chunks)))
+
+    inserted = [call.kwargs["data"] for call in vector.client.insert.call_args_list]
+    assert [len(data) for data in inserted] == [4, 4]  # 8 个分块凑成 2 个满批次，而不是 1+2+... 个未满批次
+    assert [row["file_id"] for data in inserted for row in data] == [10, 10, 10, 12, 12, 12, 12, 12]
+    assert saved == [(0, 3), (1, 0), (2, 5)]
+    assert metrics.chunks == 8
+    assert metrics.batches == 2
+
+
+def _job(job_id: str, raw: bytes, file_type: str = "txt", replace: bool = False) -> IngestJob:
+    return IngestJob(
+        job_id=job_id,
+        file_id=int(job_id),
+        file_name=f"{job_id}.{file_type}",
+        file_type=file_type,
+        user_id="u1",
+        knowledge_id=1,
+        raw=raw,
+        replace=replace,
+    )
+
+
+def test_bulk_ingestion_reports_each_file(vector, monkeypatch):
+    kept = Document(page_content="保留的分块")
+    vector.list_chunk_fingerprints = MagicMock(return_value=[(100, chunk_fingerprint(kept)), (101, "removed")])
+    vector.delete_by_ids = MagicMock()
+    monkeypatch.setattr(ingestion, "milvus_vector", vector)
+    invalidated = []
+    monkeypatch.setattr(
+        ingestion, "get_answer_cache", lambda: MagicMock(invalidate=lambda *args: invalidated.append(args))
+    )
+
+    jobs = [
+        _job("1", "第一个文件。".encode() * 50),
+        _job("2", b"not a docx", file_type="docx"),
+        _job("3", "保留的分块".encode(), replace=True),
+    ]
+    stages: list[tuple[str, str]] = []
+    outcomes: dict[str, IngestResult | Exception] = {}
+    ingestion.run_bulk_ingestion(jobs, lambda job_id, stage: stages.append((job_id, stage)), outcomes.__setitem__)
+
+    assert isinstance(outcomes["1"], IngestResult) and outcomes["1"].chunks > 1
+    assert isinstance(outcomes["2"], zipfile.BadZipFile)  # 解析失败只影响该文件
+    assert outcomes["3"].chunks == 0 and outcomes["3"].metrics["deleted"] == 1
+    vector.delete_by_ids.assert_called_once_with([101])
+    assert ("1", "embed") in stages and ("2", "parse") in stages
+    assert invalidated == [("u1", 1)]
+
+    with pytest.raises(ValueError):
+        ingestion.run_bulk_ingestion([jobs[0], jobs[1].model_copy(update={"knowledge_id": 2})])
+
+
+def test_bulk_ingestion_fails_unfinished_files_on_embedding_error(vector, monkeypatch):
+    vector.embedder = BatchEmbedder(MagicMock(side_effect=RuntimeError("quota")), batch_size=4, max_retries=0)
+    monkeypatch.setattr(ingestion, "milvus_vector", vector)
+    monkeypatch.setattr(ingestion, "get_answer_cache", lambda: MagicMock())
+
+    outcomes: dict[str, IngestResult | Exception] = {}
+    with pytest.raises(RuntimeError):
+        ingestion.run_bulk_ingestion([_job("1", b"a"), _job("2", b"b")], on_done=outcomes.__setitem__)
+    assert {job_id: str(e) for job_id, e in outcomes.items()} == {"1": "quota", "2": "quota"}
+
+
+def test_local_queue_runs_batch_with_per_file_status():
+    release = threading.Event()
+
+    def batch_runner(jobs, on_stage, on_done):
+        release.wait(5)
+        for job in jobs:
+            on_stage(job.job_id, "embed")
+        on_done(jobs[0].job_id, IngestResult(chunks=3))
+        on_done(jobs[1].job_id, ValueError("坏文件"))
+
+    queue = LocalJobQueue(lambda job, on_stage: IngestResult(), max_workers=1, batch_runner=batch_runner)
+    try:
+        statuses = queue.submit_batch([_job("1", b"a"), _job("2", b"b")])
+        assert [(s.job_id, s.state) for s in statuses] == [("1", "pending"), ("2", "pending")]
+        release.set()
+        deadline = time.monotonic() + 5
+        while queue.get_status("2").state != "failed" and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue.shutdown()
+    first, second = queue.get_status("1"), queue.get_status("2")
+    assert (first.state, first.stage, first.chunks) == ("succeeded", "done", 3)
+    assert (second.state, second.stage, second.error) == ("failed", "embed", "坏文件")
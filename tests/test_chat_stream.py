@@ -0,0 +1,107 @@
+"""对话 SSE 流输出模式测试：节点过滤、answer 模式缓冲、optimistic 模式 revision 事件与延迟统计"""
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from apps.agent.state import ReflectionState
+from apps.api.chat_stream import AnswerStream, StreamStats
+
+
+def _token(content: str, node: str) -> tuple[str, tuple]:
+    return "messages", (AIMessageChunk(content=content), {"langgraph_node": node})
+
+
+def _update(node: str, **values) -> tuple[str, dict]:
+    return "updates", {node: values}
+
+
+def _evaluated(passed: bool, feedback: str = "") -> tuple[str, dict]:
+    return _update("evaluate_node", reflection=ReflectionState(passed=passed, feedback=feedback), reflection_count=1)
+
+
+# 一轮被否决的草稿 + 一轮通过的草稿
+TRACE = [
+    _token('{"route_decision": "knowledge_base_search"}', "router"),
+    _update("router", route_decision="knowledge_base_search"),
+    _token("草稿", "generate_response"),
+    _token("一", "generate_response"),
+    _update("generate_response", draft_answer="草稿一"),
+    _token('{"passed": false}', "evaluate_node"),
+    _evaluated(False, "不完整"),
+    _token("草稿二", "generate_response"),
+    _update("generate_response", draft_answer="草稿二"),
+    _evaluated(True),
+    _update("generate_response", final_answer="草稿二"),
+]
+
+
+def _run(mode: str, trace=TRACE) -> tuple[AnswerStream, list[dict]]:
+    stream = AnswerStream(mode)
+    events = [event for stream_mode, chunk in trace for event in stream.feed(stream_mode, chunk)]
+    return stream, events
+
+
+def test_full_mode_forwards_every_node():
+    _, events = _run("full")
+    assert [e["node"] for e in events] == [
+        "router",
+        "generate_response",
+        "generate_response",
+        "evaluate_node",
+        "generate_response",
+    ]
+    assert all(e["event"] == "workflow_node" for e in events)
+
+
+def test_optimistic_mode_streams_drafts_and_revises():
+    stream, events = _run("optimistic")
+    assert [(e["event"], e["content"]) for e in events] == [
+        ("workflow_node", "草稿"),
+        ("workflow_node", "一"),
+        ("revision", "不完整"),
+        ("workflow_node", "草稿二"),
+    ]
+    assert stream.revisions == 1
+    assert stream.ttft is not None
+
+
+def test_answer_mode_only_releases_validated_drafts():
+    stream, events = _run("answer")
+    assert events == [{"event": "workflow_node", "content": "草稿二", "node": "generate_response"}]
+    assert stream.revisions == 0
+
+
+def test_tool_call_round_is_discarded():
+    trace = [
+        _token("我来查一下", "generate_response"),
+        _update("generate_response", messages=[AIMessage(content="我来查一下")]),
+        _token("答案", "generate_response"),
+        _update("generate_response", draft_answer="答案"),
+        _evaluated(True),
+    ]
+    _, optimistic = _run("optimistic", trace)
+    assert [e["event"] for e in optimistic] == ["workflow_node", "revision", "workflow_node"]
+    _, answer = _run("answer", trace)
+    assert [e["content"] for e in answer] == ["答案"]
+
+
+def test_custom_chunks_are_forwarded_in_every_mode():
+    trace = [("custom", {"node": "answer_cache_lookup", "content": "缓存答案"}), ("updates", {"cache": None})]
+    for mode in ("full", "answer", "optimistic"):
+        stream, events = _run(mode, trace)
+        assert events == [{"event": "workflow_node", "content": "缓存答案", "node": "answer_cache_lookup"}]
+        assert stream.ttft is not None
+
+
+def test_stream_stats_per_mode():
+    stats = StreamStats()
+    optimistic, _ = _run("optimistic")
+    answer, _ = _run("answer")
+    silent = AnswerStream("answer")
+    for stream in (optimistic, answer, silent):
+        stats.record(stream)
+
+    result = stats.stats()
+    assert result["optimistic"]["count"] == 1
+    assert result["optimistic"]["revisions"] == 1
+    assert result["answer"]["count"] == 2
+    assert result["answer"]["ttft_p50_ms"] >= 0
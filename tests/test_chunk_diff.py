@@ -0,0 +1,59 @@
+"""
+测试分块级增量更新对比
+"""
+
+from langchain_core.documents import Document
+
+
+class TestDiffChunks:
+    """测试 diff_chunks 的新增 / 删除计算"""
+
+    def test_unchanged_file_is_noop(self):
+        from apps.agent.rag.chunk_diff import diff_chunks
+
+        to_insert, to_delete = diff_chunks([(1, "a"), (2, "b")], ["a", "b"])
+        assert to_insert == []
+        assert to_delete == []
+
+    def test_only_changed_chunks(self):
+        from apps.agent.rag.chunk_diff import diff_chunks
+
+        to_insert, to_delete = diff_chunks([(1, "a"), (2, "b"), (3, "c")], ["a", "x", "c", "y"])
+        assert to_insert == [1, 3]
+        assert to_delete == [2]
+
+    def test_duplicate_chunks_paired_by_count(self):
+        from apps.agent.rag.chunk_diff import diff_chunks
+
+        to_insert, to_delete = diff_chunks([(1, "a"), (2, "a"), (3, "a")], ["a", "a"])
+        assert to_insert == []
+        assert len(to_delete) == 1
+
+        to_insert, to_delete = diff_chunks([(1, "a")], ["a", "a"])
+        assert to_insert == [1]
+        assert to_delete == []
+
+    def test_legacy_rows_without_fingerprint_are_replaced(self):
+        from apps.agent.rag.chunk_diff import diff_chunks
+
+        to_insert, to_delete = diff_chunks([(1, None), (2, None)], ["a"])
+        assert to_insert == [0]
+        assert sorted(to_delete) == [1, 2]
+
+
+class TestChunkFingerprint:
+    """测试分块指纹"""
+
+    def test_same_text_same_fingerprint(self):
+        from apps.agent.rag.chunk_diff import chunk_fingerprint
+
+        assert chunk_fingerprint(Document(page_content="x", metadata={"h1": "A"})) == chunk_fingerprint(
+            Document(page_content="x", metadata={"h1": "A"})
+        )
+
+    def test_metadata_change_changes_fingerprint(self):
+        from apps.agent.rag.chunk_diff import chunk_fingerprint
+
+        assert chunk_fingerprint(Document(page_content="x", metadata={"h1": "A"})) != chunk_fingerprint(
+            Document(page_content="x", metadata={"h1": "B"})
+        )
@@ -0,0 +1,75 @@
+"""
+测试内容寻址 Embedding 缓存
+"""
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.5] for t in texts]
+
+
+class TestEmbeddingCache:
+    """测试 EmbeddingCache 的命中、去重、持久化和 LRU 淘汰"""
+
+    def test_only_misses_are_encoded(self, tmp_path):
+        from apps.agent.rag.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(tmp_path / "cache.db")
+        encoder = CountingEncoder()
+        first = cache.embed("m", 2, ["a", "bb"], encoder)
+        second = cache.embed("m", 2, ["bb", "ccc", "a"], encoder)
+
+        assert encoder.calls == [["a", "bb"], ["ccc"]]
+        assert first == [[1.0, 0.5], [2.0, 0.5]]
+        assert second == [[2.0, 0.5], [3.0, 0.5], [1.0, 0.5]]
+        assert cache.stats() == {"hits": 2, "misses": 3}
+
+    def test_duplicate_texts_encoded_once(self, tmp_path):
+        from apps.agent.rag.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(tmp_path / "cache.db")
+        encoder = CountingEncoder()
+        result = cache.embed("m", 2, ["x", "x", "x"], encoder)
+        assert encoder.calls == [["x"]]
+        assert len(result) == 3
+
+    def test_key_includes_model_and_dims(self, tmp_path):
+        from apps.agent.rag.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(tmp_path / "cache.db")
+        encoder = CountingEncoder()
+        cache.embed("m1", 2, ["a"], encoder)
+        cache.embed("m2", 2, ["a"], encoder)
+        cache.embed("m1", 4, ["a"], encoder)
+        assert len(encoder.calls) == 3
+
+    def test_persists_across_instances(self, tmp_path):
+        from apps.agent.rag.embedding_cache import EmbeddingCache
+
+        EmbeddingCache(tmp_path / "cache.db").embed("m", 2, ["hello"], CountingEncoder())
+        encoder = CountingEncoder()
+        EmbeddingCache(tmp_path / "cache.db").embed("m", 2, ["hello"], encoder)
+        assert encoder.calls == []
+
+    def test_lru_eviction_keeps_recently_used(self, tmp_path):
+        import time
+
+        from apps.agent.rag.embedding_cache import EmbeddingCache, content_hash
+
+        cache = EmbeddingCache(tmp_path / "cache.db", max_entries=3)
+        encoder = CountingEncoder()
+        for text in ("a", "b", "c"):
+            cache.embed("m", 2, [text], encoder)
+            time.sleep(0.01)
+        cache.embed("m", 2, ["a"], encoder)  # 刷新 a 的访问时间
+        time.sleep(0.01)
+        cache.embed("m", 2, ["d"], encoder)
+
+        remaining = cache.get_many("m", 2, [content_hash(t) for t in "abcd"])
+        assert content_hash("a") in remaining
+        assert content_hash("d") in remaining
+        assert content_hash("b") not in remaining
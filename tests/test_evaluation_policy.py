@@ -0,0 +1,80 @@
+"""Reflection 评估的自适应跳过策略测试：answer_directly、证据重合度、本轮工具结果与计数"""
+
+import asyncio
+import importlib
+
+import pytest
+
+from apps.config import settings
+
+pytest.importorskip("langchain")
+pytest.importorskip("mem0")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+
+evaluator = importlib.import_module("apps.agent.nodes.evaluator")
+
+EVIDENCE = "检索增强生成（RAG）先从知识库检索相关文档，再把文档作为上下文交给大模型生成回答。"
+
+
+def _state(**kwargs):
+    state = {
+        "messages": [HumanMessage(content="什么是RAG")],
+        "route_decision": "knowledge_base_search",
+        "original_input": "什么是RAG",
+        "rag_docs": [{"id": 1, "document_text": EVIDENCE}],
+        "reflection_count": 0,
+        "reflection": None,
+        "draft_answer": "RAG 先从知识库检索相关文档，再交给大模型生成回答。",
+    }
+    return {**state, **kwargs}
+
+
+def test_evidence_overlap():
+    assert evaluator.evidence_overlap("检索相关文档再生成回答", EVIDENCE) == 1.0
+    assert evaluator.evidence_overlap("量子计算利用叠加态并行运算", EVIDENCE) < 0.3
+    assert evaluator.evidence_overlap("。", EVIDENCE) == 0.0
+
+
+def test_skip_answer_directly_without_tools():
+    assert evaluator.skip_reason(_state(route_decision="answer_directly", rag_docs=[])) == "answer_directly"
+
+
+def test_answer_directly_with_tool_results_checks_overlap():
+    messages = [
+        HumanMessage(content="今天有什么新闻"),
+        AIMessage(content="", tool_calls=[{"name": "tavily_search_tool", "args": {}, "id": "1"}]),
+        ToolMessage(content="某地发布暴雨预警", tool_call_id="1"),
+    ]
+    state = _state(route_decision="answer_directly", rag_docs=[], messages=messages, draft_answer="股市今日大涨")
+    assert evaluator.skip_reason(state) is None
+    assert evaluator.skip_reason({**state, "draft_answer": "某地发布暴雨预警"}) == "evidence_overlap"
+
+
+def test_tool_results_from_previous_turns_are_not_evidence():
+    messages = [
+        HumanMessage(content="上一个问题"),
+        ToolMessage(content="量子计算利用叠加态并行运算", tool_call_id="1"),
+        HumanMessage(content="量子计算是什么"),
+    ]
+    state = _state(rag_docs=[], messages=messages, draft_answer="量子计算利用叠加态并行运算")
+    assert evaluator.skip_reason(state) is None
+
+
+def test_low_overlap_is_evaluated(monkeypatch):
+    assert evaluator.skip_reason(_state()) == "evidence_overlap"
+    assert evaluator.skip_reason(_state(draft_answer="量子计算利用叠加态并行运算")) is None
+    monkeypatch.setattr(settings, "EVAL_SKIP_ENABLED", False)
+    assert evaluator.skip_reason(_state()) is None
+
+
+def test_skipped_evaluation_passes_and_counts(monkeypatch):
+    monkeypatch.setattr(evaluator, "get_llm", pytest.fail)
+    before = evaluator.evaluation_stats.stats()["skipped_evidence_overlap"]
+
+    result = asyncio.run(evaluator.evaluate_node(_state(evaluations_skipped=1)))
+    assert result["reflection"].passed
+    assert result["reflection_count"] == 1
+    assert result["evaluations_skipped"] == 2
+    assert "evaluations_run" not in result
+    assert evaluator.evaluation_stats.stats()["skipped_evidence_overlap"] == before + 1
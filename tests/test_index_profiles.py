@@ -0,0 +1,31 @@
+"""
+测试 Dense 索引 profile
+"""
+
+import pytest
+
+from apps.agent.rag.index_profiles import INDEX_PROFILES, profile_for_index_type, resolve_index_profile
+
+
+class TestIndexProfiles:
+    def test_resolve_merges_overrides(self):
+        profile = resolve_index_profile("hnsw", {"M": 32}, {"ef": 128})
+        assert profile.index_type == "HNSW"
+        assert profile.build_params == {"M": 32, "efConstruction": 200}
+        assert profile.search_params == {"ef": 128}
+        # 不修改内置 profile
+        assert INDEX_PROFILES["hnsw"].build_params["M"] == 16
+
+    def test_unknown_profile_raises(self):
+        with pytest.raises(ValueError, match="不支持的索引 profile"):
+            resolve_index_profile("annoy")
+
+    def test_search_params_respect_limit(self):
+        assert resolve_index_profile("hnsw").search_params_for(10) == {"ef": 64}
+        assert resolve_index_profile("hnsw").search_params_for(100) == {"ef": 100}
+        assert resolve_index_profile("diskann").search_params_for(150) == {"search_list": 150}
+        assert resolve_index_profile("ivf_sq8").search_params_for(100) == {"nprobe": 16}
+
+    def test_profile_for_existing_index_type(self):
+        assert profile_for_index_type("IVF_FLAT").search_params == {"nprobe": 16}
+        assert profile_for_index_type("SCANN").search_params == {}
@@ -0,0 +1,71 @@
+"""本地 embedding 推理批处理测试：长度分桶、并发查询的动态合并"""
+
+import threading
+
+import pytest
+
+from apps.agent.rag.inference_batching import DynamicBatcher, length_buckets
+
+
+def test_length_buckets_group_similar_lengths_within_budget():
+    lengths = [5, 300, 8, 290, 6, 1000, 7]
+    buckets = length_buckets(lengths, max_batch_size=3, max_batch_tokens=640)
+
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+    assert buckets == [[5], [1, 3], [2, 6, 4], [0]]  # 超长的一条独占一批，短文本不再被 pad 到 1000
+    for bucket in buckets:
+        assert len(bucket) <= 3
+        assert len(bucket) == 1 or len(bucket) * max(lengths[i] for i in bucket) <= 640
+    assert length_buckets([], 4, 100) == []
+
+
+def test_dynamic_batcher_merges_concurrent_requests():
+    calls: list[list[str]] = []
+    batcher = DynamicBatcher(lambda items: calls.append(items) or [item.upper() for item in items], max_wait=0.2)
+    barrier = threading.Barrier(8)
+    results: dict[int, list[str]] = {}
+
+    def query(i: int) -> None:
+        barrier.wait()
+        results[i] = batcher.map([f"q{i}"])
+
+    threads = [threading.Thread(target=query, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.shutdown()
+
+    assert results == {i: [f"Q{i}"] for i in range(8)}
+    assert len(calls) < 8  # 8 个会话的查询合并为更少的前向计算
+    assert batcher.stats() == {"submitted": 8, "batches": len(calls), "failed": 0, "pending": 0}
+
+
+def test_dynamic_batcher_respects_batch_size_and_propagates_errors():
+    sizes: list[int] = []
+    release = threading.Event()
+
+    def encode(items: list[int]) -> list[int]:
+        release.wait(5)
+        sizes.append(len(items))
+        if 99 in items:
+            raise RuntimeError("OOM")
+        return [item * 2 for item in items]
+
+    batcher = DynamicBatcher(encode, max_batch_size=3, max_wait=10)
+    futures = [batcher.submit(i) for i in range(7)]
+    release.set()
+    assert [future.result(5) for future in futures[:6]] == [0, 2, 4, 6, 8, 10]
+    assert sizes == [3, 3]  # 攒满一批立即执行，不等待窗口
+    batcher.shutdown()  # 关闭时剩余的请求不再等待窗口
+    assert futures[6].result(0) == 12
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+
+    batcher = DynamicBatcher(encode, max_wait=10)
+    failed, same_batch = batcher.submit(99), batcher.submit(3)
+    batcher.shutdown()
+    for future in (failed, same_batch):  # 与出错请求同批的请求一并失败
+        with pytest.raises(RuntimeError, match="OOM"):
+            future.result(0)
+    assert batcher.stats() == {"submitted": 2, "batches": 1, "failed": 2, "pending": 0}
@@ -0,0 +1,134 @@
+"""
+测试入库任务队列（local 后端）
+"""
+
+import threading
+
+import pytest
+
+
+def _make_job(job_id: str = "1"):
+    from apps.tasks.schemas import IngestJob
+
+    return IngestJob(
+        job_id=job_id,
+        file_id=42,
+        file_name="a.txt",
+        file_type="txt",
+        user_id="u1",
+        knowledge_id=1,
+        raw="你好".encode(),
+    )
+
+
+def _wait_finished(queue, job_id: str, timeout: float = 5.0):
+    import time
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = queue.get_status(job_id)
+        if status.state in ("succeeded", "failed"):
+            return status
+        time.sleep(0.01)
+    raise AssertionError("任务未在超时时间内结束")
+
+
+class TestLocalJobQueue:
+    """测试 LocalJobQueue 的提交、状态流转和失败处理"""
+
+    def test_submit_returns_pending_immediately(self):
+        from apps.tasks.queue import LocalJobQueue
+        from apps.tasks.schemas import IngestResult
+
+        release = threading.Event()
+
+        def runner(job, on_stage):
+            release.wait(5)
+            return IngestResult(chunks=1)
+
+        queue = LocalJobQueue(runner, max_workers=1)
+        try:
+            status = queue.submit(_make_job())
+            assert status.state == "pending"
+            assert status.file_id == 42
+        finally:
+            release.set()
+            queue.shutdown()
+
+    def test_success_records_stage_and_chunks(self):
+        from apps.tasks.queue import LocalJobQueue
+        from apps.tasks.schemas import IngestResult
+
+        stages = []
+
+        def runner(job, on_stage):
+            for stage in ("parse", "split", "embed"):
+                on_stage(stage)
+                stages.append(stage)
+            return IngestResult(chunks=3, metrics={"chunks_per_second": 10.0})
+
+        queue = LocalJobQueue(runner, max_workers=1)
+        try:
+            queue.submit(_make_job())
+            status = _wait_finished(queue, "1")
+        finally:
+            queue.shutdown()
+        assert status.state == "succeeded"
+        assert status.stage == "done"
+        assert status.chunks == 3
+        assert status.metrics == {"chunks_per_second": 10.0}
+        assert stages == ["parse", "split", "embed"]
+
+    def test_failure_records_error(self):
+        from apps.tasks.queue import LocalJobQueue
+
+        def runner(job, on_stage):
+            on_stage("parse")
+            raise ValueError("bad encoding")
+
+        queue = LocalJobQueue(runner, max_workers=1)
+        try:
+            queue.submit(_make_job())
+            status = _wait_finished(queue, "1")
+        finally:
+            queue.shutdown()
+        assert status.state == "failed"
+        assert status.stage == "parse"
+        assert "bad encoding" in status.error
+
+    def test_unknown_job_returns_none(self):
+        from apps.tasks.queue import LocalJobQueue
+        from apps.tasks.schemas import IngestResult
+
+        queue = LocalJobQueue(lambda job, on_stage: IngestResult())
+        try:
+            assert queue.get_status("missing") is None
+        finally:
+            queue.shutdown()
+
+    def test_finished_jobs_evicted_beyond_retention(self):
+        from apps.tasks.queue import LocalJobQueue
+        from apps.tasks.schemas import IngestResult
+
+        queue = LocalJobQueue(lambda job, on_stage: IngestResult(), max_workers=1, retention=2)
+        try:
+            for i in range(3):
+                queue.submit(_make_job(str(i)))
+                _wait_finished(queue, str(i))
+            queue.submit(_make_job("3"))
+        finally:
+            queue.shutdown()
+        assert queue.get_status("0") is None
+        assert queue.get_status("3") is not None
+
+
+def test_get_job_queue_before_init_raises():
+    import apps.tasks.queue as queue_module
+
+    original = queue_module._job_queue
+    try:
+        queue_module._job_queue = None
+        with pytest.raises(RuntimeError, match="JobQueue 未初始化"):
+            queue_module.get_job_queue()
+    finally:
+        queue_module._job_queue = original
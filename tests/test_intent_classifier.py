@@ -0,0 +1,132 @@
+"""本地意图分类器测试：规则层、softmax 回归训练 / 保存 / 加载、路由日志与评估报告"""
+
+import numpy as np
+import pytest
+
+from apps.agent.intent import IntentClassifier, log_route, read_route_log, shutdown_route_log
+from apps.agent.intent.classifier import match_rules
+from apps.agent.intent.train import evaluate, load_dataset, split_dataset
+from apps.config import settings
+
+TOPICS = ["RAG", "向量数据库", "Transformer", "BM25", "Kubernetes", "Redis缓存", "梯度下降", "微服务"]
+TEMPLATES = {
+    "knowledge_base_search": ["什么是{}", "{}的原理是什么", "请解释一下{}", "{}有哪些应用场景"],
+    "plan_and_execute": ["帮我制定一份{}学习计划", "帮我规划{}项目的实施步骤", "为{}写一份执行方案"],
+    "answer_directly": ["今天心情不错", "你是谁呀", "讲个笑话吧", "我有点无聊"],
+}
+
+
+def _dataset() -> tuple[list[str], list[str]]:
+    samples = {
+        template.format(topic): label
+        for label, templates in TEMPLATES.items()
+        for template in templates
+        for topic in TOPICS
+    }
+    return list(samples), list(samples.values())
+
+
+@pytest.fixture(scope="module")
+def trained() -> IntentClassifier:
+    texts, labels = _dataset()
+    return IntentClassifier().fit(texts, labels, epochs=10)
+
+
+@pytest.mark.parametrize("text", ["你好", "谢谢！", "OK", "好的~", "再见。", "1+2*3=?", "(3.5 - 1) / 2"])
+def test_rules_match_small_talk_and_arithmetic(text):
+    assert match_rules(text) == "answer_directly"
+
+
+@pytest.mark.parametrize("text", ["你好，请介绍一下RAG", "什么是BM25", "2024年的计划"])
+def test_rules_do_not_match_real_questions(text):
+    assert match_rules(text) is None
+
+
+def test_untrained_classifier_only_uses_rules():
+    classifier = IntentClassifier()
+    assert classifier.predict("谢谢").source == "rule"
+    assert classifier.predict("什么是RAG") is None
+
+
+def test_model_generalizes_to_unseen_topics(trained):
+    cases = {
+        "什么是LangGraph": "knowledge_base_search",
+        "帮我制定一份Python学习计划": "plan_and_execute",
+        "讲个笑话吧哈哈": "answer_directly",
+    }
+    for text, expected in cases.items():
+        prediction = trained.predict(text)
+        assert prediction.source == "model"
+        assert prediction.route_decision == expected
+        assert 1 / 3 < prediction.confidence <= 1.0
+
+
+def test_save_load_roundtrip(trained, tmp_path):
+    path = tmp_path / "intent.npz"
+    trained.save(path)
+    loaded = IntentClassifier.load(path)
+    np.testing.assert_allclose(loaded.predict_proba("什么是RAG"), trained.predict_proba("什么是RAG"))
+
+
+def test_load_rejects_mismatched_labels(tmp_path):
+    path = tmp_path / "intent.npz"
+    np.savez(path, weights=np.zeros((8, 2)), labels=np.array(["a", "b"]))
+    with pytest.raises(ValueError):
+        IntentClassifier.load(path)
+
+
+def test_route_log_roundtrip_and_dataset(tmp_path, monkeypatch):
+    path = tmp_path / "route_log.jsonl"
+    monkeypatch.setattr(settings, "ROUTE_LOG_PATH", str(path))
+    log_route("什么是RAG", "answer_directly", "llm")
+    log_route("什么是RAG", "knowledge_base_search", "llm")
+    log_route("谢谢", "answer_directly", "rule", 1.0)
+    log_route("", "answer_directly", "llm")
+    shutdown_route_log()  # 写入在后台线程，关闭时写完队列中的记录
+    with path.open("a", encoding="utf-8") as f:
+        f.write("{broken\n")
+
+    assert len(read_route_log(path)) == 3
+    # 同一问题保留最新标签；默认只用 LLM 标注的记录
+    assert load_dataset(path) == (["什么是RAG"], ["knowledge_base_search"])
+    assert len(load_dataset(path, sources=("llm", "rule"))[0]) == 2
+
+
+def test_route_log_rotates_and_reads_backups(tmp_path, monkeypatch):
+    path = tmp_path / "route_log.jsonl"
+    monkeypatch.setattr(settings, "ROUTE_LOG_PATH", str(path))
+    monkeypatch.setattr(settings, "ROUTE_LOG_MAX_BYTES", 300)
+    monkeypatch.setattr(settings, "ROUTE_LOG_BACKUP_COUNT", 2)
+    for i in range(30):
+        log_route(f"问题{i}", "answer_directly", "llm")
+    shutdown_route_log()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "route_log.jsonl",
+        "route_log.jsonl.1",
+        "route_log.jsonl.2",
+    ]
+    assert all(p.stat().st_size <= 300 for p in tmp_path.iterdir())
+    queries = [record["query"] for record in read_route_log(path)]
+    assert queries == [f"问题{i}" for i in range(30 - len(queries), 30)]  # 只保留最近的记录，按时间顺序
+
+
+def test_route_log_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ROUTE_LOG_PATH", "")
+    log_route("什么是RAG", "knowledge_base_search", "llm")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_evaluate_report(trained):
+    texts, labels = _dataset()
+    train_texts, train_labels, test_texts, test_labels = split_dataset(texts, labels, test_ratio=0.25, seed=0)
+    assert len(test_texts) == len(texts) // 4
+    assert not set(train_texts) & set(test_texts)
+
+    report = evaluate(trained, test_texts, test_labels, thresholds=(0.5, 0.9))
+    assert report["samples"] == len(test_texts)
+    assert report["accuracy"] > 0.9
+    assert set(report["per_label"]) == set(TEMPLATES)
+    coverage = [row["coverage"] for row in report["sweep"]]
+    assert coverage == sorted(coverage, reverse=True)
+    assert report["latency_ms"]["p50"] > 0
@@ -0,0 +1,193 @@
+"""LLM 请求调度测试：优先级排队、令牌桶、429 / 连接错误重试与槽位释放（异步与同步 transport）"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from apps.agent.llm.scheduler import (
+    PRIORITY_HEADER,
+    LLMScheduler,
+    SchedulingTransport,
+    SyncSchedulingTransport,
+    TokenBucket,
+)
+
+
+def test_token_bucket_delay():
+    bucket = TokenBucket(60)  # 每秒补充 1 个
+    assert bucket.delay(60, now=bucket._updated) == 0
+    bucket.take(60)
+    assert bucket.delay(2, now=bucket._updated) == pytest.approx(2.0)
+    assert bucket.delay(1, now=bucket._updated + 1) == 0
+    # 超过容量的请求按容量计算，不会永远等待
+    assert bucket.delay(1000, now=bucket._updated) == pytest.approx(59.0)
+    assert TokenBucket(0).delay(10**9, now=0) == 0
+
+
+def test_classify_shares_retry_policy(monkeypatch):
+    scheduler = LLMScheduler("test", max_retries=1)
+    monkeypatch.setattr(scheduler, "retry_delay", lambda attempt, response=None: 0.5)
+
+    assert scheduler.classify(httpx.Response(400), 0) is None
+    assert scheduler.classify(httpx.ConnectError("refused"), 0) == 0.5
+    assert scheduler.classify(httpx.Response(429), 0) == 0.5
+    assert scheduler._paused_until > time.monotonic()
+    # 重试次数用尽
+    assert scheduler.classify(httpx.Response(503), 1) is None
+    stats = scheduler.stats()
+    assert (stats["retries"], stats["rate_limited"], stats["failures"]) == (2, 1, 1)
+
+
+def test_higher_priority_is_admitted_first():
+    async def scenario() -> list[str]:
+        scheduler = LLMScheduler("test", max_concurrency=1)
+        await scheduler.acquire("interactive", 1)
+        order: list[str] = []
+
+        async def request(priority: str) -> None:
+            await scheduler.acquire(priority, 1)
+            order.append(priority)
+            scheduler.release()
+
+        tasks = [asyncio.create_task(request(p)) for p in ("background", "evaluation", "interactive")]
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["queue_depth"] == {"interactive": 1, "evaluation": 1, "background": 1}
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "evaluation", "background"]
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario() -> dict:
+        scheduler = LLMScheduler("test", max_concurrency=1)
+        await scheduler.acquire("interactive", 1)
+        waiting = asyncio.create_task(scheduler.acquire("background", 1))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        scheduler.release()
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["queue_depth"]["background"] == 0
+    assert stats["in_flight"] == 0
+
+
+def _client(handler, scheduler: LLMScheduler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=SchedulingTransport(httpx.MockTransport(handler), scheduler))
+
+
+def test_retries_rate_limited_requests_and_strips_priority_header(monkeypatch):
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        if len(seen) == 1:
+            return httpx.Response(429, headers={"retry-after": "0"})
+        return httpx.Response(200, json={"ok": True})
+
+    scheduler = LLMScheduler("test", max_retries=2)
+    monkeypatch.setattr(scheduler, "retry_delay", lambda attempt, response=None: 0.0)
+
+    async def scenario() -> httpx.Response:
+        async with _client(handler, scheduler) as client:
+            return await client.post("http://llm/v1/chat", json={}, headers={PRIORITY_HEADER: "evaluation"})
+
+    response = asyncio.run(scenario())
+    assert response.json() == {"ok": True}
+    assert all(PRIORITY_HEADER not in r.headers for r in seen)
+    stats = scheduler.stats()
+    assert (stats["requests"], stats["retries"], stats["rate_limited"], stats["in_flight"]) == (2, 1, 1, 0)
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    calls: list[int] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(1)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(503)
+
+    scheduler = LLMScheduler("test", max_retries=2)
+    monkeypatch.setattr(scheduler, "retry_delay", lambda attempt, response=None: 0.0)
+
+    async def scenario() -> int:
+        async with _client(handler, scheduler) as client:
+            return (await client.get("http://llm/")).status_code
+
+    assert asyncio.run(scenario()) == 503
+    assert len(calls) == 3
+    stats = scheduler.stats()
+    assert (stats["failures"], stats["in_flight"]) == (1, 0)
+
+
+def test_slot_held_until_streamed_response_is_closed():
+    scheduler = LLMScheduler("test")
+
+    async def scenario() -> tuple[int, int]:
+        client = _client(lambda request: httpx.Response(200, content=b"data: ok\n\n"), scheduler)
+        async with client, client.stream("POST", "http://llm/", json={}) as response:
+            during = scheduler.stats()["in_flight"]
+            async for _ in response.aiter_bytes():
+                pass
+        return during, scheduler.stats()["in_flight"]
+
+    assert asyncio.run(scenario()) == (1, 0)
+
+
+def test_sync_transport_retries_and_releases_slot(monkeypatch):
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        if len(seen) == 1:
+            return httpx.Response(429)
+        return httpx.Response(200, content=b"data: ok\n\n")
+
+    scheduler = LLMScheduler("test", max_retries=2)
+    monkeypatch.setattr(scheduler, "retry_delay", lambda attempt, response=None: 0.0)
+    transport = SyncSchedulingTransport(httpx.MockTransport(handler), scheduler)
+    with (
+        httpx.Client(transport=transport) as client,
+        client.stream("POST", "http://llm/", json={}, headers={PRIORITY_HEADER: "background"}) as response,
+    ):
+        assert scheduler.stats()["in_flight"] == 1
+        assert response.read() == b"data: ok\n\n"
+
+    assert len(seen) == 2
+    assert PRIORITY_HEADER not in seen[-1].headers
+    stats = scheduler.stats()
+    assert (stats["requests"], stats["retries"], stats["rate_limited"], stats["in_flight"]) == (2, 1, 1, 0)
+    assert stats["avg_wait_ms"]["background"] >= 0
+
+
+def test_sync_and_async_callers_share_concurrency_limit():
+    scheduler = LLMScheduler("test", max_concurrency=1)
+    admitted = threading.Event()
+
+    def sync_request() -> None:
+        scheduler.acquire_sync("interactive", 1)
+        admitted.set()
+        scheduler.release()
+
+    async def scenario() -> None:
+        await scheduler.acquire("interactive", 1)
+        thread = threading.Thread(target=sync_request)
+        thread.start()
+        await asyncio.sleep(0.05)
+        assert not admitted.is_set()  # 异步请求占用唯一的槽位，同步调用排队等待
+        assert scheduler.stats()["queue_depth"]["interactive"] == 1
+        scheduler.release()
+        await asyncio.to_thread(thread.join, 5)
+
+    start = time.monotonic()
+    asyncio.run(scenario())
+    assert admitted.is_set() and time.monotonic() - start < 5
+    assert scheduler.stats()["in_flight"] == 0
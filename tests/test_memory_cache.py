@@ -0,0 +1,120 @@
+"""按用户的记忆检索缓存测试：最近结果复用、本地记忆集打分、写入失效与回退 mem0 search"""
+
+import pytest
+
+pytest.importorskip("mem0")
+
+from apps.agent.memory.retrieval_cache import MemoryRetrievalCache  # noqa: E402
+
+VECTORS = {
+    "我喜欢什么运动": [1.0, 0.0, 0.0],
+    "我喜欢哪些运动": [0.99, 0.1, 0.0],
+    "我住在哪里": [0.0, 1.0, 0.0],
+    "用户喜欢打篮球": [0.9, 0.1, 0.0],
+    "用户住在杭州": [0.1, 0.95, 0.0],
+    "用户养了一只猫": [0.0, 0.0, 1.0],
+}
+
+
+class FakeMem0:
+    def __init__(self, memories: list[str]) -> None:
+        self.memories = memories
+        self.searches = 0
+        self.listings = 0
+
+    def search(self, query: str, user_id: str, limit: int, threshold: float) -> list[dict]:
+        self.searches += 1
+        return [{"memory": m, "score": 0.9} for m in self.memories][:limit]
+
+    def list(self, user_id: str, limit: int) -> list[dict]:
+        self.listings += 1
+        return [{"id": str(i), "memory": m} for i, m in enumerate(self.memories)][:limit]
+
+
+def _cache(mem0: FakeMem0, **kwargs) -> MemoryRetrievalCache:
+    return MemoryRetrievalCache(
+        encode_query=VECTORS.__getitem__,
+        encode_documents=lambda texts: [VECTORS[t] for t in texts],
+        remote_search=mem0.search,
+        list_memories=mem0.list,
+        **kwargs,
+    )
+
+
+def test_local_memory_set_is_scored_in_memory():
+    mem0 = FakeMem0(["用户喜欢打篮球", "用户住在杭州", "用户养了一只猫"])
+    cache = _cache(mem0)
+
+    results = cache.search("u1", "我喜欢什么运动", limit=3, threshold=0.7)
+    assert [r["memory"] for r in results] == ["用户喜欢打篮球"]
+    assert [r["memory"] for r in cache.search("u1", "我住在哪里")] == ["用户住在杭州"]
+    assert (mem0.listings, mem0.searches) == (1, 0)
+    assert cache.stats()["local_hits"] == 2
+
+
+def test_similar_queries_reuse_recent_results():
+    mem0 = FakeMem0(["用户喜欢打篮球"])
+    cache = _cache(mem0, local_max=0)
+
+    first = cache.search("u1", "我喜欢什么运动")
+    assert cache.search("u1", "我喜欢哪些运动") == first
+    cache.search("u1", "我住在哪里")
+    assert mem0.searches == 2
+    stats = cache.stats()
+    assert (stats["recent_hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-3)
+
+
+def test_invalidate_drops_cached_results():
+    mem0 = FakeMem0(["用户喜欢打篮球"])
+    cache = _cache(mem0)
+    cache.search("u1", "我住在哪里")
+    assert cache.search("u1", "我住在哪里") == []
+
+    mem0.memories.append("用户住在杭州")
+    cache.invalidate("u1")
+    assert [r["memory"] for r in cache.search("u1", "我住在哪里")] == ["用户住在杭州"]
+    assert mem0.listings == 2
+
+
+def test_large_memory_sets_fall_back_to_remote_search():
+    mem0 = FakeMem0(["用户喜欢打篮球", "用户住在杭州", "用户养了一只猫"])
+    cache = _cache(mem0, local_max=2)
+    cache.search("u1", "我喜欢什么运动")
+    cache.search("u1", "我住在哪里")
+    # 超过上限后不再重复载入
+    assert (mem0.listings, mem0.searches) == (1, 2)
+
+
+def test_non_cosine_collection_disables_local_scoring():
+    mem0 = FakeMem0(["用户喜欢打篮球", "用户住在杭州", "用户养了一只猫"])
+    distances = {"用户喜欢打篮球": 0.2, "用户住在杭州": 1.3, "用户养了一只猫": 1.4}
+    # L2 度量下 mem0 返回的 score 是距离，越小越相近
+    mem0.search = lambda query, user_id, limit, threshold: [
+        {"memory": m, "score": d} for m, d in sorted(distances.items(), key=lambda item: item[1])
+    ][:limit]
+    cache = _cache(mem0, metric="L2")
+
+    results = cache.search("u1", "我喜欢什么运动", limit=3, threshold=0.7)
+    assert results == mem0.search("我喜欢什么运动", "u1", 3, 0.7)
+    assert mem0.listings == 0
+    assert cache.stats()["local_loads"] == 0
+
+
+def test_write_during_load_is_not_cached():
+    mem0 = FakeMem0(["用户喜欢打篮球"])
+
+    def list_and_write(user_id: str, limit: int) -> list[dict]:
+        listed = mem0.list(user_id, limit)
+        cache.invalidate(user_id)
+        return listed
+
+    cache = MemoryRetrievalCache(
+        encode_query=VECTORS.__getitem__,
+        encode_documents=lambda texts: [VECTORS[t] for t in texts],
+        remote_search=mem0.search,
+        list_memories=list_and_write,
+    )
+    cache.search("u1", "我喜欢什么运动")
+    assert mem0.searches == 1
+    assert cache.stats()["users"] == 0
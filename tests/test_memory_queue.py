@@ -0,0 +1,130 @@
+"""长期记忆写入队列测试：按用户合并、批大小、有界丢弃、失败隔离与关闭时排空"""
+
+import importlib
+import threading
+import time
+
+import pytest
+
+from apps.tasks.memory_queue import MemoryWriteQueue
+from apps.tasks.schemas import MemoryTurn
+
+
+class RecordingWriter:
+    def __init__(self, block: threading.Event | None = None, fail_for: str | None = None) -> None:
+        self.batches: list[tuple[str, list[str]]] = []
+        self.block = block
+        self.fail_for = fail_for
+        self.lock = threading.Lock()
+
+    def __call__(self, user_id: str, turns: list[MemoryTurn]) -> int:
+        if self.block is not None:
+            self.block.wait(5)
+        if user_id == self.fail_for:
+            raise RuntimeError("mem0 不可用")
+        with self.lock:
+            self.batches.append((user_id, [t.question for t in turns]))
+        return len(turns)
+
+
+def _turn(question: str, answer: str = "a") -> MemoryTurn:
+    return MemoryTurn(question=question, answer=answer)
+
+
+def test_turns_of_one_user_are_coalesced_into_one_batch():
+    writer = RecordingWriter()
+    queue = MemoryWriteQueue(writer, workers=1, linger=0.2)
+    for question in ("q1", "q2", "q1"):
+        assert queue.submit("u1", _turn(question))
+    queue.submit("u2", _turn("q3"))
+
+    assert queue.join(timeout=5)
+    assert sorted(writer.batches) == [("u1", ["q1", "q2"]), ("u2", ["q3"])]
+    stats = queue.stats()
+    assert (stats["submitted"], stats["coalesced"], stats["batches"], stats["written"]) == (4, 1, 2, 3)
+    queue.shutdown(timeout=1)
+
+
+def test_batch_size_splits_large_backlogs():
+    writer = RecordingWriter()
+    queue = MemoryWriteQueue(writer, workers=1, batch_size=2, linger=10)
+    for i in range(5):
+        queue.submit("u1", _turn(f"q{i}"))
+
+    # 达到批大小的部分立即写入，不等 linger
+    deadline = time.monotonic() + 5
+    while len(writer.batches) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.batches == [("u1", ["q0", "q1"]), ("u1", ["q2", "q3"])]
+    queue.shutdown(timeout=5)
+    assert writer.batches[-1] == ("u1", ["q4"])
+
+
+def test_queue_is_bounded():
+    block = threading.Event()
+    queue = MemoryWriteQueue(RecordingWriter(block), max_pending=2, workers=1, linger=0)
+    queue.submit("u1", _turn("q1"))
+    time.sleep(0.05)  # q1 已被取走并阻塞在写入中
+    assert queue.submit("u2", _turn("q2"))
+    assert queue.submit("u3", _turn("q3"))
+    assert not queue.submit("u4", _turn("q4"))
+    assert queue.stats()["dropped"] == 1
+    block.set()
+    queue.shutdown(timeout=5)
+
+
+def test_failed_batch_does_not_stop_the_queue():
+    writer = RecordingWriter(fail_for="u1")
+    queue = MemoryWriteQueue(writer, workers=1, linger=0)
+    queue.submit("u1", _turn("q1"))
+    queue.submit("u2", _turn("q2"))
+    assert queue.join(timeout=5)
+    assert writer.batches == [("u2", ["q2"])]
+    assert queue.stats()["failed"] == 1
+    queue.shutdown(timeout=1)
+
+
+def test_shutdown_drains_without_waiting_for_linger():
+    writer = RecordingWriter()
+    queue = MemoryWriteQueue(writer, workers=2, linger=60)
+    queue.submit("u1", _turn("q1"))
+    queue.submit("u2", _turn("q2"))
+
+    start = time.monotonic()
+    queue.shutdown(timeout=5)
+    assert time.monotonic() - start < 1
+    assert sorted(writer.batches) == [("u1", ["q1"]), ("u2", ["q2"])]
+    assert not queue.submit("u1", _turn("q3"))
+    assert queue.stats()["pending"] == 0
+
+
+class FakeMemoryClient:
+    def __init__(self, known: set[str]) -> None:
+        self.known = known
+        self.added: list[list[dict]] = []
+
+    def search(self, query: str, user_id: str, limit: int, threshold: float) -> dict:
+        return {"results": [{"memory": query}] if query in self.known else []}
+
+    def add(self, messages: list[dict], user_id: str) -> None:
+        self.added.append(messages)
+
+
+def test_persist_memories_skips_duplicates_and_adds_once(monkeypatch):
+    pytest.importorskip("langchain")
+    pytest.importorskip("mem0")
+    module = importlib.import_module("apps.agent.nodes.memory")
+    client = FakeMemoryClient(known={"q1"})
+    monkeypatch.setattr(module, "get_memory_client", lambda: client)
+
+    assert module.persist_memories("u1", [_turn("q1"), _turn("q2", "a2"), _turn("q3", "a3")]) == 2
+    assert client.added == [
+        [
+            {"role": "user", "content": "q2"},
+            {"role": "assistant", "content": "a2"},
+            {"role": "user", "content": "q3"},
+            {"role": "assistant", "content": "a3"},
+        ]
+    ]
+    assert module.persist_memories("u1", [_turn("q1")]) == 0
+    assert len(client.added) == 1
@@ -0,0 +1,95 @@
+"""滚动摘要测试：增量合并上一版摘要、安全切割、token 预算触发与后台写回 checkpoint"""
+
+import asyncio
+from typing import NotRequired
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from apps.agent.utils import message_summarizer
+from apps.agent.utils.message_summarizer import select_evicted, update_summary
+
+
+class FakeLLM:
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    async def ainvoke(self, prompt, config=None):
+        self.prompts.append(prompt)
+        return AIMessage(content=f"摘要{len(self.prompts)}")
+
+
+def _turns(n: int, size: int = 10) -> list:
+    messages = []
+    for i in range(n):
+        messages.append(HumanMessage(content=f"问题{i}" + "问" * size, id=f"h{i}"))
+        messages.append(AIMessage(content=f"回答{i}" + "答" * size, id=f"a{i}"))
+    return messages
+
+
+def test_incremental_summary_only_sends_evicted_messages():
+    llm = FakeLLM()
+    messages = _turns(4)  # 8 条，保留最近 5 条
+    updates = asyncio.run(update_summary(messages, "上一版摘要", llm, keep_recent=5))
+
+    assert [m.id for m in updates["messages"]] == ["h0", "a0", "h1"]
+    assert all(isinstance(m, RemoveMessage) for m in updates["messages"])
+    assert updates["conversation_summary"] == "摘要1"
+    assert "上一版摘要" in llm.prompts[0]
+    assert "问题1" in llm.prompts[0] and "回答1" not in llm.prompts[0]
+    assert asyncio.run(update_summary(messages[:5], None, llm, keep_recent=5)) is None
+    assert len(llm.prompts) == 1
+
+
+def test_split_keeps_tool_calls_with_results():
+    messages = [
+        HumanMessage(content="查天气", id="h0"),
+        AIMessage(content="", id="a0", tool_calls=[{"name": "weather", "args": {}, "id": "c0"}]),
+        ToolMessage(content="晴", tool_call_id="c0", id="t0"),
+        AIMessage(content="今天晴", id="a1"),
+        HumanMessage(content="明天呢", id="h1"),
+    ]
+    # 切割点落在 ToolMessage 上时前移，AIMessage(tool_calls) 与 ToolMessage 一起保留
+    assert select_evicted(messages, keep_recent=3) == 1
+
+
+def test_token_trigger_evicts_to_half_budget_and_keeps_current_turn():
+    messages = _turns(6, size=38)  # 每条约 20 token，共约 240 token
+    assert select_evicted(messages, trigger="tokens", max_tokens=1000) == 0
+
+    evicted = select_evicted(messages, trigger="tokens", max_tokens=200)
+    remaining = message_summarizer.estimate_tokens(messages[evicted:])
+    assert evicted > 0 and remaining <= 100
+
+    current_turn = [*_turns(1), HumanMessage(content="问" * 1000, id="now")]
+    assert select_evicted(current_turn, trigger="tokens", max_tokens=10) == 2
+
+
+class SummaryState(MessagesState):
+    conversation_summary: NotRequired[str | None]
+
+
+def test_background_summary_writes_back_to_checkpoint(monkeypatch):
+    monkeypatch.setattr(message_summarizer.settings, "SUMMARY_TRIGGER", "messages")
+    monkeypatch.setattr(message_summarizer.settings, "SUMMARY_KEEP_RECENT", 2)
+
+    workflow = StateGraph(SummaryState)
+    workflow.add_node("save_memories", lambda state: {})
+    workflow.add_edge(START, "save_memories")
+    workflow.add_edge("save_memories", END)
+    graph = workflow.compile(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "t1"}}
+
+    async def scenario() -> dict:
+        await graph.ainvoke({"messages": _turns(3)}, config)
+        task = message_summarizer.schedule_background_summary(graph, config, FakeLLM())
+        await message_summarizer.wait_background_summary("t1")
+        assert task.done() and "t1" not in message_summarizer._background_tasks
+        snapshot = await graph.aget_state(config)
+        assert snapshot.next == ()
+        return snapshot.values
+
+    values = asyncio.run(scenario())
+    assert [m.id for m in values["messages"]] == ["h2", "a2"]
+    assert values["conversation_summary"] == "摘要1"
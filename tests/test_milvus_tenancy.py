@@ -0,0 +1,76 @@
+"""
+测试 partition_key 多租户 Collection 与迁移（基于 Milvus Lite）
+"""
+
+import random
+
+import pytest
+
+pytest.importorskip("milvus_lite")
+
+from pymilvus import MilvusClient  # noqa: E402
+
+from apps.agent.rag.migrate_partition_key import count_rows, migrate  # noqa: E402
+from apps.agent.rag.milvus_schema import create_document_collection, detect_tenant_mode, tenant_key  # noqa: E402
+
+# Milvus Lite 不支持 chinese analyzer
+ANALYZER = "standard"
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = MilvusClient(str(tmp_path / "milvus.db"))
+    yield client
+    client.close()
+
+
+def _rows(count: int) -> list[dict]:
+    rng = random.Random(0)
+    return [
+        {
+            "user_id": f"u{i % 3}",
+            "knowledge_id": 1 + i % 2,
+            "file_id": i,
+            "document_text": f"document {i}",
+            "metadata": {"h1": "t"},
+            "text_dense": [rng.random() for _ in range(1024)],
+            "create_time": i,
+            "chunk_hash": f"hash-{i}",
+        }
+        for i in range(count)
+    ]
+
+
+class TestTenantKey:
+    def test_format(self):
+        assert tenant_key("u1", 2) == "u1:2"
+
+
+class TestMigration:
+    """测试 filter 模式迁移到 partition_key 模式"""
+
+    def test_detect_mode(self, client):
+        create_document_collection(client, "flat", "filter", analyzer=ANALYZER)
+        create_document_collection(client, "pk", "partition_key", num_partitions=4, analyzer=ANALYZER)
+        assert detect_tenant_mode(client, "flat") == "filter"
+        assert detect_tenant_mode(client, "pk") == "partition_key"
+
+    def test_migrate_copies_rows_and_swaps_names(self, client):
+        create_document_collection(client, "docs", "filter", analyzer=ANALYZER)
+        client.insert(collection_name="docs", data=_rows(25))
+
+        copied = migrate(client, "docs", batch_size=10, num_partitions=4, analyzer=ANALYZER)
+
+        assert copied == 25
+        assert detect_tenant_mode(client, "docs") == "partition_key"
+        assert detect_tenant_mode(client, "docs_legacy") == "filter"
+        assert count_rows(client, "docs") == 25
+        rows = client.query(
+            collection_name="docs", filter='tenant_key == "u1:2"', output_fields=["file_id", "chunk_hash"]
+        )
+        assert sorted(row["file_id"] for row in rows) == [i for i in range(25) if i % 3 == 1 and i % 2 == 1]
+        assert all(row["chunk_hash"] == f"hash-{row['file_id']}" for row in rows)
+
+    def test_migrate_is_noop_when_already_partitioned(self, client):
+        create_document_collection(client, "docs", "partition_key", num_partitions=4, analyzer=ANALYZER)
+        assert migrate(client, "docs", analyzer=ANALYZER) == 0
@@ -0,0 +1,67 @@
+"""
+测试单次往返的多路检索
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def vector():
+    from apps.agent.rag.index_profiles import resolve_index_profile
+    from apps.agent.rag.milvus_vector import MilvusVector
+    from apps.agent.rag.query_cache import QueryEmbeddingCache
+
+    instance = MilvusVector.__new__(MilvusVector)
+    instance.timeout = 5.0
+    instance._tenant_mode = "filter"
+    instance._client = MagicMock()
+    instance.dense_index = resolve_index_profile("hnsw")
+    instance.client.hybrid_search.return_value = [[{"entity": {"id": 1, "document_text": "a"}}]]
+    instance.openai_ef = MagicMock()
+    instance.openai_ef.encode_queries.side_effect = lambda texts: [[float(len(t))] for t in texts]
+    instance.query_cache = QueryEmbeddingCache()
+    return instance
+
+
+class TestMultiSearch:
+    """测试 MilvusVector.multi_search 的子请求组装"""
+
+    def test_all_sub_requests_in_one_call(self, vector):
+        result = vector.multi_search("什么是闭包", "u1", 2, hyde="闭包是函数", keyword="闭包", top_k=3)
+
+        assert result == [{"id": 1, "document_text": "a"}]
+        vector.client.hybrid_search.assert_called_once()
+        kwargs = vector.client.hybrid_search.call_args.kwargs
+        reqs = kwargs["reqs"]
+        assert [req.anns_field for req in reqs] == ["text_dense", "text_sparse", "text_dense", "text_dense"]
+        assert all('user_id == "u1" and knowledge_id == 2' in req.expr for req in reqs)
+        assert 'TEXT_MATCH(document_text, "闭包")' in reqs[3].expr
+        assert kwargs["limit"] == 12
+        assert kwargs["timeout"] == 5.0
+        # 原始问题与 HyDE 文本只发起一次 embedding 请求
+        vector.openai_ef.encode_queries.assert_called_once_with(["什么是闭包", "闭包是函数"])
+
+    def test_optional_branches_skipped(self, vector):
+        vector.multi_search("什么是闭包", "u1", hyde=None, keyword="")
+
+        reqs = vector.client.hybrid_search.call_args.kwargs["reqs"]
+        assert [req.anns_field for req in reqs] == ["text_dense", "text_sparse"]
+        assert vector.client.hybrid_search.call_args.kwargs["limit"] == 6
+
+    def test_partition_key_mode_filters_by_tenant_key(self, vector):
+        vector._tenant_mode = "partition_key"
+        vector.multi_search("什么是闭包", "u1", 2, keyword="闭包")
+
+        reqs = vector.client.hybrid_search.call_args.kwargs["reqs"]
+        assert reqs[0].expr == 'tenant_key == "u1:2"'
+        assert reqs[-1].expr == 'tenant_key == "u1:2" and TEXT_MATCH(document_text, "闭包")'
+
+    def test_dense_search_params_follow_index_profile(self, vector):
+        vector.multi_search("什么是闭包", "u1", top_k=100)
+
+        reqs = vector.client.hybrid_search.call_args.kwargs["reqs"]
+        # HNSW 的 ef 不能小于召回条数
+        assert reqs[0].param == {"ef": 100}
+        assert reqs[1].param == {}
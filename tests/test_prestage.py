@@ -0,0 +1,137 @@
+"""推测执行前置阶段测试：记忆检索、路由、查询转换并发执行，未选中的分支被取消"""
+
+import asyncio
+import importlib
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+pytest.importorskip("langchain")
+pytest.importorskip("mem0")
+
+from apps.agent.state import RouteSchema  # noqa: E402
+
+# apps.agent.nodes 导出了同名的 prestage 函数，按模块路径导入
+prestage_module = importlib.import_module("apps.agent.nodes.prestage")
+
+DELAY = 0.2
+CONFIG = {"configurable": {"user_id": "u1"}}
+
+
+class FakeLLM:
+    def with_config(self, **kwargs):
+        return self
+
+
+class Recorder:
+    def __init__(self):
+        self.calls: list[tuple] = []
+        self.cancelled: set[str] = set()
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    rec = Recorder()
+
+    def search_memories(query, user_id):
+        rec.calls.append(("memory", query, user_id))
+        time.sleep(DELAY)
+        return "记忆上下文"
+
+    def make_transform(name, result):
+        async def transform(user_input, memory_context, llm=None):
+            rec.calls.append((name, user_input, memory_context))
+            try:
+                await asyncio.sleep(DELAY)
+            except asyncio.CancelledError:
+                rec.cancelled.add(name)
+                raise
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return transform
+
+    rec.make_transform = make_transform
+    transforms = prestage_module.SPECULATIVE_TRANSFORMS
+    monkeypatch.setattr(prestage_module, "get_llm", FakeLLM)
+    monkeypatch.setattr(prestage_module, "search_memories", search_memories)
+    monkeypatch.setitem(transforms, "knowledge_base_search", make_transform("hyde", "假设文档"))
+    monkeypatch.setitem(transforms, "answer_directly", make_transform("rewrite", "改写问题"))
+    return rec
+
+
+def _route(monkeypatch, decision):
+    async def classify_route(query):
+        await asyncio.sleep(DELAY)
+        return RouteSchema(route_decision=decision, route_reason="test")
+
+    monkeypatch.setattr(prestage_module, "classify_route", classify_route)
+
+
+async def _run(state):
+    result = await prestage_module.prestage(state, CONFIG)
+    await asyncio.sleep(0)  # 让被取消的任务处理 CancelledError
+    return result
+
+
+def test_knowledge_base_search_uses_hyde(monkeypatch, recorder):
+    _route(monkeypatch, "knowledge_base_search")
+    start = time.perf_counter()
+    result = asyncio.run(_run({"messages": [HumanMessage(content="什么是RAG")]}))
+    elapsed = time.perf_counter() - start
+
+    assert result["route_decision"] == "knowledge_base_search"
+    assert result["original_input"] == "什么是RAG"
+    assert result["memory_context"] == "记忆上下文"
+    assert result["enhanced_input"] == "假设文档"
+    assert ("memory", "什么是RAG", "u1") in recorder.calls
+    assert ("hyde", "什么是RAG", "记忆上下文") in recorder.calls
+    assert recorder.cancelled == {"rewrite"}
+    # 路由与「记忆 + HyDE」并发，总耗时约 2 * DELAY 而非 3 * DELAY
+    assert elapsed < 2.8 * DELAY
+
+
+def test_answer_directly_uses_rewrite(monkeypatch, recorder):
+    _route(monkeypatch, "answer_directly")
+    result = asyncio.run(_run({"messages": [HumanMessage(content="你好")]}))
+
+    assert result["enhanced_input"] == "改写问题"
+    assert recorder.cancelled == {"hyde"}
+
+
+def test_plan_and_execute_cancels_all_transforms(monkeypatch, recorder):
+    _route(monkeypatch, "plan_and_execute")
+    result = asyncio.run(_run({"messages": [HumanMessage(content="写一份报告")]}))
+
+    assert result["route_decision"] == "plan_and_execute"
+    assert result["enhanced_input"] is None
+    assert result["memory_context"] == "记忆上下文"
+    assert recorder.cancelled == {"hyde", "rewrite"}
+
+
+def test_transform_failure_falls_back_to_original(monkeypatch, recorder):
+    _route(monkeypatch, "knowledge_base_search")
+    monkeypatch.setitem(
+        prestage_module.SPECULATIVE_TRANSFORMS, "knowledge_base_search", recorder.make_transform("hyde", RuntimeError())
+    )
+    result = asyncio.run(_run({"messages": [HumanMessage(content="什么是RAG")]}))
+
+    assert result["route_decision"] == "knowledge_base_search"
+    assert result["enhanced_input"] is None
+
+
+def test_route_failure_cancels_speculative_tasks(monkeypatch, recorder):
+    async def classify_route(query):
+        raise RuntimeError("llm down")
+
+    monkeypatch.setattr(prestage_module, "classify_route", classify_route)
+    with pytest.raises(RuntimeError):
+        asyncio.run(_run({"messages": [HumanMessage(content="什么是RAG")]}))
+
+
+def test_empty_messages(recorder):
+    result = asyncio.run(_run({"messages": []}))
+    assert result == {"route_decision": "answer_directly", "original_input": ""}
+    assert recorder.calls == []
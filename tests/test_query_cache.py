@@ -0,0 +1,146 @@
+"""
+测试查询 Embedding 缓存（TTL + LRU + single-flight）
+"""
+
+import threading
+import time
+
+import pytest
+
+
+def _encode(texts):
+    return [[float(len(t))] for t in texts]
+
+
+class TestQueryEmbeddingCache:
+    """测试 QueryEmbeddingCache"""
+
+    def test_hit_after_miss(self):
+        from apps.agent.rag.query_cache import QueryEmbeddingCache
+
+        calls = []
+        cache = QueryEmbeddingCache()
+
+        def encode(texts):
+            calls.append(texts)
+            return _encode(texts)
+
+        assert cache.get("abc", encode) == [3.0]
+        assert cache.get("abc", encode) == [3.0]
+        assert calls == [["abc"]]
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_get_many_encodes_misses_in_one_call(self):
+        from apps.agent.rag.query_cache import QueryEmbeddingCache
+
+        calls = []
+        cache = QueryEmbeddingCache()
+
+        def encode(texts):
+            calls.append(texts)
+            return _encode(texts)
+
+        cache.get("a", encode)
+        assert cache.get_many(["a", "bb", "ccc", "bb"], encode) == [[1.0], [2.0], [3.0], [2.0]]
+        assert calls == [["a"], ["bb", "ccc"]]
+
+    def test_ttl_expiry(self):
+        from apps.agent.rag.query_cache import QueryEmbeddingCache
+
+        calls = []
+        cache = QueryEmbeddingCache(ttl=0.01)
+
+        def encode(texts):
+            calls.append(texts)
+            return _encode(texts)
+
+        cache.get("a", encode)
+        time.sleep(0.02)
+        cache.get("a", encode)
+        assert len(calls) == 2
+
+    def test_lru_eviction(self):
+        from apps.agent.rag.query_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache(max_entries=2)
+        for text in ("a", "b", "a", "c"):
+            cache.get(text, _encode)
+        calls = []
+        cache.get_many(["a", "b", "c"], lambda texts: calls.append(texts) or _encode(texts))
+        assert calls == [["b"]]
+
+    def test_single_flight_shares_inflight_request(self):
+        from apps.agent.rag.query_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_encode(texts):
+            calls.append(texts)
+            started.set()
+            release.wait(5)
+            return _encode(texts)
+
+        results = []
+        owner = threading.Thread(target=lambda: results.append(cache.get("query", slow_encode)))
+        owner.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(cache.get("query", slow_encode)))
+        follower.start()
+        time.sleep(0.05)
+        release.set()
+        owner.join(5)
+        follower.join(5)
+
+        assert calls == [["query"]]
+        assert results == [[5.0], [5.0]]
+        assert cache.stats()["shared"] == 1
+
+    def test_failure_propagates_and_is_not_cached(self):
+        from apps.agent.rag.query_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache()
+
+        def broken(texts):
+            raise ConnectionError("down")
+
+        with pytest.raises(ConnectionError):
+            cache.get("a", broken)
+        assert cache.get("a", _encode) == [1.0]
+
+    def test_wrong_result_count_releases_inflight_and_waiters(self):
+        from apps.agent.rag.query_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache()
+        started = threading.Event()
+        release = threading.Event()
+
+        def short_encode(texts):
+            started.set()
+            release.wait(5)
+            return _encode(texts)[:-1]
+
+        errors = []
+
+        def call(texts, encode):
+            try:
+                cache.get_many(texts, encode)
+            except ValueError as e:
+                errors.append(e)
+
+        owner = threading.Thread(target=call, args=(["a", "bb"], short_encode))
+        owner.start()
+        started.wait(5)
+        follower = threading.Thread(target=call, args=(["bb"], _encode))
+        follower.start()
+        time.sleep(0.05)
+        release.set()
+        owner.join(5)
+        follower.join(5)
+
+        assert not follower.is_alive()
+        assert len(errors) == 2
+        assert cache.get_many(["a", "bb"], _encode) == [[1.0], [2.0]]
@@ -0,0 +1,56 @@
+"""
+测试检索结果重排
+"""
+
+from collections.abc import Sequence
+
+from apps.agent.rag.reranker import LexicalReranker, Reranker
+
+
+class RecordingReranker(Reranker):
+    """按文本长度打分，并记录每批的大小"""
+
+    def __init__(self, batch_size: int) -> None:
+        super().__init__(batch_size=batch_size)
+        self.batches: list[int] = []
+
+    def score_batch(self, query: str, texts: Sequence[str]) -> list[float]:
+        self.batches.append(len(texts))
+        return [float(len(text)) for text in texts]
+
+
+def _docs(*texts: str) -> list[dict]:
+    return [{"id": i, "document_text": text} for i, text in enumerate(texts)]
+
+
+class TestReranker:
+    """测试重排的打分批次、排序与截断"""
+
+    def test_scores_in_batches(self):
+        reranker = RecordingReranker(batch_size=2)
+        reranker.rerank("q", _docs("a", "bb", "ccc", "dddd", "eeeee"), top_k=5)
+        assert reranker.batches == [2, 2, 1]
+
+    def test_sorted_top_k_with_scores(self):
+        reranker = RecordingReranker(batch_size=16)
+        ranked = reranker.rerank("q", _docs("a", "ccc", "bb"), top_k=2)
+        assert [doc["id"] for doc in ranked] == [1, 2]
+        assert [doc["score"] for doc in ranked] == [3.0, 2.0]
+
+    def test_min_score_filters(self):
+        reranker = RecordingReranker(batch_size=16)
+        ranked = reranker.rerank("q", _docs("a", "ccc", "bb"), top_k=3, min_score=2.0)
+        assert [doc["id"] for doc in ranked] == [1, 2]
+
+    def test_empty_docs(self):
+        assert RecordingReranker(batch_size=4).rerank("q", [], top_k=3) == []
+
+
+class TestLexicalReranker:
+    """测试查询词覆盖率打分"""
+
+    def test_prefers_documents_covering_query_terms(self):
+        docs = _docs("列表推导式是一种语法结构。", "闭包是内部函数访问外部函数的局部变量。")
+        ranked = LexicalReranker().rerank("什么是闭包", docs, top_k=2)
+        assert ranked[0]["id"] == 1
+        assert 0.0 <= ranked[-1]["score"] <= ranked[0]["score"] <= 1.0
@@ -0,0 +1,123 @@
+"""单遍句子边界分割测试：边界优先级、超长片段拆分、重叠、token 计数与 Markdown 元数据"""
+
+import random
+
+import pytest
+
+from apps.agent.rag import document_split, sentence_splitter
+from apps.agent.rag.batch_embedder import estimate_tokens
+from apps.agent.rag.sentence_splitter import SentenceSplitter
+from apps.config import settings
+
+SENTENCES = [
+    "知识库支持多种文件格式。",
+    "向量检索召回相关分块！",
+    "模型生成最终回答？",
+    "Hybrid search works well. ",
+    "分块，重排，再生成；",
+]
+
+
+def _paragraphs(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 12))) for _ in range(n)]
+
+
+def _assert_contiguous(text: str, chunks: list[str]) -> None:
+    """分块按顺序是原文的连续片段，拼接后（忽略空白）即全文"""
+    position = 0
+    for chunk in chunks:
+        found = text.find(chunk, position)
+        assert found >= 0
+        position = found + len(chunk)
+    assert "".join(chunks).replace(" ", "").replace("\n", "") == text.replace(" ", "").replace("\n", "")
+
+
+def test_chunks_respect_size_and_cover_text():
+    text = "\n\n".join(_paragraphs(200))
+    chunks = SentenceSplitter(120).split_text(text)
+    assert max(len(c) for c in chunks) <= 120
+    _assert_contiguous(text, chunks)
+
+
+def test_prefers_paragraph_then_sentence_boundaries():
+    first, second = "甲" * 59 + "。", "乙" * 59 + "。"
+    assert SentenceSplitter(100).split_text(f"{first}\n\n{second}") == [first, second]
+
+    text = "".join(f"第{i}句话的内容。" for i in range(30))
+    chunks = SentenceSplitter(50).split_text(text)
+    assert all(chunk.endswith("。") for chunk in chunks)
+    _assert_contiguous(text, chunks)
+
+    # 英文句点只在其后为空白或文本末尾时视为句末
+    assert SentenceSplitter(12).split_text("Pi is 3.14 today. Next one.") == ["Pi is 3.14", "today.", "Next one."]
+
+
+def test_splits_text_without_boundaries():
+    text = "无标点长文本" * 50 + "averyveryverylongenglishword" * 3
+    chunks = SentenceSplitter(40).split_text(text)
+    assert max(len(c) for c in chunks) <= 40
+    _assert_contiguous(text, chunks)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 31])
+def test_words_longer_than_chunk_size_are_split_by_character(chunk_size):
+    text = "abcdefghij klmno " + "x" * 40
+    chunks = SentenceSplitter(chunk_size).split_text(text)
+    assert max(len(c) for c in chunks) <= chunk_size
+    _assert_contiguous(text, chunks)
+    assert SentenceSplitter(5).split_text("abcdefghij klmno") == ["abcde", "fghij", "klmno"]
+
+
+def test_overlap_repeats_tail_of_previous_chunk():
+    text = "".join(f"句子{i:02d}。" for i in range(40))
+    chunks = SentenceSplitter(30, chunk_overlap=12).split_text(text)
+    assert max(len(c) for c in chunks) <= 30
+    for previous, current in zip(chunks, chunks[1:], strict=False):
+        assert current.startswith(previous[-10:])
+    with pytest.raises(ValueError):
+        SentenceSplitter(10, chunk_overlap=10)
+
+
+def test_length_function_sizes_chunks_in_tokens():
+    text = " ".join(["Retrieval augmented generation keeps answers grounded."] * 40)
+    chunks = SentenceSplitter(30, length_function=estimate_tokens).split_text(text)
+    assert max(estimate_tokens(c) for c in chunks) <= 30
+    assert max(len(c) for c in chunks) > 30  # 按 token 计数，英文分块的字符数大于 chunk_size
+
+
+def test_length_function_follows_embedding_provider(monkeypatch):
+    loaded: list[tuple[str, str]] = []
+    monkeypatch.setattr(settings, "SPLIT_LENGTH_UNIT", "tokens")
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "huggingface")
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL", "Qwen/Qwen3-Embedding-8B")
+    monkeypatch.setattr(
+        sentence_splitter, "_tokenizer_length", lambda provider, model: loaded.append((provider, model)) or len
+    )
+    sentence_splitter.get_length_function.cache_clear()
+    try:
+        assert sentence_splitter.get_length_function() is len
+    finally:
+        sentence_splitter.get_length_function.cache_clear()
+    # 本地模型的 tokenizer，而不是 openai 的 EMBEDDING_MODEL
+    assert loaded == [("huggingface", "Qwen/Qwen3-Embedding-8B")]
+
+
+@pytest.mark.parametrize("engine", ["sentence", "recursive"])
+def test_markdown_metadata_matches_header_splitter(monkeypatch, engine):
+    monkeypatch.setattr(settings, "TEXT_SPLITTER", engine)
+    document_split._text_splitter.cache_clear()
+    try:
+        sections = [("# 总览", {"h1": "总览"}), ("## 安装", {"h1": "总览", "h2": "安装"})]
+        sections.append(("### 依赖", {"h1": "总览", "h2": "安装", "h3": "依赖"}))
+        sections.append(("# 附录", {"h1": "附录"}))
+        text = "\n".join(f"{header}\n" + "\n\n".join(_paragraphs(6, seed=i)) for i, (header, _) in enumerate(sections))
+
+        docs = document_split.split_markdown(text, 100)
+        metadata = [d.metadata for d in docs]
+        assert [m for i, m in enumerate(metadata) if i == 0 or m != metadata[i - 1]] == [m for _, m in sections]
+        assert isinstance(document_split._text_splitter(100, 0, markdown=True), SentenceSplitter) == (
+            engine == "sentence"
+        )
+    finally:
+        document_split._text_splitter.cache_clear()
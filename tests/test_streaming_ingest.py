@@ -0,0 +1,142 @@
+"""流式入库测试：增量解码、docx 逐段落解析、流式分割与流水线阶段上报"""
+
+import io
+import random
+from types import SimpleNamespace
+
+import docx
+
+from apps.agent.rag.batch_embedder import EmbeddingMetrics
+from apps.agent.rag.document_split import iter_split_document, split_markdown, split_text
+from apps.agent.rag.sentence_splitter import get_length_function
+from apps.tasks import ingestion
+from apps.tasks.schemas import IngestJob
+
+WORDS = ["知识库", "检索", "增强", "生成。", "模型", "向量！", "hello ", "world.", "分割", "\n", "\n\n", "文本？"]
+
+
+def _random_text(n: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _pieces(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_incremental_decode_handles_split_characters():
+    raw = _random_text(500).encode("utf-8")
+    chunks = [raw[i : i + 1] for i in range(len(raw))]  # 多字节字符必然被截断
+    assert "".join(ingestion.iter_content(chunks, "txt")) == raw.decode("utf-8")
+
+
+def test_docx_paragraphs_match_python_docx():
+    document = docx.Document()
+    document.add_paragraph("第一段")
+    run = document.add_paragraph("制表").add_run("\t之后")
+    run.add_break()
+    run.add_text("换行之后")
+    document.add_paragraph("")
+    document.add_table(rows=1, cols=1).cell(0, 0).text = "表格内容"
+    document.add_paragraph("最后一段")
+    buffer = io.BytesIO()
+    document.save(buffer)
+
+    expected = "\n".join(p.text for p in docx.Document(io.BytesIO(buffer.getvalue())).paragraphs)
+    raw = buffer.getvalue()
+    chunks = [raw[i : i + 1000] for i in range(0, len(raw), 1000)]
+    assert "".join(ingestion.iter_content(chunks, "docx")) == expected
+
+
+TEXT_BOX_RUN = (
+    '<w:r xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+    ' xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+    ' xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape"'
+    ' xmlns:v="urn:schemas-microsoft-com:vml">'
+    "<mc:AlternateContent>"
+    '<mc:Choice Requires="wps"><w:drawing><wps:txbx><w:txbxContent>'
+    "<w:p><w:r><w:t>文本框内容</w:t></w:r></w:p>"
+    "</w:txbxContent></wps:txbx></w:drawing></mc:Choice>"
+    "<mc:Fallback><w:pict><v:textbox><w:txbxContent>"
+    "<w:p><w:r><w:t>文本框内容</w:t></w:r></w:p>"
+    "</w:txbxContent></v:textbox></w:pict></mc:Fallback>"
+    "</mc:AlternateContent>"
+    "<w:t>正文</w:t>"
+    "</w:r>"
+)
+
+
+def test_docx_text_box_paragraph_matches_python_docx():
+    from docx.oxml import parse_xml
+
+    document = docx.Document()
+    paragraph = document.add_paragraph("文本框之前")
+    paragraph._p.append(parse_xml(TEXT_BOX_RUN))
+    paragraph._p.append(
+        parse_xml(
+            '<w:ins xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" w:id="1" w:author="a">'
+            "<w:r><w:t>修订插入</w:t></w:r></w:ins>"
+        )
+    )
+    buffer = io.BytesIO()
+    document.save(buffer)
+
+    expected = "\n".join(p.text for p in docx.Document(io.BytesIO(buffer.getvalue())).paragraphs)
+    assert expected == "文本框之前正文"
+    assert "".join(ingestion.iter_content([buffer.getvalue()], "docx")) == expected
+
+
+def test_streaming_text_split_respects_chunk_size_and_covers_text():
+    text = _random_text(20000)
+    chunks = [doc.page_content for doc in iter_split_document(_pieces(text, 777), "txt", 200)]
+    assert max(get_length_function()(c) for c in chunks) <= 200
+    assert "".join(chunks).replace("\n", "").replace(" ", "") == text.replace("\n", "").replace(" ", "")
+
+    # 不超过一个窗口的文本与整篇分割完全一致
+    short = text[:2000]
+    assert [d.page_content for d in iter_split_document(_pieces(short, 100), "txt", 200)] == [
+        d.page_content for d in split_text(short, 200)
+    ]
+
+
+def test_streaming_markdown_split_matches_whole_document():
+    rng = random.Random(1)
+    lines: list[str] = []
+    for i in range(150):
+        lines.append("#" * rng.choice([1, 2, 3, 4]) + f" 标题{i}")
+        if i % 17 == 0:
+            lines += ["```", "# 代码块中的注释", "```"]
+        lines += [_random_text(rng.randint(5, 60), seed=i * 10 + j).replace("\n", "") for j in range(rng.randint(0, 4))]
+    text = "\n".join(lines)
+
+    expected = [(d.page_content, d.metadata) for d in split_markdown(text, 200)]
+    streamed = [(d.page_content, d.metadata) for d in iter_split_document(_pieces(text, 333), "md", 200)]
+    assert streamed == expected
+
+
+def test_run_ingestion_streams_chunks_and_reports_stages(monkeypatch):
+    text = _random_text(5000)
+    consumed: list[str] = []
+
+    def save_documents(docs, user_id, knowledge_id, file_id):
+        for doc in docs:
+            consumed.append(doc.page_content)
+            assert stages == ["parse", "split", "embed"]
+        return EmbeddingMetrics(chunks=len(consumed), batches=1)
+
+    monkeypatch.setattr(ingestion, "milvus_vector", SimpleNamespace(save_documents=save_documents))
+    monkeypatch.setattr(ingestion, "get_answer_cache", lambda: SimpleNamespace(invalidate=lambda *args: None))
+    stages: list[str] = []
+    job = IngestJob(
+        job_id="1",
+        file_id=1,
+        file_name="a.txt",
+        file_type="txt",
+        user_id="u1",
+        knowledge_id=1,
+        raw=text.encode("utf-8"),
+    )
+
+    result = ingestion.run_ingestion(job, stages.append)
+    assert result.chunks == len(consumed) > 1
+    assert stages == ["parse", "split", "embed"]